@@ -0,0 +1,239 @@
+"""
+Vectorized portfolio risk analytics
+
+Risk factors of a set of analyses are loaded once into NumPy arrays (scores,
+category codes, lifecycle stage codes) and every statistic is computed with
+array operations instead of Python loops over ORM objects.
+
+Loading avoids per-factor Python work as well: the database maps enums to
+integer codes, and the integer rows are read from the DBAPI cursor in chunks
+straight into one 2-D array, without SQLAlchemy's row processing. Each row
+holds all values of one factor, so the columns line up whatever order the
+database returns the rows in.
+"""
+from itertools import chain
+from typing import Dict, List, Sequence
+
+import numpy as np
+from sqlalchemy import String, case, func, select, type_coerce
+from sqlalchemy.orm import Session
+
+from ..models.risk_analysis import RiskAnalysis, RiskFactor, HazardCategory, LifecycleStage
+
+# Same thresholds as calculate_analysis_statistics
+HIGH_RISK_THRESHOLD = 15
+MEDIUM_RISK_THRESHOLD = 10
+
+DEFAULT_PERCENTILES = (50, 75, 90, 95, 99)
+
+CATEGORIES = list(HazardCategory)
+STAGES = list(LifecycleStage)
+
+# Enum columns are stored by member name; map them straight to small integer codes
+CATEGORY_CODES = {category.name: code for code, category in enumerate(CATEGORIES)}
+STAGE_CODES = {stage.name: code for code, stage in enumerate(STAGES)}
+
+# Stands in for a missing residual risk score in the loaded rows
+NO_RESIDUAL = -1
+
+# Rows fetched per chunk: bounds the Python tuples alive at once
+FETCH_ROWS = 65536
+
+
+class RiskFactorArrays:
+    """Column-oriented view of risk factors"""
+
+    def __init__(
+        self,
+        ids: np.ndarray,
+        project_ids: np.ndarray,
+        severity: np.ndarray,
+        probability: np.ndarray,
+        risk: np.ndarray,
+        residual: np.ndarray,
+        category: np.ndarray,
+        stage: np.ndarray,
+    ):
+        self.ids = ids
+        self.project_ids = project_ids
+        self.severity = severity
+        self.probability = probability
+        self.risk = risk
+        self.residual = residual  # float, NaN where no residual risk was assessed
+        self.category = category
+        self.stage = stage
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @property
+    def nbytes(self) -> int:
+        """Memory held by the arrays"""
+        return sum(array.nbytes for array in (
+            self.ids, self.project_ids, self.severity, self.probability,
+            self.risk, self.residual, self.category, self.stage
+        ))
+
+    @classmethod
+    def from_columns(cls, columns: Sequence[Sequence]) -> "RiskFactorArrays":
+        """Build arrays from column sequences in load order (ids .. stage codes)"""
+        ids, project_ids, severity, probability, risk, residual, category, stage = columns
+        return cls(
+            ids=np.asarray(ids, dtype=np.int64),
+            project_ids=np.asarray(project_ids, dtype=np.int64),
+            severity=np.asarray(severity, dtype=np.int16),
+            probability=np.asarray(probability, dtype=np.int16),
+            risk=np.asarray(risk, dtype=np.int16),
+            residual=np.asarray(residual, dtype=np.float64),  # NaN where not assessed
+            category=np.asarray(category, dtype=np.int8),
+            stage=np.asarray(stage, dtype=np.int8),
+        )
+
+
+def _enum_codes(column, codes: Dict[str, int]):
+    return case(codes, value=type_coerce(column, String), else_=-1)
+
+
+# Loaded per factor, in RiskFactorArrays.from_columns order
+FACTOR_COLUMNS = (
+    RiskFactor.id,
+    RiskAnalysis.project_id,
+    RiskFactor.severity_score,
+    RiskFactor.probability_score,
+    RiskFactor.risk_score,
+    func.coalesce(RiskFactor.residual_risk_score, NO_RESIDUAL),
+    _enum_codes(RiskFactor.hazard_category, CATEGORY_CODES),
+    _enum_codes(RiskFactor.lifecycle_stage, STAGE_CODES),
+)
+
+
+def load_factor_arrays(db: Session, analysis_ids: List[int]) -> RiskFactorArrays:
+    """Load risk factors of the given analyses into NumPy arrays with one query"""
+    if not analysis_ids:
+        return RiskFactorArrays.from_columns([[]] * 8)
+
+    statement = select(*FACTOR_COLUMNS).join(
+        RiskAnalysis, RiskFactor.analysis_id == RiskAnalysis.id
+    ).where(RiskFactor.analysis_id.in_(analysis_ids)).order_by(RiskFactor.analysis_id, RiskFactor.id)
+    result = db.connection(bind_arguments={"clause": statement}).execute(statement)
+    try:
+        chunks = [
+            np.fromiter(chain.from_iterable(rows), dtype=np.int64, count=len(rows) * len(FACTOR_COLUMNS))
+            for rows in iter(lambda: result.cursor.fetchmany(FETCH_ROWS), [])
+        ]
+    finally:
+        result.close()
+    values = np.concatenate(chunks or [np.empty(0, dtype=np.int64)]).reshape(-1, len(FACTOR_COLUMNS))
+
+    columns = list(values.T)
+    residual = columns[5].astype(np.float64)
+    residual[residual == NO_RESIDUAL] = np.nan
+    columns[5] = residual
+    return RiskFactorArrays.from_columns(columns)
+
+
+def risk_distribution(arrays: RiskFactorArrays) -> Dict:
+    """Risk level counts and histograms of severity, probability and risk score"""
+    risk = arrays.risk
+    high = int(np.count_nonzero(risk >= HIGH_RISK_THRESHOLD))
+    medium = int(np.count_nonzero((risk >= MEDIUM_RISK_THRESHOLD) & (risk < HIGH_RISK_THRESHOLD)))
+    return {
+        "total_risk_factors": len(arrays),
+        "high_risk_count": high,
+        "medium_risk_count": medium,
+        "low_risk_count": len(arrays) - high - medium,
+        # index = score, clipped so invalid scores cannot blow up the histogram size
+        "severity_histogram": np.bincount(np.clip(arrays.severity, 0, 5), minlength=6).tolist(),
+        "probability_histogram": np.bincount(np.clip(arrays.probability, 0, 5), minlength=6).tolist(),
+        "risk_score_histogram": np.bincount(np.clip(risk, 0, 25), minlength=26).tolist(),
+    }
+
+
+def risk_percentiles(arrays: RiskFactorArrays, percentiles: Sequence[float] = DEFAULT_PERCENTILES) -> Dict[str, float]:
+    """Percentiles of the risk score"""
+    if not len(arrays):
+        return {str(p): 0.0 for p in percentiles}
+    values = np.percentile(arrays.risk, percentiles)
+    return {str(p): float(value) for p, value in zip(percentiles, values)}
+
+
+def _grouped_means(codes: np.ndarray, values: np.ndarray, labels: List[str]) -> Dict[str, Dict]:
+    valid = codes >= 0
+    codes = codes[valid].astype(np.int64)
+    values = values[valid].astype(np.float64)
+    counts = np.bincount(codes, minlength=len(labels))
+    sums = np.bincount(codes, weights=values, minlength=len(labels))
+    means = np.divide(sums, counts, out=np.zeros_like(sums), where=counts > 0)
+    return {
+        label: {"count": int(counts[code]), "mean_risk_score": round(float(means[code]), 3)}
+        for code, label in enumerate(labels)
+    }
+
+
+def category_means(arrays: RiskFactorArrays) -> Dict[str, Dict]:
+    """Factor count and mean risk score per hazard category"""
+    return _grouped_means(arrays.category, arrays.risk, [category.value for category in CATEGORIES])
+
+
+def stage_means(arrays: RiskFactorArrays) -> Dict[str, Dict]:
+    """Factor count and mean risk score per lifecycle stage"""
+    return _grouped_means(arrays.stage, arrays.risk, [stage.value for stage in STAGES])
+
+
+def residual_reduction(arrays: RiskFactorArrays) -> Dict:
+    """How much control measures reduce risk (1.0 = risk fully eliminated)"""
+    assessed = ~np.isnan(arrays.residual) & (arrays.risk > 0)
+    assessed_count = int(np.count_nonzero(assessed))
+    if not assessed_count:
+        return {"assessed_count": 0, "mean_reduction_ratio": None, "median_reduction_ratio": None,
+                "increased_count": 0}
+    initial = arrays.risk[assessed].astype(np.float64)
+    ratios = (initial - arrays.residual[assessed]) / initial
+    return {
+        "assessed_count": assessed_count,
+        "mean_reduction_ratio": round(float(ratios.mean()), 4),
+        "median_reduction_ratio": round(float(np.median(ratios)), 4),
+        "increased_count": int(np.count_nonzero(ratios < 0)),
+    }
+
+
+def risk_outliers(arrays: RiskFactorArrays, limit: int = 50) -> Dict:
+    """
+    Factors whose risk score lies above the upper Tukey fence (Q3 + 1.5 * IQR)
+
+    Returns the fence and the ids of the highest-scoring outliers.
+    """
+    if not len(arrays):
+        return {"upper_fence": None, "outlier_count": 0, "outliers": []}
+    q1, q3 = np.percentile(arrays.risk, (25, 75))
+    fence = q3 + 1.5 * (q3 - q1)
+    mask = arrays.risk > fence
+    indexes = np.flatnonzero(mask)
+    # Highest risk first, only the requested number of rows
+    if len(indexes) > limit:
+        top = np.argpartition(-arrays.risk[indexes], limit - 1)[:limit]
+        indexes = indexes[top]
+    indexes = indexes[np.argsort(-arrays.risk[indexes], kind="stable")]
+    return {
+        "upper_fence": float(fence),
+        "outlier_count": int(np.count_nonzero(mask)),
+        "outliers": [
+            {
+                "risk_factor_id": int(arrays.ids[i]),
+                "project_id": int(arrays.project_ids[i]),
+                "risk_score": int(arrays.risk[i]),
+            }
+            for i in indexes
+        ],
+    }
+
+
+def portfolio_summary(arrays: RiskFactorArrays) -> Dict:
+    """All portfolio statistics in one call"""
+    return {
+        "distribution": risk_distribution(arrays),
+        "percentiles": risk_percentiles(arrays),
+        "categories": category_means(arrays),
+        "lifecycle_stages": stage_means(arrays),
+        "residual_reduction": residual_reduction(arrays),
+    }
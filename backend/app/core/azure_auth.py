@@ -3,12 +3,15 @@ Azure Entra ID authentication utilities
 """
 import httpx
 import json
+import logging
 from datetime import datetime, timedelta
 from typing import Optional, Dict, Any
 from jose import jwt, JWTError
 from fastapi import HTTPException, status
 from .config import settings
 
+logger = logging.getLogger(__name__)
+
 # Azure Entra configuration
 AZURE_TENANT_ID = "deb8c5e9-54cd-477d-be23-71cb103b773f"
 AZURE_CLIENT_ID = "624fdd0e-67d1-4f65-8a19-036f4c6879c6"
@@ -71,7 +74,7 @@ async def verify_azure_token(token: str) -> Dict[str, Any]:
         
         # Decode without verification for testing
         unverified_payload = jwt.get_unverified_claims(token)
-        print(f"Token payload: {unverified_payload}")
+        logger.debug("Azure token claims", extra={"claims": sorted(unverified_payload)})
         
         # Extract user information
         user_info = {
@@ -83,7 +86,7 @@ async def verify_azure_token(token: str) -> Dict[str, Any]:
             "tenant_id": unverified_payload.get("tid"),
         }
         
-        print(f"Extracted user info: {user_info}")
+        logger.debug("Azure user extracted", extra={"object_id": user_info["object_id"]})
         
         # Ensure we have required fields
         if not user_info["object_id"]:
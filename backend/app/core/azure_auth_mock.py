@@ -3,21 +3,23 @@ Mock Azure authentication for development/testing
 This bypasses Azure token verification for local development
 """
 
+import logging
 from datetime import datetime, timedelta
 from typing import Dict, Any
 from jose import jwt
 from fastapi import HTTPException, status
 from .config import settings
 
+logger = logging.getLogger(__name__)
+
 async def verify_azure_token_mock(token: str) -> Dict[str, Any]:
     """Mock Azure token verification for development"""
-    print(f"🔧 Mock Azure token verification (development mode)")
-    print(f"Token length: {len(token)}")
+    logger.debug("Mock Azure token verification", extra={"token_length": len(token)})
     
     try:
         # Try to decode without verification
         unverified_payload = jwt.get_unverified_claims(token)
-        print(f"Token payload keys: {list(unverified_payload.keys())}")
+        logger.debug("Azure token claims", extra={"claims": sorted(unverified_payload)})
         
         # Extract user information with better fallbacks
         email = (unverified_payload.get("email") or 
@@ -49,18 +51,15 @@ async def verify_azure_token_mock(token: str) -> Dict[str, Any]:
             "tenant_id": unverified_payload.get("tid"),
         }
         
-        print(f"✅ Extracted user info: {user_info}")
-        
         # Validate required fields
         if not user_info["email"]:
-            print("⚠️  No email found, using fallback")
+            logger.warning("Azure token has no email claim, using fallback email")
             user_info["email"] = "fallback@example.com"
         
         return user_info
         
     except Exception as e:
-        print(f"❌ Token decode error: {e}")
-        print("Using complete fallback user data")
+        logger.warning("Azure token could not be decoded, using fallback user: %s", e)
         # Complete fallback
         return {
             "object_id": "mock-fallback-user",
@@ -0,0 +1,295 @@
+"""
+Batch execution of API operations
+
+POST /api/batch runs an ordered list of sub-operations (method, path, query,
+body) through the existing route handlers: each operation is matched against
+the application's routes and its handler is called directly, with arguments
+bound from the operation and the batch's shared session and user instead of a
+new HTTP request, authentication and session per call.
+
+All operations share one session inside one database transaction. Handlers
+still call db.commit(); in the batch session that only releases a savepoint,
+and the transaction is committed once at the end. A failed operation either rolls
+back the whole batch (atomic, the default) or, in non-atomic batches where each
+operation runs in its own savepoint, only itself.
+
+Handlers see the batch's uncommitted rows, so cache writes are suspended for
+the whole batch: a rolled-back batch hands the same revisions out again and
+must not leave values computed from its rows behind. Operations whose effects
+happen outside the transaction (report jobs, picked up by worker processes
+that cannot see uncommitted rows) are not available in batches.
+"""
+import inspect
+import json
+import logging
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Annotated, Any, Dict, List, Optional, Tuple, get_origin, get_type_hints
+from urllib.parse import parse_qs, urlsplit
+
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.params import Body, Depends
+from fastapi.responses import JSONResponse
+from fastapi.routing import APIRoute
+from pydantic import BaseModel, TypeAdapter, ValidationError
+from pydantic.fields import FieldInfo
+from pydantic_core import PydanticUndefined
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from starlette.routing import Match
+
+from .cache import suspend_cache_writes
+from ..database import SessionLocal, engine, get_db
+from ..models.user import User
+from ..routers.auth import get_current_active_user, get_current_user
+
+logger = logging.getLogger(__name__)
+
+# Paths that make no sense inside a batch (login flow, nested batches)
+EXCLUDED_PREFIXES = ("/api/auth", "/api/batch")
+# (method, path prefix) of operations with effects outside the batch transaction
+EXCLUDED_OPERATIONS = (("POST", "/api/reports"),)
+
+
+class BatchOperationError(Exception):
+    """Operation that cannot be run in a batch, reported like an HTTP error"""
+
+    def __init__(self, status_code: int, detail: Any):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+@contextmanager
+def batch_session():
+    """Session whose commits release savepoints of one outer transaction, which is rolled back unless committed"""
+    connection = engine.connect()
+    transaction = connection.begin()
+    if connection.dialect.name == "sqlite":
+        # pysqlite defers BEGIN to the first write, so the first SAVEPOINT would
+        # open the transaction itself and its RELEASE would commit everything
+        connection.exec_driver_sql("BEGIN")
+    db = SessionLocal(bind=connection, join_transaction_mode="create_savepoint")
+    try:
+        yield db, connection, transaction
+    finally:
+        db.close()
+        if transaction.is_active:
+            transaction.rollback()
+        connection.close()
+
+
+def resolve_operation(routers: List[Tuple[APIRouter, str]], method: str, path: str) -> Tuple[APIRoute, Dict[str, Any]]:
+    """Route and path parameters for an operation (404 / 405 like a direct request)"""
+    if not path.startswith("/api/") or path.startswith(EXCLUDED_PREFIXES):
+        raise BatchOperationError(400, f"Path not available in batch requests: {path}")
+    if any(method == excluded_method and path.startswith(prefix) for excluded_method, prefix in EXCLUDED_OPERATIONS):
+        raise BatchOperationError(400, f"Operation not available in batch requests: {method} {path}")
+    method_mismatch = False
+    for router, prefix in routers:
+        if not path.startswith(prefix):
+            continue
+        # Router routes carry their paths without the include prefix
+        scope = {"type": "http", "method": method, "path": path[len(prefix):], "root_path": ""}
+        for route in router.routes:
+            if not isinstance(route, APIRoute):
+                continue
+            match, child_scope = route.matches(scope)
+            if match == Match.FULL:
+                return route, child_scope["path_params"]
+            if match == Match.PARTIAL:
+                method_mismatch = True
+    if method_mismatch:
+        raise BatchOperationError(405, "Method Not Allowed")
+    raise BatchOperationError(404, "Not Found")
+
+
+class HandlerParameter:
+    """A handler parameter and how a batch operation supplies it"""
+
+    def __init__(self, name: str, annotation: Any, default: Any):
+        self.name = name
+        self.default = default
+        self.field_info = default if isinstance(default, FieldInfo) else None
+        self.key = getattr(self.field_info, "alias", None) or name
+        self.is_list = get_origin(annotation) is list or any(
+            get_origin(arg) is list for arg in getattr(annotation, "__args__", ())
+        )
+        if isinstance(default, Depends):
+            self.source = "depends"
+        elif inspect.isclass(annotation) and issubclass(annotation, Request):
+            self.source = "request"
+        elif isinstance(default, Body) or (inspect.isclass(annotation) and issubclass(annotation, BaseModel)):
+            self.source = "body"
+        else:
+            self.source = "value"  # path or query
+        if self.source in ("body", "value"):
+            # Query(...) constraints (ge, pattern, ...) are applied as in a direct request
+            constrained = annotation if self.field_info is None else Annotated[annotation, self.field_info]
+            self.adapter = TypeAdapter(constrained)
+
+    @property
+    def fallback(self):
+        value = self.field_info.default if self.field_info is not None else self.default
+        if value is PydanticUndefined or value is Ellipsis or value is inspect.Parameter.empty:
+            return PydanticUndefined
+        return value
+
+    def validate(self, value, location: Tuple[str, ...]):
+        try:
+            return self.adapter.validate_python(value)
+        except ValidationError as e:
+            errors = [{**error, "loc": location + tuple(error["loc"])} for error in e.errors(include_url=False)]
+            raise BatchOperationError(422, jsonable_encoder(errors))
+
+
+@lru_cache(maxsize=None)
+def handler_parameters(endpoint) -> List[HandlerParameter]:
+    hints = get_type_hints(endpoint)
+    return [
+        HandlerParameter(name, hints.get(name, Any), parameter.default)
+        for name, parameter in inspect.signature(endpoint).parameters.items()
+    ]
+
+
+def _missing(location: Tuple[str, ...]) -> BatchOperationError:
+    return BatchOperationError(422, [{"type": "missing", "loc": list(location), "msg": "Field required"}])
+
+
+def bind_arguments(
+    route: APIRoute,
+    path_params: Dict[str, Any],
+    query: Dict[str, List[str]],
+    body: Any,
+    db: Session,
+    user: User,
+    request: Request
+) -> Dict[str, Any]:
+    """Handler keyword arguments for an operation, validated like FastAPI does for a request"""
+    kwargs = {}
+    for parameter in handler_parameters(route.endpoint):
+        name = parameter.name
+        if parameter.source == "depends":
+            dependency = parameter.default.dependency
+            if dependency is get_db:
+                kwargs[name] = db
+            elif dependency in (get_current_active_user, get_current_user):
+                kwargs[name] = user
+            else:
+                raise BatchOperationError(400, f"Operation not supported in batch requests: {route.path}")
+        elif parameter.source == "request":
+            kwargs[name] = request
+        elif name in path_params:
+            kwargs[name] = parameter.validate(path_params[name], ("path", name))
+        elif parameter.source == "body":
+            if body is None:
+                raise _missing(("body",))
+            kwargs[name] = parameter.validate(body, ("body",))
+        elif parameter.key in query:
+            values = query[parameter.key]
+            kwargs[name] = parameter.validate(values if parameter.is_list else values[-1], ("query", parameter.key))
+        elif parameter.fallback is not PydanticUndefined:
+            kwargs[name] = parameter.fallback
+        else:
+            raise _missing(("query", parameter.key))
+    return kwargs
+
+
+def parse_query(path: str, query: Optional[Dict[str, Any]]) -> Tuple[str, Dict[str, List[str]]]:
+    """Path without its query string, and the query values from both the path and the `query` object"""
+    parts = urlsplit(path)
+    values = parse_qs(parts.query, keep_blank_values=True)
+    for key, value in (query or {}).items():
+        values[key] = [str(item) for item in value] if isinstance(value, list) else [str(value)]
+    return parts.path, values
+
+
+@lru_cache(maxsize=None)
+def response_adapter(response_model) -> TypeAdapter:
+    return TypeAdapter(response_model)
+
+
+def serialize_result(route: APIRoute, result: Any) -> Tuple[int, Any]:
+    """Status code and JSON body of a handler result, shaped by the route's response model"""
+    if isinstance(result, JSONResponse):
+        return result.status_code, json.loads(result.body) if result.body else None
+    if hasattr(result, "body_iterator") or hasattr(result, "body"):
+        raise BatchOperationError(400, "Non-JSON responses (file downloads) are not supported in batch requests")
+    status_code = route.status_code or 200
+    if route.response_model is not None:
+        adapter = response_adapter(route.response_model)
+        return status_code, adapter.dump_python(adapter.validate_python(result, from_attributes=True), mode="json")
+    return status_code, jsonable_encoder(result)
+
+
+async def run_operation(
+    routers: List[Tuple[APIRouter, str]],
+    operation,
+    db: Session,
+    user: User,
+    request: Request
+) -> Tuple[int, Any]:
+    """Run one operation through its route handler and return (status, body)"""
+    method = operation.method.upper()
+    path, query = parse_query(operation.path, operation.query)
+    route, path_params = resolve_operation(routers, method, path)
+    kwargs = bind_arguments(route, path_params, query, operation.body, db, user, request)
+    if inspect.iscoroutinefunction(route.endpoint):
+        result = await route.endpoint(**kwargs)
+    else:
+        result = await run_in_threadpool(route.endpoint, **kwargs)
+    # Serialized before the operation's commit expires the returned ORM objects
+    return serialize_result(route, result)
+
+
+async def execute_batch(
+    routers: List[Tuple[APIRouter, str]],
+    operations: List,
+    user: User,
+    request: Request,
+    atomic: bool = True
+) -> Tuple[List[Dict[str, Any]], bool]:
+    """
+    Run the operations in order in one session and transaction
+
+    atomic: the first failed operation rolls back the whole batch and the
+    remaining operations are skipped (status 424); otherwise only the failed
+    operation is rolled back and the rest still run and are committed.
+
+    Returns the per-operation results and whether the transaction was committed.
+    """
+    results = []
+    with batch_session() as (db, connection, transaction), suspend_cache_writes():
+        failed = False
+        for operation in operations:
+            if failed and atomic:
+                results.append({"id": operation.id, "status": 424, "body": {"detail": "Skipped after a failed operation"}})
+                continue
+
+            # Opened on the connection before the session's own savepoint, so it also
+            # covers the handler's intermediate commits (atomic batches roll back as a whole)
+            savepoint = None if atomic else connection.begin_nested()
+            try:
+                status_code, body = await run_operation(routers, operation, db, user, request)
+                if status_code < 400:
+                    db.commit()
+                    if savepoint is not None:
+                        savepoint.commit()
+            except (HTTPException, BatchOperationError) as e:
+                status_code, body = e.status_code, {"detail": e.detail}
+            except Exception:
+                logger.exception("Batch operation %s %s failed", operation.method, operation.path)
+                status_code, body = 500, {"detail": "Internal Server Error"}
+
+            if status_code >= 400:
+                db.rollback()
+                if savepoint is not None and savepoint.is_active:
+                    savepoint.rollback()
+                failed = True
+            results.append({"id": operation.id, "status": status_code, "body": body})
+
+        committed = not (failed and atomic)
+        if committed:
+            transaction.commit()
+    return results, committed
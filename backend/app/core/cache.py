@@ -0,0 +1,85 @@
+"""
+In-process caches for derived data
+"""
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Hashable, Iterator, Optional
+
+# Set while uncommitted changes are visible (a batch transaction): values computed
+# from them must not be cached, since a rollback hands their revisions out again
+cache_writes_suspended: ContextVar[bool] = ContextVar("cache_writes_suspended", default=False)
+
+
+@contextmanager
+def suspend_cache_writes() -> Iterator[None]:
+    """Make every RevisionCache.put a no-op in this context (and threads started from it)"""
+    token = cache_writes_suspended.set(True)
+    try:
+        yield
+    finally:
+        cache_writes_suspended.reset(token)
+
+
+class RevisionCache:
+    """
+    LRU cache whose entries are only valid for the revision they were computed at
+
+    A lookup with a different revision is a miss, so callers never have to
+    invalidate explicitly: a changed project or analysis simply produces a new
+    revision string.
+
+    With max_size and sizeof, the cache is also bounded by the total size of
+    its values (e.g. bytes of large arrays); a value larger than max_size on
+    its own is not cached.
+
+    Nothing is stored while cache writes are suspended (see suspend_cache_writes).
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        max_size: Optional[int] = None,
+        sizeof: Optional[Callable[[Any], int]] = None
+    ):
+        self.max_entries = max_entries
+        self.max_size = max_size
+        self.sizeof = sizeof
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, revision: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != revision:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: Hashable, revision: str, value: Any):
+        if cache_writes_suspended.get():
+            return
+        size = self.sizeof(value) if self.sizeof is not None else 0
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.size -= previous[2]
+            if self.max_size is not None and size > self.max_size:
+                return
+            self._entries[key] = (revision, value, size)
+            self.size += size
+            while len(self._entries) > self.max_entries or (self.max_size is not None and self.size > self.max_size):
+                self.size -= self._entries.popitem(last=False)[1][2]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+            self.hits = 0
+            self.misses = 0
@@ -0,0 +1,383 @@
+"""
+Changelog retention and archival
+
+Entries older than the retention period are moved out of `changelogs` into
+compressed JSONL files under settings.changelog_archive_dir:
+
+    <archive dir>/<YYYY-MM>/changelogs-<min id>-<max id>.jsonl.zst   (or .gz)
+    <archive dir>/<YYYY-MM>/changelogs-<min id>-<max id>.jsonl.zst.idx.json
+
+A file is a sequence of independently compressed blocks of BLOCK_SIZE entries
+in id order (zstd frames or gzip members, so the whole file still decompresses
+with the standard tools). The index sidecar lists every block with its byte
+range, id range and the project/user/action values it contains, so a lookup
+by id decompresses one block and filtered searches skip blocks that cannot
+match. Segments are cataloged in ChangeLogArchiveSegment; a segment row and
+the deletion of its entries are committed together, after the files are on
+disk, so an interrupted run simply archives the same entries again. Files of
+a batch whose commit fails are removed, so no segment is left uncataloged.
+
+zstandard is optional; without it new archives are written with gzip.
+"""
+import gzip
+import json
+import os
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Set
+
+from sqlalchemy.orm import Session
+
+from .config import settings
+from .search import CHANGELOG_SEARCH_COLUMNS, query_terms, russian_prefix
+from ..models.changelog import ChangeLog, ActionType
+from ..models.changelog_archive import ChangeLogArchiveSegment
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Entries per independently compressed block
+BLOCK_SIZE = 500
+
+# Entries moved per transaction
+ARCHIVE_BATCH_SIZE = 5000
+
+# Bound the size of IN (...) lists
+DELETE_BATCH_SIZE = 500
+
+COMPRESSION_LEVEL = 10
+
+CODEC_EXTENSIONS = {"zstd": "zst", "gzip": "gz"}
+
+PAYLOAD_COLUMNS = ["old_values", "new_values", "extra_data"]
+
+ARCHIVE_COLUMNS = [
+    "id", "action_type", "action_description", "user_id", "target_type", "target_id", "target_name",
+    "project_id", "old_values", "new_values", "extra_data", "ip_address", "user_agent", "created_at",
+]
+
+
+def default_codec() -> str:
+    return "zstd" if zstandard is not None else "gzip"
+
+
+def _compress(codec: str, data: bytes) -> bytes:
+    if codec == "zstd":
+        return zstandard.ZstdCompressor(level=COMPRESSION_LEVEL).compress(data)
+    return gzip.compress(data, compresslevel=6)
+
+
+def _decompress(codec: str, data: bytes) -> bytes:
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("zstandard is required to read zstd changelog archives")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return gzip.decompress(data)
+
+
+def _naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """Comparable timestamp: SQLite returns naive UTC, clients may send aware values"""
+    if value is not None and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def _entry_dict(row) -> Dict[str, Any]:
+    entry = dict(zip(ARCHIVE_COLUMNS, row))
+    entry["action_type"] = entry["action_type"].value
+    entry["created_at"] = entry["created_at"].isoformat()
+    return entry
+
+
+def _write_file(path: str, data: bytes):
+    """Write through a temporary file so readers never see a partial file"""
+    temporary = path + ".tmp"
+    with open(temporary, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporary, path)
+
+
+def write_segment(archive_dir: str, month: str, entries: List[Dict[str, Any]], codec: str) -> Dict[str, Any]:
+    """Write one segment file and its sidecar; returns the catalog row values"""
+    relative_path = os.path.join(
+        month, f"changelogs-{entries[0]['id']}-{entries[-1]['id']}.jsonl.{CODEC_EXTENSIONS[codec]}"
+    )
+    os.makedirs(os.path.join(archive_dir, month), exist_ok=True)
+
+    data = bytearray()
+    blocks = []
+    for start in range(0, len(entries), BLOCK_SIZE):
+        block_entries = entries[start:start + BLOCK_SIZE]
+        lines = "".join(json.dumps(entry, ensure_ascii=False) + "\n" for entry in block_entries)
+        compressed = _compress(codec, lines.encode("utf-8"))
+        blocks.append({
+            "offset": len(data),
+            "length": len(compressed),
+            "first_id": block_entries[0]["id"],
+            "last_id": block_entries[-1]["id"],
+            "count": len(block_entries),
+            "project_ids": sorted({e["project_id"] for e in block_entries if e["project_id"] is not None}),
+            "user_ids": sorted({e["user_id"] for e in block_entries}),
+            "action_types": sorted({e["action_type"] for e in block_entries}),
+        })
+        data.extend(compressed)
+
+    path = os.path.join(archive_dir, relative_path)
+    _write_file(path, bytes(data))
+    _write_file(path + ".idx.json", json.dumps({"codec": codec, "blocks": blocks}).encode("utf-8"))
+
+    created = [datetime.fromisoformat(entry["created_at"]) for entry in entries]
+    return {
+        "path": relative_path,
+        "codec": codec,
+        "month": month,
+        "min_id": entries[0]["id"],
+        "max_id": entries[-1]["id"],
+        "min_created_at": min(created),
+        "max_created_at": max(created),
+        "entry_count": len(entries),
+    }
+
+
+def _remove_segment_files(archive_dir: str, paths: List[str]):
+    """Delete segment files of a batch that was not committed (the entries are still in the table)"""
+    for relative_path in paths:
+        path = os.path.join(archive_dir, relative_path)
+        for name in (path, path + ".idx.json"):
+            try:
+                os.remove(name)
+            except FileNotFoundError:
+                pass
+
+
+def archive_changelog(
+    db: Session,
+    older_than: datetime,
+    archive_dir: Optional[str] = None,
+    batch_size: int = ARCHIVE_BATCH_SIZE,
+    codec: Optional[str] = None,
+    max_entries: Optional[int] = None
+) -> int:
+    """
+    Move entries created before `older_than` into archive files; returns the number moved
+
+    Runs in batches of `batch_size` entries, one transaction per batch, so it
+    can be stopped and resumed at any time.
+    """
+    archive_dir = archive_dir or settings.changelog_archive_dir
+    codec = codec or default_codec()
+    columns = [getattr(ChangeLog, name) for name in ARCHIVE_COLUMNS]
+    archived = 0
+    while max_entries is None or archived < max_entries:
+        limit = batch_size if max_entries is None else min(batch_size, max_entries - archived)
+        rows = db.query(*columns).filter(
+            ChangeLog.created_at < older_than
+        ).order_by(ChangeLog.id).limit(limit).all()
+        if not rows:
+            break
+
+        by_month: Dict[str, List[Dict[str, Any]]] = {}
+        for row in rows:
+            entry = _entry_dict(row)
+            by_month.setdefault(entry["created_at"][:7], []).append(entry)
+
+        written: List[str] = []
+        try:
+            for month, entries in sorted(by_month.items()):
+                segment = write_segment(archive_dir, month, entries, codec)
+                written.append(segment["path"])
+                db.add(ChangeLogArchiveSegment(**segment))
+
+            ids = [row[0] for row in rows]
+            for start in range(0, len(ids), DELETE_BATCH_SIZE):
+                db.query(ChangeLog).filter(
+                    ChangeLog.id.in_(ids[start:start + DELETE_BATCH_SIZE])
+                ).delete(synchronize_session=False)
+            db.commit()
+        except BaseException:
+            db.rollback()
+            _remove_segment_files(archive_dir, written)
+            raise
+        archived += len(rows)
+    return archived
+
+
+@lru_cache(maxsize=256)
+def _load_sidecar(path: str, mtime: float) -> Dict[str, Any]:
+    with open(path + ".idx.json", "rb") as f:
+        return json.loads(f.read())
+
+
+def segment_index(archive_dir: str, segment: ChangeLogArchiveSegment) -> Dict[str, Any]:
+    """Parsed sidecar of a segment (cached while the file is unchanged)"""
+    path = os.path.join(archive_dir, segment.path)
+    return _load_sidecar(path, os.path.getmtime(path + ".idx.json"))
+
+
+def read_block(archive_dir: str, segment: ChangeLogArchiveSegment, block: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Decompress one block of a segment into entry dicts"""
+    with open(os.path.join(archive_dir, segment.path), "rb") as f:
+        f.seek(block["offset"])
+        data = f.read(block["length"])
+    return [json.loads(line) for line in _decompress(segment.codec, data).decode("utf-8").splitlines()]
+
+
+def _restore_types(entry: Dict[str, Any]) -> Dict[str, Any]:
+    entry["action_type"] = ActionType(entry["action_type"])
+    entry["created_at"] = datetime.fromisoformat(entry["created_at"])
+    # Archived before the payload columns became JSON: values are JSON text
+    for name in PAYLOAD_COLUMNS:
+        if isinstance(entry[name], str):
+            entry[name] = _payload(entry[name]) or None
+    return entry
+
+
+def _payload(value: Any) -> Dict[str, Any]:
+    if isinstance(value, str):
+        try:
+            value = json.loads(value)
+        except ValueError:
+            return {}
+    return value if isinstance(value, dict) else {}
+
+
+def _search_text(value: Any) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, str):
+        return value.lower()
+    return json.dumps(value, ensure_ascii=False).lower()
+
+
+def find_archived_entry(db: Session, changelog_id: int, archive_dir: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """Archived changelog entry by id (None if it is not archived)"""
+    archive_dir = archive_dir or settings.changelog_archive_dir
+    segments = db.query(ChangeLogArchiveSegment).filter(
+        ChangeLogArchiveSegment.min_id <= changelog_id,
+        ChangeLogArchiveSegment.max_id >= changelog_id
+    ).all()
+    for segment in segments:
+        for block in segment_index(archive_dir, segment)["blocks"]:
+            if block["first_id"] <= changelog_id <= block["last_id"]:
+                for entry in read_block(archive_dir, segment, block):
+                    if entry["id"] == changelog_id:
+                        return _restore_types(entry)
+    return None
+
+
+class ArchiveFilter:
+    """The changelog search filters, evaluated against archived entries"""
+
+    def __init__(
+        self,
+        query: Optional[str] = None,
+        project_ids: Optional[List[int]] = None,
+        user_id: Optional[int] = None,
+        action_type: Optional[ActionType] = None,
+        date_from: Optional[datetime] = None,
+        date_to: Optional[datetime] = None,
+        field: Optional[str] = None
+    ):
+        self.terms = [russian_prefix(term) for term in query_terms(query)] if query else []
+        self.project_ids: Optional[Set[int]] = set(project_ids) if project_ids is not None else None
+        self.user_id = user_id
+        self.action_type = action_type.value if action_type is not None else None
+        self.date_from = _naive_utc(date_from)
+        self.date_to = _naive_utc(date_to)
+        self.field = field
+
+    def segment_criteria(self) -> List[Any]:
+        criteria = []
+        if self.date_from is not None:
+            criteria.append(ChangeLogArchiveSegment.max_created_at >= self.date_from)
+        if self.date_to is not None:
+            criteria.append(ChangeLogArchiveSegment.min_created_at <= self.date_to)
+        return criteria
+
+    def block_may_match(self, block: Dict[str, Any]) -> bool:
+        if self.project_ids is not None and not self.project_ids.intersection(block["project_ids"]):
+            return False
+        if self.user_id is not None and self.user_id not in block["user_ids"]:
+            return False
+        if self.action_type is not None and self.action_type not in block["action_types"]:
+            return False
+        return True
+
+    def matches(self, entry: Dict[str, Any]) -> bool:
+        if self.project_ids is not None and entry["project_id"] not in self.project_ids:
+            return False
+        if self.user_id is not None and entry["user_id"] != self.user_id:
+            return False
+        if self.action_type is not None and entry["action_type"] != self.action_type:
+            return False
+        if self.date_from is not None or self.date_to is not None:
+            created_at = _naive_utc(datetime.fromisoformat(entry["created_at"]))
+            if self.date_from is not None and created_at < self.date_from:
+                return False
+            if self.date_to is not None and created_at > self.date_to:
+                return False
+        if self.field is not None and not any(
+            self.field in _payload(entry[name]) for name in ("old_values", "new_values")
+        ):
+            return False
+        # Same semantics as the LIKE search fallback: every term occurs in some searched column
+        for term in self.terms:
+            if not any(term in _search_text(entry.get(name)) for name in CHANGELOG_SEARCH_COLUMNS):
+                return False
+        return True
+
+
+def search_archived_entries(
+    db: Session,
+    archive_filter: ArchiveFilter,
+    before_id: Optional[int] = None,
+    after_id: Optional[int] = None,
+    limit: int = 50,
+    archive_dir: Optional[str] = None
+) -> List[Dict[str, Any]]:
+    """
+    Archived entries matching the filter with after_id < id < before_id, newest first
+
+    Segments and blocks are visited from the highest ids down and skipped when
+    their sidecar shows they cannot match; the scan stops once `limit` entries
+    newer than anything left to visit have been found.
+    """
+    archive_dir = archive_dir or settings.changelog_archive_dir
+    segments = db.query(ChangeLogArchiveSegment).filter(*archive_filter.segment_criteria())
+    if before_id is not None:
+        segments = segments.filter(ChangeLogArchiveSegment.min_id < before_id)
+    if after_id is not None:
+        segments = segments.filter(ChangeLogArchiveSegment.max_id > after_id)
+
+    found: List[Dict[str, Any]] = []
+    for segment in segments.order_by(ChangeLogArchiveSegment.max_id.desc()):
+        if _is_full(found, limit, segment.max_id):
+            break
+        for block in reversed(segment_index(archive_dir, segment)["blocks"]):
+            if before_id is not None and block["first_id"] >= before_id:
+                continue
+            if after_id is not None and block["last_id"] <= after_id:
+                break
+            if _is_full(found, limit, block["last_id"]):
+                break
+            if not archive_filter.block_may_match(block):
+                continue
+            for entry in read_block(archive_dir, segment, block):
+                if before_id is not None and entry["id"] >= before_id:
+                    continue
+                if after_id is not None and entry["id"] <= after_id:
+                    continue
+                if archive_filter.matches(entry):
+                    found.append(entry)
+            found.sort(key=lambda entry: entry["id"], reverse=True)
+            del found[limit:]
+    return [_restore_types(entry) for entry in found]
+
+
+def _is_full(found: List[Dict[str, Any]], limit: int, next_max_id: int) -> bool:
+    """True when `limit` entries newer than everything from next_max_id down are found"""
+    return len(found) >= limit and found[limit - 1]["id"] > next_max_id
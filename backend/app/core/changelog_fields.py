@@ -0,0 +1,80 @@
+"""
+"Changes touching field X" filter over changelog payloads
+
+A changelog entry touches a field when the field is a key of new_values
+(created / changed) or old_values (changed / deleted).
+
+SQLite: one partial index on id per commonly filtered field, restricted by the
+JSON1 path expression
+coalesce(json_type(new_values, '$.<field>'), json_type(old_values, '$.<field>')) IS NOT NULL.
+The filter uses the identical expression with the path inlined (SQLite only
+matches index expressions against literal text, not bound parameters), so the
+index yields the matching entries already in id order for keyset pages.
+Other field names still work, without an index.
+
+PostgreSQL: GIN indexes on the JSONB columns serve the key-exists operator ?
+for every field.
+"""
+import logging
+import re
+
+from sqlalchemy import String, literal, or_, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import SQLAlchemyError
+
+from ..models.changelog import ChangeLog
+
+logger = logging.getLogger(__name__)
+
+# Field names are inlined into SQL, so only plain identifiers are accepted
+FIELD_NAME_RE = re.compile(r"^[A-Za-z_][A-Za-z0-9_]{0,63}$")
+
+# Fields with a dedicated SQLite index: risk scoring and the main status fields
+INDEXED_FIELDS = [
+    "severity_score", "probability_score", "risk_score", "residual_risk_score",
+    "hazard_name", "hazard_category", "lifecycle_stage", "control_measures",
+    "status", "role",
+]
+
+POSTGRES_FIELD_INDEX_DDL = [
+    "CREATE INDEX IF NOT EXISTS ix_changelogs_new_values_keys ON changelogs USING GIN (new_values)",
+    "CREATE INDEX IF NOT EXISTS ix_changelogs_old_values_keys ON changelogs USING GIN (old_values)",
+]
+
+
+def is_valid_field_name(field: str) -> bool:
+    return bool(FIELD_NAME_RE.match(field))
+
+
+def _sqlite_field_expression(field: str, prefix: str = "") -> str:
+    return f"coalesce(json_type({prefix}new_values, '$.{field}'), json_type({prefix}old_values, '$.{field}'))"
+
+
+def ensure_changelog_field_indexes(engine: Engine):
+    """Create the changed-field indexes for the current database if missing"""
+    dialect = engine.dialect.name
+    try:
+        with engine.begin() as conn:
+            if dialect == "sqlite":
+                for field in INDEXED_FIELDS:
+                    conn.execute(text(
+                        f"CREATE INDEX IF NOT EXISTS ix_changelogs_changes_{field} "
+                        f"ON changelogs (id) WHERE {_sqlite_field_expression(field)} IS NOT NULL"
+                    ))
+            elif dialect == "postgresql":
+                for statement in POSTGRES_FIELD_INDEX_DDL:
+                    conn.execute(text(statement))
+    except SQLAlchemyError as e:
+        # e.g. SQLite without JSON1, or PostgreSQL columns not yet migrated to JSONB
+        logger.warning("Changelog field indexes unavailable: %s", e)
+
+
+def changed_field_criterion(dialect: str, field: str):
+    """WHERE criterion for entries whose old or new values contain `field` (validated name)"""
+    if not is_valid_field_name(field):
+        raise ValueError(f"Invalid field name: {field!r}")
+    if dialect == "postgresql":
+        key = literal(field, String)
+        return or_(ChangeLog.new_values.op("?")(key), ChangeLog.old_values.op("?")(key))
+    # Qualified: the full-text search query also selects from changelogs_fts, which has the same columns
+    return text(f"{_sqlite_field_expression(field, 'changelogs.')} IS NOT NULL")
@@ -0,0 +1,325 @@
+"""
+Response compression middleware (gzip, brotli, zstd)
+
+Responses smaller than the minimum size are sent as is. Complete bodies of
+responses with an ETag, or of cached routes (the admin page), are compressed
+once per path/version/encoding/level and kept in an LRU bounded by bytes, so
+hot unchanged responses are not recompressed on every hit. Other responses
+(API JSON, which rarely repeats byte for byte) are compressed without being
+hashed or cached. Streaming responses are compressed chunk by chunk.
+"""
+import gzip
+import hashlib
+import zlib
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+import anyio.to_thread
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:
+    # brotli is optional
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    # zstandard is optional
+    zstandard = None
+
+
+# Content types that are already compressed or must not be buffered
+EXCLUDED_CONTENT_TYPES = (
+    "application/gzip",
+    "application/zip",
+    "application/vnd.openxmlformats-officedocument",
+    "application/pdf",
+    "image/",
+    "audio/",
+    "video/",
+    "font/woff",
+    "text/event-stream",
+)
+
+# Bodies above this size are compressed in a worker thread
+THREAD_MINIMUM_SIZE = 256 * 1024
+
+
+def supported_encodings() -> Tuple[str, ...]:
+    """Encodings available in this environment, in server preference order"""
+    encodings = []
+    if zstandard is not None:
+        encodings.append("zstd")
+    if brotli is not None:
+        encodings.append("br")
+    encodings.append("gzip")
+    return tuple(encodings)
+
+
+def choose_encoding(accept_encoding: str, available: Tuple[str, ...]) -> Optional[str]:
+    """Pick the best encoding the client accepts (honours q=0 exclusions)"""
+    accepted: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name] = quality
+
+    best = None
+    best_quality = 0.0
+    for encoding in available:
+        quality = accepted.get(encoding, accepted.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def compress(body: bytes, encoding: str, level: int) -> bytes:
+    """Compress a complete body. Level uses the gzip 1-9 scale for every codec."""
+    if encoding == "zstd":
+        return zstandard.ZstdCompressor(level=level).compress(body)
+    if encoding == "br":
+        return brotli.compress(body, quality=min(level, 11))
+    return gzip.compress(body, compresslevel=min(level, 9), mtime=0)
+
+
+class StreamCompressor:
+    """Incremental compressor for streaming responses"""
+
+    def __init__(self, encoding: str, level: int):
+        self.encoding = encoding
+        if encoding == "zstd":
+            self._compressor = zstandard.ZstdCompressor(level=level).compressobj()
+        elif encoding == "br":
+            self._compressor = brotli.Compressor(quality=min(level, 11))
+        else:
+            self._compressor = zlib.compressobj(min(level, 9), zlib.DEFLATED, 31)
+
+    def process(self, chunk: bytes) -> bytes:
+        if self.encoding == "br":
+            return self._compressor.process(chunk) + self._compressor.flush()
+        if self.encoding == "zstd":
+            return self._compressor.compress(chunk) + self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+        return self._compressor.compress(chunk) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        if self.encoding == "br":
+            return self._compressor.finish()
+        return self._compressor.flush()
+
+
+# (path, ETag or content digest, encoding, level)
+CacheKey = Tuple[str, str, str, int]
+
+
+class CompressedBodyCache:
+    """LRU of compressed bodies bounded by their total size in bytes"""
+
+    def __init__(self, max_bytes: int = 16 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[CacheKey, bytes]" = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: CacheKey) -> Optional[bytes]:
+        body = self._entries.get(key)
+        if body is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return body
+
+    def put(self, key: CacheKey, body: bytes):
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self.size -= len(previous)
+        if len(body) > self.max_bytes:
+            return
+        self._entries[key] = body
+        self.size += len(body)
+        while self.size > self.max_bytes:
+            self.size -= len(self._entries.popitem(last=False)[1])
+
+    def clear(self):
+        self._entries.clear()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+
+
+class CompressionMiddleware:
+    """
+    ASGI middleware compressing responses with the best encoding the client supports
+
+    Args:
+        app: Wrapped ASGI application
+        minimum_size: Responses smaller than this (bytes) are not compressed
+        level: Default compression level (gzip 1-9 scale)
+        route_levels: Per-route levels keyed by path prefix (longest prefix wins)
+        cache_max_bytes: Total size of the precompressed bodies kept in the LRU (0 disables it)
+        cached_prefixes: Path prefixes whose bodies are cached without an ETag (keyed by content digest)
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = 1024,
+        level: int = 6,
+        route_levels: Optional[Dict[str, int]] = None,
+        cache_max_bytes: int = 16 * 1024 * 1024,
+        cached_prefixes: Tuple[str, ...] = (),
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.level = level
+        # Sort so that the longest (most specific) prefix is checked first
+        self.route_levels = sorted((route_levels or {}).items(), key=lambda item: len(item[0]), reverse=True)
+        self.cache = CompressedBodyCache(cache_max_bytes)
+        self.cached_prefixes = tuple(cached_prefixes)
+        self.encodings = supported_encodings()
+
+    def level_for_path(self, path: str) -> int:
+        for prefix, level in self.route_levels:
+            if path.startswith(prefix):
+                return level
+        return self.level
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""), self.encodings)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        responder = _CompressionResponder(self, encoding, self.level_for_path(scope["path"]), scope["path"], send)
+        await self.app(scope, receive, responder.send)
+
+
+class _CompressionResponder:
+    """Per-request send wrapper that buffers the start message until the body is known"""
+
+    def __init__(self, middleware: CompressionMiddleware, encoding: str, level: int, path: str, send: Send):
+        self.middleware = middleware
+        self.encoding = encoding
+        self.level = level
+        self.path = path
+        self._send = send
+        self.start_message: Optional[Message] = None
+        self.passthrough = False
+        self.started = False
+        self.stream: Optional[StreamCompressor] = None
+
+    async def send(self, message: Message):
+        message_type = message["type"]
+
+        if message_type == "http.response.start":
+            self.start_message = message
+            headers = Headers(raw=message["headers"])
+            content_type = headers.get("content-type", "").lower()
+            self.passthrough = (
+                "content-encoding" in headers
+                or message["status"] in (204, 206, 304)
+                or content_type.startswith(EXCLUDED_CONTENT_TYPES)
+            )
+            if self.passthrough:
+                await self._send(message)
+            return
+
+        if message_type != "http.response.body" or self.passthrough:
+            if self.start_message is not None and not self.started and not self.passthrough:
+                self.started = True
+                await self._send(self.start_message)
+            await self._send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if not self.started:
+            self.started = True
+            if not more_body:
+                await self._send_complete(body)
+            else:
+                await self._start_stream(body)
+            return
+
+        if self.stream is None:
+            await self._send(message)
+            return
+
+        chunk = self.stream.process(body) if body else b""
+        if not more_body:
+            chunk += self.stream.finish()
+        await self._send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+
+    async def _send_complete(self, body: bytes):
+        headers = MutableHeaders(raw=self.start_message["headers"])
+        if len(body) < self.middleware.minimum_size:
+            await self._send(self.start_message)
+            await self._send({"type": "http.response.body", "body": body})
+            return
+
+        etag = headers.get("etag")
+        cache_key = None
+        compressed = None
+        if self.start_message["status"] == 200 and self.middleware.cache.max_bytes > 0:
+            version = etag
+            if version is None and self.path.startswith(self.middleware.cached_prefixes):
+                # Cached routes without an ETag are keyed by a digest of their content
+                version = hashlib.blake2b(body, digest_size=16).hexdigest()
+            if version is not None:
+                cache_key = (self.path, version, self.encoding, self.level)
+                compressed = self.middleware.cache.get(cache_key)
+
+        if compressed is None:
+            if len(body) >= THREAD_MINIMUM_SIZE:
+                compressed = await anyio.to_thread.run_sync(compress, body, self.encoding, self.level)
+            else:
+                compressed = compress(body, self.encoding, self.level)
+            if cache_key is not None:
+                self.middleware.cache.put(cache_key, compressed)
+
+        headers["Content-Encoding"] = self.encoding
+        headers["Content-Length"] = str(len(compressed))
+        headers.add_vary_header("Accept-Encoding")
+        if etag:
+            # A compressed representation needs its own validator
+            headers["ETag"] = self._encoded_etag(etag)
+
+        await self._send(self.start_message)
+        await self._send({"type": "http.response.body", "body": compressed})
+
+    async def _start_stream(self, body: bytes):
+        self.stream = StreamCompressor(self.encoding, self.level)
+        headers = MutableHeaders(raw=self.start_message["headers"])
+        headers["Content-Encoding"] = self.encoding
+        headers.add_vary_header("Accept-Encoding")
+        if "content-length" in headers:
+            del headers["Content-Length"]
+        etag = headers.get("etag")
+        if etag:
+            headers["ETag"] = self._encoded_etag(etag)
+
+        await self._send(self.start_message)
+        await self._send({"type": "http.response.body", "body": self.stream.process(body), "more_body": True})
+
+    def _encoded_etag(self, etag: str) -> str:
+        if etag.endswith('"'):
+            return f'{etag[:-1]}-{self.encoding}"'
+        return f"{etag}-{self.encoding}"
@@ -31,6 +31,9 @@ class Settings(BaseSettings):
         "DATABASE_URL", 
         "sqlite:///./medical_risk.db"  # SQLite для разработки
     )
+    # Read replicas (comma-separated URLs, read by app/database.py) and read-your-writes window in seconds
+    database_replica_urls: str = os.getenv("DATABASE_REPLICA_URLS", "")
+    read_your_writes_seconds: float = float(os.getenv("READ_YOUR_WRITES_SECONDS", "5"))
     
     # Security
     secret_key: str = os.getenv(
@@ -40,6 +43,58 @@ class Settings(BaseSettings):
     algorithm: str = "HS256"
     access_token_expire_minutes: int = 30
     
+    # Performance
+    fast_json_responses: bool = os.getenv("FAST_JSON_RESPONSES", "False").lower() == "true"
+    
+    # Response compression
+    compression_enabled: bool = os.getenv("COMPRESSION_ENABLED", "True").lower() == "true"
+    compression_minimum_size: int = int(os.getenv("COMPRESSION_MINIMUM_SIZE", "1024"))
+    compression_level: int = int(os.getenv("COMPRESSION_LEVEL", "6"))
+    compression_cache_mb: int = int(os.getenv("COMPRESSION_CACHE_MB", "16"))  # precompressed bodies per worker
+    
+    # Portfolio analytics: memory for cached factor arrays per worker (about 32 MB per 1M factors)
+    analytics_cache_mb: int = int(os.getenv("ANALYTICS_CACHE_MB", "128"))
+    
+    # Report generation
+    report_workers: int = int(os.getenv("REPORT_WORKERS", "2"))
+    report_job_timeout: int = int(os.getenv("REPORT_JOB_TIMEOUT", "600"))  # seconds
+    
+    # Changelog retention: entries older than this are moved to compressed archive files
+    changelog_retention_days: int = int(os.getenv("CHANGELOG_RETENTION_DAYS", "365"))
+    changelog_archive_dir: str = os.getenv("CHANGELOG_ARCHIVE_DIR", "changelog_archive")
+    
+    # Batch requests: maximum sub-operations per POST /api/batch
+    batch_max_operations: int = int(os.getenv("BATCH_MAX_OPERATIONS", "1000"))
+    
+    # Rate limiting: token buckets per user and route class, in-flight cap for expensive routes
+    rate_limit_enabled: bool = os.getenv("RATE_LIMIT_ENABLED", "True").lower() == "true"
+    rate_limit_backend: str = os.getenv("RATE_LIMIT_BACKEND", "memory")  # memory or sqlite (shared by workers)
+    rate_limit_sqlite_path: str = os.getenv("RATE_LIMIT_SQLITE_PATH", "rate_limits.db")
+    rate_limit_default_rate: float = float(os.getenv("RATE_LIMIT_DEFAULT_RATE", "20"))  # requests per second
+    rate_limit_default_burst: int = int(os.getenv("RATE_LIMIT_DEFAULT_BURST", "100"))
+    rate_limit_expensive_rate: float = float(os.getenv("RATE_LIMIT_EXPENSIVE_RATE", "1"))
+    rate_limit_expensive_burst: int = int(os.getenv("RATE_LIMIT_EXPENSIVE_BURST", "10"))
+    rate_limit_expensive_in_flight: int = int(os.getenv("RATE_LIMIT_EXPENSIVE_IN_FLIGHT", "4"))  # per worker
+    
+    # Prometheus metrics at /metrics
+    metrics_enabled: bool = os.getenv("METRICS_ENABLED", "True").lower() == "true"
+    
+    # Slow-query log: statements slower than this are logged with their plan (0 disables);
+    # bound parameters are only logged with query_debug
+    slow_query_ms: float = float(os.getenv("SLOW_QUERY_MS", "200"))
+    slow_query_explain: bool = os.getenv("SLOW_QUERY_EXPLAIN", "True").lower() == "true"
+    
+    # Query debugging (defaults to DEBUG): N+1 detection and X-Query-Count / X-DB-Time headers
+    query_debug: bool = os.getenv("QUERY_DEBUG", os.getenv("DEBUG", "False")).lower() == "true"
+    n_plus_one_threshold: int = int(os.getenv("N_PLUS_ONE_THRESHOLD", "10"))
+    
+    # Logging (JSON lines written by a background thread)
+    log_level: str = os.getenv("LOG_LEVEL", "INFO")
+    log_levels: str = os.getenv("LOG_LEVELS", "")  # per-module overrides: "app.routers.auth=DEBUG,..."
+    log_format: str = os.getenv("LOG_FORMAT", "json")  # json or text
+    log_debug_sample_every: int = int(os.getenv("LOG_DEBUG_SAMPLE_EVERY", "1"))  # keep every n-th DEBUG record per call site
+    log_file: str = os.getenv("LOG_FILE", "")  # empty: stdout
+    
     # CORS
     allowed_origins: List[str] = [
         "http://localhost:3000",
@@ -0,0 +1,232 @@
+"""
+Streaming export of risk factor tables (CSV, XLSX, zip of many projects)
+
+Rows are read with a server-side cursor (yield_per) and turned into bytes by
+generators, so memory use does not depend on the number of factors. XLSX and
+zip archives are written through zipfile into an unseekable buffer that is
+drained after every row batch; entries use data descriptors, so nothing has to
+be rewritten once streamed.
+"""
+import csv
+import io
+import re
+import zipfile
+from typing import Any, Callable, Iterable, Iterator, List, Sequence, Tuple
+from xml.sax.saxutils import escape
+
+from sqlalchemy.orm import Session
+
+from ..database import SessionLocal
+from ..models.risk_analysis import RiskFactor, HazardCategory, LifecycleStage
+
+YIELD_PER = 1000
+
+# Column header and model attribute, in the order of the risk analysis page
+EXPORT_COLUMNS = [
+    ("ID", RiskFactor.id),
+    ("Lifecycle Stage", RiskFactor.lifecycle_stage),
+    ("Hazard Category", RiskFactor.hazard_category),
+    ("Hazard Name", RiskFactor.hazard_name),
+    ("Hazardous Situation", RiskFactor.hazardous_situation),
+    ("Sequence of Events", RiskFactor.sequence_of_events),
+    ("Harm", RiskFactor.harm),
+    ("Severity Score", RiskFactor.severity_score),
+    ("Probability Score", RiskFactor.probability_score),
+    ("Risk Score", RiskFactor.risk_score),
+    ("Control Measures", RiskFactor.control_measures),
+    ("Residual Risk Score", RiskFactor.residual_risk_score),
+]
+EXPORT_HEADERS = [header for header, _ in EXPORT_COLUMNS]
+
+CONTENT_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "zip": "application/zip",
+}
+
+# Characters not allowed in XML 1.0 documents
+INVALID_XML_RE = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f]")
+FILENAME_RE = re.compile(r"[^\w.-]+", re.UNICODE)
+
+
+def iter_factor_rows(db: Session, analysis_id: int) -> Iterator[Tuple]:
+    """Risk factor rows of an analysis, fetched from a server-side cursor"""
+    query = db.query(*[column for _, column in EXPORT_COLUMNS]).filter(
+        RiskFactor.analysis_id == analysis_id
+    ).order_by(RiskFactor.id).execution_options(yield_per=YIELD_PER)
+    for row in query:
+        yield tuple(
+            value.value if isinstance(value, (HazardCategory, LifecycleStage)) else value
+            for value in row
+        )
+
+
+def session_chunks(produce: Callable[[Session], Iterable[bytes]]) -> Iterator[bytes]:
+    """
+    Run a chunk generator with its own session
+
+    The request session may be closed before a streaming response finishes,
+    so export generators open and close their own.
+    """
+    db = SessionLocal()
+    try:
+        yield from produce(db)
+    finally:
+        db.close()
+
+
+def safe_filename(name: str) -> str:
+    """File name component without path separators or spaces"""
+    return FILENAME_RE.sub("_", name).strip("_") or "export"
+
+
+def csv_chunks(rows: Iterable[Sequence[Any]], batch_size: int = YIELD_PER) -> Iterator[bytes]:
+    """CSV bytes with a UTF-8 BOM (so Excel detects the encoding), one chunk per batch of rows"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    buffer.write("\ufeff")
+    writer.writerow(EXPORT_HEADERS)
+    for count, row in enumerate(rows, 1):
+        writer.writerow(["" if value is None else value for value in row])
+        if count % batch_size == 0:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode("utf-8")
+
+
+class _ZipBuffer(io.RawIOBase):
+    """Unseekable sink for zipfile; drain() hands out what was written so far"""
+
+    def __init__(self):
+        super().__init__()
+        self._chunks: List[bytes] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def zip_chunks(entries: Iterable[Tuple[str, Callable[[], Iterable[bytes]]]]) -> Iterator[bytes]:
+    """
+    Stream a zip archive
+
+    entries yields (file name, factory of the file's byte chunks); a file's
+    content is only produced while the archive is being streamed.
+    """
+    buffer = _ZipBuffer()
+    with zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for name, content in entries:
+            with archive.open(name, "w", force_zip64=True) as entry:
+                for chunk in content():
+                    entry.write(chunk)
+                    data = buffer.drain()
+                    if data:
+                        yield data
+            yield buffer.drain()
+    yield buffer.drain()
+
+
+def _column_letter(index: int) -> str:
+    letters = ""
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return letters
+
+
+def _xlsx_cell(reference: str, value: Any) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return f'<c r="{reference}"><v>{value}</v></c>'
+    text = escape(INVALID_XML_RE.sub("", str(value)))
+    return f'<c r="{reference}" t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>'
+
+
+def _xlsx_row(number: int, values: Sequence[Any]) -> str:
+    cells = "".join(_xlsx_cell(f"{_column_letter(i)}{number}", value) for i, value in enumerate(values))
+    return f'<row r="{number}">{cells}</row>'
+
+
+XLSX_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '</Types>'
+)
+XLSX_ROOT_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="xl/workbook.xml"/>'
+    '</Relationships>'
+)
+XLSX_WORKBOOK_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+    'Target="worksheets/sheet1.xml"/>'
+    '</Relationships>'
+)
+
+
+def _xlsx_workbook(sheet_name: str) -> str:
+    # Sheet names are limited to 31 characters and may not contain []:*?/\
+    name = escape(re.sub(r"[\[\]:*?/\\]", "_", sheet_name)[:31] or "Risks", {'"': "&quot;"})
+    return (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        f'<sheets><sheet name="{name}" sheetId="1" r:id="rId1"/></sheets>'
+        '</workbook>'
+    )
+
+
+def _xlsx_sheet(rows: Iterable[Sequence[Any]], batch_size: int) -> Iterator[bytes]:
+    parts = [
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>',
+        _xlsx_row(1, EXPORT_HEADERS),
+    ]
+    for number, row in enumerate(rows, 2):
+        parts.append(_xlsx_row(number, row))
+        if len(parts) >= batch_size:
+            yield "".join(parts).encode("utf-8")
+            parts = []
+    parts.append("</sheetData></worksheet>")
+    yield "".join(parts).encode("utf-8")
+
+
+def xlsx_chunks(rows: Iterable[Sequence[Any]], sheet_name: str = "Risks", batch_size: int = YIELD_PER) -> Iterator[bytes]:
+    """Single-sheet XLSX workbook (inline strings, no styles) streamed as zip chunks"""
+    return zip_chunks([
+        ("[Content_Types].xml", lambda: [XLSX_CONTENT_TYPES.encode("utf-8")]),
+        ("_rels/.rels", lambda: [XLSX_ROOT_RELS.encode("utf-8")]),
+        ("xl/workbook.xml", lambda: [_xlsx_workbook(sheet_name).encode("utf-8")]),
+        ("xl/_rels/workbook.xml.rels", lambda: [XLSX_WORKBOOK_RELS.encode("utf-8")]),
+        ("xl/worksheets/sheet1.xml", lambda: _xlsx_sheet(rows, batch_size)),
+    ])
+
+
+def export_chunks(rows: Iterable[Sequence[Any]], export_format: str, sheet_name: str = "Risks") -> Iterator[bytes]:
+    """Byte chunks of the factor rows in the requested format ("csv" or "xlsx")"""
+    if export_format == "xlsx":
+        return xlsx_chunks(rows, sheet_name)
+    return csv_chunks(rows)
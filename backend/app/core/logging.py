@@ -1,11 +1,11 @@
 """
 Logging functions for various system operations
 """
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
 from sqlalchemy.orm import Session
 from fastapi import Request
 
-from .logging_helper import log_action
+from .logging_helper import log_action, log_actions
 from ..models.changelog import ActionType
 from ..models.user import User
 
@@ -116,21 +116,16 @@ async def log_project_status_changed(
     )
 
 
-async def log_project_member_added(
-    db: Session,
-    user: User,
+def project_member_added_entry(
     project_id: int,
     project_name: str,
     member_id: int,
     member_name: str,
     member_email: str,
-    member_role: str,
-    request: Optional[Request] = None
-):
-    """Log project member addition"""
-    await log_action(
-        db=db,
-        user=user,
+    member_role: str
+) -> Dict[str, Any]:
+    """log_action arguments for a project member addition"""
+    return dict(
         action_type=ActionType.PROJECT_MEMBER_ADDED,
         action_description=f"Добавлен участник {member_name} ({member_email}) с ролью '{member_role}' в проект '{project_name}'",
         target_type="user",
@@ -142,26 +137,20 @@ async def log_project_member_added(
             "user_name": member_name,
             "user_email": member_email,
             "role": member_role
-        },
-        request=request
+        }
     )
 
 
-async def log_project_member_removed(
-    db: Session,
-    user: User,
+def project_member_removed_entry(
     project_id: int,
     project_name: str,
     member_id: int,
     member_name: str,
     member_email: str,
-    member_role: str,
-    request: Optional[Request] = None
-):
-    """Log project member removal"""
-    await log_action(
-        db=db,
-        user=user,
+    member_role: str
+) -> Dict[str, Any]:
+    """log_action arguments for a project member removal"""
+    return dict(
         action_type=ActionType.PROJECT_MEMBER_REMOVED,
         action_description=f"Удален участник {member_name} ({member_email}) с ролью '{member_role}' из проекта '{project_name}'",
         target_type="user",
@@ -173,8 +162,68 @@ async def log_project_member_removed(
             "user_name": member_name,
             "user_email": member_email,
             "role": member_role
-        },
-        request=request
+        }
+    )
+
+
+def project_member_role_changed_entry(
+    project_id: int,
+    project_name: str,
+    member_id: int,
+    member_name: str,
+    old_role: str,
+    new_role: str
+) -> Dict[str, Any]:
+    """log_action arguments for a project member role change"""
+    return dict(
+        action_type=ActionType.PROJECT_MEMBER_ROLE_CHANGED,
+        action_description=f"Изменена роль участника {member_name} в проекте '{project_name}' с '{old_role}' на '{new_role}'",
+        target_type="user",
+        target_id=member_id,
+        target_name=member_name,
+        project_id=project_id,
+        old_values={"role": old_role},
+        new_values={"role": new_role}
+    )
+
+
+async def log_project_member_added(
+    db: Session,
+    user: User,
+    project_id: int,
+    project_name: str,
+    member_id: int,
+    member_name: str,
+    member_email: str,
+    member_role: str,
+    request: Optional[Request] = None
+):
+    """Log project member addition"""
+    await log_action(
+        db=db,
+        user=user,
+        request=request,
+        **project_member_added_entry(project_id, project_name, member_id, member_name, member_email, member_role)
+    )
+
+
+async def log_project_member_removed(
+    db: Session,
+    user: User,
+    project_id: int,
+    project_name: str,
+    member_id: int,
+    member_name: str,
+    member_email: str,
+    member_role: str,
+    request: Optional[Request] = None
+):
+    """Log project member removal"""
+    await log_action(
+        db=db,
+        user=user,
+        request=request,
+        **project_member_removed_entry(project_id, project_name, member_id, member_name, member_email, member_role)
     )
 
 
@@ -193,18 +242,21 @@ async def log_project_member_role_changed(
     await log_action(
         db=db,
         user=user,
-        action_type=ActionType.PROJECT_MEMBER_ROLE_CHANGED,
-        action_description=f"Изменена роль участника {member_name} в проекте '{project_name}' с '{old_role}' на '{new_role}'",
-        target_type="user",
-        target_id=member_id,
-        target_name=member_name,
-        project_id=project_id,
-        old_values={"role": old_role},
-        new_values={"role": new_role},
-        request=request
+        request=request,
+        **project_member_role_changed_entry(project_id, project_name, member_id, member_name, old_role, new_role)
     )
 
 
+async def log_project_members_synced(
+    db: Session,
+    user: User,
+    entries: List[Dict[str, Any]],
+    request: Optional[Request] = None
+):
+    """Log the member additions, removals and role changes of one roster update with one commit"""
+    await log_actions(db=db, user=user, entries=entries, request=request)
+
+
 # Risk analysis logging functions
 async def log_risk_created(
     db: Session,
@@ -1,13 +1,15 @@
 """
 Logging helper functions for ChangeLog
 """
-import json
-from typing import Dict, Any, Optional
+import time
+from typing import Dict, Any, List, Optional
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
 from fastapi import Request
 
 from ..models.changelog import ChangeLog, ActionType
 from ..models.user import User
+from .metrics import CHANGELOG_WRITE_LATENCY
 
 
 async def log_action(
@@ -42,11 +44,60 @@ async def log_action(
         request: FastAPI request object for IP/user-agent
     """
     
-    # Convert dicts to JSON strings
-    old_values_json = json.dumps(old_values) if old_values else None
-    new_values_json = json.dumps(new_values) if new_values else None
-    extra_data_json = json.dumps(extra_data) if extra_data else None
+    changelog = ChangeLog(**_changelog_values(
+        user, request,
+        action_type=action_type,
+        action_description=action_description,
+        target_type=target_type,
+        target_id=target_id,
+        target_name=target_name,
+        project_id=project_id,
+        old_values=old_values,
+        new_values=new_values,
+        extra_data=extra_data
+    ))
+    
+    started = time.perf_counter()
+    db.add(changelog)
+    db.commit()
+    CHANGELOG_WRITE_LATENCY.observe(time.perf_counter() - started, "single")
+    
+    return changelog
+
+
+async def log_actions(
+    db: Session,
+    user: User,
+    entries: List[Dict[str, Any]],
+    request: Optional[Request] = None
+):
+    """
+    Log several actions with one multi-row insert and one commit
     
+    Each entry holds the log_action keyword arguments (action_type,
+    action_description, target_*, project_id, old/new values, extra_data).
+    Changes already pending in the session are committed together with them.
+    """
+    started = time.perf_counter()
+    if entries:
+        db.execute(insert(ChangeLog.__table__), [_changelog_values(user, request, **entry) for entry in entries])
+    db.commit()
+    CHANGELOG_WRITE_LATENCY.observe(time.perf_counter() - started, "bulk")
+
+
+def _changelog_values(
+    user: User,
+    request: Optional[Request],
+    action_type: ActionType,
+    action_description: str,
+    target_type: Optional[str] = None,
+    target_id: Optional[int] = None,
+    target_name: Optional[str] = None,
+    project_id: Optional[int] = None,
+    old_values: Optional[Dict[str, Any]] = None,
+    new_values: Optional[Dict[str, Any]] = None,
+    extra_data: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
     # Extract IP address and user agent from request
     ip_address = None
     user_agent = None
@@ -54,8 +105,7 @@ async def log_action(
         ip_address = request.client.host if request.client else None
         user_agent = request.headers.get("user-agent")
     
-    # Create changelog entry
-    changelog = ChangeLog(
+    return dict(
         action_type=action_type,
         action_description=action_description,
         user_id=user.id,
@@ -63,17 +113,12 @@ async def log_action(
         target_id=target_id,
         target_name=target_name,
         project_id=project_id,
-        old_values=old_values_json,
-        new_values=new_values_json,
-        extra_data=extra_data_json,
+        old_values=old_values or None,
+        new_values=new_values or None,
+        extra_data=extra_data or None,
         ip_address=ip_address,
         user_agent=user_agent
     )
-    
-    db.add(changelog)
-    db.commit()
-    
-    return changelog
 
 
 def create_field_diff(old_obj: Any, new_obj: Any, fields_to_track: list) -> Dict[str, Dict[str, Any]]:
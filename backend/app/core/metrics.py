@@ -0,0 +1,312 @@
+"""
+Prometheus metrics
+
+A small in-process registry (counters, gauges, histograms) rendered in the
+Prometheus text exposition format by GET /metrics, plus the instrumentation
+feeding it:
+
+- MetricsMiddleware: request latency by method and route template, status
+  counters, requests in flight, and SQL statement count / time per request
+- instrument_engine: SQL statement latency by statement type (timed by
+  core/query_timing.py, shared with the query profiler) and connection pool
+  checkout wait
+- changelog write latency (core/logging_helper.py)
+
+Recording is a few dictionary updates under a lock per observation, cheap
+enough to stay enabled in production. Metrics are per worker process; with
+several workers, Prometheus scrapes and aggregates each one.
+"""
+import re
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+
+from sqlalchemy.engine import Engine
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .query_timing import add_query_observer, request_queries
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+QUERY_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+# Requests that matched no route share one label value (bounded cardinality)
+UNMATCHED_ROUTE = "unmatched"
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    """Monotonic counter with optional labels"""
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = list(self._values.items())
+        return self.header() + [
+            f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+            for labels, value in values
+        ]
+
+
+class Gauge(Counter):
+    """Value that goes up and down"""
+    kind = "gauge"
+
+    def dec(self, *labels: str, amount: float = 1.0):
+        self.inc(*labels, amount=-amount)
+
+    def set(self, *labels: str, value: float):
+        with self._lock:
+            self._values[labels] = value
+
+
+class Histogram(_Metric):
+    """Cumulative histogram with fixed buckets"""
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [per-bucket counts (+Inf last), sum, count]
+        self._series: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, *labels: str):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> List[str]:
+        with self._lock:
+            series = [(labels, list(counts), total, count) for labels, (counts, total, count) in self._series.items()]
+        lines = self.header()
+        bounds = [_format_value(bound) for bound in self.buckets] + ["+Inf"]
+        for labels, counts, total, count in series:
+            cumulative = 0
+            for bound, bucket_count in zip(bounds, counts):
+                cumulative += bucket_count
+                le = f'le="{bound}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {count}")
+        return lines
+
+
+class Registry:
+    """Metrics of this process plus collectors rendering externally kept state"""
+
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+        self._collectors: List[Callable[[], Iterable[str]]] = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector: Callable[[], Iterable[str]]):
+        """Function returning exposition lines, called on every scrape"""
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for collector in self._collectors:
+            lines.extend(collector())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+HTTP_REQUESTS = REGISTRY.register(Counter(
+    "http_requests_total", "HTTP requests by method, route template and status", ("method", "route", "status")
+))
+HTTP_LATENCY = REGISTRY.register(Histogram(
+    "http_request_duration_seconds", "HTTP request latency by method and route template", ("method", "route")
+))
+HTTP_IN_FLIGHT = REGISTRY.register(Gauge(
+    "http_requests_in_flight", "HTTP requests currently being processed"
+))
+REQUEST_DB_QUERIES = REGISTRY.register(Histogram(
+    "http_request_db_queries", "SQL statements executed per HTTP request", ("method", "route"),
+    buckets=QUERY_COUNT_BUCKETS
+))
+REQUEST_DB_TIME = REGISTRY.register(Histogram(
+    "http_request_db_seconds", "Time spent in SQL statements per HTTP request", ("method", "route")
+))
+DB_QUERY_LATENCY = REGISTRY.register(Histogram(
+    "db_query_duration_seconds", "SQL statement latency by statement type", ("statement",),
+    buckets=QUERY_LATENCY_BUCKETS
+))
+DB_POOL_CHECKOUT_WAIT = REGISTRY.register(Histogram(
+    "db_pool_checkout_wait_seconds", "Time waiting for a connection from the pool",
+    buckets=QUERY_LATENCY_BUCKETS
+))
+CHANGELOG_WRITE_LATENCY = REGISTRY.register(Histogram(
+    "changelog_write_duration_seconds", "Changelog write latency (insert and commit)", ("mode",)
+))
+
+
+def _statement_type(statement: str) -> str:
+    keyword = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else ""
+    return keyword if keyword in ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH") else "OTHER"
+
+
+def instrument_engine(engine: Engine):
+    """Record statement latency, per-request statement counts and pool checkout wait for an engine"""
+
+    def observe_statement(cursor, statement: str, parameters, elapsed: float, executemany: bool):
+        DB_QUERY_LATENCY.observe(elapsed, _statement_type(statement))
+
+    add_query_observer(engine, observe_statement)
+
+    # The pool has no "checkout requested" event, so the engine's request for a
+    # connection is timed; dispose() replaces engine.pool, the engine stays
+    raw_connection = engine.raw_connection
+
+    def timed_raw_connection():
+        started = time.perf_counter()
+        try:
+            return raw_connection()
+        finally:
+            DB_POOL_CHECKOUT_WAIT.observe(time.perf_counter() - started)
+
+    engine.raw_connection = timed_raw_connection
+
+
+_PATH_PARAM_RE = re.compile(r"{(\w+)(?::\w+)?}")
+
+
+def route_template(scope: Scope) -> str:
+    """Full path template of the matched route, e.g. /api/projects/{project_id}/view"""
+    route = scope.get("route")
+    route_path = getattr(route, "path", None)
+    if route_path is None:
+        return UNMATCHED_ROUTE
+    path = scope["path"]
+    path_params = scope.get("path_params", {})
+    # Routes of included routers may carry their path without the include prefix
+    rendered = _PATH_PARAM_RE.sub(lambda match: str(path_params.get(match.group(1), match.group(0))), route_path)
+    if path != rendered and path.endswith(rendered):
+        return path[: len(path) - len(rendered)] + route_path
+    return route_path
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording request metrics
+
+    Args:
+        app: Wrapped ASGI application
+        excluded_paths: Paths not recorded (e.g. the scrape endpoint itself)
+    """
+
+    def __init__(self, app: ASGIApp, excluded_paths: Sequence[str] = ("/metrics",)):
+        self.app = app
+        self.excluded_paths = set(excluded_paths)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or scope["path"] in self.excluded_paths:
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_wrapper(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc()
+        started = time.perf_counter()
+        with request_queries() as queries:
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                elapsed = time.perf_counter() - started
+                HTTP_IN_FLIGHT.dec()
+                method, route = scope["method"], route_template(scope)
+                HTTP_REQUESTS.inc(method, route, str(status_code))
+                HTTP_LATENCY.observe(elapsed, method, route)
+                REQUEST_DB_QUERIES.observe(queries.count, method, route)
+                REQUEST_DB_TIME.observe(queries.seconds, method, route)
+
+
+def rate_limit_collector(limiter) -> Callable[[], List[str]]:
+    """Exposition lines for the rate limiter's counters and in-flight gauges"""
+
+    def collect() -> List[str]:
+        snapshot = limiter.snapshot()
+        lines = [
+            "# HELP rate_limit_requests_total Requests by route class and admission decision",
+            "# TYPE rate_limit_requests_total counter",
+        ]
+        for route_class, counters in snapshot.items():
+            for decision in ("allowed", "rate_limited", "shed"):
+                lines.append(
+                    f'rate_limit_requests_total{{route_class="{route_class}",decision="{decision}"}} {counters[decision]}'
+                )
+        lines += [
+            "# HELP rate_limit_in_flight Admitted requests in flight by route class",
+            "# TYPE rate_limit_in_flight gauge",
+        ]
+        lines += [
+            f'rate_limit_in_flight{{route_class="{route_class}"}} {counters["in_flight"]}'
+            for route_class, counters in snapshot.items()
+        ]
+        lines += [
+            "# HELP rate_limit_backend_errors_total Bucket backend failures (requests allowed)",
+            "# TYPE rate_limit_backend_errors_total counter",
+            f"rate_limit_backend_errors_total {limiter.backend_errors}",
+        ]
+        return lines
+
+    return collect
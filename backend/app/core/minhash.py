@@ -0,0 +1,81 @@
+"""
+MinHash signatures and LSH band keys for near-duplicate hazard detection
+
+Text is normalized and cut into overlapping character shingles. A MinHash
+signature of NUM_PERM values estimates the Jaccard similarity of two shingle
+sets; splitting it into BANDS bands of ROWS values and hashing every band
+gives LSH keys. Two texts share at least one band key with probability
+1 - (1 - J^ROWS)^BANDS, about 50% at J = 0.37 and over 95% at J = 0.6.
+"""
+import hashlib
+import re
+import zlib
+from typing import Iterable, List, Set
+
+import numpy as np
+
+SHINGLE_SIZE = 3
+BANDS = 20
+ROWS = 3
+NUM_PERM = BANDS * ROWS
+
+# Hash values wrap modulo this prime; the permutations differ only because of the wrap-around
+MERSENNE_PRIME = np.uint64((1 << 31) - 1)
+
+# Fixed seed: signatures are persisted, so the permutations must never change
+_random = np.random.RandomState(20240601)
+_PERM_A = _random.randint(1, (1 << 31) - 1, size=NUM_PERM, dtype=np.uint64)
+_PERM_B = _random.randint(0, (1 << 31) - 1, size=NUM_PERM, dtype=np.uint64)
+
+NON_WORD_RE = re.compile(r"[\W_]+", re.UNICODE)
+
+
+def normalize(text: str) -> str:
+    """Lowercase, 'ё' -> 'е' and collapse punctuation and whitespace"""
+    return NON_WORD_RE.sub(" ", text.lower().replace("ё", "е")).strip()
+
+
+def shingles(*texts: str) -> Set[str]:
+    """Character shingles of the normalized, space-joined texts"""
+    text = normalize(" ".join(t for t in texts if t))
+    if len(text) <= SHINGLE_SIZE:
+        return {text} if text else set()
+    return {text[i:i + SHINGLE_SIZE] for i in range(len(text) - SHINGLE_SIZE + 1)}
+
+
+def minhash_signature(shingle_set: Iterable[str]) -> np.ndarray:
+    """NUM_PERM minimum hash values of the shingle set"""
+    hashes = np.fromiter(
+        (zlib.crc32(shingle.encode("utf-8")) for shingle in shingle_set), dtype=np.uint64
+    )
+    if not len(hashes):
+        return np.full(NUM_PERM, MERSENNE_PRIME, dtype=np.uint64)
+    # (a * x + b) mod p for every permutation (rows) and shingle (columns); a, b < 2^31 and x < 2^32 keep it below 2^64
+    values = (np.outer(_PERM_A, hashes) + _PERM_B[:, None]) % MERSENNE_PRIME
+    return values.min(axis=1)
+
+
+def band_keys(signature: np.ndarray) -> List[int]:
+    """One signed 64-bit LSH key per band"""
+    keys = []
+    for band in range(BANDS):
+        digest = hashlib.blake2b(
+            signature[band * ROWS:(band + 1) * ROWS].tobytes(), digest_size=8, person=bytes([band])
+        ).digest()
+        keys.append(int.from_bytes(digest, "big", signed=True))
+    return keys
+
+
+def text_band_keys(*texts: str) -> List[int]:
+    """LSH keys of the texts (empty when there is nothing to shingle)"""
+    shingle_set = shingles(*texts)
+    if not shingle_set:
+        return []
+    return band_keys(minhash_signature(shingle_set))
+
+
+def jaccard(a: Set[str], b: Set[str]) -> float:
+    """Exact Jaccard similarity of two shingle sets"""
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
@@ -0,0 +1,142 @@
+"""
+Slow-query log and N+1 detector
+
+Slow queries: every SQL statement slower than settings.slow_query_ms is logged
+with its duration and the database's plan for it (EXPLAIN QUERY PLAN on
+SQLite, EXPLAIN on PostgreSQL), run on the same DBAPI connection. Bound
+parameters carry personal data and clinical free text, so they are only
+logged in query debugging mode.
+
+Query debugging (settings.query_debug, on with DEBUG by default): the SQL
+statements of each request are recorded; statements repeated at least
+settings.n_plus_one_threshold times with the same shape (differing only in
+parameters or literal values) are logged as N+1 suspects, and the response
+carries X-Query-Count, X-DB-Time (milliseconds) and X-N-Plus-One (number of
+suspect shapes) headers. Statements run while a streaming body is being
+sent are not included in the headers.
+
+Statements are timed by core/query_timing.py, which the metrics share.
+"""
+import logging
+import re
+from collections import Counter
+from typing import List, Optional, Tuple
+
+from sqlalchemy.engine import Engine
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .query_timing import RequestQueries, add_query_observer, install_query_timing, request_queries
+
+logger = logging.getLogger(__name__)
+
+# Statements worth explaining / counting as query shapes
+PROFILED_STATEMENTS = ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH")
+
+_WHITESPACE_RE = re.compile(r"\s+")
+_STRING_LITERAL_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL_RE = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER_LIST_RE = re.compile(r"\(\s*(?:\?|%\([^)]*\)s|%s|:\w+)(?:\s*,\s*(?:\?|%\([^)]*\)s|%s|:\w+))*\s*\)")
+
+
+def statement_shape(statement: str) -> str:
+    """Statement with literals and IN-list lengths normalized away"""
+    shape = _WHITESPACE_RE.sub(" ", statement).strip()
+    shape = _STRING_LITERAL_RE.sub("?", shape)
+    shape = _NUMBER_LITERAL_RE.sub("?", shape)
+    return _PLACEHOLDER_LIST_RE.sub("(?)", shape)
+
+
+def _statement_keyword(statement: str) -> str:
+    return statement.lstrip()[:6].upper()
+
+
+def repeated_shapes(queries: RequestQueries, threshold: int) -> List[Tuple[str, int]]:
+    """(shape, executions) of statement shapes run at least `threshold` times, most repeated first"""
+    shapes: Counter = Counter()
+    for statement, executions in (queries.statements or {}).items():
+        if _statement_keyword(statement) in PROFILED_STATEMENTS:
+            shapes[statement_shape(statement)] += executions
+    return [(shape, executions) for shape, executions in shapes.most_common() if executions >= threshold]
+
+
+def explain(cursor, dialect_name: str, statement: str, parameters) -> Optional[str]:
+    """Plan of a statement from the database, on the statement's own DBAPI connection"""
+    prefix = "EXPLAIN QUERY PLAN " if dialect_name == "sqlite" else "EXPLAIN "
+    explain_cursor = cursor.connection.cursor()
+    try:
+        explain_cursor.execute(prefix + statement, parameters)
+        return "\n".join(" | ".join(str(value) for value in row) for row in explain_cursor.fetchall())
+    except Exception as e:
+        return f"(plan unavailable: {e})"
+    finally:
+        explain_cursor.close()
+
+
+def install_query_profiler(engine: Engine, slow_query_ms: float, explain_slow: bool = True,
+                           log_parameters: bool = False):
+    """Time every statement of the engine and log the slow ones (with bound parameters only if log_parameters)"""
+    install_query_timing(engine)
+    if not slow_query_ms:
+        return
+    dialect_name = engine.dialect.name
+
+    def log_slow_query(cursor, statement: str, parameters, elapsed: float, executemany: bool):
+        if elapsed * 1000 < slow_query_ms:
+            return
+        plan = None
+        if explain_slow and not executemany and _statement_keyword(statement) in PROFILED_STATEMENTS:
+            plan = explain(cursor, dialect_name, statement, parameters)
+        logger.warning(
+            "Slow query (%.1f ms): %s%s%s",
+            elapsed * 1000, _WHITESPACE_RE.sub(" ", statement).strip(),
+            f"\nParameters: {parameters!r}" if log_parameters else "",
+            f"\nPlan:\n{plan}" if plan else ""
+        )
+
+    add_query_observer(engine, log_slow_query)
+
+
+class QueryProfilerMiddleware:
+    """
+    ASGI middleware recording the SQL statements of each request
+
+    Args:
+        app: Wrapped ASGI application
+        n_plus_one_threshold: Executions of one statement shape that flag an N+1 suspect
+        debug_headers: Add X-Query-Count / X-DB-Time / X-N-Plus-One to responses
+    """
+
+    def __init__(self, app: ASGIApp, n_plus_one_threshold: int = 10, debug_headers: bool = True):
+        self.app = app
+        self.n_plus_one_threshold = n_plus_one_threshold
+        self.debug_headers = debug_headers
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        suspects: List[Tuple[str, int]] = []
+        with request_queries() as queries:
+            queries.track_statements()
+
+            async def send_wrapper(message: Message):
+                nonlocal suspects
+                if message["type"] == "http.response.start":
+                    suspects = repeated_shapes(queries, self.n_plus_one_threshold)
+                    if self.debug_headers:
+                        headers = MutableHeaders(scope=message)
+                        headers["X-Query-Count"] = str(queries.count)
+                        headers["X-DB-Time"] = f"{queries.seconds * 1000:.1f}"
+                        headers["X-N-Plus-One"] = str(len(suspects))
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                for shape, executions in suspects:
+                    logger.warning(
+                        "Possible N+1 in %s %s: %d executions of %s",
+                        scope["method"], scope["path"], executions, shape[:500]
+                    )
@@ -0,0 +1,95 @@
+"""
+SQL statement timing shared by the metrics and the query profiler
+
+One pair of cursor event listeners per engine times every statement. The start
+time is kept on the statement's execution context, so a statement that raises
+leaves nothing behind on the connection. Each finished statement is counted in
+the current request's RequestQueries record and passed to the engine's
+observers (statement latency histogram, slow-query log).
+"""
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# observer(cursor, statement, parameters, elapsed seconds, executemany)
+QueryObserver = Callable[[Any, str, Any, float, bool], None]
+
+
+class RequestQueries:
+    """SQL statements executed while handling one request"""
+    __slots__ = ("count", "seconds", "statements")
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        # Raw statement text -> executions, only kept when track_statements() was called
+        self.statements: Optional[Counter] = None
+
+    def track_statements(self):
+        if self.statements is None:
+            self.statements = Counter()
+
+    def record(self, statement: str, elapsed: float):
+        self.count += 1
+        self.seconds += elapsed
+        if self.statements is not None:
+            self.statements[statement] += 1
+
+
+# Set by the outermost middleware for the duration of a request; handler threads inherit it
+current_request_queries: ContextVar[Optional[RequestQueries]] = ContextVar("current_request_queries", default=None)
+
+
+@contextmanager
+def request_queries() -> Iterator[RequestQueries]:
+    """The current request's record, created here unless an outer middleware already did"""
+    queries = current_request_queries.get()
+    if queries is not None:
+        yield queries
+        return
+    queries = RequestQueries()
+    token = current_request_queries.set(queries)
+    try:
+        yield queries
+    finally:
+        current_request_queries.reset(token)
+
+
+_observers: Dict[Engine, List[QueryObserver]] = {}
+
+
+def install_query_timing(engine: Engine) -> List[QueryObserver]:
+    """Time the statements of an engine (once per engine); returns its observer list"""
+    observers = _observers.get(engine)
+    if observers is not None:
+        return observers
+    observers = _observers[engine] = []
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _start_timer(conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context._query_started = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _stop_timer(conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, "_query_started", None)
+        if started is None:
+            return
+        elapsed = time.perf_counter() - started
+        queries = current_request_queries.get()
+        if queries is not None:
+            queries.record(statement, elapsed)
+        for observer in observers:
+            observer(cursor, statement, parameters, elapsed, executemany)
+
+    return observers
+
+
+def add_query_observer(engine: Engine, observer: QueryObserver):
+    """Call observer after every statement of the engine"""
+    install_query_timing(engine).append(observer)
@@ -0,0 +1,327 @@
+"""
+Rate limiting and admission control middleware
+
+Every API request is assigned a route class by its method and path (e.g.
+"expensive" for portfolio-wide lists and exports, "default" otherwise) and
+charged one token from a token bucket keyed by (caller, route class). The
+caller is the user from the bearer token, or the client address for
+anonymous requests. An empty bucket answers 429 with Retry-After.
+
+Route classes may also cap the number of requests in flight in this worker;
+requests over the cap are shed immediately with 503 instead of queueing
+behind the slow ones.
+
+Buckets live in process memory, or in a SQLite file shared by all worker
+processes of a host (one atomic upsert per request). The upsert runs on the
+event loop: it takes microseconds, and a busy file fails open after a short
+busy timeout instead of stalling every request of the worker. In-flight limits
+are per worker process, which is the resource they protect.
+"""
+import logging
+import math
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from fnmatch import fnmatchcase
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+from jose import jwt
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+# Idle buckets are refilled completely, so they can be dropped after this long
+BUCKET_IDLE_SECONDS = 3600
+# Longest wait for a SQLite bucket file locked by another worker; the request is then allowed
+SQLITE_BUSY_TIMEOUT = 0.05
+
+
+@dataclass(frozen=True)
+class RouteClassLimit:
+    """Limits of one route class"""
+    rate: float  # tokens per second refilled into each caller's bucket
+    burst: int  # bucket capacity
+    max_in_flight: int = 0  # concurrent requests per worker, 0 = unlimited
+
+    def __post_init__(self):
+        # A bucket that never refills would reject its caller forever
+        if self.rate <= 0 or self.burst < 1:
+            raise ValueError(f"Rate limit needs a positive rate and burst, got rate={self.rate}, burst={self.burst}")
+
+
+class MemoryTokenBuckets:
+    """Token buckets in process memory (single worker or per-worker limits)"""
+
+    def __init__(self, max_keys: int = 100_000):
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def acquire(self, key: str, rate: float, burst: int, now: Optional[float] = None) -> float:
+        """Take a token; returns 0 if allowed, otherwise the seconds until one is available"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (float(burst), now))
+            tokens = min(float(burst), tokens + (now - updated) * rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self._buckets[key] = (tokens, now)
+            while len(self._buckets) > self.max_keys:
+                # Least recently used buckets are the ones most likely to be full again
+                self._buckets.popitem(last=False)
+        return 0.0 if allowed else (1 - tokens) / rate
+
+
+class SQLiteTokenBuckets:
+    """
+    Token buckets in a SQLite file shared by the worker processes of one host
+
+    Each request is one atomic INSERT ... ON CONFLICT DO UPDATE ... RETURNING,
+    so concurrent workers never lose a token. The file only holds throwaway
+    state, so it is written without fsync.
+    """
+
+    ACQUIRE_SQL = """
+        INSERT INTO rate_limit_buckets (key, tokens, updated, allowed)
+        VALUES (:key, :burst - 1, :now, 1)
+        ON CONFLICT (key) DO UPDATE SET
+            allowed = min(:burst, tokens + (:now - updated) * :rate) >= 1,
+            tokens = min(:burst, tokens + (:now - updated) * :rate)
+                     - (min(:burst, tokens + (:now - updated) * :rate) >= 1),
+            updated = :now
+        RETURNING tokens, allowed
+    """
+
+    def __init__(self, path: str, prune_every: int = 10_000, busy_timeout: float = SQLITE_BUSY_TIMEOUT):
+        self.path = path
+        self.busy_timeout = busy_timeout
+        self.prune_every = prune_every
+        self._local = threading.local()
+        self._calls = 0
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        # Set up once with a patient connection: workers starting together contend for the file
+        setup = sqlite3.connect(path, timeout=5, isolation_level=None)
+        try:
+            setup.execute("PRAGMA journal_mode=WAL")  # persistent in the file
+            setup.execute(
+                "CREATE TABLE IF NOT EXISTS rate_limit_buckets ("
+                "key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL, allowed INTEGER NOT NULL"
+                ") WITHOUT ROWID"
+            )
+        finally:
+            setup.close()
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            # Autocommit: every statement is its own transaction
+            connection = sqlite3.connect(
+                self.path, timeout=self.busy_timeout, isolation_level=None, check_same_thread=False
+            )
+            connection.execute("PRAGMA synchronous=OFF")
+            self._local.connection = connection
+        return connection
+
+    def acquire(self, key: str, rate: float, burst: int, now: Optional[float] = None) -> float:
+        """Take a token; returns 0 if allowed, otherwise the seconds until one is available"""
+        # Wall clock: monotonic clocks are not comparable across processes
+        now = time.time() if now is None else now
+        connection = self._connection()
+        tokens, allowed = connection.execute(
+            self.ACQUIRE_SQL, {"key": key, "burst": burst, "rate": rate, "now": now}
+        ).fetchone()
+
+        self._calls += 1
+        if self._calls % self.prune_every == 0:
+            connection.execute("DELETE FROM rate_limit_buckets WHERE updated < ?", (now - BUCKET_IDLE_SECONDS,))
+
+        return 0.0 if allowed else (1 - tokens) / rate
+
+
+@lru_cache(maxsize=4096)
+def _token_subject(token: str) -> Optional[str]:
+    """User of a local bearer token (None if invalid); cached, tokens repeat on every request"""
+    try:
+        payload = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
+    except Exception:
+        return None
+    return payload.get("sub")
+
+
+def caller_key(scope: Scope) -> str:
+    """Rate limit key of the caller: token user, or client address for anonymous/invalid tokens"""
+    authorization = Headers(scope=scope).get("authorization", "")
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() == "bearer" and token:
+        subject = _token_subject(token.strip())
+        if subject:
+            return f"user:{subject}"
+    client = scope.get("client")
+    return f"ip:{client[0] if client else 'unknown'}"
+
+
+class RateLimiter:
+    """
+    Route classification, token buckets, in-flight counters and their statistics
+
+    Args:
+        buckets: MemoryTokenBuckets or SQLiteTokenBuckets
+        limits: Limits per route class; the "default" class applies to unmatched API paths
+        route_classes: Route class per pattern: "[METHOD ]<fnmatch path pattern>",
+            most specific (longest) pattern first
+        path_prefix: Only paths under this prefix are limited
+    """
+
+    def __init__(
+        self,
+        buckets,
+        limits: Dict[str, RouteClassLimit],
+        route_classes: Optional[Dict[str, str]] = None,
+        path_prefix: str = "/api/",
+    ):
+        self.buckets = buckets
+        self.limits = limits
+        self.path_prefix = path_prefix
+        self.route_classes: List[Tuple[Optional[str], str, str]] = []
+        for pattern, route_class in sorted((route_classes or {}).items(), key=lambda item: len(item[0]), reverse=True):
+            method, _, path_pattern = pattern.rpartition(" ")
+            self.route_classes.append((method.upper() or None, path_pattern, route_class))
+        self._in_flight: Dict[str, int] = {route_class: 0 for route_class in limits}
+        self._lock = threading.Lock()
+        self.stats: Dict[str, Dict[str, int]] = {
+            route_class: {"allowed": 0, "rate_limited": 0, "shed": 0} for route_class in limits
+        }
+        self.backend_errors = 0
+
+    def route_class(self, method: str, path: str) -> Optional[str]:
+        if not path.startswith(self.path_prefix):
+            return None
+        for pattern_method, pattern, route_class in self.route_classes:
+            if (pattern_method is None or pattern_method == method) and fnmatchcase(path, pattern):
+                return route_class
+        return "default" if "default" in self.limits else None
+
+    def check_rate(self, key: str, route_class: str) -> float:
+        """0 if the request may proceed, otherwise seconds to wait (fails open on backend errors)"""
+        limit = self.limits[route_class]
+        try:
+            wait = self.buckets.acquire(f"{key}:{route_class}", limit.rate, limit.burst)
+        except Exception as e:
+            self.backend_errors += 1
+            logger.warning("Rate limit backend unavailable, request allowed: %s", e)
+            return 0.0
+        if wait > 0:
+            self.stats[route_class]["rate_limited"] += 1
+        return wait
+
+    def enter(self, route_class: str) -> bool:
+        """Admit a request into the class's in-flight slots"""
+        limit = self.limits[route_class]
+        with self._lock:
+            if limit.max_in_flight and self._in_flight[route_class] >= limit.max_in_flight:
+                self.stats[route_class]["shed"] += 1
+                return False
+            self._in_flight[route_class] += 1
+            self.stats[route_class]["allowed"] += 1
+            return True
+
+    def leave(self, route_class: str):
+        with self._lock:
+            self._in_flight[route_class] -= 1
+
+    def snapshot(self) -> Dict[str, Dict[str, int]]:
+        """Counters and current in-flight requests per route class"""
+        with self._lock:
+            return {
+                route_class: {**counters, "in_flight": self._in_flight[route_class]}
+                for route_class, counters in self.stats.items()
+            }
+
+
+def rejection(status_code: int, detail: str, retry_after: float) -> JSONResponse:
+    return JSONResponse(
+        {"detail": detail},
+        status_code=status_code,
+        headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+    )
+
+
+class RateLimitMiddleware:
+    """
+    ASGI middleware applying a RateLimiter to HTTP requests
+
+    Args:
+        app: Wrapped ASGI application
+        limiter: Shared RateLimiter (its statistics are reported by /health)
+        shed_retry_after: Retry-After seconds for requests shed at the in-flight limit
+    """
+
+    def __init__(self, app: ASGIApp, limiter: RateLimiter, shed_retry_after: int = 1):
+        self.app = app
+        self.limiter = limiter
+        self.shed_retry_after = shed_retry_after
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or scope["method"] == "OPTIONS":
+            await self.app(scope, receive, send)
+            return
+
+        route_class = self.limiter.route_class(scope["method"], scope["path"])
+        if route_class is None:
+            await self.app(scope, receive, send)
+            return
+
+        wait = self.limiter.check_rate(caller_key(scope), route_class)
+        if wait > 0:
+            await rejection(429, "Too many requests", wait)(scope, receive, send)
+            return
+
+        if not self.limiter.enter(route_class):
+            await rejection(503, "Server busy, retry later", self.shed_retry_after)(scope, receive, send)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.limiter.leave(route_class)
+
+
+def create_rate_limiter() -> RateLimiter:
+    """RateLimiter configured from settings"""
+    if settings.rate_limit_backend == "sqlite":
+        buckets = SQLiteTokenBuckets(settings.rate_limit_sqlite_path)
+    else:
+        buckets = MemoryTokenBuckets()
+    limits = {
+        "default": RouteClassLimit(settings.rate_limit_default_rate, settings.rate_limit_default_burst),
+        "expensive": RouteClassLimit(
+            settings.rate_limit_expensive_rate,
+            settings.rate_limit_expensive_burst,
+            settings.rate_limit_expensive_in_flight,
+        ),
+    }
+    # Portfolio-wide queries, exports, report rendering and batches
+    route_classes = {
+        "/api/users/with-projects": "expensive",
+        "/api/users/me/statistics": "expensive",
+        "/api/risk-analyses/summary": "expensive",
+        "/api/risk-analyses/export": "expensive",
+        "/api/risk-analyses/project/*/export": "expensive",
+        "/api/risk-analyses/matrix": "expensive",
+        "/api/risk-analyses/search": "expensive",
+        "/api/risk-analyses/similar": "expensive",
+        "/api/analytics/*": "expensive",
+        "/api/changelog/search": "expensive",
+        "POST /api/reports/*": "expensive",
+        "POST /api/batch": "expensive",
+    }
+    return RateLimiter(buckets, limits, route_classes)
@@ -0,0 +1,83 @@
+"""
+Read replica routing middleware
+
+GET and HEAD requests are served from a read replica (see RoutingSession in
+app/database.py) unless their caller changed something in the last
+READ_YOUR_WRITES_SECONDS: after a mutation (any other method, or a GET whose
+handler wrote) the caller's requests go to the primary until the window has
+passed, so users see their own changes despite replication lag.
+
+The caller is the user from the bearer token or, for anonymous requests, the
+client address; reads also check the client address, so the first requests
+after a login stay on the primary. Recent writers are remembered in process
+memory, per worker.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from ..database import RequestRouting, current_routing
+from .rate_limit import caller_key
+
+READ_METHODS = ("GET", "HEAD")
+
+
+class RecentWriters:
+    """Callers with a mutation in the last `window` seconds"""
+
+    def __init__(self, window: float, max_keys: int = 100_000):
+        self.window = window
+        self.max_keys = max_keys
+        self._expiry: "OrderedDict[str, float]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def mark(self, key: str, now: Optional[float] = None):
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            self._expiry[key] = now + self.window
+            self._expiry.move_to_end(key)
+            # Oldest marks expire first, so expired ones are at the front
+            while self._expiry and (len(self._expiry) > self.max_keys or next(iter(self._expiry.values())) <= now):
+                self._expiry.popitem(last=False)
+
+    def is_recent(self, key: str, now: Optional[float] = None) -> bool:
+        expiry = self._expiry.get(key)
+        return expiry is not None and expiry > (time.monotonic() if now is None else now)
+
+
+class ReadReplicaMiddleware:
+    """
+    ASGI middleware choosing primary or replica reads per request
+
+    Args:
+        app: Wrapped ASGI application
+        window: Read-your-writes stickiness after a caller's mutation, in seconds
+    """
+
+    def __init__(self, app: ASGIApp, window: float = 5.0):
+        self.app = app
+        self.writers = RecentWriters(window)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        key = caller_key(scope)
+        client = scope.get("client")
+        address_key = f"ip:{client[0] if client else 'unknown'}"
+        routing = RequestRouting(
+            use_replica=scope["method"] in READ_METHODS
+            and not self.writers.is_recent(key)
+            and not self.writers.is_recent(address_key)
+        )
+        token = current_routing.set(routing)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            current_routing.reset(token)
+            if routing.wrote or scope["method"] not in READ_METHODS + ("OPTIONS",):
+                self.writers.mark(key)
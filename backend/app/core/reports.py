@@ -0,0 +1,400 @@
+"""
+ISO 14971-style risk management reports
+
+Reports are rendered in a process pool so that gathering thousands of factors
+and building the document never blocks API workers. A worker process loads
+everything it needs through its own session, renders HTML (and PDF through
+weasyprint when installed) and stores the result on its ReportJob row. The job
+records the project revision the report was built from; a report is reused
+until the project changes.
+"""
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timedelta, timezone
+from html import escape
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from .config import settings
+from ..database import SessionLocal
+from ..models.changelog import ChangeLog, ACTION_DISPLAY_NAMES
+from ..models.project import Project, ProjectMember
+from ..models.report import ReportJob, ReportStatus
+from ..models.risk_analysis import LATEST_ANALYSIS_ORDER, RiskAnalysis, RiskFactor
+from ..models.user import User
+
+try:
+    from weasyprint import HTML
+except ImportError:
+    # weasyprint is optional, PDF reports are unavailable without it
+    HTML = None
+
+logger = logging.getLogger(__name__)
+
+REPORT_FORMATS = ("html", "pdf")
+CONTENT_TYPES = {
+    "html": "text/html; charset=utf-8",
+    "pdf": "application/pdf",
+}
+
+MATRIX_SIZE = 5
+# Same thresholds as calculate_analysis_statistics
+HIGH_RISK_THRESHOLD = 15
+MEDIUM_RISK_THRESHOLD = 10
+
+# Change history is cut to the most recent entries
+CHANGELOG_LIMIT = 500
+
+DEVICE_FIELDS = [
+    ("device_name", "Наименование изделия"),
+    ("device_model", "Модель"),
+    ("device_classification", "Класс"),
+    ("device_purpose", "Назначение"),
+    ("device_description", "Описание"),
+    ("intended_use", "Предполагаемое применение"),
+    ("user_profile", "Профиль пользователя"),
+    ("operating_environment", "Условия эксплуатации"),
+    ("technical_specs", "Технические характеристики"),
+    ("regulatory_requirements", "Регуляторные требования"),
+    ("standards", "Стандарты"),
+    ("contact_type", "Тип контакта"),
+    ("duration", "Продолжительность контакта"),
+    ("invasiveness", "Инвазивность"),
+    ("energy_source", "Источник энергии"),
+]
+
+FACTOR_COLUMNS = [
+    ("hazard_name", "Опасность"),
+    ("hazardous_situation", "Опасная ситуация"),
+    ("sequence_of_events", "Последовательность событий"),
+    ("harm", "Вред"),
+    ("hazard_category", "Категория"),
+    ("lifecycle_stage", "Стадия ЖЦ"),
+    ("severity_score", "S"),
+    ("probability_score", "P"),
+    ("risk_score", "R"),
+    ("control_measures", "Меры управления"),
+    ("residual_risk_score", "Остаточный R"),
+]
+
+_executor: Optional[ProcessPoolExecutor] = None
+# Pending jobs created before this were queued in a pool that no longer exists
+# (whole seconds: SQLite timestamps have no fraction)
+PROCESS_STARTED_AT = datetime.now(timezone.utc).replace(microsecond=0)
+_executor_lock = threading.Lock()
+
+
+def pdf_available() -> bool:
+    return HTML is not None
+
+
+def risk_level(score: Optional[int]) -> str:
+    if score is None:
+        return ""
+    if score >= HIGH_RISK_THRESHOLD:
+        return "high"
+    if score >= MEDIUM_RISK_THRESHOLD:
+        return "medium"
+    return "low"
+
+
+def collect_report_data(db: Session, project_id: int) -> Dict[str, Any]:
+    """Everything a report shows, as plain values"""
+    project = db.query(Project).filter(Project.id == project_id).one()
+    owner = db.query(User).filter(User.id == project.owner_id).first()
+    members = db.query(User.first_name, User.last_name, ProjectMember.role).join(
+        ProjectMember, ProjectMember.user_id == User.id
+    ).filter(ProjectMember.project_id == project_id).order_by(User.last_name).all()
+
+    analysis = db.query(RiskAnalysis).filter(
+        RiskAnalysis.project_id == project_id
+    ).order_by(*LATEST_ANALYSIS_ORDER).first()
+    analyst = db.query(User).filter(User.id == analysis.analyst_id).first() if analysis is not None else None
+
+    factors = []
+    matrix = [[0] * MATRIX_SIZE for _ in range(MATRIX_SIZE)]
+    if analysis is not None:
+        rows = db.query(*[getattr(RiskFactor, name) for name, _ in FACTOR_COLUMNS]).filter(
+            RiskFactor.analysis_id == analysis.id
+        ).order_by(RiskFactor.risk_score.desc(), RiskFactor.id).all()
+        for row in rows:
+            factor = dict(zip([name for name, _ in FACTOR_COLUMNS], row))
+            factor["hazard_category"] = factor["hazard_category"].value
+            factor["lifecycle_stage"] = factor["lifecycle_stage"].value
+            factors.append(factor)
+            severity, probability = factor["severity_score"], factor["probability_score"]
+            if 1 <= severity <= MATRIX_SIZE and 1 <= probability <= MATRIX_SIZE:
+                matrix[severity - 1][probability - 1] += 1
+
+    changelog_total = db.query(func.count(ChangeLog.id)).filter(ChangeLog.project_id == project_id).scalar()
+    changes = db.query(
+        ChangeLog.created_at, ChangeLog.action_type, ChangeLog.action_description,
+        User.first_name, User.last_name
+    ).join(User, ChangeLog.user_id == User.id).filter(
+        ChangeLog.project_id == project_id
+    ).order_by(ChangeLog.id.desc()).limit(CHANGELOG_LIMIT).all()
+
+    return {
+        "project": {
+            "id": project.id,
+            "name": project.name,
+            "description": project.description,
+            "status": project.status.value,
+            "revision": project.revision,
+            "owner": f"{owner.first_name} {owner.last_name}" if owner else None,
+            "device": [(label, getattr(project, name)) for name, label in DEVICE_FIELDS],
+        },
+        "members": [(f"{first} {last}", role.value) for first, last, role in members],
+        "analysis": {
+            "id": analysis.id,
+            "analysis_date": analysis.analysis_date,
+            "analyst": f"{analyst.first_name} {analyst.last_name}" if analyst else None,
+            "has_body_contact": "да" if analysis.has_body_contact else "нет",
+            "contact_type": analysis.contact_type.value if analysis.contact_type else None,
+        } if analysis is not None else None,
+        "factors": factors,
+        "matrix": matrix,
+        "changelog_total": changelog_total,
+        "changes": [
+            (created_at, ACTION_DISPLAY_NAMES.get(action_type, action_type.value), description, f"{first} {last}")
+            for created_at, action_type, description, first, last in changes
+        ],
+    }
+
+
+def _text(value: Any) -> str:
+    if value is None or value == "":
+        return "—"
+    if isinstance(value, datetime):
+        return value.strftime("%d.%m.%Y %H:%M")
+    return escape(str(value))
+
+
+def _table(headers: List[str], rows: List[List[str]], css_class: str = "") -> str:
+    head = "".join(f"<th>{escape(header)}</th>" for header in headers)
+    body = "".join(f"<tr>{''.join(cells)}</tr>" for cells in rows)
+    return f'<table class="{css_class}"><thead><tr>{head}</tr></thead><tbody>{body}</tbody></table>'
+
+
+REPORT_CSS = """
+body { font-family: "DejaVu Sans", Arial, sans-serif; font-size: 11px; color: #222; margin: 24px; }
+h1 { font-size: 20px; } h2 { font-size: 15px; margin-top: 28px; border-bottom: 1px solid #999; }
+table { border-collapse: collapse; width: 100%; margin-top: 8px; }
+th, td { border: 1px solid #bbb; padding: 3px 5px; vertical-align: top; text-align: left; }
+th { background: #eee; }
+table.matrix { width: auto; } table.matrix td { width: 36px; text-align: center; }
+.high { background: #f5b7b1; } .medium { background: #fad7a0; } .low { background: #abebc6; }
+.meta td:first-child { width: 30%; font-weight: bold; }
+"""
+
+
+def render_html(data: Dict[str, Any]) -> str:
+    """Render the report document"""
+    project = data["project"]
+    sections = [f"<h1>Отчёт по менеджменту риска (ISO 14971): {_text(project['name'])}</h1>"]
+
+    sections.append("<h2>1. Сведения о проекте и изделии</h2>")
+    meta = [("Проект", project["name"]), ("Описание", project["description"]), ("Статус", project["status"]),
+            ("Владелец", project["owner"]), ("Ревизия данных", project["revision"])] + project["device"]
+    sections.append(_table(["Поле", "Значение"], [[f"<td>{_text(k)}</td>", f"<td>{_text(v)}</td>"] for k, v in meta], "meta"))
+    if data["members"]:
+        sections.append(_table(["Участник", "Роль"], [[f"<td>{_text(n)}</td>", f"<td>{_text(r)}</td>"] for n, r in data["members"]]))
+
+    sections.append("<h2>2. Анализ риска</h2>")
+    analysis = data["analysis"]
+    factors = data["factors"]
+    if analysis is None:
+        sections.append("<p>Анализ риска ещё не проводился.</p>")
+    else:
+        levels = [risk_level(factor["risk_score"]) for factor in factors]
+        summary = [("Дата анализа", analysis["analysis_date"]), ("Аналитик", analysis["analyst"]),
+                   ("Контакт с телом", analysis["has_body_contact"]), ("Тип контакта", analysis["contact_type"]),
+                   ("Всего факторов риска", len(factors)), ("Высокий риск", levels.count("high")),
+                   ("Средний риск", levels.count("medium")), ("Низкий риск", levels.count("low"))]
+        sections.append(_table(["Показатель", "Значение"], [[f"<td>{_text(k)}</td>", f"<td>{_text(v)}</td>"] for k, v in summary], "meta"))
+
+    sections.append("<h2>3. Матрица рисков (тяжесть × вероятность)</h2>")
+    matrix_rows = []
+    for severity in range(MATRIX_SIZE, 0, -1):
+        cells = [f"<th>S{severity}</th>"]
+        for probability in range(1, MATRIX_SIZE + 1):
+            count = data["matrix"][severity - 1][probability - 1]
+            cells.append(f'<td class="{risk_level(severity * probability)}">{count or ""}</td>')
+        matrix_rows.append(cells)
+    sections.append(_table([""] + [f"P{p}" for p in range(1, MATRIX_SIZE + 1)], matrix_rows, "matrix"))
+
+    sections.append("<h2>4. Факторы риска</h2>")
+    factor_rows = []
+    for number, factor in enumerate(factors, 1):
+        cells = [f"<td>{number}</td>"]
+        for name, _ in FACTOR_COLUMNS:
+            css = f' class="{risk_level(factor[name])}"' if name in ("risk_score", "residual_risk_score") else ""
+            cells.append(f"<td{css}>{_text(factor[name])}</td>")
+        factor_rows.append(cells)
+    sections.append(_table(["№"] + [label for _, label in FACTOR_COLUMNS], factor_rows)
+                    if factor_rows else "<p>Факторы риска отсутствуют.</p>")
+
+    sections.append("<h2>5. История изменений</h2>")
+    if data["changelog_total"] > len(data["changes"]):
+        sections.append(f"<p>Показаны последние {len(data['changes'])} из {data['changelog_total']} записей.</p>")
+    sections.append(_table(
+        ["Дата", "Действие", "Описание", "Пользователь"],
+        [[f"<td>{_text(value)}</td>" for value in change] for change in data["changes"]]
+    ) if data["changes"] else "<p>Записей нет.</p>")
+
+    generated = datetime.now(timezone.utc).strftime("%d.%m.%Y %H:%M UTC")
+    sections.append(f"<p><small>Сформировано {generated}</small></p>")
+    return (
+        '<!DOCTYPE html><html lang="ru"><head><meta charset="utf-8">'
+        f"<title>{_text(project['name'])}</title><style>{REPORT_CSS}</style></head>"
+        f"<body>{''.join(sections)}</body></html>"
+    )
+
+
+def render_report(db: Session, project_id: int, report_format: str):
+    """Return (project revision, document bytes) for the current project state"""
+    data = collect_report_data(db, project_id)
+    html = render_html(data)
+    if report_format == "pdf":
+        return data["project"]["revision"], HTML(string=html).write_pdf()
+    return data["project"]["revision"], html.encode("utf-8")
+
+
+def run_report_job(job_id: int):
+    """Process pool entry point: render one job and store the result"""
+    db = SessionLocal()
+    try:
+        job = db.query(ReportJob).filter(ReportJob.id == job_id).first()
+        if job is None or job.status != ReportStatus.PENDING:
+            return
+        job.status = ReportStatus.RUNNING
+        job.started_at = func.now()
+        db.commit()
+        try:
+            # Read inside one transaction so the revision matches the rendered data
+            revision, content = render_report(db, job.project_id, job.report_format)
+        except Exception as e:
+            db.rollback()
+            logger.exception("Report job %s failed", job_id)
+            job.status = ReportStatus.FAILED
+            job.error = str(e)
+        else:
+            job.project_revision = revision
+            job.content = content
+            job.content_size = len(content)
+            job.status = ReportStatus.COMPLETED
+        job.finished_at = func.now()
+        db.commit()
+    finally:
+        db.close()
+
+
+def fail_report_job(job_id: int, error: str):
+    """Mark an unfinished job FAILED (it could not be queued, or its worker died)"""
+    db = SessionLocal()
+    try:
+        db.query(ReportJob).filter(
+            ReportJob.id == job_id,
+            ReportJob.status.in_([ReportStatus.PENDING, ReportStatus.RUNNING])
+        ).update({"status": ReportStatus.FAILED, "error": error, "finished_at": func.now()}, synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+
+
+def is_stale(job: ReportJob) -> bool:
+    """
+    True for unfinished jobs that will never finish: older than the timeout
+    (e.g. lost in a crashed worker), or pending since before this process started
+    """
+    if job.status not in (ReportStatus.PENDING, ReportStatus.RUNNING) or job.created_at is None:
+        return False
+    created_at = job.created_at
+    if created_at.tzinfo is None:
+        created_at = created_at.replace(tzinfo=timezone.utc)  # SQLite stores UTC without offset
+    if job.status == ReportStatus.PENDING and created_at < PROCESS_STARTED_AT:
+        return True
+    return datetime.now(timezone.utc) - created_at > timedelta(seconds=settings.report_job_timeout)
+
+
+def find_reusable_job(db: Session, project: Project, report_format: str) -> Optional[ReportJob]:
+    """Newest completed or in-flight job for the project's current revision"""
+    jobs = db.query(ReportJob).filter(
+        ReportJob.project_id == project.id,
+        ReportJob.project_revision == project.revision,
+        ReportJob.report_format == report_format,
+        ReportJob.status != ReportStatus.FAILED
+    ).order_by(ReportJob.id.desc()).all()
+    for job in jobs:
+        if not is_stale(job):
+            return job
+    return None
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        # spawn: forking a process that runs threads and holds DB connections is unsafe
+        _executor = ProcessPoolExecutor(
+            max_workers=settings.report_workers,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+    return _executor
+
+
+def _discard_broken_executor(executor: ProcessPoolExecutor):
+    """The pool accepts no more work (a worker process died): replace it (once)"""
+    global _executor
+    with _executor_lock:
+        if _executor is executor:
+            _executor = None
+    executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _job_done(job_id: int, executor: ProcessPoolExecutor, future: Future):
+    if future.cancelled():
+        error = "Report job was cancelled"
+    else:
+        error = future.exception()
+        if error is None:
+            return
+        logger.error("Report job %s crashed: %s", job_id, error)
+        if isinstance(error, BrokenProcessPool):
+            _discard_broken_executor(executor)
+        error = f"Report worker failed: {error}"
+    # Otherwise the job would be reused as in-flight until it goes stale
+    fail_report_job(job_id, error)
+
+
+def submit_report_job(job_id: int) -> bool:
+    """
+    Queue a pending job for rendering in the process pool
+
+    Returns False, with the job marked FAILED, when the pool cannot take it
+    (broken by a dead worker, or shut down).
+    """
+    with _executor_lock:
+        executor = _get_executor()
+    try:
+        future = executor.submit(run_report_job, job_id)
+    except (BrokenProcessPool, RuntimeError) as e:
+        logger.error("Report job %s could not be queued: %s", job_id, e)
+        # The next request gets a new pool
+        _discard_broken_executor(executor)
+        fail_report_job(job_id, f"Report workers unavailable: {e}")
+        return False
+    future.add_done_callback(lambda done: _job_done(job_id, executor, done))
+    return True
+
+
+def shutdown_report_executor():
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=False, cancel_futures=True)
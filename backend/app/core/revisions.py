@@ -0,0 +1,26 @@
+"""
+Revision fingerprints used as cache keys for derived data
+"""
+from typing import Iterable, Optional
+
+from sqlalchemy.orm import Session
+
+from ..models.project import Project
+from ..models.risk_analysis import RiskAnalysis
+
+
+def analysis_revision(db: Session, analysis_ids: Iterable[int]) -> str:
+    """Fingerprint of one or more analyses built from their revision counters"""
+    analysis_ids = sorted(set(analysis_ids))
+    if not analysis_ids:
+        return "empty"
+    rows = db.query(RiskAnalysis.id, RiskAnalysis.revision).filter(
+        RiskAnalysis.id.in_(analysis_ids)
+    ).order_by(RiskAnalysis.id).all()
+    return ",".join(f"{row.id}:{row.revision}" for row in rows)
+
+
+def project_revision(db: Session, project_id: int) -> Optional[int]:
+    """Current revision counter of a project (None if it does not exist)"""
+    row = db.query(Project.revision).filter(Project.id == project_id).first()
+    return row.revision if row else None
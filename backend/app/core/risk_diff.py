@@ -0,0 +1,121 @@
+"""
+Differences between two risk analyses
+
+Factors are matched by a normalized hazard key (hazard name without case,
+punctuation or extra spaces, plus lifecycle stage). Both factor streams are
+read in id order, keyed in one pass and merged through a hash table, so the
+diff is linear in the number of factors. Repeated keys within an analysis are
+matched in id order.
+"""
+from collections import deque
+from typing import Any, Deque, Dict, Iterator, Tuple
+
+from sqlalchemy.orm import Session
+
+from .minhash import normalize
+from ..models.risk_analysis import FACTOR_FIELDS, RiskFactor
+
+# Same threshold as calculate_analysis_statistics
+HIGH_RISK_THRESHOLD = 15
+
+SCORE_FIELDS = ["severity_score", "probability_score", "risk_score", "residual_risk_score"]
+
+
+def hazard_key(factor: Dict[str, Any]) -> Tuple[str, str]:
+    """Key identifying 'the same hazard' across analyses"""
+    return normalize(factor["hazard_name"] or ""), factor["lifecycle_stage"]
+
+
+def iter_factors(db: Session, analysis_id: int) -> Iterator[Dict[str, Any]]:
+    """Factors of an analysis as plain dicts, in id order"""
+    rows = db.query(RiskFactor.id, *[getattr(RiskFactor, name) for name in FACTOR_FIELDS]).filter(
+        RiskFactor.analysis_id == analysis_id
+    ).order_by(RiskFactor.id).execution_options(yield_per=1000)
+    for row in rows:
+        factor = {"id": row[0]}
+        for name, value in zip(FACTOR_FIELDS, row[1:]):
+            factor[name] = value.value if hasattr(value, "value") else value
+        yield factor
+
+
+def _keyed(factors: Iterator[Dict[str, Any]]) -> Dict[Tuple, Deque[Dict[str, Any]]]:
+    keyed: Dict[Tuple, Deque[Dict[str, Any]]] = {}
+    for factor in factors:
+        key = hazard_key(factor)
+        candidates = keyed.get(key)
+        if candidates is None:
+            candidates = keyed[key] = deque()
+        candidates.append(factor)
+    return keyed
+
+
+def _score_delta(old: Dict[str, Any], new: Dict[str, Any]) -> Dict[str, int]:
+    return {
+        name: new[name] - old[name]
+        for name in SCORE_FIELDS
+        if old[name] is not None and new[name] is not None and new[name] != old[name]
+    }
+
+
+def diff_factors(old_factors: Iterator[Dict[str, Any]], new_factors: Iterator[Dict[str, Any]]) -> Dict[str, Any]:
+    """Added, removed and modified factors between two factor streams"""
+    old_by_key = _keyed(old_factors)
+
+    added, modified = [], []
+    unchanged = 0
+    risk_delta = 0
+    high_delta = 0
+    for new in new_factors:
+        candidates = old_by_key.get(hazard_key(new))
+        if not candidates:
+            added.append(new)
+            risk_delta += new["risk_score"]
+            high_delta += new["risk_score"] >= HIGH_RISK_THRESHOLD
+            continue
+        old = candidates.popleft()
+        risk_delta += new["risk_score"] - old["risk_score"]
+        high_delta += (new["risk_score"] >= HIGH_RISK_THRESHOLD) - (old["risk_score"] >= HIGH_RISK_THRESHOLD)
+        changes = {
+            name: {"old": old[name], "new": new[name]}
+            for name in FACTOR_FIELDS
+            if old[name] != new[name]
+        }
+        if not changes:
+            unchanged += 1
+            continue
+        modified.append({
+            "old_id": old["id"],
+            "new_id": new["id"],
+            "hazard_name": new["hazard_name"],
+            "lifecycle_stage": new["lifecycle_stage"],
+            "changes": changes,
+            "score_delta": _score_delta(old, new),
+        })
+
+    removed = [factor for candidates in old_by_key.values() for factor in candidates]
+    removed.sort(key=lambda factor: factor["id"])
+    for old in removed:
+        risk_delta -= old["risk_score"]
+        high_delta -= old["risk_score"] >= HIGH_RISK_THRESHOLD
+
+    return {
+        "added": added,
+        "removed": removed,
+        "modified": modified,
+        "summary": {
+            "added_count": len(added),
+            "removed_count": len(removed),
+            "modified_count": len(modified),
+            "unchanged_count": unchanged,
+            "total_risk_score_delta": risk_delta,
+            "high_risk_count_delta": high_delta,
+        },
+    }
+
+
+def diff_analyses(db: Session, old_analysis_id: int, new_analysis_id: int) -> Dict[str, Any]:
+    """Diff the factors of two analyses (old -> new)"""
+    result = diff_factors(iter_factors(db, old_analysis_id), iter_factors(db, new_analysis_id))
+    result["old_analysis_id"] = old_analysis_id
+    result["new_analysis_id"] = new_analysis_id
+    return result
@@ -0,0 +1,368 @@
+"""
+Full-text search over risk factors and the audit trail (changelogs)
+
+SQLite: external-content FTS5 tables kept in sync with their source tables by triggers.
+The porter + unicode61 tokenizer stems English and case-folds Cyrillic; Russian
+query terms lose their inflection ending and every term is a prefix match.
+
+PostgreSQL: a GIN expression index over to_tsvector('russian', ...). The
+'russian' configuration stems Cyrillic words with the Russian stemmer and
+ASCII words with the English one, so bilingual content needs a single index.
+
+Other databases (or SQLite builds without FTS5) fall back to LIKE matching.
+
+Highlights are HTML: the database marks matches with control characters, the
+text is HTML-escaped and only then are the markers replaced by <mark> tags, so
+stored content can never inject markup.
+"""
+import html
+import logging
+import re
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import Integer, String, bindparam, cast, column, or_, table, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from ..models.changelog import ChangeLog
+from ..models.project import Project
+from ..models.risk_analysis import RiskAnalysis, RiskFactor, HazardCategory, LifecycleStage
+
+logger = logging.getLogger(__name__)
+
+# Searchable columns in highlight order, with bm25 weights (hazard name matters most)
+SEARCH_COLUMNS = {
+    "hazard_name": 10.0,
+    "harm": 5.0,
+    "hazardous_situation": 4.0,
+    "sequence_of_events": 2.0,
+    "control_measures": 1.0,
+}
+
+# Audit trail columns; old/new values are JSON, the tokenizer splits keys and values
+CHANGELOG_SEARCH_COLUMNS = ["action_description", "target_name", "old_values", "new_values"]
+
+# JSON(B) columns among the searchable ones, indexed by their text form
+JSON_SEARCH_COLUMNS = {"old_values", "new_values"}
+
+HIGHLIGHT_START = "<mark>"
+HIGHLIGHT_END = "</mark>"
+
+# Match markers inserted by the database, replaced by the tags after escaping
+MATCH_START = "\x02"
+MATCH_END = "\x03"
+
+# Users type short phrases; anything longer is truncated
+MAX_QUERY_TERMS = 16
+
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+CYRILLIC_RE = re.compile(r"[а-яё]")
+
+# Russian inflection endings, longest first. Stripping them from query terms turns
+# "электрический" into the prefix "электрическ", which also matches "электрическим".
+RUSSIAN_ENDINGS = sorted([
+    "иями", "ями", "ами", "ого", "его", "ому", "ему", "ыми", "ими", "ией",
+    "ой", "ей", "ий", "ый", "ая", "яя", "ое", "ее", "ых", "их", "ом", "ем",
+    "ам", "ям", "ах", "ях", "ов", "ев", "ую", "юю", "ия", "ие", "ию",
+    "а", "я", "о", "е", "ы", "и", "у", "ю", "ь",
+], key=len, reverse=True)
+MIN_STEM_LENGTH = 3
+
+# Only rowid is needed to join the FTS table back to changelogs
+changelogs_fts = table("changelogs_fts", column("rowid", Integer))
+
+# Backend chosen at startup by ensure_search_indexes: "fts5", "postgres" or "like"
+_search_backend = "like"
+
+def _pg_document_sql(alias: str = "", columns=SEARCH_COLUMNS) -> str:
+    """Searchable text of a row; must match the GIN index expression"""
+    return " || ' ' || ".join(
+        f"coalesce({alias}{column}{'::text' if column in JSON_SEARCH_COLUMNS else ''}, '')" for column in columns
+    )
+
+
+def _sqlite_fts_ddl(table: str, columns) -> List[str]:
+    """External-content FTS5 table over `columns` of `table` plus its sync triggers"""
+    fts = f"{table}_fts"
+    columns_sql = ", ".join(columns)
+    new_sql = ", ".join(f"new.{column}" for column in columns)
+    old_sql = ", ".join(f"old.{column}" for column in columns)
+    return [
+        f"""CREATE VIRTUAL TABLE {fts} USING fts5(
+            {columns_sql},
+            content='{table}', content_rowid='id',
+            tokenize='porter unicode61 remove_diacritics 2'
+        )""",
+        f"""CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN
+            INSERT INTO {fts}(rowid, {columns_sql}) VALUES (new.id, {new_sql});
+        END""",
+        f"""CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN
+            INSERT INTO {fts}({fts}, rowid, {columns_sql}) VALUES ('delete', old.id, {old_sql});
+        END""",
+        f"""CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE ON {table} BEGIN
+            INSERT INTO {fts}({fts}, rowid, {columns_sql}) VALUES ('delete', old.id, {old_sql});
+            INSERT INTO {fts}(rowid, {columns_sql}) VALUES (new.id, {new_sql});
+        END""",
+        # Index rows that existed before the table was created
+        f"INSERT INTO {fts}({fts}) VALUES ('rebuild')",
+    ]
+
+
+# Full-text indexed tables and their searchable columns
+FTS_TABLES = {
+    "risk_factors": list(SEARCH_COLUMNS),
+    "changelogs": CHANGELOG_SEARCH_COLUMNS,
+}
+
+POSTGRES_FTS_DDL = [
+    f"""CREATE INDEX IF NOT EXISTS ix_{table}_search
+        ON {table} USING GIN (to_tsvector('russian', {_pg_document_sql(columns=columns)}))"""
+    for table, columns in FTS_TABLES.items()
+]
+
+
+def ensure_search_indexes(engine: Engine) -> str:
+    """Create the full-text index for the current database if missing and pick the search backend"""
+    global _search_backend
+
+    dialect = engine.dialect.name
+    try:
+        with engine.begin() as conn:
+            if dialect == "sqlite":
+                for table, columns in FTS_TABLES.items():
+                    exists = conn.execute(text(
+                        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"
+                    ), {"name": f"{table}_fts"}).first()
+                    if not exists:
+                        for statement in _sqlite_fts_ddl(table, columns):
+                            conn.execute(text(statement))
+                _search_backend = "fts5"
+            elif dialect == "postgresql":
+                for statement in POSTGRES_FTS_DDL:
+                    conn.execute(text(statement))
+                _search_backend = "postgres"
+            else:
+                _search_backend = "like"
+    except OperationalError as e:
+        # e.g. SQLite compiled without FTS5
+        logger.warning("Full-text index unavailable, falling back to LIKE search: %s", e)
+        _search_backend = "like"
+    return _search_backend
+
+
+def query_terms(query: str) -> List[str]:
+    """Split user input into lowercase word tokens (drops all query syntax)"""
+    return TOKEN_RE.findall(query.lower())[:MAX_QUERY_TERMS]
+
+
+def russian_prefix(term: str) -> str:
+    """Strip one Russian inflection ending so the term can be used as a prefix"""
+    if not CYRILLIC_RE.search(term):
+        return term
+    for ending in RUSSIAN_ENDINGS:
+        if term.endswith(ending) and len(term) - len(ending) >= MIN_STEM_LENGTH:
+            return term[:-len(ending)]
+    return term
+
+
+def _marked_html(value: str) -> str:
+    """Escape text with match markers as HTML and turn the markers into <mark> tags"""
+    return html.escape(value).replace(MATCH_START, HIGHLIGHT_START).replace(MATCH_END, HIGHLIGHT_END)
+
+
+def _mark_matches(value: Optional[str], terms: List[str]) -> Optional[str]:
+    """Text with match markers around the terms, None without matches"""
+    if not value:
+        return None
+    pattern = re.compile("|".join(re.escape(term) for term in terms), re.IGNORECASE | re.UNICODE)
+    marked, count = pattern.subn(lambda match: f"{MATCH_START}{match.group(0)}{MATCH_END}", value)
+    return marked if count else None
+
+
+def _enum_value(enum_class, value):
+    if isinstance(value, enum_class):
+        return value.value
+    return enum_class[value].value
+
+
+def _collect_highlights(row: Dict[str, Any]) -> Dict[str, str]:
+    highlights = {}
+    for column in SEARCH_COLUMNS:
+        value = row.pop(f"{column}_highlight", None)
+        if value and MATCH_START in value:
+            highlights[column] = _marked_html(value)
+    return highlights
+
+
+def _search_fts5(db: Session, terms: List[str], analysis_ids: List[int], limit: int, offset: int):
+    match = " ".join(f'"{term}"*' for term in terms)
+    weights = ", ".join(str(weight) for weight in SEARCH_COLUMNS.values())
+    highlight_sql = ", ".join(
+        f"highlight(risk_factors_fts, {index}, :match_start, :match_end) AS {column}_highlight"
+        for index, column in enumerate(SEARCH_COLUMNS)
+    )
+    statement = text(f"""
+        SELECT rf.id, rf.analysis_id, ra.project_id, p.name AS project_name,
+               rf.hazard_name, rf.harm, rf.hazard_category, rf.lifecycle_stage, rf.risk_score,
+               -bm25(risk_factors_fts, {weights}) AS rank,
+               {highlight_sql}
+        FROM risk_factors_fts
+        JOIN risk_factors rf ON rf.id = risk_factors_fts.rowid
+        JOIN risk_analyses ra ON ra.id = rf.analysis_id
+        JOIN projects p ON p.id = ra.project_id
+        WHERE risk_factors_fts MATCH :match AND rf.analysis_id IN :analysis_ids
+        ORDER BY bm25(risk_factors_fts, {weights})
+        LIMIT :limit OFFSET :offset
+    """).bindparams(bindparam("analysis_ids", expanding=True))
+    rows = db.execute(statement, {
+        "match": match, "analysis_ids": analysis_ids, "limit": limit, "offset": offset,
+        "match_start": MATCH_START, "match_end": MATCH_END
+    }).mappings().all()
+    return [dict(row) for row in rows]
+
+
+def _search_postgres(db: Session, terms: List[str], analysis_ids: List[int], limit: int, offset: int):
+    tsquery = " & ".join(f"{term}:*" for term in terms)
+    highlight_sql = ", ".join(
+        f"ts_headline('russian', coalesce(rf.{column}, ''), q.query, :headline_options) AS {column}_highlight"
+        for column in SEARCH_COLUMNS
+    )
+    statement = text(f"""
+        SELECT rf.id, rf.analysis_id, ra.project_id, p.name AS project_name,
+               rf.hazard_name, rf.harm, rf.hazard_category, rf.lifecycle_stage, rf.risk_score,
+               ts_rank_cd(to_tsvector('russian', {_pg_document_sql('rf.')}), q.query) AS rank,
+               {highlight_sql}
+        FROM risk_factors rf
+        CROSS JOIN (SELECT to_tsquery('russian', :tsquery) AS query) q
+        JOIN risk_analyses ra ON ra.id = rf.analysis_id
+        JOIN projects p ON p.id = ra.project_id
+        WHERE to_tsvector('russian', {_pg_document_sql('rf.')}) @@ q.query
+          AND rf.analysis_id IN :analysis_ids
+        ORDER BY rank DESC
+        LIMIT :limit OFFSET :offset
+    """).bindparams(bindparam("analysis_ids", expanding=True))
+    rows = db.execute(statement, {
+        "tsquery": tsquery, "analysis_ids": analysis_ids, "limit": limit, "offset": offset,
+        "headline_options": f"StartSel={MATCH_START}, StopSel={MATCH_END}, HighlightAll=true"
+    }).mappings().all()
+    return [dict(row) for row in rows]
+
+
+def _search_like(db: Session, terms: List[str], analysis_ids: List[int], limit: int, offset: int):
+    columns = [getattr(RiskFactor, column) for column in SEARCH_COLUMNS]
+    query = db.query(
+        RiskFactor.id, RiskFactor.analysis_id, RiskAnalysis.project_id, Project.name.label("project_name"),
+        RiskFactor.hazard_name, RiskFactor.harm, RiskFactor.hazard_category, RiskFactor.lifecycle_stage,
+        RiskFactor.risk_score, *[column.label(f"{column.key}_text") for column in columns]
+    ).join(RiskAnalysis, RiskFactor.analysis_id == RiskAnalysis.id).join(
+        Project, RiskAnalysis.project_id == Project.id
+    ).filter(RiskFactor.analysis_id.in_(analysis_ids))
+    for term in terms:
+        query = query.filter(or_(*[column.ilike(f"%{term}%") for column in columns]))
+
+    results = []
+    for row in query.order_by(RiskFactor.risk_score.desc(), RiskFactor.id).offset(offset).limit(limit).all():
+        item = dict(row._mapping)
+        for column in SEARCH_COLUMNS:
+            item[f"{column}_highlight"] = _mark_matches(item.pop(f"{column}_text"), terms)
+        item["rank"] = 0.0
+        results.append(item)
+    return results
+
+
+def search_risk_factors(
+    db: Session,
+    query: str,
+    analysis_ids: List[int],
+    limit: int = 20,
+    offset: int = 0
+) -> List[Dict[str, Any]]:
+    """
+    Search risk factors of the given analyses, best matches first
+
+    Returns dicts with factor fields, project info, a relevance rank and
+    per-column highlights (HTML-escaped text, matched words wrapped in <mark>).
+    """
+    terms = query_terms(query)
+    if not terms or not analysis_ids:
+        return []
+
+    if _search_backend == "fts5":
+        rows = _search_fts5(db, [russian_prefix(term) for term in terms], analysis_ids, limit, offset)
+    elif _search_backend == "postgres":
+        # The 'russian' text search configuration stems query terms itself
+        rows = _search_postgres(db, terms, analysis_ids, limit, offset)
+    else:
+        rows = _search_like(db, [russian_prefix(term) for term in terms], analysis_ids, limit, offset)
+
+    for row in rows:
+        row["highlights"] = _collect_highlights(row)
+        # Raw SQL returns the stored enum member names, the ORM returns members
+        row["hazard_category"] = _enum_value(HazardCategory, row["hazard_category"])
+        row["lifecycle_stage"] = _enum_value(LifecycleStage, row["lifecycle_stage"])
+    return rows
+
+
+def _changelog_id_query(db: Session, terms: List[str]):
+    """Query of changelog ids matching all terms; returns (query, id column to order by)"""
+    if not terms:
+        return db.query(ChangeLog.id), ChangeLog.id
+    if _search_backend == "fts5":
+        match = " ".join(f'"{russian_prefix(term)}"*' for term in terms)
+        # Driving the query from the FTS table lets SQLite walk matches in rowid order
+        query = db.query(changelogs_fts.c.rowid).join(ChangeLog, ChangeLog.id == changelogs_fts.c.rowid).filter(
+            text("changelogs_fts MATCH :match").bindparams(match=match)
+        )
+        return query, changelogs_fts.c.rowid
+    if _search_backend == "postgres":
+        document = _pg_document_sql("changelogs.", CHANGELOG_SEARCH_COLUMNS)
+        query = db.query(ChangeLog.id).filter(
+            text(f"to_tsvector('russian', {document}) @@ to_tsquery('russian', :tsquery)").bindparams(
+                tsquery=" & ".join(f"{term}:*" for term in terms)
+            )
+        )
+        return query, ChangeLog.id
+    columns = [
+        cast(getattr(ChangeLog, name), String) if name in JSON_SEARCH_COLUMNS else getattr(ChangeLog, name)
+        for name in CHANGELOG_SEARCH_COLUMNS
+    ]
+    query = db.query(ChangeLog.id)
+    for term in terms:
+        query = query.filter(or_(*[column.ilike(f"%{russian_prefix(term)}%") for column in columns]))
+    return query, ChangeLog.id
+
+
+def search_changelog_ids(
+    db: Session,
+    query: Optional[str],
+    criteria: List[Any],
+    before_id: Optional[int] = None,
+    limit: int = 50
+) -> List[int]:
+    """
+    Ids of changelog entries matching the text query and filter criteria, newest first
+
+    Ids grow with insertion time, so ordering and paging by id (keyset: only
+    entries with id < before_id) returns the newest entries first without an
+    OFFSET scan. Filters on project, user and action type are served by the
+    (column, id) composite indexes on changelogs.
+    """
+    id_query, id_column = _changelog_id_query(db, query_terms(query) if query else [])
+    id_query = id_query.filter(*criteria)
+    if before_id is not None:
+        id_query = id_query.filter(id_column < before_id)
+    return [row[0] for row in id_query.order_by(id_column.desc()).limit(limit).all()]
+
+
+def changelog_highlights(row: Dict[str, Any], query: Optional[str]) -> Dict[str, str]:
+    """HTML-escaped short text columns with matched words wrapped in <mark>"""
+    terms = [russian_prefix(term) for term in query_terms(query)] if query else []
+    if not terms:
+        return {}
+    highlights = {}
+    for name in ("action_description", "target_name"):
+        marked = _mark_matches(row.get(name), terms)
+        if marked:
+            highlights[name] = _marked_html(marked)
+    return highlights
@@ -0,0 +1,46 @@
+"""
+Fast JSON serialization helpers for list endpoints
+"""
+import json
+from datetime import date, datetime
+from enum import Enum
+from typing import Any, Iterable, List, Dict
+
+from starlette.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:
+    # orjson is optional, fall back to the stdlib encoder
+    orjson = None
+
+
+def _default(value: Any) -> Any:
+    """Encode values the stdlib json module does not know about"""
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    """Serialize content to JSON bytes (orjson when available)"""
+    if orjson is not None:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(
+        content, default=_default, ensure_ascii=False, separators=(",", ":")
+    ).encode("utf-8")
+
+
+class ORJSONResponse(JSONResponse):
+    """JSON response rendered with orjson, skipping response_model validation"""
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def rows_to_dicts(rows: Iterable[Any]) -> List[Dict[str, Any]]:
+    """Convert SQLAlchemy Row tuples into plain dicts keyed by column label"""
+    return [dict(row._mapping) for row in rows]
@@ -0,0 +1,101 @@
+"""
+Near-duplicate hazard lookup across projects
+
+Candidates come from the LSH buckets (one indexed lookup per band), ordered by
+the number of shared bands, which tracks the estimated similarity. The project
+filter is applied before the candidates are cut, so factors of projects the
+user cannot see never take their place. Only the best candidates are loaded
+and reranked by exact shingle Jaccard similarity.
+"""
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from .minhash import band_keys, jaccard, minhash_signature, shingles
+from ..models.hazard_similarity import HazardLSHBucket, bucket_rows
+from ..models.project import Project
+from ..models.risk_analysis import RiskAnalysis, RiskFactor
+
+# Candidates reranked per query; bounds the work for very common hazards
+MAX_CANDIDATES = 200
+
+BACKFILL_BATCH_SIZE = 1000
+
+
+def find_similar_factors(
+    db: Session,
+    hazard_name: str,
+    harm: Optional[str] = None,
+    project_filter=None,
+    k: int = 10,
+    min_similarity: float = 0.2,
+    exclude_factor_id: Optional[int] = None
+) -> List[Dict[str, Any]]:
+    """
+    Top-k existing risk factors most similar to the given hazard text
+
+    project_filter is an optional SQL criterion on Project restricting which
+    projects may be suggested (e.g. the ones the user can access).
+    """
+    query_shingles = shingles(hazard_name, harm)
+    if not query_shingles:
+        return []
+    keys = band_keys(minhash_signature(query_shingles))
+
+    # Joining risk_factors also drops buckets of factors deleted outside the ORM
+    shared_bands = func.count().label("shared_bands")
+    candidate_query = db.query(HazardLSHBucket.risk_factor_id, shared_bands).join(
+        RiskFactor, HazardLSHBucket.risk_factor_id == RiskFactor.id
+    ).filter(HazardLSHBucket.bucket.in_(keys))
+    if project_filter is not None:
+        candidate_query = candidate_query.join(
+            RiskAnalysis, RiskFactor.analysis_id == RiskAnalysis.id
+        ).join(Project, RiskAnalysis.project_id == Project.id).filter(project_filter)
+    if exclude_factor_id is not None:
+        candidate_query = candidate_query.filter(HazardLSHBucket.risk_factor_id != exclude_factor_id)
+    candidate_ids = [
+        row[0] for row in candidate_query.group_by(HazardLSHBucket.risk_factor_id).order_by(
+            shared_bands.desc(), HazardLSHBucket.risk_factor_id.desc()
+        ).limit(MAX_CANDIDATES).all()
+    ]
+    if not candidate_ids:
+        return []
+
+    rows = db.query(
+        RiskFactor.id, RiskFactor.analysis_id, RiskAnalysis.project_id, Project.name.label("project_name"),
+        RiskFactor.hazard_name, RiskFactor.harm, RiskFactor.risk_score
+    ).join(RiskAnalysis, RiskFactor.analysis_id == RiskAnalysis.id).join(
+        Project, RiskAnalysis.project_id == Project.id
+    ).filter(RiskFactor.id.in_(candidate_ids))
+
+    results = []
+    for row in rows.all():
+        similarity = jaccard(query_shingles, shingles(row.hazard_name, row.harm))
+        if similarity >= min_similarity:
+            item = dict(row._mapping)
+            item["similarity"] = round(similarity, 4)
+            results.append(item)
+    results.sort(key=lambda item: (-item["similarity"], -item["id"]))
+    return results[:k]
+
+
+def backfill_similarity_index(db: Session, batch_size: int = BACKFILL_BATCH_SIZE) -> int:
+    """Add bucket rows for factors that have none (created before the index existed)"""
+    indexed = db.query(HazardLSHBucket.risk_factor_id)
+    last_id = 0
+    added = 0
+    while True:
+        batch = db.query(RiskFactor.id, RiskFactor.hazard_name, RiskFactor.harm).filter(
+            RiskFactor.id > last_id, RiskFactor.id.notin_(indexed)
+        ).order_by(RiskFactor.id).limit(batch_size).all()
+        if not batch:
+            return added
+        rows = []
+        for factor_id, hazard_name, harm in batch:
+            rows.extend(bucket_rows(factor_id, hazard_name, harm))
+        if rows:
+            db.execute(HazardLSHBucket.__table__.insert(), rows)
+        db.commit()
+        added += len(batch)
+        last_id = batch[-1].id
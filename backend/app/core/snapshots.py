@@ -0,0 +1,196 @@
+"""
+Copy-on-write project version snapshots
+
+A snapshot is a small tree of content-addressed JSON blobs:
+
+    version root  -> project fields, latest analysis, members blob, factor chunks
+    factor chunk  -> [[factor id, factor blob hash], ...] for ids in one id range
+    factor blob   -> fields of one risk factor (no id or timestamps)
+
+Blobs are keyed by the sha256 of their canonical JSON and written only when
+missing, so a new version copies just the factors that changed plus the chunk
+that lists them. Chunks cover fixed factor id ranges, which keeps unchanged
+chunks identical when factors are added or deleted elsewhere.
+"""
+import hashlib
+import json
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from ..models.project import Project, ProjectMember, ProjectVersion
+from ..models.risk_analysis import FACTOR_FIELDS, LATEST_ANALYSIS_ORDER, RiskAnalysis, RiskFactor
+from ..models.snapshot import SnapshotBlob
+from ..models.user import User
+
+# Factors with id // CHUNK_SIZE equal share a chunk blob
+CHUNK_SIZE = 256
+
+# Bound the size of IN (...) lists
+LOOKUP_BATCH_SIZE = 500
+
+PROJECT_FIELDS = [
+    "name", "description", "status", "progress_percentage", "device_name", "device_model",
+    "device_purpose", "device_description", "device_classification", "intended_use", "user_profile",
+    "operating_environment", "technical_specs", "regulatory_requirements", "standards",
+    "contact_type", "duration", "invasiveness", "energy_source", "owner_id",
+]
+
+
+def _plain(value: Any) -> Any:
+    return value.value if hasattr(value, "value") else value
+
+
+def canonical_json(content: Any) -> str:
+    """Deterministic JSON: same content, same text, same hash"""
+    return json.dumps(content, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+
+
+class _BlobWriter:
+    """Collects blobs of one snapshot and writes the missing ones in bulk"""
+
+    def __init__(self):
+        self.blobs: Dict[str, Tuple[str, str]] = {}
+
+    def add(self, kind: str, content: Any) -> str:
+        text = canonical_json(content)
+        content_hash = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        self.blobs[content_hash] = (kind, text)
+        return content_hash
+
+
+def existing_hashes(db: Session, hashes: Iterable[str]) -> set:
+    """Subset of the hashes already stored"""
+    hashes = list(hashes)
+    found = set()
+    for start in range(0, len(hashes), LOOKUP_BATCH_SIZE):
+        batch = hashes[start:start + LOOKUP_BATCH_SIZE]
+        found.update(row[0] for row in db.query(SnapshotBlob.content_hash).filter(
+            SnapshotBlob.content_hash.in_(batch)
+        ))
+    return found
+
+
+def _insert_blobs(db: Session, rows: List[Dict[str, str]]):
+    if not rows:
+        return
+    dialect = db.get_bind().dialect.name
+    table = SnapshotBlob.__table__
+    if dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    elif dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        dialect_insert = None
+    # A concurrent snapshot may store the same content first; blobs are immutable, so skip it
+    statement = dialect_insert(table).on_conflict_do_nothing() if dialect_insert else insert(table)
+    for start in range(0, len(rows), LOOKUP_BATCH_SIZE):
+        db.execute(statement, rows[start:start + LOOKUP_BATCH_SIZE])
+
+
+def take_snapshot(db: Session, project: Project) -> Dict[str, Any]:
+    """
+    Store the current state of a project; returns the ProjectVersion snapshot columns
+
+    Only blobs that do not exist yet are written. The caller commits.
+    """
+    writer = _BlobWriter()
+
+    analysis = db.query(RiskAnalysis).filter(
+        RiskAnalysis.project_id == project.id
+    ).order_by(*LATEST_ANALYSIS_ORDER).first()
+
+    chunk_factors: Dict[int, List[List]] = {}
+    factor_count = 0
+    if analysis is not None:
+        rows = db.query(RiskFactor.id, *[getattr(RiskFactor, name) for name in FACTOR_FIELDS]).filter(
+            RiskFactor.analysis_id == analysis.id
+        ).order_by(RiskFactor.id).all()
+        for row in rows:
+            factor_hash = writer.add("factor", {name: _plain(value) for name, value in zip(FACTOR_FIELDS, row[1:])})
+            chunk_factors.setdefault(row[0] // CHUNK_SIZE, []).append([row[0], factor_hash])
+        factor_count = len(rows)
+
+    chunks = [[key, writer.add("factor_chunk", {"factors": entries})] for key, entries in sorted(chunk_factors.items())]
+
+    members = db.query(ProjectMember.user_id, ProjectMember.role, User.first_name, User.last_name, User.email).join(
+        User, ProjectMember.user_id == User.id
+    ).filter(ProjectMember.project_id == project.id).order_by(ProjectMember.user_id).all()
+    members_hash = writer.add("members", [
+        {"user_id": user_id, "role": _plain(role), "name": f"{first_name} {last_name}", "email": email}
+        for user_id, role, first_name, last_name, email in members
+    ])
+
+    root_hash = writer.add("version", {
+        "project": {name: _plain(getattr(project, name)) for name in PROJECT_FIELDS},
+        "analysis": {
+            "id": analysis.id,
+            "analysis_date": analysis.analysis_date,
+            "analyst_id": analysis.analyst_id,
+            "has_body_contact": analysis.has_body_contact,
+            "contact_type": _plain(analysis.contact_type),
+        } if analysis is not None else None,
+        "members": members_hash,
+        "factor_chunks": chunks,
+    })
+
+    # A stored chunk implies its factor blobs are stored, so unchanged chunks skip the factor lookup
+    missing = {root_hash, members_hash} - existing_hashes(db, [root_hash, members_hash])
+    stored_chunks = existing_hashes(db, [chunk_hash for _, chunk_hash in chunks])
+    for key, chunk_hash in chunks:
+        if chunk_hash not in stored_chunks:
+            missing.add(chunk_hash)
+            factor_hashes = {factor_hash for _, factor_hash in chunk_factors[key]}
+            missing.update(factor_hashes - existing_hashes(db, factor_hashes))
+
+    # Children before parents, so a partially written snapshot never has dangling references
+    order = {"factor": 0, "factor_chunk": 1, "members": 2, "version": 3}
+    _insert_blobs(db, [
+        {"content_hash": h, "kind": writer.blobs[h][0], "content": writer.blobs[h][1]}
+        for h in sorted(missing, key=lambda h: order[writer.blobs[h][0]])
+    ])
+
+    return {
+        "snapshot_hash": root_hash,
+        "project_revision": project.revision,
+        "factor_count": factor_count,
+    }
+
+
+def _load_blobs(db: Session, hashes: Iterable[str]) -> Dict[str, Any]:
+    hashes = list(hashes)
+    result = {}
+    for start in range(0, len(hashes), LOOKUP_BATCH_SIZE):
+        batch = hashes[start:start + LOOKUP_BATCH_SIZE]
+        for content_hash, content in db.query(SnapshotBlob.content_hash, SnapshotBlob.content).filter(
+            SnapshotBlob.content_hash.in_(batch)
+        ):
+            result[content_hash] = json.loads(content)
+    return result
+
+
+def load_snapshot(db: Session, version: ProjectVersion) -> Optional[Dict[str, Any]]:
+    """Rebuild the project state stored by a version (None for versions without a snapshot)"""
+    if not version.snapshot_hash:
+        return None
+    root = _load_blobs(db, [version.snapshot_hash]).get(version.snapshot_hash)
+    if root is None:
+        return None
+
+    members = _load_blobs(db, [root["members"]]).get(root["members"], [])
+    chunks = _load_blobs(db, [chunk_hash for _, chunk_hash in root["factor_chunks"]])
+    entries = [
+        entry
+        for _, chunk_hash in root["factor_chunks"]
+        for entry in chunks[chunk_hash]["factors"]
+    ]
+    factor_blobs = _load_blobs(db, {factor_hash for _, factor_hash in entries})
+    factors = [{"id": factor_id, **factor_blobs[factor_hash]} for factor_id, factor_hash in entries]
+
+    return {
+        "project": root["project"],
+        "analysis": root["analysis"],
+        "members": members,
+        "risk_factors": factors,
+    }
@@ -0,0 +1,237 @@
+"""
+Structured application logging
+
+Log records are put on an in-memory queue by a QueueHandler on the root
+logger and written by a QueueListener thread, so request handlers never block
+on stdout or file I/O. The listener writes one JSON object per line (or plain
+text for local development) with the time, level, logger, message, request id
+and any `extra={...}` fields of the call.
+
+- Per-module levels: LOG_LEVEL for the root logger plus LOG_LEVELS overrides,
+  e.g. "app.routers.auth=DEBUG,sqlalchemy.engine=WARNING"
+- Sampling: only every LOG_DEBUG_SAMPLE_EVERY-th DEBUG record of each call site
+  (logger and message template) is kept; kept records carry "sampled": N
+- Request ids: RequestIdMiddleware takes X-Request-ID from the request (or
+  generates one), returns it in the response and stamps it on every record
+  logged while the request is handled, handler threads included
+"""
+import atexit
+import json
+import logging
+import queue
+import re
+import sys
+import threading
+import uuid
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import orjson
+except ImportError:
+    # orjson is optional, log lines fall back to the stdlib encoder
+    orjson = None
+
+REQUEST_ID_HEADER = "X-Request-ID"
+# Incoming ids are echoed into logs and headers, so only simple tokens are accepted
+_REQUEST_ID_RE = re.compile(r"^[A-Za-z0-9._:-]{1,128}$")
+
+# Attributes every LogRecord has; anything else was passed with extra={...}
+_RECORD_ATTRIBUTES = set(logging.makeLogRecord({}).__dict__) | {"message", "asctime", "request_id", "sampled"}
+
+current_request_id: ContextVar[Optional[str]] = ContextVar("current_request_id", default=None)
+
+
+def parse_levels(spec: str) -> Dict[str, int]:
+    """Logger levels from "logger=LEVEL,logger=LEVEL" (unknown levels are ignored)"""
+    levels = {}
+    for item in spec.split(","):
+        name, _, level = item.partition("=")
+        level_number = logging.getLevelName(level.strip().upper())
+        if name.strip() and isinstance(level_number, int):
+            levels[name.strip()] = level_number
+    return levels
+
+
+class RequestContextFilter(logging.Filter):
+    """Stamps the current request id on records (in the logging thread, before queueing)"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = current_request_id.get()
+        return True
+
+
+class DebugSamplingFilter(logging.Filter):
+    """Keeps the first and then every n-th DEBUG record per call site; other levels pass"""
+
+    def __init__(self, every: int):
+        super().__init__()
+        self.every = max(1, every)
+        self._counts: Dict[tuple, int] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno != logging.DEBUG or self.every == 1:
+            return True
+        key = (record.name, record.msg if isinstance(record.msg, str) else type(record.msg))
+        with self._lock:
+            count = self._counts.get(key, 0)
+            self._counts[key] = count + 1
+            if len(self._counts) > 10_000:
+                self._counts.clear()
+        if count % self.every:
+            return False
+        record.sampled = self.every
+        return True
+
+
+class StructuredQueueHandler(QueueHandler):
+    """Queues records with their message and traceback rendered, extras kept as attributes"""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = logging.makeLogRecord(record.__dict__)
+        record.message = record.getMessage()
+        if record.exc_info:
+            # Tracebacks keep frames alive, so they are rendered before queueing
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.msg = record.message
+        record.args = None
+        record.exc_info = None
+        return record
+
+
+def _json_default(value):
+    return str(value)
+
+
+class JSONLineFormatter(logging.Formatter):
+    """One JSON object per record"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        request_id = getattr(record, "request_id", None)
+        if request_id:
+            entry["request_id"] = request_id
+        sampled = getattr(record, "sampled", None)
+        if sampled:
+            entry["sampled"] = sampled
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        if orjson is not None:
+            return orjson.dumps(entry, default=_json_default, option=orjson.OPT_NON_STR_KEYS).decode("utf-8")
+        return json.dumps(entry, ensure_ascii=False, default=_json_default)
+
+
+class TextFormatter(logging.Formatter):
+    """Human-readable lines with the request id, for local development"""
+
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)-7s %(name)s [%(request_id)s] %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        if getattr(record, "request_id", None) is None:
+            record.request_id = "-"
+        return super().format(record)
+
+
+_listener: Optional[QueueListener] = None
+
+
+def configure_logging(
+    level: str = "INFO",
+    levels: str = "",
+    log_format: str = "json",
+    debug_sample_every: int = 1,
+    log_file: Optional[str] = None,
+) -> Optional[QueueListener]:
+    """
+    Route the root logger through a queue to a background writer (idempotent)
+
+    Args:
+        level: Root logger level
+        levels: Per-logger overrides, "logger=LEVEL,..."
+        log_format: "json" (JSON lines) or "text"
+        debug_sample_every: Keep every n-th DEBUG record per call site (1 keeps all)
+        log_file: Write to this file instead of stdout
+    """
+    global _listener
+    if _listener is not None:
+        return _listener
+
+    output = logging.FileHandler(log_file, encoding="utf-8") if log_file else logging.StreamHandler(sys.stdout)
+    output.setFormatter(TextFormatter() if log_format == "text" else JSONLineFormatter())
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    handler = StructuredQueueHandler(log_queue)
+    handler.addFilter(RequestContextFilter())
+    handler.addFilter(DebugSamplingFilter(debug_sample_every))
+
+    root = logging.getLogger()
+    root.handlers = [existing for existing in root.handlers if not isinstance(existing, QueueHandler)]
+    root.addHandler(handler)
+    root.setLevel(parse_levels(f"root={level}").get("root", logging.INFO))
+    for name, logger_level in parse_levels(levels).items():
+        logging.getLogger(name).setLevel(logger_level)
+
+    _listener = QueueListener(log_queue, output, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+    return _listener
+
+
+def shutdown_logging():
+    """Write out queued records and stop the writer thread"""
+    global _listener
+    if _listener is not None:
+        listener, _listener = _listener, None
+        listener.stop()
+
+
+def new_request_id() -> str:
+    return uuid.uuid4().hex
+
+
+class RequestIdMiddleware:
+    """
+    ASGI middleware assigning each request an id for log correlation
+
+    The id is taken from the X-Request-ID request header when it is a simple
+    token (set by a proxy or the frontend), otherwise generated, and returned
+    in the X-Request-ID response header.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = Headers(scope=scope).get(REQUEST_ID_HEADER)
+        if not request_id or not _REQUEST_ID_RE.match(request_id):
+            request_id = new_request_id()
+        token = current_request_id.set(request_id)
+
+        async def send_wrapper(message: Message):
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message)[REQUEST_ID_HEADER] = request_id
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            current_request_id.reset(token)
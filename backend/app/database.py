@@ -1,10 +1,16 @@
 """
 Database configuration and connection setup
 """
+import itertools
+import json
 import os
-from sqlalchemy import create_engine
+from contextvars import ContextVar
+from typing import Optional, Sequence
+
+from sqlalchemy import CompoundSelect, Select, TextClause, create_engine
+from sqlalchemy.engine import Engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -15,14 +21,110 @@ DATABASE_URL = os.getenv(
     "sqlite:///./medical_risk.db"
 )
 
+try:
+    import orjson
+except ImportError:
+    # orjson is optional, JSON columns fall back to the stdlib encoder
+    orjson = None
+
+
+def json_serializer(value) -> str:
+    """Encoder for JSON columns: compact, non-ASCII kept readable (and full-text searchable)"""
+    if orjson is not None:
+        return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS).decode("utf-8")
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+
+
+def json_deserializer(value: str):
+    if orjson is not None:
+        return orjson.loads(value)
+    return json.loads(value)
+
+
 # Create SQLAlchemy engine
-if DATABASE_URL.startswith("sqlite"):
-    engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
-else:
-    engine = create_engine(DATABASE_URL)
+json_options = {"json_serializer": json_serializer, "json_deserializer": json_deserializer}
+
+
+def create_database_engine(url: str):
+    if url.startswith("sqlite"):
+        return create_engine(url, connect_args={"check_same_thread": False}, **json_options)
+    return create_engine(url, **json_options)
+
+
+engine = create_database_engine(DATABASE_URL)
+
+# Read replicas: comma-separated URLs of copies of the primary database (none by default)
+DATABASE_REPLICA_URLS = [url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()]
+replica_engines = [create_database_engine(url) for url in DATABASE_REPLICA_URLS]
+
+
+class RequestRouting:
+    """Replica routing state of one request: set by ReadReplicaMiddleware, updated by sessions"""
+    __slots__ = ("use_replica", "wrote")
+
+    def __init__(self, use_replica: bool):
+        self.use_replica = use_replica
+        self.wrote = False
+
+
+current_routing: ContextVar[Optional[RequestRouting]] = ContextVar("current_routing", default=None)
+_replica_counter = itertools.count()
+
+
+def _is_read(clause) -> bool:
+    if isinstance(clause, (Select, CompoundSelect)):
+        return True
+    if isinstance(clause, TextClause):
+        return clause.text.lstrip()[:6].upper() in ("SELECT", "WITH")
+    return False
+
+
+class RoutingSession(Session):
+    """
+    Session reading from a replica while the current request allows it
+
+    Reads go to one replica per session (picked round-robin) when the request
+    is routed to replicas; flushes, DML and any other statement go to the
+    primary, and so does everything after the session's first write, so a
+    handler always reads its own changes. A bind asked for without a statement
+    outside a flush (get_bind() for the dialect, connection()) is the primary
+    and counts as neither: statements executed on that connection directly are
+    not seen by the routing.
+    """
+
+    def __init__(self, *args, replicas: Sequence[Engine] = (), **kwargs):
+        super().__init__(*args, **kwargs)
+        self.replicas = replicas
+        self._replica: Optional[Engine] = None
+        self._wrote = False
+
+    def get_bind(self, mapper=None, *, clause=None, **kwargs):
+        primary = super().get_bind(mapper, clause=clause, **kwargs)
+        routing = current_routing.get()
+        if not self.replicas or routing is None or kwargs.get("bind") is not None or not isinstance(primary, Engine):
+            # No routing, or an explicit bind / a session bound to a connection (batch requests)
+            return primary
+        if clause is None and not self._flushing:
+            return primary
+        if self._wrote or self._flushing or not _is_read(clause):
+            self._wrote = routing.wrote = True
+            return primary
+        if not routing.use_replica:
+            return primary
+        if self._replica is None:
+            self._replica = self.replicas[next(_replica_counter) % len(self.replicas)]
+        return self._replica
+
+    def close(self):
+        super().close()
+        self._replica = None
+        self._wrote = False
+
 
 # Create SessionLocal class
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+SessionLocal = sessionmaker(
+    class_=RoutingSession, autocommit=False, autoflush=False, bind=engine, replicas=replica_engines
+)
 
 # Create Base class for models
 Base = declarative_base()
@@ -1,14 +1,36 @@
-from fastapi import FastAPI, Depends
+import logging
+
+from fastapi import FastAPI, Depends, HTTPException
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import HTTPBearer
 from sqlalchemy.orm import Session
 
-from .database import engine, get_db
+from .database import engine, get_db, replica_engines
 from .models import user, project, risk_analysis
 from .models import changelog as changelog_model
-from .routers import auth, users, projects, risk_analyses, changelog
+from .routers import auth, users, projects, risk_analyses, project_view, changelog, analytics, reports, batch
 from . import admin_auth
 from .core.config import settings
+from .core.compression import CompressionMiddleware
+from .core.rate_limit import RateLimitMiddleware, create_rate_limiter
+from .core import metrics
+from .core.query_profiler import QueryProfilerMiddleware, install_query_profiler
+from .core.read_replicas import ReadReplicaMiddleware
+from .core.search import ensure_search_indexes
+from .core.changelog_fields import ensure_changelog_field_indexes
+from .core.reports import shutdown_report_executor
+from .core.structured_logging import RequestIdMiddleware, configure_logging, shutdown_logging
+
+# Structured logging: JSON lines written by a background thread
+configure_logging(
+    level=settings.log_level,
+    levels=settings.log_levels,
+    log_format=settings.log_format,
+    debug_sample_every=settings.log_debug_sample_every,
+    log_file=settings.log_file or None,
+)
+logger = logging.getLogger(__name__)
 
 # Create database tables
 user.Base.metadata.create_all(bind=engine)
@@ -16,6 +38,12 @@ project.Base.metadata.create_all(bind=engine)
 risk_analysis.Base.metadata.create_all(bind=engine)
 changelog_model.Base.metadata.create_all(bind=engine)
 
+# Create full-text search indexes (FTS5 on SQLite, GIN on PostgreSQL)
+ensure_search_indexes(engine)
+
+# Create "changes touching field" indexes over changelog JSON payloads
+ensure_changelog_field_indexes(engine)
+
 # Initialize FastAPI app
 app = FastAPI(
     title="Medical Risk Analysis API",
@@ -25,6 +53,24 @@ app = FastAPI(
     redoc_url="/redoc"
 )
 
+# Slow-query log, and per-request query recording / N+1 detection in debug mode
+for database_engine in [engine, *replica_engines]:
+    install_query_profiler(
+        database_engine, settings.slow_query_ms,
+        explain_slow=settings.slow_query_explain, log_parameters=settings.query_debug
+    )
+if settings.query_debug:
+    app.add_middleware(QueryProfilerMiddleware, n_plus_one_threshold=settings.n_plus_one_threshold)
+
+# GET requests read from replicas, except shortly after the caller's own changes
+if replica_engines:
+    app.add_middleware(ReadReplicaMiddleware, window=settings.read_your_writes_seconds)
+
+# Rate limiting and admission control (inside CORS, so rejections carry CORS headers)
+rate_limiter = create_rate_limiter() if settings.rate_limit_enabled else None
+if rate_limiter is not None:
+    app.add_middleware(RateLimitMiddleware, limiter=rate_limiter)
+
 # Configure CORS
 app.add_middleware(
     CORSMiddleware,
@@ -34,18 +80,58 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Include routers
-app.include_router(auth.router, prefix="/api/auth", tags=["authentication"])
-app.include_router(users.router, prefix="/api/users", tags=["users"])
-app.include_router(projects.router, prefix="/api/projects", tags=["projects"])
-app.include_router(risk_analyses.router, prefix="/api/risk-analyses", tags=["risk-analyses"])
-app.include_router(changelog.router)
+# Compress large responses (admin page, factor lists, users with projects)
+if settings.compression_enabled:
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=settings.compression_minimum_size,
+        level=settings.compression_level,
+        route_levels={
+            "/admin": 9,  # Static-ish HTML, served from the precompressed cache
+            "/api/risk-analyses/project": 5,  # Hot, large JSON lists
+        },
+        cache_max_bytes=settings.compression_cache_mb * 1024 * 1024,
+        cached_prefixes=("/admin",),
+    )
+
+# Prometheus metrics (outermost, so latency covers the whole middleware stack)
+if settings.metrics_enabled:
+    for database_engine in [engine, *replica_engines]:
+        metrics.instrument_engine(database_engine)
+    if rate_limiter is not None:
+        metrics.REGISTRY.add_collector(metrics.rate_limit_collector(rate_limiter))
+    app.add_middleware(metrics.MetricsMiddleware)
+
+# Request ids for log correlation (outermost, so every record of a request carries it)
+app.add_middleware(RequestIdMiddleware)
+
+# Include routers (API routers are also available to POST /api/batch)
+API_ROUTERS = [
+    (auth.router, "/api/auth", ["authentication"]),
+    (users.router, "/api/users", ["users"]),
+    (projects.router, "/api/projects", ["projects"]),
+    (project_view.router, "/api/projects", ["projects"]),
+    (risk_analyses.router, "/api/risk-analyses", ["risk-analyses"]),
+    (analytics.router, "/api/analytics", ["analytics"]),
+    (reports.router, "/api/reports", ["reports"]),
+    (changelog.router, "", None),  # Router has its own prefix
+]
+for api_router, prefix, tags in API_ROUTERS:
+    app.include_router(api_router, prefix=prefix, tags=tags)
+app.state.batch_routers = [(api_router, prefix) for api_router, prefix, _ in API_ROUTERS]
+app.include_router(batch.router)
 app.include_router(admin_auth.router, tags=["admin"])
 
+@app.on_event("shutdown")
+def stop_report_workers():
+    """Stop report worker processes and write out queued log records"""
+    shutdown_report_executor()
+    shutdown_logging()
+
 @app.get("/")
 async def root():
     """Root endpoint"""
-    print("🔥 DEBUG: Root endpoint called - server is running with new code!")
+    logger.debug("Root endpoint called")
     return {
         "message": "Medical Risk Analysis API",
         "version": "1.0.1",  # Увеличили версию
@@ -53,6 +139,13 @@ async def root():
         "debug": "Server updated with new code"
     }
 
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    """Prometheus metrics of this worker process"""
+    if not settings.metrics_enabled:
+        raise HTTPException(status_code=404, detail="Not Found")
+    return PlainTextResponse(metrics.REGISTRY.render(), media_type=metrics.CONTENT_TYPE)
+
 @app.get("/health")
 async def health_check(db: Session = Depends(get_db)):
     """Health check endpoint"""
@@ -60,6 +153,9 @@ async def health_check(db: Session = Depends(get_db)):
         # Simple database connectivity check
         from sqlalchemy import text
         db.execute(text("SELECT 1"))
-        return {"status": "healthy", "database": "connected"}
+        health = {"status": "healthy", "database": "connected"}
+        if rate_limiter is not None:
+            health["rate_limiting"] = rate_limiter.snapshot()
+        return health
     except Exception as e:
         return {"status": "unhealthy", "database": "disconnected", "error": str(e)}
\ No newline at end of file
@@ -3,10 +3,19 @@ from .user import User, UserRole
 from .project import Project, ProjectMember, ProjectVersion, ProjectStatus, ProjectRole
 from .risk_analysis import RiskAnalysis, RiskFactor, LifecycleStage, HazardCategory, ContactType
 from .changelog import ChangeLog, ActionType
+from .changelog_archive import ChangeLogArchiveSegment
+from .report import ReportJob, ReportStatus
+from .snapshot import SnapshotBlob
+from .hazard_similarity import HazardLSHBucket  # registers LSH bucket flush hooks
+from . import revision_tracking  # registers revision counter flush hooks
 
 __all__ = [
     "User", "UserRole",
     "Project", "ProjectMember", "ProjectVersion", "ProjectStatus", "ProjectRole",
     "RiskAnalysis", "RiskFactor", "LifecycleStage", "HazardCategory", "ContactType",
-    "ChangeLog", "ActionType"
+    "ChangeLog", "ActionType",
+    "ChangeLogArchiveSegment",
+    "ReportJob", "ReportStatus",
+    "SnapshotBlob",
+    "HazardLSHBucket"
 ]
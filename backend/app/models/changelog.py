@@ -1,7 +1,8 @@
 """
 ChangeLog model for tracking all changes in the system
 """
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Enum
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Enum, Index, JSON
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from enum import Enum as PyEnum
@@ -45,9 +46,46 @@ class ActionType(PyEnum):
     SYSTEM_BACKUP = "system_backup"
 
 
+# Human-readable action names in Russian
+ACTION_DISPLAY_NAMES = {
+    ActionType.PROJECT_CREATED: "Создан проект",
+    ActionType.PROJECT_UPDATED: "Обновлен проект",
+    ActionType.PROJECT_DELETED: "Удален проект",
+    ActionType.PROJECT_STATUS_CHANGED: "Изменен статус проекта",
+    ActionType.USER_ADDED: "Добавлен пользователь",
+    ActionType.USER_REMOVED: "Удален пользователь",
+    ActionType.USER_ROLE_CHANGED: "Изменена роль пользователя",
+    ActionType.USER_PROFILE_UPDATED: "Обновлен профиль пользователя",
+    ActionType.RISK_CREATED: "Создан риск",
+    ActionType.RISK_UPDATED: "Обновлен риск",
+    ActionType.RISK_DELETED: "Удален риск",
+    ActionType.RISK_STATUS_CHANGED: "Изменен статус риска",
+    ActionType.PROJECT_MEMBER_ADDED: "Добавлен участник проекта",
+    ActionType.PROJECT_MEMBER_REMOVED: "Удален участник проекта",
+    ActionType.PROJECT_MEMBER_ROLE_CHANGED: "Изменена роль участника",
+    ActionType.VERSION_CREATED: "Создана версия",
+    ActionType.VERSION_UPDATED: "Обновлена версия",
+    ActionType.USER_LOGIN: "Вход в систему",
+    ActionType.USER_LOGOUT: "Выход из системы",
+    ActionType.SYSTEM_BACKUP: "Резервное копирование",
+}
+
+
+# JSON text queried with JSON1 functions on SQLite, binary JSONB on PostgreSQL;
+# None is stored as SQL NULL rather than the JSON literal null
+ChangePayload = JSON(none_as_null=True).with_variant(JSONB(none_as_null=True), "postgresql")
+
+
 class ChangeLog(Base):
     """Model for tracking all changes in the system"""
     __tablename__ = "changelogs"
+    __table_args__ = (
+        # Filter + newest-first (id order) lookups for changelog search
+        Index("ix_changelogs_project_id_id", "project_id", "id"),
+        Index("ix_changelogs_user_id_id", "user_id", "id"),
+        Index("ix_changelogs_action_type_id", "action_type", "id"),
+        Index("ix_changelogs_created_at", "created_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     
@@ -66,12 +104,12 @@ class ChangeLog(Base):
     # Related project (if applicable)
     project_id = Column(Integer, ForeignKey("projects.id"), nullable=True)
     
-    # Change details (JSON-like structure stored as text)
-    old_values = Column(Text, nullable=True)  # JSON string of old values
-    new_values = Column(Text, nullable=True)  # JSON string of new values
+    # Change details ({field: value}; updates list the changed fields in both)
+    old_values = Column(ChangePayload, nullable=True)  # Old values of changed/deleted fields
+    new_values = Column(ChangePayload, nullable=True)  # New values of changed/created fields
     
     # Additional metadata
-    extra_data = Column(Text, nullable=True)  # Any additional information as JSON
+    extra_data = Column(ChangePayload, nullable=True)  # Any additional information
     ip_address = Column(String, nullable=True)
     user_agent = Column(String, nullable=True)
     
@@ -88,26 +126,4 @@ class ChangeLog(Base):
     @property
     def action_display_name(self) -> str:
         """Return human-readable action name in Russian"""
-        action_names = {
-            ActionType.PROJECT_CREATED: "Создан проект",
-            ActionType.PROJECT_UPDATED: "Обновлен проект",
-            ActionType.PROJECT_DELETED: "Удален проект",
-            ActionType.PROJECT_STATUS_CHANGED: "Изменен статус проекта",
-            ActionType.USER_ADDED: "Добавлен пользователь",
-            ActionType.USER_REMOVED: "Удален пользователь",
-            ActionType.USER_ROLE_CHANGED: "Изменена роль пользователя",
-            ActionType.USER_PROFILE_UPDATED: "Обновлен профиль пользователя",
-            ActionType.RISK_CREATED: "Создан риск",
-            ActionType.RISK_UPDATED: "Обновлен риск",
-            ActionType.RISK_DELETED: "Удален риск",
-            ActionType.RISK_STATUS_CHANGED: "Изменен статус риска",
-            ActionType.PROJECT_MEMBER_ADDED: "Добавлен участник проекта",
-            ActionType.PROJECT_MEMBER_REMOVED: "Удален участник проекта",
-            ActionType.PROJECT_MEMBER_ROLE_CHANGED: "Изменена роль участника",
-            ActionType.VERSION_CREATED: "Создана версия",
-            ActionType.VERSION_UPDATED: "Обновлена версия",
-            ActionType.USER_LOGIN: "Вход в систему",
-            ActionType.USER_LOGOUT: "Выход из системы",
-            ActionType.SYSTEM_BACKUP: "Резервное копирование",
-        }
-        return action_names.get(self.action_type, self.action_type.value)
+        return ACTION_DISPLAY_NAMES.get(self.action_type, self.action_type.value)
@@ -0,0 +1,37 @@
+"""
+Catalog of archived changelog segments
+"""
+from sqlalchemy import Column, Integer, String, DateTime, Index
+from sqlalchemy.sql import func
+
+from ..database import Base
+
+
+class ChangeLogArchiveSegment(Base):
+    """
+    One compressed JSONL file of changelog entries moved out of `changelogs`
+
+    Files live under settings.changelog_archive_dir, grouped by month; each has
+    an index sidecar (<path>.idx.json) listing its compressed blocks.
+    """
+    __tablename__ = "changelog_archive_segments"
+    __table_args__ = (
+        # Which segments can hold an id / ids below a keyset cursor
+        Index("ix_changelog_archive_segments_id_range", "max_id", "min_id"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    path = Column(String, nullable=False, unique=True)  # relative to the archive directory
+    codec = Column(String, nullable=False)  # "zstd" or "gzip"
+    month = Column(String(7), nullable=False)  # "YYYY-MM" of created_at
+
+    min_id = Column(Integer, nullable=False)
+    max_id = Column(Integer, nullable=False)
+    min_created_at = Column(DateTime(timezone=True), nullable=False)
+    max_created_at = Column(DateTime(timezone=True), nullable=False)
+    entry_count = Column(Integer, nullable=False)
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    def __repr__(self):
+        return f"<ChangeLogArchiveSegment(path='{self.path}', ids={self.min_id}-{self.max_id})>"
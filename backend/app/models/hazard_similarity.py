@@ -0,0 +1,67 @@
+"""
+LSH buckets of risk factor hazards for near-duplicate lookup
+
+Every risk factor has one row per MinHash band. The rows are written by a
+flush hook whenever a factor is added or its hazard_name/harm changes, so the
+index grows incrementally and never needs a full rebuild.
+"""
+from sqlalchemy import BigInteger, Column, Integer, delete, event, insert, inspect
+from sqlalchemy.orm import Session
+
+from ..core.minhash import text_band_keys
+from ..database import Base
+from .risk_analysis import RiskFactor
+
+
+class HazardLSHBucket(Base):
+    """One LSH band key of a risk factor"""
+    __tablename__ = "hazard_lsh_buckets"
+
+    # Bucket first: lookups are "which factors share one of these band keys".
+    # Keys are hashed per band, so equal keys of different bands do not collide.
+    bucket = Column(BigInteger, primary_key=True, autoincrement=False)
+    band = Column(Integer, primary_key=True, autoincrement=False)
+    risk_factor_id = Column(Integer, primary_key=True, autoincrement=False, index=True)
+
+    def __repr__(self):
+        return f"<HazardLSHBucket(band={self.band}, risk_factor_id={self.risk_factor_id})>"
+
+
+def bucket_rows(risk_factor_id: int, hazard_name: str, harm: str):
+    """Bucket rows of one risk factor"""
+    return [
+        {"band": band, "bucket": key, "risk_factor_id": risk_factor_id}
+        for band, key in enumerate(text_band_keys(hazard_name, harm))
+    ]
+
+
+def _text_changed(factor: RiskFactor) -> bool:
+    state = inspect(factor)
+    return state.attrs.hazard_name.history.has_changes() or state.attrs.harm.history.has_changes()
+
+
+@event.listens_for(Session, "after_flush")
+def _update_hazard_buckets(session: Session, flush_context):
+    stale_ids = set()
+    rows = []
+
+    for obj in session.deleted:
+        if isinstance(obj, RiskFactor) and obj.id:
+            stale_ids.add(obj.id)
+    for obj in session.dirty:
+        if isinstance(obj, RiskFactor) and _text_changed(obj):
+            stale_ids.add(obj.id)
+            rows.extend(bucket_rows(obj.id, obj.hazard_name, obj.harm))
+    for obj in session.new:
+        if isinstance(obj, RiskFactor):
+            rows.extend(bucket_rows(obj.id, obj.hazard_name, obj.harm))
+
+    if not stale_ids and not rows:
+        return
+
+    connection = session.connection()
+    table = HazardLSHBucket.__table__
+    if stale_ids:
+        connection.execute(delete(table).where(table.c.risk_factor_id.in_(stale_ids)))
+    if rows:
+        connection.execute(insert(table), rows)
@@ -60,6 +60,9 @@ class Project(Base):
     # Project ownership
     owner_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     
+    # Bumped on every change to the project, its members or its risk data (see revision_tracking)
+    revision = Column(Integer, default=0, server_default="0", nullable=False)
+    
     # Timestamps
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
@@ -79,8 +82,8 @@ class ProjectMember(Base):
     __tablename__ = "project_members"
 
     id = Column(Integer, primary_key=True, index=True)
-    project_id = Column(Integer, ForeignKey("projects.id"), nullable=False)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    project_id = Column(Integer, ForeignKey("projects.id"), nullable=False, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
     role = Column(Enum(ProjectRole), default=ProjectRole.DOCTOR, nullable=False)  # Project role
     
     # Timestamps
@@ -104,6 +107,12 @@ class ProjectVersion(Base):
     description = Column(Text, nullable=True)
     is_current = Column(Boolean, default=False)
     
+    # Snapshot of project fields, members and risk factors (see core/snapshots)
+    snapshot_hash = Column(String(64), nullable=True)  # Root SnapshotBlob
+    project_revision = Column(Integer, nullable=True)  # Project.revision at snapshot time
+    factor_count = Column(Integer, nullable=True)
+    created_by = Column(Integer, ForeignKey("users.id"), nullable=True)
+    
     # Timestamps
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
@@ -112,3 +121,7 @@ class ProjectVersion(Base):
 
     def __repr__(self):
         return f"<ProjectVersion(project_id={self.project_id}, version='{self.version}')>"
+
+    @property
+    def has_snapshot(self) -> bool:
+        return self.snapshot_hash is not None
@@ -0,0 +1,50 @@
+"""
+Report generation jobs
+"""
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Enum, LargeBinary, Index
+from sqlalchemy.orm import relationship, deferred
+from sqlalchemy.sql import func
+from enum import Enum as PyEnum
+
+from ..database import Base
+
+
+class ReportStatus(PyEnum):
+    """Report job lifecycle"""
+    PENDING = "pending"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+
+class ReportJob(Base):
+    """A risk management report rendered (or being rendered) for one project revision"""
+    __tablename__ = "report_jobs"
+    __table_args__ = (
+        # Cache lookup: is there a report of this project revision in this format?
+        Index("ix_report_jobs_project_revision", "project_id", "project_revision", "report_format"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    project_id = Column(Integer, ForeignKey("projects.id"), nullable=False)
+    project_revision = Column(Integer, nullable=False)  # Project.revision the report reflects
+    report_format = Column(String, nullable=False)  # "html" or "pdf"
+    status = Column(Enum(ReportStatus), default=ReportStatus.PENDING, nullable=False)
+    error = Column(Text, nullable=True)
+    requested_by = Column(Integer, ForeignKey("users.id"), nullable=False)
+
+    # Rendered document, loaded only for downloads
+    content = deferred(Column(LargeBinary, nullable=True))
+    content_size = Column(Integer, nullable=True)
+
+    # Timestamps
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+    # Relationships
+    project = relationship("Project")
+    requester = relationship("User")
+
+    def __repr__(self):
+        return f"<ReportJob(project_id={self.project_id}, revision={self.project_revision}, status='{self.status.value}')>"
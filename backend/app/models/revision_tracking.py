@@ -0,0 +1,105 @@
+"""
+Automatic revision counters for projects and risk analyses
+
+Every flush that touches a project, one of its members, a risk analysis or a
+risk factor bumps the `revision` column of the affected analysis and project.
+Caches of derived data (risk matrix, reports, diffs) use these counters as
+their keys, so they stay correct no matter which endpoint changed the data.
+"""
+from sqlalchemy import event, update
+from sqlalchemy.orm import Session
+
+from .project import Project, ProjectMember
+from .risk_analysis import RiskAnalysis, RiskFactor
+
+
+def _collect_targets(session: Session):
+    """Return (project_ids, analysis_ids) touched by the pending flush"""
+    project_ids = set()
+    analysis_ids = set()
+
+    for obj in list(session.new) + list(session.deleted):
+        if isinstance(obj, RiskFactor):
+            analysis_id = obj.analysis_id or (obj.analysis.id if obj.analysis is not None else None)
+            if analysis_id:
+                analysis_ids.add(analysis_id)
+        elif isinstance(obj, RiskAnalysis):
+            if obj.project_id:
+                project_ids.add(obj.project_id)
+        elif isinstance(obj, ProjectMember):
+            if obj.project_id:
+                project_ids.add(obj.project_id)
+
+    for obj in session.dirty:
+        if not session.is_modified(obj, include_collections=False):
+            continue
+        if isinstance(obj, RiskFactor):
+            analysis_ids.add(obj.analysis_id)
+        elif isinstance(obj, RiskAnalysis):
+            analysis_ids.add(obj.id)
+            project_ids.add(obj.project_id)
+        elif isinstance(obj, ProjectMember):
+            project_ids.add(obj.project_id)
+        elif isinstance(obj, Project):
+            project_ids.add(obj.id)
+
+    return project_ids, analysis_ids
+
+
+@event.listens_for(Session, "before_flush")
+def _remember_revision_targets(session: Session, flush_context, instances):
+    project_ids, analysis_ids = _collect_targets(session)
+    pending = session.info.setdefault("revision_targets", (set(), set()))
+    pending[0].update(project_ids)
+    pending[1].update(analysis_ids)
+
+
+@event.listens_for(Session, "after_flush")
+def _bump_revisions(session: Session, flush_context):
+    project_ids, analysis_ids = session.info.pop("revision_targets", (set(), set()))
+
+    # New factors and analyses only get their foreign keys during the flush
+    for obj in session.new:
+        if isinstance(obj, RiskFactor) and obj.analysis_id:
+            analysis_ids.add(obj.analysis_id)
+        elif isinstance(obj, RiskAnalysis) and obj.project_id:
+            project_ids.add(obj.project_id)
+    analysis_ids.discard(None)
+    project_ids.discard(None)
+
+    if not project_ids and not analysis_ids:
+        return
+
+    connection = session.connection()
+    if analysis_ids:
+        table = RiskAnalysis.__table__
+        connection.execute(
+            update(table).where(table.c.id.in_(analysis_ids)).values(
+                revision=table.c.revision + 1,
+                updated_at=table.c.updated_at  # keep the user-visible timestamp untouched
+            )
+        )
+        # Factor changes are project changes too
+        project_ids.update(
+            row[0] for row in connection.execute(
+                table.select().with_only_columns(table.c.project_id).where(table.c.id.in_(analysis_ids))
+            )
+        )
+    bump_project_revisions(connection, project_ids)
+
+
+def bump_project_revisions(connection, project_ids):
+    """
+    Increment the revision of projects
+
+    Called by the flush hook; bulk statements that bypass the ORM flush
+    (e.g. roster updates) call it themselves.
+    """
+    if project_ids:
+        table = Project.__table__
+        connection.execute(
+            update(table).where(table.c.id.in_(project_ids)).values(
+                revision=table.c.revision + 1,
+                updated_at=table.c.updated_at  # keep the user-visible timestamp untouched
+            )
+        )
@@ -39,7 +39,7 @@ class RiskAnalysis(Base):
     __tablename__ = "risk_analyses"
 
     id = Column(Integer, primary_key=True, index=True)
-    project_id = Column(Integer, ForeignKey("projects.id"), nullable=False)
+    project_id = Column(Integer, ForeignKey("projects.id"), nullable=False, index=True)
     
     # Device characteristics
     has_body_contact = Column(Boolean, default=False)
@@ -49,6 +49,9 @@ class RiskAnalysis(Base):
     analysis_date = Column(DateTime(timezone=True), server_default=func.now())
     analyst_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     
+    # Bumped on every change to the analysis or its risk factors (see revision_tracking)
+    revision = Column(Integer, default=0, server_default="0", nullable=False)
+    
     # Timestamps
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
@@ -62,12 +65,17 @@ class RiskAnalysis(Base):
         return f"<RiskAnalysis(project_id={self.project_id}, analysis_date='{self.analysis_date}')>"
 
 
+# The latest analysis of a project comes first in this order (newest, ties by id).
+# Every page, report, export and statistic of "the" analysis of a project uses it.
+LATEST_ANALYSIS_ORDER = (RiskAnalysis.created_at.desc(), RiskAnalysis.id.desc())
+
+
 class RiskFactor(Base):
     """Individual risk factors in the analysis"""
     __tablename__ = "risk_factors"
 
     id = Column(Integer, primary_key=True, index=True)
-    analysis_id = Column(Integer, ForeignKey("risk_analyses.id"), nullable=False)
+    analysis_id = Column(Integer, ForeignKey("risk_analyses.id"), nullable=False, index=True)
     
     # Risk identification
     lifecycle_stage = Column(Enum(LifecycleStage), nullable=False)
@@ -96,3 +104,11 @@ class RiskFactor(Base):
     def __repr__(self):
         return f"<RiskFactor(hazard_name='{self.hazard_name}', risk_score={self.risk_score})>"
 
+
+# Content of a risk factor (no id, analysis or timestamps), compared by risk
+# diffs and stored in version snapshots
+FACTOR_FIELDS = [
+    "lifecycle_stage", "hazard_name", "hazardous_situation", "sequence_of_events", "harm",
+    "hazard_category", "severity_score", "probability_score", "risk_score",
+    "control_measures", "residual_risk_score",
+]
@@ -0,0 +1,18 @@
+"""
+Content-addressed storage for project version snapshots
+"""
+from sqlalchemy import Column, String, Text
+
+from ..database import Base
+
+
+class SnapshotBlob(Base):
+    """Immutable JSON document stored once per distinct content (sha256 of the content)"""
+    __tablename__ = "snapshot_blobs"
+
+    content_hash = Column(String(64), primary_key=True)
+    kind = Column(String, nullable=False)  # "version", "members", "factor_chunk", "factor"
+    content = Column(Text, nullable=False)
+
+    def __repr__(self):
+        return f"<SnapshotBlob(kind='{self.kind}', hash='{self.content_hash[:12]}')>"
@@ -0,0 +1,65 @@
+"""
+Portfolio analytics router
+"""
+from typing import List, Optional
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+
+from ..database import get_db
+from ..models.user import User
+from ..schemas.analytics import PortfolioAnalyticsResponse, RiskOutliersResponse
+from ..routers.auth import get_current_active_user
+from ..routers.risk_analyses import get_latest_analysis_ids
+from ..core.analytics import RiskFactorArrays, load_factor_arrays, portfolio_summary, risk_outliers
+from ..core.cache import RevisionCache
+from ..core.config import settings
+from ..core.revisions import analysis_revision
+
+router = APIRouter()
+
+# Loaded factor arrays keyed by analysis ids, valid for one analysis revision.
+# Bounded by memory: one portfolio can hold millions of factors.
+factor_arrays_cache = RevisionCache(
+    max_entries=32, max_size=settings.analytics_cache_mb * 1024 * 1024, sizeof=lambda arrays: arrays.nbytes
+)
+
+
+def get_factor_arrays(db: Session, analysis_ids: List[int]) -> RiskFactorArrays:
+    """Load factor arrays for analyses, reusing them while the analyses are unchanged"""
+    cache_key = tuple(sorted(analysis_ids))
+    revision = analysis_revision(db, analysis_ids)
+    arrays = factor_arrays_cache.get(cache_key, revision)
+    if arrays is None:
+        arrays = load_factor_arrays(db, list(cache_key))
+        factor_arrays_cache.put(cache_key, revision, arrays)
+    return arrays
+
+
+def get_portfolio_arrays(db: Session, user: User, project_ids: Optional[List[int]]):
+    """Factor arrays of the latest analyses of accessible (optionally selected) projects"""
+    analysis_ids = get_latest_analysis_ids(db, user, project_ids)
+    arrays = get_factor_arrays(db, analysis_ids)
+    return arrays, sorted(set(arrays.project_ids.tolist()))
+
+
+@router.get("/summary", response_model=PortfolioAnalyticsResponse)
+async def get_portfolio_summary(
+    project_id: Optional[List[int]] = Query(None, description="Limit to these projects"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Get risk distribution, percentiles, per-category means and residual risk reduction"""
+    arrays, project_ids = get_portfolio_arrays(db, current_user, project_id)
+    return PortfolioAnalyticsResponse(project_ids=project_ids, **portfolio_summary(arrays))
+
+
+@router.get("/outliers", response_model=RiskOutliersResponse)
+async def get_portfolio_outliers(
+    project_id: Optional[List[int]] = Query(None, description="Limit to these projects"),
+    limit: int = Query(50, ge=1, le=1000),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Get risk factors whose risk score is unusually high for the portfolio"""
+    arrays, project_ids = get_portfolio_arrays(db, current_user, project_id)
+    return RiskOutliersResponse(project_ids=project_ids, **risk_outliers(arrays, limit=limit))
@@ -1,6 +1,7 @@
 """
 Authentication router for Azure Entra ID
 """
+import logging
 from datetime import datetime
 from fastapi import APIRouter, Depends, HTTPException, status, Request, Header
 from fastapi.security import HTTPBearer
@@ -18,6 +19,8 @@ from ..core.logging import log_user_login
 router = APIRouter()
 security = HTTPBearer()
 
+logger = logging.getLogger(__name__)
+
 
 def get_user_by_email(db: Session, email: str) -> User:
     """Get user by email"""
@@ -107,36 +110,30 @@ async def azure_login(
     """Login with Azure Entra ID token"""
     
     try:
-        print(f"🚀 Azure login endpoint called")
-        print(f"Token received: {login_data.azure_token[:50]}..." if len(login_data.azure_token) > 50 else login_data.azure_token)
+        logger.debug("Azure login requested", extra={"token_length": len(login_data.azure_token)})
         
         # Verify Azure token and extract user info
-        print("🔐 Verifying Azure token...")
         azure_user_info = await verify_azure_token_mock(login_data.azure_token)
-        print(f"✅ Azure user info verified: {azure_user_info}")
+        logger.debug("Azure token verified", extra={"object_id": azure_user_info["object_id"]})
         
         # Try to find existing user
-        print(f"👤 Looking for user with Azure ID: {azure_user_info['object_id']}")
         user = get_user_by_azure_id(db, azure_user_info["object_id"])
         
         if not user:
-            print(f"📧 Looking for user with email: {azure_user_info['email']}")
             user = get_user_by_email(db, azure_user_info["email"])
             if user:
-                print("🔄 Updating existing user with Azure object ID")
                 # Update existing user with Azure object ID
                 user.azure_object_id = azure_user_info["object_id"]
                 db.commit()
+                logger.info("Linked existing user to Azure account", extra={"user_id": user.id})
             else:
-                print("➕ Creating new user from Azure info")
                 # Create new user
                 user = create_user_from_azure(db, azure_user_info)
-        else:
-            print("✅ Found existing user by Azure ID")
+                logger.info("Created user from Azure account", extra={"user_id": user.id})
         
         # Check if user is active
         if not user.is_active:
-            print(f"❌ User {user.email} is not active")
+            logger.warning("Login of deactivated user rejected", extra={"user_id": user.id})
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Account is deactivated. Please contact administrator.",
@@ -144,31 +141,26 @@ async def azure_login(
             )
         
         # Update last login
-        print("⏰ Updating last login time")
         user.last_login = datetime.now()
         db.commit()
         
         # Log user login
-        print("📝 Logging user login")
         await log_user_login(db=db, user=user, request=request)
         
         # Create local token
-        print("🎫 Creating local token")
         access_token = create_local_token({
             "email": user.email,
             "object_id": user.azure_object_id
         })
         
-        print(f"✅ Login successful for user: {user.email}")
+        logger.info("Azure login succeeded", extra={"user_id": user.id})
         return {"access_token": access_token, "token_type": "bearer"}
         
     except HTTPException as e:
-        print(f"❌ HTTP Exception in azure_login: {e.detail}")
+        logger.warning("Azure login failed: %s", e.detail)
         raise e
     except Exception as e:
-        print(f"❌ Unexpected error in azure_login: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Unexpected error in Azure login")
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail=f"Authentication failed: {str(e)}",
@@ -0,0 +1,39 @@
+"""
+Batch router: many API operations in one request, session and transaction
+"""
+from fastapi import APIRouter, Depends, HTTPException, Request
+
+from ..models.user import User
+from ..schemas.batch import BatchRequest, BatchResponse
+from ..routers.auth import get_current_active_user
+from ..core.batch import execute_batch
+from ..core.config import settings
+
+router = APIRouter(prefix="/api/batch", tags=["batch"])
+
+
+@router.post("", response_model=BatchResponse)
+async def run_batch(
+    batch: BatchRequest,
+    request: Request,
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Run an ordered list of API operations (e.g. adding risk factors or project
+    members) with one authentication in one database transaction
+
+    Each operation is handled by the same route handler as a direct request,
+    including its permission checks, and gets its own status and body in the
+    results. With atomic=true (default) a failed operation rolls back the whole
+    batch and skips the rest; otherwise only the failed operation is undone.
+    """
+    if len(batch.operations) > settings.batch_max_operations:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Too many operations: at most {settings.batch_max_operations} per batch"
+        )
+
+    results, committed = await execute_batch(
+        request.app.state.batch_routers, batch.operations, current_user, request, atomic=batch.atomic
+    )
+    return BatchResponse(committed=committed, results=results)
@@ -4,16 +4,24 @@ ChangeLog router for API endpoints
 from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.orm import Session, joinedload
 from typing import List, Optional
+from datetime import datetime
+from types import SimpleNamespace
 import math
-import json
 
-from ..database import get_db
+from ..database import engine, get_db
 from ..models import User, Project, ChangeLog, ActionType, UserRole
+from ..models.changelog import ACTION_DISPLAY_NAMES
 from ..schemas.changelog import (
     ChangeLogResponse, ChangeLogListResponse, ProjectChangeLogResponse,
-    ProjectsChangeLogResponse, ChangeLogDetailResponse, CreateChangeLogRequest
+    ProjectsChangeLogResponse, ChangeLogDetailResponse, CreateChangeLogRequest,
+    ChangeLogSearchResponse
 )
 from ..routers.auth import get_current_user
+from ..core.config import settings
+from ..core.search import search_changelog_ids, changelog_highlights
+from ..core.changelog_fields import FIELD_NAME_RE, changed_field_criterion
+from ..core.changelog_archive import ArchiveFilter, find_archived_entry, search_archived_entries
+from ..core.serialization import ORJSONResponse
 
 
 router = APIRouter(prefix="/api/changelog", tags=["changelog"])
@@ -57,6 +65,95 @@ def check_project_changelog_access(current_user: User, project: Project, db: Ses
     )
 
 
+def _changelog_rows_query(db: Session):
+    """Changelog columns joined with user and project, in ChangeLogResponse shape"""
+    return db.query(
+        ChangeLog.id,
+        ChangeLog.action_type,
+        ChangeLog.action_description,
+        ChangeLog.user_id,
+        User.first_name,
+        User.last_name,
+        User.role,
+        ChangeLog.target_type,
+        ChangeLog.target_id,
+        ChangeLog.target_name,
+        ChangeLog.project_id,
+        Project.name.label("project_name"),
+        ChangeLog.old_values,
+        ChangeLog.new_values,
+        ChangeLog.extra_data,
+        ChangeLog.created_at
+    ).join(User, ChangeLog.user_id == User.id).outerjoin(
+        Project, ChangeLog.project_id == Project.id
+    )
+
+
+def _changelog_row_to_dict(row) -> dict:
+    item = dict(row._mapping)
+    first_name = item.pop("first_name")
+    last_name = item.pop("last_name")
+    item["action_display_name"] = ACTION_DISPLAY_NAMES.get(row.action_type, row.action_type.value)
+    item["user_name"] = f"{first_name} {last_name}"
+    item["user_role"] = item.pop("role").value
+    return item
+
+
+def _archived_entries_to_dicts(db: Session, entries: List[dict]) -> List[dict]:
+    """Archived entries in the _changelog_row_to_dict shape (users and projects still live in the database)"""
+    user_ids = {entry["user_id"] for entry in entries}
+    project_ids = {entry["project_id"] for entry in entries if entry["project_id"] is not None}
+    users = {
+        row.id: row for row in db.query(User.id, User.first_name, User.last_name, User.role).filter(User.id.in_(user_ids))
+    } if user_ids else {}
+    project_names = dict(
+        db.query(Project.id, Project.name).filter(Project.id.in_(project_ids)).all()
+    ) if project_ids else {}
+
+    items = []
+    for entry in entries:
+        user = users.get(entry["user_id"])
+        items.append({
+            "id": entry["id"],
+            "action_type": entry["action_type"],
+            "action_description": entry["action_description"],
+            "action_display_name": ACTION_DISPLAY_NAMES.get(entry["action_type"], entry["action_type"].value),
+            "user_id": entry["user_id"],
+            "user_name": f"{user.first_name} {user.last_name}" if user else "",
+            "user_role": user.role.value if user else "",
+            "target_type": entry["target_type"],
+            "target_id": entry["target_id"],
+            "target_name": entry["target_name"],
+            "project_id": entry["project_id"],
+            "project_name": project_names.get(entry["project_id"]),
+            "old_values": entry["old_values"],
+            "new_values": entry["new_values"],
+            "extra_data": entry["extra_data"],
+            "created_at": entry["created_at"],
+        })
+    return items
+
+
+def fast_changelog_rows(db: Session, project_id: int, offset: int, limit: int) -> List[dict]:
+    """Fetch a page of project changelog entries as plain dicts (mirrors ChangeLogResponse)"""
+    rows = _changelog_rows_query(db).filter(
+        ChangeLog.project_id == project_id
+    ).order_by(ChangeLog.created_at.desc()).offset(offset).limit(limit).all()
+    return [_changelog_row_to_dict(row) for row in rows]
+
+
+def get_changelog_admin_project_ids(db: Session, current_user: User) -> List[int]:
+    """Ids of projects whose changelog the user may view (owner or ProjectRole.ADMIN)"""
+    from ..models.project import ProjectMember, ProjectRole
+
+    owned = db.query(Project.id).filter(Project.owner_id == current_user.id)
+    administered = db.query(ProjectMember.project_id).filter(
+        ProjectMember.user_id == current_user.id,
+        ProjectMember.role == ProjectRole.ADMIN
+    )
+    return [row[0] for row in owned.union(administered).all()]
+
+
 @router.get("/projects", response_model=ProjectsChangeLogResponse)
 async def get_projects_changelog(
     db: Session = Depends(get_db),
@@ -200,6 +297,15 @@ async def get_project_changelog(
     offset = (page - 1) * size
     total_pages = math.ceil(total / size)
     
+    if settings.fast_json_responses:
+        return ORJSONResponse({
+            "changelogs": fast_changelog_rows(db, project_id, offset, size),
+            "total": total,
+            "page": page,
+            "size": size,
+            "total_pages": total_pages
+        })
+    
     # Get changes with pagination
     changes = db.query(ChangeLog).filter(
         ChangeLog.project_id == project_id
@@ -239,28 +345,117 @@ async def get_project_changelog(
     )
 
 
+@router.get("/search", response_model=ChangeLogSearchResponse)
+async def search_changelog(
+    q: Optional[str] = Query(None, max_length=200, description="Текст в описании, объекте или изменённых значениях"),
+    project_id: Optional[int] = Query(None),
+    user_id: Optional[int] = Query(None),
+    action_type: Optional[ActionType] = Query(None),
+    date_from: Optional[datetime] = Query(None),
+    date_to: Optional[datetime] = Query(None),
+    field: Optional[str] = Query(
+        None, pattern=FIELD_NAME_RE.pattern, description="Только изменения, затрагивающие это поле (например, severity_score)"
+    ),
+    cursor: Optional[int] = Query(None, description="next_cursor предыдущей страницы"),
+    limit: int = Query(50, ge=1, le=200),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Search the audit trail, newest entries first, with keyset pagination
+
+    Entries moved to the changelog archive are searched too; archive files are
+    only read when the page is not filled by newer entries from the table.
+    """
+    criteria = []
+    scope_project_ids = None
+    if project_id is not None:
+        project = db.query(Project).filter(Project.id == project_id).first()
+        if not project:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Project not found"
+            )
+        check_project_changelog_access(current_user, project, db)
+        scope_project_ids = [project_id]
+        criteria.append(ChangeLog.project_id == project_id)
+    elif current_user.role != UserRole.SYS_ADMIN:
+        # System-wide entries and other projects stay hidden
+        scope_project_ids = get_changelog_admin_project_ids(db, current_user)
+        if not scope_project_ids:
+            return ChangeLogSearchResponse(changelogs=[], limit=limit, next_cursor=None)
+        criteria.append(ChangeLog.project_id.in_(scope_project_ids))
+
+    if user_id is not None:
+        criteria.append(ChangeLog.user_id == user_id)
+    if action_type is not None:
+        criteria.append(ChangeLog.action_type == action_type)
+    if date_from is not None:
+        criteria.append(ChangeLog.created_at >= date_from)
+    if date_to is not None:
+        criteria.append(ChangeLog.created_at <= date_to)
+    if field is not None:
+        criteria.append(changed_field_criterion(engine.dialect.name, field))
+
+    ids = search_changelog_ids(db, q, criteria, before_id=cursor, limit=limit)
+    rows = _changelog_rows_query(db).filter(ChangeLog.id.in_(ids)).all() if ids else []
+    by_id = {row.id: _changelog_row_to_dict(row) for row in rows}
+    items = [by_id[changelog_id] for changelog_id in ids]
+
+    # Only archived entries newer than the last table hit can make it into a full page
+    archive_filter = ArchiveFilter(q, scope_project_ids, user_id, action_type, date_from, date_to, field)
+    archived = search_archived_entries(
+        db, archive_filter, before_id=cursor, after_id=ids[-1] if len(ids) == limit else None, limit=limit
+    )
+    if archived:
+        items = sorted(items + _archived_entries_to_dicts(db, archived), key=lambda item: item["id"], reverse=True)[:limit]
+
+    for item in items:
+        item["highlights"] = changelog_highlights(item, q)
+
+    content = {
+        "changelogs": items,
+        "limit": limit,
+        "next_cursor": items[-1]["id"] if len(items) == limit else None
+    }
+    if settings.fast_json_responses:
+        return ORJSONResponse(content)
+    return content
+
+
 @router.get("/{changelog_id}", response_model=ChangeLogDetailResponse)
 async def get_changelog_detail(
     changelog_id: int,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    """Get detailed information about a specific changelog entry"""
+    """Get detailed information about a specific changelog entry (live or archived)"""
     
-    # First get the changelog to check project access
     changelog = db.query(ChangeLog).options(
+        joinedload(ChangeLog.user),
         joinedload(ChangeLog.project)
     ).filter(ChangeLog.id == changelog_id).first()
     
-    if not changelog:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Changelog entry not found"
-        )
+    if changelog:
+        user = changelog.user
+        project = changelog.project
+    else:
+        # Entries past the retention period live in the changelog archive
+        archived = find_archived_entry(db, changelog_id)
+        if archived is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Changelog entry not found"
+            )
+        changelog = SimpleNamespace(**archived)
+        user = db.query(User).filter(User.id == changelog.user_id).first()
+        project = db.query(Project).filter(
+            Project.id == changelog.project_id
+        ).first() if changelog.project_id is not None else None
     
     # Check if user has access to this project's changelog
-    if changelog.project:
-        check_project_changelog_access(current_user, changelog.project, db)
+    if project:
+        check_project_changelog_access(current_user, project, db)
     # For system-wide logs that are not project-specific, only sys_admin can view
     elif current_user.role != UserRole.SYS_ADMIN:
         raise HTTPException(
@@ -268,59 +463,24 @@ async def get_changelog_detail(
             detail="Access denied. Only system administrators can view system-wide logs."
         )
     
-    # Get changelog with user and project data
-    changelog = db.query(ChangeLog).options(
-        joinedload(ChangeLog.user),
-        joinedload(ChangeLog.project)
-    ).filter(ChangeLog.id == changelog_id).first()
-    
-    if not changelog:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Changelog entry not found"
-        )
-    
-    # Parse JSON fields
-    old_values = None
-    new_values = None
-    extra_data = None
-    
-    try:
-        if changelog.old_values:
-            old_values = json.loads(changelog.old_values)
-    except json.JSONDecodeError:
-        pass
-    
-    try:
-        if changelog.new_values:
-            new_values = json.loads(changelog.new_values)
-    except json.JSONDecodeError:
-        pass
-    
-    try:
-        if changelog.extra_data:
-            extra_data = json.loads(changelog.extra_data)
-    except json.JSONDecodeError:
-        pass
-    
     return ChangeLogDetailResponse(
         id=changelog.id,
         action_type=changelog.action_type,
         action_description=changelog.action_description,
-        action_display_name=changelog.action_display_name,
+        action_display_name=ACTION_DISPLAY_NAMES.get(changelog.action_type, changelog.action_type.value),
         user_id=changelog.user_id,
-        user_name=f"{changelog.user.first_name} {changelog.user.last_name}",
-        user_email=changelog.user.email,
-        user_role=changelog.user.role.value,
-        user_position=changelog.user.position,
+        user_name=f"{user.first_name} {user.last_name}",
+        user_email=user.email,
+        user_role=user.role.value,
+        user_position=user.position,
         target_type=changelog.target_type,
         target_id=changelog.target_id,
         target_name=changelog.target_name,
         project_id=changelog.project_id,
-        project_name=changelog.project.name if changelog.project else None,
-        old_values=old_values,
-        new_values=new_values,
-        extra_data=extra_data,
+        project_name=project.name if project else None,
+        old_values=changelog.old_values,
+        new_values=changelog.new_values,
+        extra_data=changelog.extra_data,
         ip_address=changelog.ip_address,
         user_agent=changelog.user_agent,
         created_at=changelog.created_at
@@ -334,11 +494,6 @@ async def create_changelog_entry(
     current_user: User = Depends(get_current_user)
 ):
     """Create a new changelog entry (internal API)"""
-    # Convert dicts to JSON strings
-    old_values_json = json.dumps(request.old_values) if request.old_values else None
-    new_values_json = json.dumps(request.new_values) if request.new_values else None
-    extra_data_json = json.dumps(request.extra_data) if request.extra_data else None
-    
     # Create changelog entry
     changelog = ChangeLog(
         action_type=request.action_type,
@@ -348,9 +503,9 @@ async def create_changelog_entry(
         target_id=request.target_id,
         target_name=request.target_name,
         project_id=request.project_id,
-        old_values=old_values_json,
-        new_values=new_values_json,
-        extra_data=extra_data_json,
+        old_values=request.old_values or None,
+        new_values=request.new_values or None,
+        extra_data=request.extra_data or None,
         ip_address=request.ip_address,
         user_agent=request.user_agent
     )
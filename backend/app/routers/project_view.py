@@ -0,0 +1,208 @@
+"""
+Composite project page router
+
+GET /api/projects/{id}/view returns everything the project pages load on
+open (project, roster, latest analysis statistics and risk factors) in one
+response, assembled with a fixed number of queries regardless of the number
+of members or factors:
+
+1. project joined with its owner
+2. members joined with their users (also answers the access check)
+3. latest risk analysis
+4. its risk factors, or just their score statistics when factors are not requested
+"""
+from typing import List, Optional, Set
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import case, func
+from sqlalchemy.orm import Session
+
+from ..database import get_db
+from ..models.user import User, UserRole
+from ..models.project import Project, ProjectMember
+from ..models.risk_analysis import LATEST_ANALYSIS_ORDER, RiskAnalysis, RiskFactor
+from ..schemas.risk_analysis import RiskFactorResponse
+from ..schemas.project import (
+    ProjectBase, ProjectResponse, ProjectMemberResponse, ProjectViewAnalysis, ProjectViewResponse
+)
+from ..routers.auth import get_current_active_user
+from ..routers.risk_analyses import RISK_FACTOR_COLUMNS, calculate_analysis_statistics
+from ..core.config import settings
+from ..core.serialization import ORJSONResponse, rows_to_dicts
+
+router = APIRouter()
+
+VIEW_PARTS = ("members", "analysis", "factors")
+
+
+def parse_view_include(include: Optional[str]) -> Set[str]:
+    """Requested parts of the project view (all of them by default)"""
+    if include is None:
+        return set(VIEW_PARTS)
+    parts = {part.strip() for part in include.split(",") if part.strip()}
+    unknown = parts - set(VIEW_PARTS)
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown include part(s): {', '.join(sorted(unknown))}. Allowed: {', '.join(VIEW_PARTS)}"
+        )
+    return parts
+
+
+def build_project_response(project: Project) -> ProjectResponse:
+    """Project fields without related data (no lazy loads)"""
+    fields = {name: getattr(project, name) for name in ProjectBase.model_fields}
+    return ProjectResponse(
+        **fields,
+        id=project.id,
+        status=project.status,
+        progress_percentage=project.progress_percentage,
+        owner_id=project.owner_id,
+        created_at=project.created_at,
+        updated_at=project.updated_at
+    )
+
+
+def build_member_responses(
+    project: Project,
+    owner: User,
+    member_rows: List,
+    current_user: User
+) -> List[ProjectMemberResponse]:
+    """Roster in the GET /members format: owner first, then the sys admin (unless a member), then members"""
+    member_responses = [ProjectMemberResponse(
+        id=0,  # Special ID for owner
+        project_id=project.id,
+        user_id=owner.id,
+        role="admin",  # Project owner is always admin
+        joined_at=project.created_at,
+        user_email=owner.email,
+        user_first_name=owner.first_name,
+        user_last_name=owner.last_name
+    )]
+
+    if current_user.role == UserRole.SYS_ADMIN and current_user.id != project.owner_id:
+        if not any(member.user_id == current_user.id for member, _ in member_rows):
+            member_responses.append(ProjectMemberResponse(
+                id=-1,  # Special ID for sys admin
+                project_id=project.id,
+                user_id=current_user.id,
+                role="admin",  # Sys admin is always admin in any project
+                joined_at=project.created_at,
+                user_email=current_user.email,
+                user_first_name=current_user.first_name,
+                user_last_name=current_user.last_name
+            ))
+
+    for member, user in member_rows:
+        if member.user_id == project.owner_id:
+            continue
+        member_responses.append(ProjectMemberResponse(
+            id=member.id,
+            project_id=member.project_id,
+            user_id=member.user_id,
+            role=member.role.value,
+            joined_at=member.joined_at,
+            user_email=user.email,
+            user_first_name=user.first_name,
+            user_last_name=user.last_name
+        ))
+
+    return member_responses
+
+
+def factor_statistics(db: Session, analysis_id: int) -> dict:
+    """calculate_analysis_statistics computed in SQL, without loading the factors"""
+    row = db.query(
+        func.count(RiskFactor.id),
+        func.sum(case((RiskFactor.risk_score >= 15, 1), else_=0)),
+        func.sum(case(((RiskFactor.risk_score >= 10) & (RiskFactor.risk_score < 15), 1), else_=0)),
+        func.sum(case((RiskFactor.risk_score < 10, 1), else_=0)),
+    ).filter(RiskFactor.analysis_id == analysis_id).one()
+    return {
+        "total_risk_factors": row[0] or 0,
+        "high_risk_count": row[1] or 0,
+        "medium_risk_count": row[2] or 0,
+        "low_risk_count": row[3] or 0
+    }
+
+
+@router.get("/{project_id}/view", response_model=ProjectViewResponse)
+async def read_project_view(
+    project_id: int,
+    include: Optional[str] = Query(
+        None, description="Comma-separated parts to include: members, analysis, factors (default: all)"
+    ),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Get a project together with its roster, latest analysis statistics and risk factors"""
+    parts = parse_view_include(include)
+
+    row = db.query(Project, User).join(User, User.id == Project.owner_id).filter(
+        Project.id == project_id
+    ).first()
+    if row is None:
+        raise HTTPException(status_code=404, detail="Project not found")
+    db_project, owner = row
+
+    is_privileged = current_user.role == UserRole.SYS_ADMIN or db_project.owner_id == current_user.id
+
+    # The member rows answer the access check as well, so they are only skipped
+    # when neither needs them
+    member_rows = []
+    if "members" in parts or not is_privileged:
+        member_rows = db.query(ProjectMember, User).join(User, User.id == ProjectMember.user_id).filter(
+            ProjectMember.project_id == project_id
+        ).order_by(ProjectMember.id).all()
+
+    if not is_privileged and not any(member.user_id == current_user.id for member, _ in member_rows):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not enough permissions to access this project"
+        )
+
+    view = ProjectViewResponse(project=build_project_response(db_project))
+    if "members" in parts:
+        view.members = build_member_responses(db_project, owner, member_rows, current_user)
+
+    factor_rows = None
+    if "analysis" in parts or "factors" in parts:
+        analysis = db.query(RiskAnalysis).filter(
+            RiskAnalysis.project_id == project_id
+        ).order_by(*LATEST_ANALYSIS_ORDER).first()
+
+        if analysis is None:
+            factor_rows = []
+        elif "factors" in parts:
+            factor_rows = db.query(*RISK_FACTOR_COLUMNS).filter(
+                RiskFactor.analysis_id == analysis.id
+            ).order_by(RiskFactor.id).all()
+
+        if analysis is not None and "analysis" in parts:
+            statistics = (
+                calculate_analysis_statistics(factor_rows) if factor_rows is not None
+                else factor_statistics(db, analysis.id)
+            )
+            view.analysis = ProjectViewAnalysis(
+                id=analysis.id,
+                analyst_id=analysis.analyst_id,
+                analysis_date=analysis.analysis_date,
+                has_body_contact=analysis.has_body_contact,
+                contact_type=analysis.contact_type,
+                created_at=analysis.created_at,
+                updated_at=analysis.updated_at,
+                **statistics
+            )
+
+    if settings.fast_json_responses:
+        # Trusted DB rows: skip response model validation of the factor list
+        payload = view.model_dump()
+        if "factors" in parts:
+            payload["risk_factors"] = rows_to_dicts(factor_rows)
+        return ORJSONResponse(payload)
+
+    if "factors" in parts:
+        view = view.model_copy(update={
+            "risk_factors": [RiskFactorResponse.model_validate(factor) for factor in rows_to_dicts(factor_rows)]
+        })
+    return view
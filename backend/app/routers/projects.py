@@ -4,19 +4,26 @@ Projects router
 from typing import List
 from fastapi import APIRouter, Depends, HTTPException, status, Request
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy import func, insert
 
 from ..database import get_db
 from ..models.user import User, UserRole
 from ..models.project import Project, ProjectMember, ProjectVersion, ProjectStatus, ProjectRole
+from ..models.revision_tracking import bump_project_revisions
 from ..schemas.project import (
     ProjectCreate, ProjectUpdate, ProjectResponse, ProjectListResponse,
-    ProjectMemberCreate, ProjectMemberResponse, ProjectVersionCreate, ProjectVersionResponse
+    ProjectMemberCreate, ProjectMemberResponse, ProjectVersionCreate, ProjectVersionResponse,
+    ProjectVersionSnapshotResponse, ProjectMembersUpdate, ProjectMembersUpdateResponse
 )
 from ..routers.auth import get_current_active_user
+from ..core.config import settings
+from ..core.serialization import ORJSONResponse
+from ..core.snapshots import take_snapshot, load_snapshot
 from ..core.logging import (
     log_project_created, log_project_updated, log_project_deleted,
-    log_project_status_changed, log_project_member_added, log_project_member_removed
+    log_project_status_changed, log_project_member_added, log_project_member_removed,
+    log_project_members_synced, project_member_added_entry, project_member_removed_entry,
+    project_member_role_changed_entry
 )
 
 router = APIRouter()
@@ -125,6 +132,53 @@ def check_project_member_management_permission(project: Project, user: User, db:
     )
 
 
+def fast_project_list(db: Session, current_user: User, skip: int, limit: int) -> ORJSONResponse:
+    """Build project list from plain rows and encode it without model validation"""
+    member_counts = db.query(
+        ProjectMember.project_id.label("project_id"),
+        func.count(ProjectMember.id).label("member_count")
+    ).group_by(ProjectMember.project_id).subquery()
+    
+    query = db.query(
+        Project.id,
+        Project.name,
+        Project.status,
+        Project.progress_percentage,
+        Project.device_name,
+        Project.owner_id,
+        Project.created_at,
+        func.coalesce(member_counts.c.member_count, 0).label("member_count")
+    ).outerjoin(member_counts, member_counts.c.project_id == Project.id)
+    
+    if current_user.role == UserRole.SYS_ADMIN:
+        rows = query.offset(skip).limit(limit).all()
+        result = []
+        for row in rows:
+            item = dict(row._mapping)
+            item["user_role"] = "admin"
+            result.append(item)
+        return ORJSONResponse(result)
+    
+    # Resolve the current user's membership with the same query instead of per-project lookups
+    rows = query.add_columns(ProjectMember.role.label("member_role")).outerjoin(
+        ProjectMember,
+        (ProjectMember.project_id == Project.id) & (ProjectMember.user_id == current_user.id)
+    ).filter(
+        (Project.owner_id == current_user.id) | (ProjectMember.user_id == current_user.id)
+    ).distinct().offset(skip).limit(limit).all()
+    
+    result = []
+    for row in rows:
+        item = dict(row._mapping)
+        member_role = item.pop("member_role")
+        if item["owner_id"] == current_user.id:
+            item["user_role"] = "admin"
+        else:
+            item["user_role"] = member_role.value if member_role else None
+        result.append(item)
+    return ORJSONResponse(result)
+
+
 @router.get("/", response_model=List[ProjectListResponse])
 async def read_projects(
     skip: int = 0,
@@ -133,6 +187,9 @@ async def read_projects(
     current_user: User = Depends(get_current_active_user)
 ):
     """Get all projects accessible to the user"""
+    if settings.fast_json_responses:
+        return fast_project_list(db, current_user, skip, limit)
+    
     if current_user.role == UserRole.SYS_ADMIN:
         # System admin can see all projects
         projects = db.query(Project).offset(skip).limit(limit).all()
@@ -221,7 +278,9 @@ async def create_project(
         project_id=db_project.id,
         version="1.0",
         description="Initial version",
-        is_current=True
+        is_current=True,
+        created_by=current_user.id,
+        **take_snapshot(db, db_project)
     )
     db.add(initial_version)
     db.commit()
@@ -655,6 +714,118 @@ async def remove_project_member(
     return {"message": "Member removed successfully"}
 
 
+@router.put("/{project_id}/members", response_model=ProjectMembersUpdateResponse)
+async def update_project_members(
+    project_id: int,
+    roster: ProjectMembersUpdate,
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Replace the project members with the given roster
+
+    Members missing from the roster are removed, new ones added and changed
+    roles updated in one transaction, together with one batch of changelog
+    entries. The project owner is always an admin and is ignored if listed.
+    """
+    db_project = get_project(db, project_id=project_id)
+    if db_project is None:
+        raise HTTPException(status_code=404, detail="Project not found")
+    
+    check_project_member_management_permission(db_project, current_user, db)
+    
+    desired = {}
+    for entry in roster.members:
+        if entry.user_id == db_project.owner_id:
+            continue
+        if entry.user_id in desired:
+            raise HTTPException(status_code=400, detail=f"User {entry.user_id} is listed more than once")
+        desired[entry.user_id] = entry.role
+    
+    current = {
+        member.user_id: member
+        for member in db.query(ProjectMember).filter(ProjectMember.project_id == project_id)
+        if member.user_id != db_project.owner_id
+    }
+    user_ids = set(desired) | set(current)
+    users = {user.id: user for user in db.query(User).filter(User.id.in_(user_ids))} if user_ids else {}
+    missing = sorted(set(desired) - set(users))
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Users not found: {', '.join(map(str, missing))}")
+    
+    def member_name(user_id: int) -> str:
+        user = users.get(user_id)
+        return f"{user.first_name} {user.last_name}" if user else f"User {user_id}"
+    
+    entries = []
+    added, removed, role_changed = [], [], []
+    new_roles = {}
+    for user_id, member in current.items():
+        if user_id not in desired:
+            removed.append(user_id)
+            entries.append(project_member_removed_entry(
+                project_id, db_project.name, user_id, member_name(user_id),
+                users[user_id].email if user_id in users else "Unknown", member.role.value
+            ))
+        elif desired[user_id] is not None and desired[user_id] != member.role:
+            role_changed.append(user_id)
+            new_roles.setdefault(desired[user_id], []).append(member.id)
+            entries.append(project_member_role_changed_entry(
+                project_id, db_project.name, user_id, member_name(user_id), member.role.value, desired[user_id].value
+            ))
+    
+    new_members = []
+    for user_id, role in desired.items():
+        if user_id not in current:
+            role = role or ProjectRole.DOCTOR
+            added.append(user_id)
+            new_members.append({"project_id": project_id, "user_id": user_id, "role": role})
+            entries.append(project_member_added_entry(
+                project_id, db_project.name, user_id, member_name(user_id), users[user_id].email, role.value
+            ))
+    
+    # Set-based statements instead of per-member ORM flushes: one DELETE, one
+    # UPDATE per new role and one multi-row INSERT
+    if entries:
+        if removed:
+            db.query(ProjectMember).filter(
+                ProjectMember.project_id == project_id, ProjectMember.user_id.in_(removed)
+            ).delete(synchronize_session=False)
+        for role, member_ids in new_roles.items():
+            db.query(ProjectMember).filter(ProjectMember.id.in_(member_ids)).update(
+                {ProjectMember.role: role}, synchronize_session=False
+            )
+        if new_members:
+            db.execute(insert(ProjectMember.__table__), new_members)
+        # Bulk statements skip the ORM flush hooks that bump the revision
+        bump_project_revisions(db.connection(), [project_id])
+        # Membership changes and their changelog entries are committed together
+        await log_project_members_synced(db=db, user=current_user, entries=entries, request=request)
+    
+    members = db.query(ProjectMember, User).join(User, ProjectMember.user_id == User.id).filter(
+        ProjectMember.project_id == project_id
+    ).order_by(ProjectMember.id).all()
+    return ProjectMembersUpdateResponse(
+        members=[
+            ProjectMemberResponse(
+                id=member.id,
+                project_id=member.project_id,
+                user_id=member.user_id,
+                role=member.role.value,  # Convert enum to string
+                joined_at=member.joined_at,
+                user_email=user.email,
+                user_first_name=user.first_name,
+                user_last_name=user.last_name
+            )
+            for member, user in members
+        ],
+        added=sorted(added),
+        removed=sorted(removed),
+        role_changed=sorted(role_changed)
+    )
+
+
 @router.get("/{project_id}/members", response_model=List[ProjectMemberResponse])
 async def get_project_members(
     project_id: int,
@@ -761,10 +932,70 @@ async def create_project_version(
         project_id=project_id,
         version=version.version,
         description=version.description,
-        is_current=True
+        is_current=True,
+        created_by=current_user.id,
+        # Stores only factors and chunks that differ from earlier versions
+        **take_snapshot(db, db_project)
     )
     db.add(db_version)
     db.commit()
     db.refresh(db_version)
     
     return db_version
+
+
+@router.get("/{project_id}/versions", response_model=List[ProjectVersionResponse])
+async def get_project_versions(
+    project_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Get project versions, newest first"""
+    db_project = get_project(db, project_id=project_id)
+    if db_project is None:
+        raise HTTPException(status_code=404, detail="Project not found")
+    
+    if not check_project_access(db_project, current_user, db):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not enough permissions to access this project"
+        )
+    
+    return db.query(ProjectVersion).filter(
+        ProjectVersion.project_id == project_id
+    ).order_by(ProjectVersion.id.desc()).all()
+
+
+@router.get("/{project_id}/versions/{version_id}", response_model=ProjectVersionSnapshotResponse)
+async def get_project_version_snapshot(
+    project_id: int,
+    version_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Get a project version together with the project fields, members and risk factors it captured"""
+    db_project = get_project(db, project_id=project_id)
+    if db_project is None:
+        raise HTTPException(status_code=404, detail="Project not found")
+    
+    if not check_project_access(db_project, current_user, db):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not enough permissions to access this project"
+        )
+    
+    db_version = db.query(ProjectVersion).filter(
+        ProjectVersion.id == version_id,
+        ProjectVersion.project_id == project_id
+    ).first()
+    if db_version is None:
+        raise HTTPException(status_code=404, detail="Version not found")
+    
+    snapshot = load_snapshot(db, db_version)
+    if snapshot is None:
+        raise HTTPException(status_code=404, detail="This version was created without a snapshot")
+    
+    return ProjectVersionSnapshotResponse(
+        **ProjectVersionResponse.model_validate(db_version).model_dump(),
+        **snapshot
+    )
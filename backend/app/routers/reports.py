@@ -0,0 +1,126 @@
+"""
+Risk management report router
+"""
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from fastapi.responses import JSONResponse
+from sqlalchemy.orm import Session
+
+from ..database import get_db
+from ..models.user import User
+from ..models.report import ReportJob, ReportStatus
+from ..schemas.report import ReportJobResponse
+from ..routers.auth import get_current_active_user
+from ..routers.projects import get_project, check_project_access
+from ..routers.risk_analyses import attachment_headers
+from ..core.export import safe_filename
+from ..core.reports import (
+    CONTENT_TYPES, find_reusable_job, pdf_available, submit_report_job
+)
+
+router = APIRouter()
+
+
+def report_job_response(job: ReportJob) -> ReportJobResponse:
+    response = ReportJobResponse.model_validate(job)
+    if job.status == ReportStatus.COMPLETED:
+        response.download_url = f"/api/reports/{job.id}/download"
+    return response
+
+
+def get_accessible_job(db: Session, job_id: int, user: User) -> ReportJob:
+    """Get a report job whose project the user can access"""
+    job = db.query(ReportJob).filter(ReportJob.id == job_id).first()
+    if job is None:
+        raise HTTPException(status_code=404, detail="Report not found")
+    if not check_project_access(job.project, user, db):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not enough permissions to access this project"
+        )
+    return job
+
+
+@router.post("/project/{project_id}", response_model=ReportJobResponse)
+async def request_project_report(
+    project_id: int,
+    report_format: str = Query("html", alias="format", pattern="^(html|pdf)$"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Request a risk management report of a project
+
+    Returns the existing report (200) when the project has not changed since it
+    was generated, otherwise queues a job (202); poll GET /api/reports/{id}.
+    """
+    db_project = get_project(db, project_id=project_id)
+    if db_project is None:
+        raise HTTPException(status_code=404, detail="Project not found")
+
+    if not check_project_access(db_project, current_user, db):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not enough permissions to access this project"
+        )
+
+    if report_format == "pdf" and not pdf_available():
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="PDF reports are not available on this server (weasyprint is not installed)"
+        )
+
+    job = find_reusable_job(db, db_project, report_format)
+    if job is None:
+        job = ReportJob(
+            project_id=project_id,
+            project_revision=db_project.revision,
+            report_format=report_format,
+            status=ReportStatus.PENDING,
+            requested_by=current_user.id
+        )
+        db.add(job)
+        db.commit()
+        db.refresh(job)
+        if not submit_report_job(job.id):
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Report workers are unavailable, please retry"
+            )
+
+    response = report_job_response(job)
+    if job.status == ReportStatus.COMPLETED:
+        return response
+    return JSONResponse(status_code=status.HTTP_202_ACCEPTED, content=response.model_dump(mode="json"))
+
+
+@router.get("/{job_id}", response_model=ReportJobResponse)
+async def get_report_job(
+    job_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Get the status of a report job"""
+    return report_job_response(get_accessible_job(db, job_id, current_user))
+
+
+@router.get("/{job_id}/download")
+async def download_report(
+    job_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Download a generated report"""
+    job = get_accessible_job(db, job_id, current_user)
+    if job.status != ReportStatus.COMPLETED:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Report is not ready (status: {job.status.value})"
+        )
+
+    content = db.query(ReportJob.content).filter(ReportJob.id == job_id).scalar()
+    filename = f"{safe_filename(job.project.name)}_risk_report_r{job.project_revision}.{job.report_format}"
+    return Response(
+        content=content,
+        media_type=CONTENT_TYPES[job.report_format],
+        headers=attachment_headers(filename)
+    )
@@ -1,20 +1,35 @@
 """
 Risk analyses router
 """
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status, Request
+import re
+from typing import List, Optional
+from urllib.parse import quote
+from fastapi import APIRouter, Depends, HTTPException, Query, status, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 
 from ..database import get_db
 from ..models.user import User, UserRole
 from ..models.project import Project, ProjectMember, ProjectRole
-from ..models.risk_analysis import RiskAnalysis, RiskFactor
+from ..models.risk_analysis import LATEST_ANALYSIS_ORDER, RiskAnalysis, RiskFactor
 from ..schemas.risk_analysis import (
     RiskAnalysisCreate, RiskAnalysisUpdate, RiskAnalysisResponse, RiskAnalysisSummary,
-    RiskFactorCreate, RiskFactorUpdate, RiskFactorResponse
+    RiskFactorCreate, RiskFactorUpdate, RiskFactorResponse, RiskMatrixResponse,
+    RiskFactorSearchResponse, SimilarRiskFactorsResponse, RiskDiffResponse
 )
 from ..routers.auth import get_current_active_user
 from ..routers.projects import get_project, check_project_access
+from ..core.config import settings
+from ..core.serialization import ORJSONResponse, rows_to_dicts
+from ..core.cache import RevisionCache
+from ..core.revisions import analysis_revision
+from ..core.search import search_risk_factors
+from ..core.similarity import find_similar_factors
+from ..core.risk_diff import diff_analyses
+from ..core.export import (
+    CONTENT_TYPES, export_chunks, iter_factor_rows, safe_filename, session_chunks, zip_chunks
+)
 from ..core.logging import log_risk_created, log_risk_updated, log_risk_deleted
 
 router = APIRouter()
@@ -45,6 +60,121 @@ def calculate_analysis_statistics(risk_factors: List[RiskFactor]) -> dict:
     }
 
 
+# Columns returned by the fast risk factor list path (mirrors RiskFactorResponse)
+RISK_FACTOR_COLUMNS = (
+    RiskFactor.id,
+    RiskFactor.analysis_id,
+    RiskFactor.lifecycle_stage,
+    RiskFactor.hazard_name,
+    RiskFactor.hazardous_situation,
+    RiskFactor.sequence_of_events,
+    RiskFactor.harm,
+    RiskFactor.hazard_category,
+    RiskFactor.severity_score,
+    RiskFactor.probability_score,
+    RiskFactor.risk_score,
+    RiskFactor.control_measures,
+    RiskFactor.residual_risk_score,
+    RiskFactor.created_at,
+    RiskFactor.updated_at,
+)
+
+# Scores are on a 1-5 scale, so the risk matrix is 5x5
+MATRIX_SIZE = 5
+
+# Columns the risk matrix can be split by
+MATRIX_GROUP_COLUMNS = {
+    "hazard_category": RiskFactor.hazard_category,
+    "lifecycle_stage": RiskFactor.lifecycle_stage,
+}
+
+# Risk matrices keyed by (analysis ids, group_by), valid for one analysis revision
+risk_matrix_cache = RevisionCache()
+
+# Diffs keyed by (old analysis id, new analysis id), valid for the revision of both
+risk_diff_cache = RevisionCache()
+
+
+def empty_risk_matrix() -> List[List[int]]:
+    """Create a zero-filled severity x probability matrix"""
+    return [[0] * MATRIX_SIZE for _ in range(MATRIX_SIZE)]
+
+
+def build_risk_matrix(db: Session, analysis_ids: List[int], group_by: Optional[str] = None) -> dict:
+    """Count factors per severity/probability cell with a single GROUP BY query"""
+    columns = [RiskFactor.severity_score, RiskFactor.probability_score]
+    if group_by:
+        columns.append(MATRIX_GROUP_COLUMNS[group_by])
+    
+    rows = db.query(*columns, func.count(RiskFactor.id)).filter(
+        RiskFactor.analysis_id.in_(analysis_ids)
+    ).group_by(*columns).all() if analysis_ids else []
+    
+    matrix = empty_risk_matrix()
+    groups = {}
+    total = 0
+    for row in rows:
+        severity, probability, count = row[0], row[1], row[-1]
+        total += count
+        # Scores outside the 1-5 scale are counted in the total but have no cell
+        if not (1 <= severity <= MATRIX_SIZE and 1 <= probability <= MATRIX_SIZE):
+            continue
+        matrix[severity - 1][probability - 1] += count
+        if group_by:
+            group_key = row[2].value if row[2] is not None else "unknown"
+            group_matrix = groups.setdefault(group_key, empty_risk_matrix())
+            group_matrix[severity - 1][probability - 1] += count
+    
+    return {
+        "analysis_ids": analysis_ids,
+        "total_risk_factors": total,
+        "matrix": matrix,
+        "group_by": group_by,
+        "groups": groups
+    }
+
+
+def get_cached_risk_matrix(db: Session, analysis_ids: List[int], group_by: Optional[str]) -> dict:
+    """Return the risk matrix for analyses, recomputing only when their revision changed"""
+    if group_by is not None and group_by not in MATRIX_GROUP_COLUMNS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"group_by must be one of: {', '.join(MATRIX_GROUP_COLUMNS)}"
+        )
+    
+    analysis_ids = sorted(analysis_ids)
+    cache_key = (tuple(analysis_ids), group_by)
+    revision = analysis_revision(db, analysis_ids)
+    result = risk_matrix_cache.get(cache_key, revision)
+    if result is None:
+        result = build_risk_matrix(db, analysis_ids, group_by)
+        risk_matrix_cache.put(cache_key, revision, result)
+    return result
+
+
+def get_latest_analysis_ids(db: Session, user: User, project_ids: Optional[List[int]] = None) -> List[int]:
+    """Get the latest analysis id (LATEST_ANALYSIS_ORDER) of every project the user can access"""
+    position = func.row_number().over(
+        partition_by=RiskAnalysis.project_id, order_by=LATEST_ANALYSIS_ORDER
+    ).label("position")
+    analyses = db.query(RiskAnalysis.id, position).join(Project)
+    if user.role != UserRole.SYS_ADMIN:
+        analyses = analyses.filter(
+            (Project.owner_id == user.id) |
+            (Project.members.any(user_id=user.id))
+        )
+    if project_ids:
+        analyses = analyses.filter(Project.id.in_(project_ids))
+    ranked = analyses.subquery()
+    return [row[0] for row in db.query(ranked.c.id).filter(ranked.c.position == 1).all()]
+
+
+def attachment_headers(filename: str) -> dict:
+    """Content-Disposition for a download; non-ASCII names go into filename*"""
+    ascii_name = re.sub(r"[^A-Za-z0-9._-]+", "_", filename).strip("_")
+    return {"Content-Disposition": f"attachment; filename=\"{ascii_name}\"; filename*=UTF-8''{quote(filename)}"}
+
+
 def check_risk_edit_permission(project: Project, user: User, db: Session):
     """Check if user can edit risks in this project"""
     # System administrator can edit any project risks
@@ -90,7 +220,7 @@ async def get_project_risk_analysis(
     # Get the latest risk analysis for this project
     analysis = db.query(RiskAnalysis).filter(
         RiskAnalysis.project_id == project_id
-    ).order_by(RiskAnalysis.created_at.desc()).first()
+    ).order_by(*LATEST_ANALYSIS_ORDER).first()
     
     if not analysis:
         raise HTTPException(status_code=404, detail="Risk analysis not found")
@@ -424,14 +554,197 @@ async def get_project_risk_factors(
     # Get the latest risk analysis for this project
     analysis = db.query(RiskAnalysis).filter(
         RiskAnalysis.project_id == project_id
-    ).order_by(RiskAnalysis.created_at.desc()).first()
+    ).order_by(*LATEST_ANALYSIS_ORDER).first()
     
     if not analysis:
         return []
     
+    if settings.fast_json_responses:
+        # Trusted DB rows: skip ORM hydration and response model validation
+        rows = db.query(*RISK_FACTOR_COLUMNS).filter(
+            RiskFactor.analysis_id == analysis.id
+        ).order_by(RiskFactor.id).all()
+        return ORJSONResponse(rows_to_dicts(rows))
+    
     return analysis.risk_factors
 
 
+@router.get("/project/{project_id}/export")
+async def export_project_risk_factors(
+    project_id: int,
+    export_format: str = Query("csv", alias="format", pattern="^(csv|xlsx)$"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Download the risk table of a project's latest analysis as CSV or XLSX (streamed)"""
+    db_project = get_project(db, project_id=project_id)
+    if db_project is None:
+        raise HTTPException(status_code=404, detail="Project not found")
+
+    if not check_project_access(db_project, current_user, db):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not enough permissions to access this project"
+        )
+
+    analysis_ids = get_latest_analysis_ids(db, current_user, [project_id])
+    if not analysis_ids:
+        raise HTTPException(status_code=404, detail="Risk analysis not found")
+
+    analysis_id = analysis_ids[0]
+    project_name = db_project.name
+    return StreamingResponse(
+        session_chunks(lambda export_db: export_chunks(
+            iter_factor_rows(export_db, analysis_id), export_format, project_name
+        )),
+        media_type=CONTENT_TYPES[export_format],
+        headers=attachment_headers(f"{safe_filename(project_name)}_risks.{export_format}")
+    )
+
+
+@router.get("/export")
+async def export_risk_factors_bulk(
+    project_id: Optional[List[int]] = Query(None, description="Projects to export (default: all accessible)"),
+    export_format: str = Query("csv", alias="format", pattern="^(csv|xlsx)$"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Download the risk tables of many projects as one zip, built while it is streamed"""
+    analysis_ids = get_latest_analysis_ids(db, current_user, project_id)
+    if not analysis_ids:
+        raise HTTPException(status_code=404, detail="No risk analyses to export")
+
+    analyses = db.query(RiskAnalysis.id, Project.id, Project.name).join(
+        Project, RiskAnalysis.project_id == Project.id
+    ).filter(RiskAnalysis.id.in_(analysis_ids)).order_by(Project.id).all()
+
+    def archive(export_db: Session):
+        entries = (
+            (
+                f"{analysis_project_id}_{safe_filename(project_name)}.{export_format}",
+                lambda analysis_id=analysis_id, project_name=project_name: export_chunks(
+                    iter_factor_rows(export_db, analysis_id), export_format, project_name
+                )
+            )
+            for analysis_id, analysis_project_id, project_name in analyses
+        )
+        return zip_chunks(entries)
+
+    return StreamingResponse(
+        session_chunks(archive),
+        media_type=CONTENT_TYPES["zip"],
+        headers=attachment_headers(f"risks_{export_format}.zip")
+    )
+
+
+@router.get("/project/{project_id}/matrix", response_model=RiskMatrixResponse)
+async def get_project_risk_matrix(
+    project_id: int,
+    group_by: Optional[str] = None,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Get severity x probability counts for the latest analysis of a project"""
+    db_project = get_project(db, project_id=project_id)
+    if db_project is None:
+        raise HTTPException(status_code=404, detail="Project not found")
+    
+    if not check_project_access(db_project, current_user, db):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not enough permissions to access this project"
+        )
+    
+    # Get the latest risk analysis for this project
+    analysis = db.query(RiskAnalysis.id).filter(
+        RiskAnalysis.project_id == project_id
+    ).order_by(*LATEST_ANALYSIS_ORDER).first()
+    
+    analysis_ids = [analysis.id] if analysis else []
+    result = get_cached_risk_matrix(db, analysis_ids, group_by)
+    return RiskMatrixResponse(project_id=project_id, **result)
+
+
+@router.get("/matrix", response_model=RiskMatrixResponse)
+async def get_portfolio_risk_matrix(
+    group_by: Optional[str] = None,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Get severity x probability counts aggregated over all accessible projects"""
+    analysis_ids = get_latest_analysis_ids(db, current_user)
+    result = get_cached_risk_matrix(db, analysis_ids, group_by)
+    return RiskMatrixResponse(project_id=None, **result)
+
+
+@router.get("/search", response_model=RiskFactorSearchResponse)
+async def search_project_risk_factors(
+    q: str = Query(..., min_length=1, max_length=200, description="Search text (Russian or English)"),
+    project_id: Optional[List[int]] = Query(None, description="Limit to these projects"),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Full-text search over risk factors of accessible projects, best matches first"""
+    analysis_ids = get_latest_analysis_ids(db, current_user, project_id)
+    results = search_risk_factors(db, q, analysis_ids, limit=limit, offset=offset)
+    return RiskFactorSearchResponse(query=q, results=results, limit=limit, offset=offset)
+
+
+@router.get("/similar", response_model=SimilarRiskFactorsResponse)
+async def get_similar_risk_factors(
+    hazard_name: str = Query(..., min_length=1, max_length=500),
+    harm: Optional[str] = Query(None, max_length=2000),
+    k: int = Query(10, ge=1, le=50),
+    min_similarity: float = Query(0.2, ge=0.0, le=1.0),
+    exclude_factor_id: Optional[int] = Query(None, description="Factor being edited"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Suggest existing near-duplicate risk factors from accessible projects while a new one is typed"""
+    project_filter = None
+    if current_user.role != UserRole.SYS_ADMIN:
+        project_filter = (Project.owner_id == current_user.id) | Project.members.any(user_id=current_user.id)
+    results = find_similar_factors(
+        db, hazard_name, harm, project_filter=project_filter, k=k,
+        min_similarity=min_similarity, exclude_factor_id=exclude_factor_id
+    )
+    return SimilarRiskFactorsResponse(results=results)
+
+
+@router.get("/{analysis_id}/diff/{other_analysis_id}", response_model=RiskDiffResponse)
+async def diff_risk_analyses(
+    analysis_id: int,
+    other_analysis_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Compare two risk analyses (analysis_id -> other_analysis_id)
+
+    Factors are matched by normalized hazard name and lifecycle stage and
+    reported as added, removed or modified with score deltas.
+    """
+    for checked_id in {analysis_id, other_analysis_id}:
+        db_analysis = get_risk_analysis(db, analysis_id=checked_id)
+        if db_analysis is None:
+            raise HTTPException(status_code=404, detail=f"Risk analysis {checked_id} not found")
+        if not check_project_access(db_analysis.project, current_user, db):
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Not enough permissions to access this project"
+            )
+
+    cache_key = (analysis_id, other_analysis_id)
+    revision = analysis_revision(db, [analysis_id, other_analysis_id])
+    result = risk_diff_cache.get(cache_key, revision)
+    if result is None:
+        result = RiskDiffResponse(**diff_analyses(db, analysis_id, other_analysis_id))
+        risk_diff_cache.put(cache_key, revision, result)
+    return result
+
+
 @router.get("/summary", response_model=List[RiskAnalysisSummary])
 async def get_risk_analysis_summary(
     db: Session = Depends(get_db),
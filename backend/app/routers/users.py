@@ -1,3 +1,5 @@
+import logging
+
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from typing import List
@@ -12,6 +14,8 @@ router = APIRouter(
     tags=["users"]
 )
 
+logger = logging.getLogger(__name__)
+
 
 @router.get("/{user_id}/projects", response_model=List[ProjectListResponse])
 async def get_user_projects(
@@ -65,7 +69,10 @@ async def get_user_projects(
         project_responses.append(ProjectListResponse(
             id=project.id,
             name=project.name,
+            status=project.status,
+            progress_percentage=project.progress_percentage,
             device_name=project.device_name,
+            owner_id=project.owner_id,
             created_at=project.created_at,
             is_owner=is_owner,
             owner_email=project.owner.email if project.owner else None,
@@ -129,8 +136,7 @@ async def get_users_with_projects(
 ):
     """Get users with their project participations for Role Management"""
     
-    print("🔥 DEBUG: get_users_with_projects called!")
-    print(f"👤 Current user: {current_user.email if current_user else 'None'}")
+    logger.debug("Users with projects requested", extra={"user_id": current_user.id})
     
     try:
         if current_user.role == UserRole.SYS_ADMIN:
@@ -285,9 +291,7 @@ async def get_users_with_projects(
             return result
         
     except Exception as e:
-        import traceback
-        print(f"Error in get_users_with_projects: {e}")
-        print(traceback.format_exc())
+        logger.exception("Error in get_users_with_projects")
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
 
@@ -298,9 +302,7 @@ async def get_user_statistics(
 ):
     """Get statistics for current user"""
     
-    print("🔥 DEBUG: get_user_statistics called!")
-    print(f"👤 Current user: {current_user.email if current_user else 'None'}")
-    print(f"🎭 User role: {current_user.role.value if current_user else 'None'}")
+    logger.debug("User statistics requested", extra={"user_id": current_user.id, "role": current_user.role.value})
     
     if current_user.role == UserRole.SYS_ADMIN:
         # Sys admin sees global statistics
@@ -348,6 +350,30 @@ async def get_user_statistics(
         }
 
 
+@router.get("/me", response_model=UserResponse)
+async def get_me(current_user: User = Depends(get_current_active_user)):
+    """Get current user info"""
+    return current_user
+
+
+@router.put("/me", response_model=UserResponse)
+async def update_current_user(
+    user_update: UserUpdate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Update current user"""
+    # Update fields (excluding role - users can't change their own role)
+    for field, value in user_update.dict(exclude_unset=True).items():
+        if field == "role":
+            continue  # Users can't change their own role
+        setattr(current_user, field, value)
+    
+    db.commit()
+    db.refresh(current_user)
+    return current_user
+
+
 @router.get("/{user_id}", response_model=UserResponse)
 async def get_user(
     user_id: int,
@@ -418,27 +444,3 @@ async def update_user(
     db.commit()
     db.refresh(db_user)
     return db_user
-
-
-@router.get("/me", response_model=UserResponse)
-async def get_me(current_user: User = Depends(get_current_active_user)):
-    """Get current user info"""
-    return current_user
-
-
-@router.put("/me", response_model=UserResponse)
-async def update_current_user(
-    user_update: UserUpdate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
-):
-    """Update current user"""
-    # Update fields (excluding role - users can't change their own role)
-    for field, value in user_update.dict(exclude_unset=True).items():
-        if field == "role":
-            continue  # Users can't change their own role
-        setattr(current_user, field, value)
-    
-    db.commit()
-    db.refresh(current_user)
-    return current_user
@@ -1,6 +1,7 @@
 # Schemas package
 from .changelog import (
     ChangeLogResponse, ChangeLogListResponse, ProjectChangeLogResponse,
-    ProjectsChangeLogResponse, ChangeLogDetailResponse, CreateChangeLogRequest
+    ProjectsChangeLogResponse, ChangeLogDetailResponse, CreateChangeLogRequest,
+    ChangeLogSearchResult, ChangeLogSearchResponse
 )
 
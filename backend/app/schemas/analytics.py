@@ -0,0 +1,55 @@
+"""
+Portfolio analytics schemas for API responses
+"""
+from pydantic import BaseModel
+from typing import Optional, List, Dict
+
+
+class RiskDistribution(BaseModel):
+    """Risk level counts and score histograms (list index = score)"""
+    total_risk_factors: int
+    high_risk_count: int
+    medium_risk_count: int
+    low_risk_count: int
+    severity_histogram: List[int]
+    probability_histogram: List[int]
+    risk_score_histogram: List[int]
+
+
+class GroupStatistics(BaseModel):
+    """Factor count and mean risk score of one category or lifecycle stage"""
+    count: int
+    mean_risk_score: float
+
+
+class ResidualReduction(BaseModel):
+    """Effect of control measures on risk"""
+    assessed_count: int
+    mean_reduction_ratio: Optional[float] = None
+    median_reduction_ratio: Optional[float] = None
+    increased_count: int = 0
+
+
+class RiskOutlier(BaseModel):
+    """Risk factor above the upper fence"""
+    risk_factor_id: int
+    project_id: int
+    risk_score: int
+
+
+class RiskOutliersResponse(BaseModel):
+    """Schema for risk outliers response"""
+    project_ids: List[int]
+    upper_fence: Optional[float] = None
+    outlier_count: int
+    outliers: List[RiskOutlier]
+
+
+class PortfolioAnalyticsResponse(BaseModel):
+    """Schema for portfolio analytics summary"""
+    project_ids: List[int]
+    distribution: RiskDistribution
+    percentiles: Dict[str, float]
+    categories: Dict[str, GroupStatistics]
+    lifecycle_stages: Dict[str, GroupStatistics]
+    residual_reduction: ResidualReduction
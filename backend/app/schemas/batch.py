@@ -0,0 +1,33 @@
+"""
+Batch request schemas
+"""
+from pydantic import BaseModel, Field
+from typing import Any, Dict, List, Optional
+
+
+class BatchOperation(BaseModel):
+    """One sub-operation of a batch request, as it would be sent on its own"""
+    method: str = Field(..., pattern="^(?i)(GET|POST|PUT|PATCH|DELETE)$")
+    path: str  # e.g. "/api/risk-analyses/3/factors", may include a query string
+    query: Optional[Dict[str, Any]] = None  # query parameters (lists for repeated ones)
+    body: Optional[Any] = None  # JSON request body
+    id: Optional[str] = None  # client reference, echoed in the result
+
+
+class BatchRequest(BaseModel):
+    """Schema for a batch request"""
+    operations: List[BatchOperation] = Field(..., min_length=1)
+    atomic: bool = True  # roll back all operations if one fails
+
+
+class BatchOperationResult(BaseModel):
+    """Result of one sub-operation: HTTP status and JSON body of the handler"""
+    id: Optional[str] = None
+    status: int
+    body: Any = None
+
+
+class BatchResponse(BaseModel):
+    """Schema for batch response"""
+    committed: bool
+    results: List[BatchOperationResult]
@@ -31,9 +31,9 @@ class ChangeLogResponse(BaseModel):
     project_name: Optional[str] = None
     
     # Change details
-    old_values: Optional[str] = None
-    new_values: Optional[str] = None
-    extra_data: Optional[str] = None
+    old_values: Optional[Dict[str, Any]] = None
+    new_values: Optional[Dict[str, Any]] = None
+    extra_data: Optional[Dict[str, Any]] = None
     
     # Timestamp
     created_at: datetime
@@ -51,6 +51,18 @@ class ChangeLogListResponse(BaseModel):
     total_pages: int
 
 
+class ChangeLogSearchResult(ChangeLogResponse):
+    """Changelog entry found by search, with matched words wrapped in <mark> (text HTML-escaped)"""
+    highlights: Dict[str, str] = {}
+
+
+class ChangeLogSearchResponse(BaseModel):
+    """Schema for changelog search response with keyset pagination"""
+    changelogs: List[ChangeLogSearchResult]
+    limit: int
+    next_cursor: Optional[int] = Field(None, description="Передайте как cursor для следующей страницы")
+
+
 class ProjectChangeLogResponse(BaseModel):
     """Schema for project changelog response"""
     project_id: int
@@ -2,9 +2,11 @@
 Project schemas for API requests and responses
 """
 from pydantic import BaseModel
-from typing import Optional, List
+from typing import Optional, List, Dict, Any
 from datetime import datetime
 from ..models.project import ProjectStatus, ProjectRole
+from ..models.risk_analysis import ContactType
+from .risk_analysis import RiskFactorResponse
 
 
 class ProjectBase(BaseModel):
@@ -84,6 +86,25 @@ class ProjectMemberResponse(BaseModel):
         from_attributes = True
 
 
+class ProjectRosterMember(BaseModel):
+    """One member of a desired project roster"""
+    user_id: int
+    role: Optional[ProjectRole] = None  # None keeps the current role (doctor for new members)
+
+
+class ProjectMembersUpdate(BaseModel):
+    """Schema for replacing the project members with a desired roster"""
+    members: List[ProjectRosterMember]
+
+
+class ProjectMembersUpdateResponse(BaseModel):
+    """Schema for the result of a roster update"""
+    members: List[ProjectMemberResponse]
+    added: List[int] = []  # user ids
+    removed: List[int] = []
+    role_changed: List[int] = []
+
+
 class ProjectVersionBase(BaseModel):
     """Base project version schema"""
     version: str
@@ -101,11 +122,24 @@ class ProjectVersionResponse(ProjectVersionBase):
     project_id: int
     is_current: bool
     created_at: datetime
+    
+    # Snapshot metadata (absent for versions created before snapshots existed)
+    project_revision: Optional[int] = None
+    factor_count: Optional[int] = None
+    has_snapshot: bool = False
 
     class Config:
         from_attributes = True
 
 
+class ProjectVersionSnapshotResponse(ProjectVersionResponse):
+    """Schema for a project version with its stored project state"""
+    project: Dict[str, Any]
+    analysis: Optional[Dict[str, Any]] = None
+    members: List[Dict[str, Any]] = []
+    risk_factors: List[Dict[str, Any]] = []
+
+
 class ProjectResponse(ProjectBase):
     """Schema for project response"""
     id: int
@@ -137,3 +171,27 @@ class ProjectListResponse(BaseModel):
 
     class Config:
         from_attributes = True
+
+
+class ProjectViewAnalysis(BaseModel):
+    """Latest risk analysis of a project with its statistics, without the factor list"""
+    id: int
+    analyst_id: int
+    analysis_date: datetime
+    has_body_contact: bool
+    contact_type: ContactType
+    created_at: datetime
+    updated_at: Optional[datetime] = None
+
+    total_risk_factors: int = 0
+    high_risk_count: int = 0  # risk_score >= 15
+    medium_risk_count: int = 0  # 10 <= risk_score < 15
+    low_risk_count: int = 0  # risk_score < 10
+
+
+class ProjectViewResponse(BaseModel):
+    """Schema for the composite project page payload; parts not requested via include= are null"""
+    project: ProjectResponse  # members are listed once, in `members`
+    members: Optional[List[ProjectMemberResponse]] = None
+    analysis: Optional[ProjectViewAnalysis] = None
+    risk_factors: Optional[List[RiskFactorResponse]] = None
@@ -0,0 +1,27 @@
+"""
+Report job schemas for API
+"""
+from pydantic import BaseModel
+from typing import Optional
+from datetime import datetime
+
+from ..models.report import ReportStatus
+
+
+class ReportJobResponse(BaseModel):
+    """Schema for report job status"""
+    id: int
+    project_id: int
+    project_revision: int
+    report_format: str
+    status: ReportStatus
+    error: Optional[str] = None
+    content_size: Optional[int] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    # Set once the report is ready
+    download_url: Optional[str] = None
+
+    class Config:
+        from_attributes = True
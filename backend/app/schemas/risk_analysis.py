@@ -2,7 +2,7 @@
 Risk analysis schemas for API requests and responses
 """
 from pydantic import BaseModel
-from typing import Optional, List
+from typing import Any, Optional, List, Dict
 from datetime import datetime
 from ..models.risk_analysis import LifecycleStage, HazardCategory, ContactType
 
@@ -105,3 +105,94 @@ class RiskAnalysisSummary(BaseModel):
     class Config:
         from_attributes = True
 
+
+class RiskMatrixResponse(BaseModel):
+    """Schema for severity x probability risk matrix (heatmap)"""
+    project_id: Optional[int] = None  # None for the portfolio-wide matrix
+    analysis_ids: List[int] = []
+    total_risk_factors: int = 0
+    # matrix[severity - 1][probability - 1] = number of factors in the cell
+    matrix: List[List[int]]
+    group_by: Optional[str] = None
+    groups: Dict[str, List[List[int]]] = {}
+
+
+class RiskFactorSearchResult(BaseModel):
+    """Schema for a single risk factor search hit"""
+    id: int
+    analysis_id: int
+    project_id: int
+    project_name: str
+    hazard_name: str
+    harm: str
+    hazard_category: HazardCategory
+    lifecycle_stage: LifecycleStage
+    risk_score: int
+    rank: float
+    # Matched fields as HTML-escaped text, matched words wrapped in <mark></mark>
+    highlights: Dict[str, str] = {}
+
+
+class RiskFactorSearchResponse(BaseModel):
+    """Schema for risk factor search response"""
+    query: str
+    results: List[RiskFactorSearchResult]
+    limit: int
+    offset: int
+
+
+class SimilarRiskFactor(BaseModel):
+    """Schema for an existing risk factor similar to the one being entered"""
+    id: int
+    analysis_id: int
+    project_id: int
+    project_name: str
+    hazard_name: str
+    harm: str
+    risk_score: int
+    # Jaccard similarity of hazard name + harm character shingles (0..1)
+    similarity: float
+
+
+class SimilarRiskFactorsResponse(BaseModel):
+    """Schema for hazard reuse suggestions"""
+    results: List[SimilarRiskFactor]
+
+
+class RiskDiffFactor(RiskFactorBase):
+    """Schema for a risk factor present in only one side of a diff"""
+    id: int
+    risk_score: int
+    residual_risk_score: Optional[int] = None
+
+
+class RiskFactorChange(BaseModel):
+    """Schema for a risk factor matched in both analyses with different fields"""
+    old_id: int
+    new_id: int
+    hazard_name: str
+    lifecycle_stage: LifecycleStage
+    # field -> {"old": value, "new": value}
+    changes: Dict[str, Dict[str, Any]]
+    # score field -> new - old, only scores that changed
+    score_delta: Dict[str, int] = {}
+
+
+class RiskDiffSummary(BaseModel):
+    """Schema for risk diff totals"""
+    added_count: int
+    removed_count: int
+    modified_count: int
+    unchanged_count: int
+    total_risk_score_delta: int
+    high_risk_count_delta: int
+
+
+class RiskDiffResponse(BaseModel):
+    """Schema for differences between two risk analyses (old -> new)"""
+    old_analysis_id: int
+    new_analysis_id: int
+    added: List[RiskDiffFactor]
+    removed: List[RiskDiffFactor]
+    modified: List[RiskFactorChange]
+    summary: RiskDiffSummary
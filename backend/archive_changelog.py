@@ -0,0 +1,56 @@
+"""
+Changelog archival script
+Moves changelog entries older than the retention period from the database
+into compressed archive files (settings.changelog_archive_dir). Safe to run
+repeatedly, e.g. nightly from cron: each run archives only entries that
+became old enough since the previous one, in small transactions.
+
+Usage:
+    python archive_changelog.py [--days 365] [--batch-size 5000] [--limit N] [--dry-run]
+"""
+
+import argparse
+import sys
+from datetime import datetime, timedelta
+
+from app.database import engine, SessionLocal
+from app.models import ChangeLog
+from app.models.changelog_archive import ChangeLogArchiveSegment
+from app.core.config import settings
+from app.core.changelog_archive import ARCHIVE_BATCH_SIZE, archive_changelog, default_codec
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Archive old changelog entries")
+    parser.add_argument("--days", type=int, default=settings.changelog_retention_days,
+                        help="archive entries older than this many days")
+    parser.add_argument("--batch-size", type=int, default=ARCHIVE_BATCH_SIZE, help="entries per transaction")
+    parser.add_argument("--limit", type=int, default=None, help="archive at most this many entries in this run")
+    parser.add_argument("--dry-run", action="store_true", help="only count the entries that would be archived")
+    args = parser.parse_args()
+
+    # CURRENT_TIMESTAMP defaults are stored in UTC
+    cutoff = datetime.utcnow() - timedelta(days=args.days)
+    print(f"Archiving changelog entries created before {cutoff:%Y-%m-%d %H:%M} UTC "
+          f"to {settings.changelog_archive_dir} ({default_codec()})...")
+
+    ChangeLogArchiveSegment.__table__.create(bind=engine, checkfirst=True)
+
+    db = SessionLocal()
+    try:
+        if args.dry_run:
+            count = db.query(ChangeLog).filter(ChangeLog.created_at < cutoff).count()
+            print(f"{count} entries would be archived")
+            return True
+        archived = archive_changelog(db, cutoff, batch_size=args.batch_size, max_entries=args.limit)
+        print(f"✅ Archived {archived} changelog entries")
+        return True
+    except Exception as e:
+        print(f"❌ Archival failed: {e}")
+        return False
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,13 @@
+"""Benchmarks package"""
+import time
+from typing import Callable
+
+
+def best_of(func: Callable[[], object], repeat: int) -> float:
+    """Return the best wall time in milliseconds"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return min(timings)
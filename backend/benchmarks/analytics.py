@@ -0,0 +1,124 @@
+"""
+Portfolio analytics benchmark
+
+Writes synthetic risk factors to a throwaway SQLite database, then times
+loading them into arrays (the cold path after any edit, when the cached arrays
+of the portfolio are stale) and the vectorized statistics over the loaded
+arrays.
+
+Usage:
+    python -m benchmarks.analytics [--factors 1000000] [--projects 1000] [--repeat 5]
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.models import Project, RiskAnalysis, RiskFactor, User
+from app.core.analytics import (
+    RiskFactorArrays, CATEGORIES, STAGES, load_factor_arrays, portfolio_summary, risk_outliers
+)
+from benchmarks import best_of
+
+
+def make_arrays(count: int, projects: int = 1000, seed: int = 42) -> RiskFactorArrays:
+    """Random factors with realistic score ranges and ~60% residual risk assessed"""
+    rng = np.random.default_rng(seed)
+    severity = rng.integers(1, 6, count, dtype=np.int16)
+    probability = rng.integers(1, 6, count, dtype=np.int16)
+    risk = severity * probability
+    residual = np.where(
+        rng.random(count) < 0.6,
+        np.maximum(1, risk - rng.integers(0, 10, count)),
+        np.nan
+    )
+    return RiskFactorArrays(
+        ids=np.arange(1, count + 1, dtype=np.int64),
+        project_ids=rng.integers(1, projects + 1, count, dtype=np.int64),
+        severity=severity,
+        probability=probability,
+        risk=risk,
+        residual=residual.astype(np.float64),
+        category=rng.integers(0, len(CATEGORIES), count, dtype=np.int8),
+        stage=rng.integers(0, len(STAGES), count, dtype=np.int8),
+    )
+
+
+def build_database(url: str, arrays: RiskFactorArrays, projects: int):
+    """One analysis per project, factors inserted analysis by analysis as they are entered"""
+    engine = create_engine(url)
+    Base.metadata.create_all(bind=engine)
+    order = np.argsort(arrays.project_ids, kind="stable")
+    residual = [None if np.isnan(value) else int(value) for value in arrays.residual[order]]
+    with engine.begin() as conn:
+        conn.execute(insert(User.__table__), [{
+            "id": 1, "email": "bench@example.com", "azure_object_id": "bench",
+            "first_name": "Bench", "last_name": "User", "role": "USER", "is_active": True
+        }])
+        conn.execute(insert(Project.__table__), [
+            {"id": project_id, "name": f"Bench {project_id}", "device_name": "Device", "owner_id": 1,
+             "status": "DRAFT", "revision": 0}
+            for project_id in range(1, projects + 1)
+        ])
+        conn.execute(insert(RiskAnalysis.__table__), [
+            {"id": project_id, "project_id": project_id, "analyst_id": 1, "revision": 0}
+            for project_id in range(1, projects + 1)
+        ])
+        # Core inserts on the raw connection: no ORM flush hooks (search and similarity indexes)
+        conn.exec_driver_sql(
+            "INSERT INTO risk_factors (analysis_id, lifecycle_stage, hazard_name, hazardous_situation, "
+            "sequence_of_events, harm, hazard_category, severity_score, probability_score, risk_score, "
+            "residual_risk_score) VALUES (?, ?, 'Overheating', '-', '-', 'Burn', ?, ?, ?, ?, ?)",
+            list(zip(
+                arrays.project_ids[order].tolist(),
+                [STAGES[code].name for code in arrays.stage[order]],
+                [CATEGORIES[code].name for code in arrays.category[order]],
+                arrays.severity[order].tolist(),
+                arrays.probability[order].tolist(),
+                arrays.risk[order].tolist(),
+                residual,
+            ))
+        )
+    return engine
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Portfolio analytics benchmark")
+    parser.add_argument("--factors", type=int, default=1_000_000)
+    parser.add_argument("--projects", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        start = time.perf_counter()
+        engine = build_database(
+            f"sqlite:///{os.path.join(directory, 'bench.db')}", make_arrays(args.factors, args.projects), args.projects
+        )
+        build_s = time.perf_counter() - start
+
+        db = sessionmaker(bind=engine)()
+        analysis_ids = list(range(1, args.projects + 1))
+        load_ms = best_of(lambda: load_factor_arrays(db, analysis_ids), args.repeat)
+        arrays = load_factor_arrays(db, analysis_ids)
+        db.close()
+        engine.dispose()
+
+    summary_ms = best_of(lambda: portfolio_summary(arrays), args.repeat)
+    outliers_ms = best_of(lambda: risk_outliers(arrays), args.repeat)
+
+    print(f"factors:   {len(arrays):,}")
+    print(f"build:     {build_s:8.1f} s")
+    print(f"load:      {load_ms:8.1f} ms")
+    print(f"summary:   {summary_ms:8.1f} ms")
+    print(f"outliers:  {outliers_ms:8.1f} ms")
+    print(f"total:     {load_ms + summary_ms + outliers_ms:8.1f} ms")
+    print(f"memory:    {arrays.nbytes / 1024 / 1024:8.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
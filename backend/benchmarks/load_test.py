@@ -0,0 +1,411 @@
+"""
+HTTP load test
+
+Virtual users (asyncio tasks) replay the frontend's user journeys: login via
+the mock Azure flow, dashboard, project view, risk editing and changelog.
+Each user logs in as a generated account (see generate_dataset.py), then picks
+journeys by the weights of the scenario profile with exponential think time
+between requests, until the duration is over. The mock login creates unknown
+accounts, which would change the dataset between runs: in process, only the
+generated accounts found in the database are used; against a server, --accounts
+must be given, and the run aborts at the first account created during it.
+
+The target is the application in this process (httpx ASGI transport, against
+DATABASE_URL) or a running server given with --url. Throughput, p50/p95/p99
+latency and error rate are reported per route template and written as JSON;
+--compare prints the change against an earlier report.
+
+Usage:
+    DATABASE_URL=sqlite:///./load.db python -m benchmarks.load_test [--profile mixed] [--users 20]
+        [--duration 60] [--ramp-up 5] [--think-time 0.5] [--accounts N] [--seed 42]
+        [--output load_report.json] [--compare previous.json]
+    python -m benchmarks.load_test --url http://localhost:8000 --accounts 200 ...
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, List, Optional
+
+import httpx
+import numpy as np
+from jose import jwt
+
+from generate_dataset import EMAIL_TEMPLATE, OBJECT_ID_TEMPLATE
+
+# Journey weights per scenario profile
+PROFILES = {
+    "browse": {"dashboard": 4, "project_view": 4, "risk_edit": 0, "changelog": 2},
+    "edit": {"dashboard": 1, "project_view": 2, "risk_edit": 6, "changelog": 1},
+    "mixed": {"dashboard": 3, "project_view": 4, "risk_edit": 2, "changelog": 1},
+}
+
+LOGIN_ATTEMPTS = 3
+
+
+class AccountCreated(Exception):
+    """A login created its account, which does not exist in the target dataset"""
+
+
+def azure_token(email: str, object_id: str) -> str:
+    """Unsigned Azure-style ID token, accepted by the mock Azure verification"""
+    return jwt.encode(
+        {"email": email, "oid": object_id, "given_name": "Load", "family_name": "Test"},
+        "not-verified",
+        algorithm="HS256",
+    )
+
+
+def percentile(values: np.ndarray, q: float) -> Optional[float]:
+    return round(float(np.percentile(values, q)), 2) if len(values) else None
+
+
+class RouteStats:
+    __slots__ = ("latencies", "statuses", "errors")
+
+    def __init__(self):
+        self.latencies: List[float] = []
+        self.statuses: Counter = Counter()
+        self.errors = 0
+
+    def summary(self, elapsed: float) -> dict:
+        latencies = np.array(self.latencies)
+        requests = len(latencies)
+        return {
+            "requests": requests,
+            "errors": self.errors,
+            "error_rate": round(self.errors / requests, 4) if requests else 0.0,
+            "throughput_rps": round(requests / elapsed, 2),
+            "mean_ms": round(float(latencies.mean()), 2) if requests else None,
+            "p50_ms": percentile(latencies, 50),
+            "p95_ms": percentile(latencies, 95),
+            "p99_ms": percentile(latencies, 99),
+            "max_ms": round(float(latencies.max()), 2) if requests else None,
+            "statuses": dict(sorted(self.statuses.items())),
+        }
+
+
+class Recorder:
+    """Latencies and outcomes per route template ("GET /api/projects/{project_id}/view")"""
+
+    def __init__(self):
+        self.routes: Dict[str, RouteStats] = {}
+        self.journeys: Counter = Counter()
+
+    def record(self, route: str, elapsed_ms: float, status: str, error: bool):
+        stats = self.routes.get(route)
+        if stats is None:
+            stats = self.routes[route] = RouteStats()
+        stats.latencies.append(elapsed_ms)
+        stats.statuses[status] += 1
+        stats.errors += error
+
+    def report(self, elapsed: float) -> dict:
+        total = RouteStats()
+        for stats in self.routes.values():
+            total.latencies.extend(stats.latencies)
+            total.statuses.update(stats.statuses)
+            total.errors += stats.errors
+        return {
+            "elapsed_s": round(elapsed, 2),
+            "totals": total.summary(elapsed),
+            "journeys": dict(sorted(self.journeys.items())),
+            "routes": {route: self.routes[route].summary(elapsed) for route in sorted(self.routes)},
+        }
+
+
+class VirtualUser:
+    """One simulated browser session"""
+
+    def __init__(self, client: httpx.AsyncClient, recorder: Recorder, rng: random.Random,
+                 account: int, accounts: int, think_time: float, started_at: datetime):
+        self.client = client
+        self.recorder = recorder
+        self.rng = rng
+        self.account = account
+        self.accounts = accounts
+        self.think_time = think_time
+        self.started_at = started_at  # server time when the run started
+        self.headers: Dict[str, str] = {}
+        self.user_id: Optional[int] = None
+        self.projects: List[dict] = []
+
+    async def request(self, method: str, route: str, url: str, **kwargs) -> Optional[httpx.Response]:
+        """Timed request; None on transport errors. `route` is the template results are grouped by."""
+        start = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, headers=self.headers, **kwargs)
+            await response.aread()
+        except httpx.HTTPError as e:
+            self.recorder.record(f"{method} {route}", (time.perf_counter() - start) * 1000, type(e).__name__, True)
+            return None
+        self.recorder.record(
+            f"{method} {route}", (time.perf_counter() - start) * 1000,
+            str(response.status_code), response.status_code >= 400
+        )
+        return response
+
+    async def think(self):
+        if self.think_time:
+            await asyncio.sleep(self.rng.expovariate(1 / self.think_time))
+
+    async def login(self) -> bool:
+        """Mock Azure login; inactive or failing accounts are replaced by the next ones"""
+        for attempt in range(LOGIN_ATTEMPTS):
+            number = (self.account + attempt * 7919) % self.accounts + 1
+            response = await self.request("POST", "/api/auth/azure-login", "/api/auth/azure-login", json={
+                "azure_token": azure_token(EMAIL_TEMPLATE.format(number), OBJECT_ID_TEMPLATE.format(number))
+            })
+            if response is not None and response.status_code == 200:
+                self.headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+                return True
+        return False
+
+    # Journeys (requests as the frontend pages send them)
+
+    async def dashboard(self):
+        response = await self.request("GET", "/api/auth/me", "/api/auth/me")
+        if response is not None and response.status_code == 200:
+            user = response.json()
+            if self.user_id is None and utc(datetime.fromisoformat(user["created_at"])) >= self.started_at:
+                raise AccountCreated(user["email"])
+            self.user_id = user["id"]
+        await self.think()
+        response = await self.request("GET", "/api/projects/", "/api/projects/")
+        if response is not None and response.status_code == 200:
+            self.projects = response.json()
+
+    async def project_view(self):
+        project = self.pick_project()
+        if project is None:
+            return await self.dashboard()
+        await self.request(
+            "GET", "/api/projects/{project_id}/view", f"/api/projects/{project['id']}/view",
+            params={"include": "members,analysis"}
+        )
+        await self.think()
+        await self.request(
+            "GET", "/api/risk-analyses/project/{project_id}/matrix",
+            f"/api/risk-analyses/project/{project['id']}/matrix"
+        )
+
+    async def risk_edit(self):
+        # Edits go to the user's own projects, where they are allowed
+        project = self.pick_project(owned=True)
+        if project is None:
+            return await self.project_view()
+        view_route, view_url = "/api/projects/{project_id}/view", f"/api/projects/{project['id']}/view"
+        response = await self.request("GET", view_route, view_url, params={"include": "factors"})
+        if response is None or response.status_code != 200:
+            return
+        factors = response.json().get("risk_factors")
+        if not factors:
+            return
+        await self.think()
+        factor = self.rng.choice(factors)
+        await self.request(
+            "PUT", "/api/risk-analyses/factors/{factor_id}", f"/api/risk-analyses/factors/{factor['id']}",
+            json={
+                "severity_score": self.rng.randint(1, 5),
+                "probability_score": self.rng.randint(1, 5),
+                "control_measures": factor.get("control_measures"),
+            }
+        )
+        # The page reloads the factor list after saving
+        await self.request("GET", view_route, view_url, params={"include": "factors"})
+
+    async def changelog(self):
+        # The changelog page lists the projects whose log the user may read (owned or project admin)
+        response = await self.request("GET", "/api/changelog/projects", "/api/changelog/projects")
+        projects = response.json().get("projects") if response is not None and response.status_code == 200 else None
+        if not projects:
+            return
+        await self.think()
+        project_id = self.rng.choice(projects)["project_id"]
+        response = await self.request(
+            "GET", "/api/changelog/project/{project_id}", f"/api/changelog/project/{project_id}"
+        )
+        entries = response.json().get("changelogs") if response is not None and response.status_code == 200 else None
+        if entries:
+            await self.think()
+            entry = self.rng.choice(entries[:10])
+            await self.request("GET", "/api/changelog/{changelog_id}", f"/api/changelog/{entry['id']}")
+
+    def pick_project(self, owned: bool = False) -> Optional[dict]:
+        projects = self.projects
+        if owned:
+            projects = [project for project in projects if project.get("owner_id") == self.user_id]
+        return self.rng.choice(projects) if projects else None
+
+    async def run(self, profile: Dict[str, float], deadline: float):
+        if not await self.login():
+            return
+        await self.dashboard()
+        journeys = [name for name, weight in profile.items() if weight]
+        weights = [profile[name] for name in journeys]
+        while time.perf_counter() < deadline:
+            await self.think()
+            name = self.rng.choices(journeys, weights)[0]
+            await getattr(self, name)()
+            self.recorder.journeys[name] += 1
+
+
+def utc(value: datetime) -> datetime:
+    # SQLite returns UTC timestamps without offset
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value
+
+
+async def server_time(client: httpx.AsyncClient) -> datetime:
+    """Current time of the target (the in-process application sends no Date header)"""
+    response = await client.get("/health")
+    date = response.headers.get("date")
+    return parsedate_to_datetime(date) if date else datetime.now(timezone.utc).replace(microsecond=0)
+
+
+def generated_account_count() -> int:
+    """Accounts of generate_dataset.py (user1..userN) in the database of the in-process application"""
+    from app.database import SessionLocal
+    from app.models import User
+
+    db = SessionLocal()
+    try:
+        return db.query(User).filter(User.email.like(EMAIL_TEMPLATE.format("%"))).count()
+    finally:
+        db.close()
+
+
+def in_process_client(timeout: float) -> httpx.AsyncClient:
+    """Client bound to the application in this process (configured by the usual environment variables)"""
+    # A load test measures capacity, not the per-user limits; RATE_LIMIT_ENABLED=true keeps them
+    os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    from app.main import app
+
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://load-test", timeout=timeout)
+
+
+async def run_load_test(args) -> dict:
+    profile = PROFILES[args.profile]
+    recorder = Recorder()
+    if args.url:
+        client = httpx.AsyncClient(
+            base_url=args.url, timeout=args.timeout,
+            limits=httpx.Limits(max_connections=args.users, max_keepalive_connections=args.users),
+        )
+    else:
+        client = in_process_client(args.timeout)
+        available = generated_account_count()
+        if not available:
+            sys.exit(f"No generated accounts ({EMAIL_TEMPLATE.format('N')}) in the database, see generate_dataset.py")
+        if args.accounts is None:
+            args.accounts = available
+        elif args.accounts > available:
+            sys.exit(f"--accounts {args.accounts}: the database has only {available} generated accounts")
+
+    async with client:
+        started_at = await server_time(client)
+        started = time.perf_counter()
+        deadline = started + args.duration
+
+        async def virtual_user(index: int):
+            await asyncio.sleep(args.ramp_up * index / args.users)
+            rng = random.Random(args.seed * 100_003 + index)
+            user = VirtualUser(
+                client, recorder, rng, rng.randrange(args.accounts), args.accounts, args.think_time, started_at
+            )
+            await user.run(profile, deadline)
+
+        tasks = [asyncio.create_task(virtual_user(index)) for index in range(args.users)]
+        try:
+            await asyncio.gather(*tasks)
+        except AccountCreated as e:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            sys.exit(f"Login created the account {e}: --accounts exceeds the accounts of the target dataset")
+        elapsed = time.perf_counter() - started
+
+    report = {
+        "started_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "target": args.url or "in-process",
+        "profile": args.profile,
+        "users": args.users,
+        "duration_s": args.duration,
+        "think_time_s": args.think_time,
+        "accounts": args.accounts,
+        "seed": args.seed,
+    }
+    report.update(recorder.report(elapsed))
+    return report
+
+
+def print_report(report: dict):
+    print(f"{'route':58} {'req':>7} {'rps':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7}")
+    for route, stats in list(report["routes"].items()) + [("total", report["totals"])]:
+        print(
+            f"{route:58} {stats['requests']:7} {stats['throughput_rps']:8.1f} {stats['p50_ms'] or 0:9.1f} "
+            f"{stats['p95_ms'] or 0:9.1f} {stats['p99_ms'] or 0:9.1f} {stats['error_rate']:7.1%}"
+        )
+
+
+def print_comparison(report: dict, previous: dict):
+    """Throughput and p95 change per route against an earlier report"""
+    print(f"\nCompared with {previous.get('started_at')} ({previous.get('target')}, {previous.get('profile')}):")
+    print(f"{'route':58} {'rps':>17} {'p95 ms':>24} {'errors':>17}")
+    for route, stats in list(report["routes"].items()) + [("total", report["totals"])]:
+        before = previous["totals"] if route == "total" else previous.get("routes", {}).get(route)
+        if not before:
+            print(f"{route:58} (new)")
+            continue
+        p95_change = ""
+        if before.get("p95_ms") and stats["p95_ms"] is not None:
+            p95_change = f"{(stats['p95_ms'] / before['p95_ms'] - 1):+.0%}"
+        print(
+            f"{route:58} {before['throughput_rps']:7.1f} -> {stats['throughput_rps']:6.1f} "
+            f"{before['p95_ms'] or 0:8.1f} -> {stats['p95_ms'] or 0:6.1f} {p95_change:>5} "
+            f"{before['error_rate']:6.1%} -> {stats['error_rate']:6.1%}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HTTP load test with virtual users replaying user journeys")
+    parser.add_argument("--url", help="base URL of a running server (default: the application in this process)")
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="mixed", help="journey mix")
+    parser.add_argument("--users", type=int, default=20, help="concurrent virtual users")
+    parser.add_argument("--duration", type=float, default=60, help="seconds of load")
+    parser.add_argument("--ramp-up", type=float, default=5, help="seconds until all users have started")
+    parser.add_argument("--think-time", type=float, default=0.5,
+                        help="mean pause between requests in seconds (0: none)")
+    parser.add_argument("--accounts", type=int,
+                        help="generated accounts to log in as (user1..userN@synthetic.example); "
+                             "default in process: all of the database, required with --url")
+    parser.add_argument("--timeout", type=float, default=30, help="request timeout in seconds")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default="load_report.json", help="JSON report path")
+    parser.add_argument("--compare", help="earlier JSON report to compare with")
+    args = parser.parse_args()
+    if args.url and args.accounts is None:
+        parser.error("--accounts is required with --url (the number of users of the target dataset)")
+    if args.users < 1 or (args.accounts is not None and args.accounts < 1):
+        parser.error("--users and --accounts must be positive")
+
+    report = asyncio.run(run_load_test(args))
+    print_report(report)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            print_comparison(report, json.load(f))
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"\nReport written to {args.output}")
+    if not report["totals"]["requests"]:
+        sys.exit("No requests completed")
+
+
+if __name__ == "__main__":
+    main()
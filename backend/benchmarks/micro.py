@@ -0,0 +1,355 @@
+"""
+Microbenchmarks of per-request computations
+
+Times the small functions every request goes through: risk scoring and
+statistics, change diffs, changelog payload encoding, Pydantic schema
+validation, action display names and local token handling.
+
+Each benchmark is a setup function registered with @benchmark that returns
+the callable to time and the number of operations one call performs. Calls
+are repeated until a round takes at least --min-time; the median and minimum
+time per operation over --rounds rounds are reported.
+
+Results are appended to a JSON Lines history (one run per line, with commit
+and machine). A benchmark regresses when its median is more than --threshold
+above the median of the last --baseline-runs runs of the same machine and
+Python version; the command then exits with status 1.
+
+Usage:
+    python -m benchmarks.micro [--filter token] [--rounds 7] [--min-time 0.05]
+        [--threshold 0.2] [--baseline-runs 5] [--history PATH] [--no-save]
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional, Tuple
+
+from app.core.azure_auth_mock import create_local_token, verify_local_token
+from app.core.logging_helper import _changelog_values, create_field_diff
+from app.database import engine
+from app.models import ActionType, ChangeLog, HazardCategory, LifecycleStage, ProjectStatus, RiskFactor, User
+from app.routers.risk_analyses import calculate_analysis_statistics, calculate_risk_score
+from app.schemas.changelog import ChangeLogResponse
+from app.schemas.project import ProjectCreate, ProjectListResponse
+from app.schemas.risk_analysis import RiskFactorCreate, RiskFactorResponse, RiskFactorUpdate
+
+DEFAULT_HISTORY = os.path.join(os.path.dirname(__file__), "history", "micro.jsonl")
+
+BENCHMARKS: Dict[str, Callable[[], Tuple[Callable[[], object], int]]] = {}
+
+
+def benchmark(name: str):
+    """Register a setup function returning (callable to time, operations per call)"""
+    def register(setup):
+        BENCHMARKS[name] = setup
+        return setup
+    return register
+
+
+def make_factor(index: int) -> RiskFactor:
+    """Transient ORM factor (attribute access goes through the ORM instrumentation as in handlers)"""
+    stages, categories = list(LifecycleStage), list(HazardCategory)
+    severity, probability = index % 5 + 1, index // 5 % 5 + 1
+    return RiskFactor(
+        id=index + 1, analysis_id=1, lifecycle_stage=stages[index % len(stages)],
+        hazard_name=f"Перегрев корпуса {index}", hazardous_situation="Длительная работа на максимальной мощности",
+        sequence_of_events="Отказ вентилятора", harm="Термический ожог",
+        hazard_category=categories[index % len(categories)], severity_score=severity,
+        probability_score=probability, risk_score=severity * probability,
+        control_measures="Датчик температуры с отключением", residual_risk_score=None,
+        created_at=datetime(2025, 1, 1), updated_at=None,
+    )
+
+
+FACTOR_BODY = {
+    "lifecycle_stage": "operation", "hazard_name": "Поражение электрическим током",
+    "hazardous_situation": "Контакт с токоведущими частями", "sequence_of_events": "Повреждение изоляции",
+    "harm": "Ожог", "hazard_category": "energy_functional", "severity_score": 4, "probability_score": 2,
+    "control_measures": "Двойная изоляция",
+}
+TRACKED_FIELDS = [
+    "hazard_name", "hazardous_situation", "harm", "lifecycle_stage", "hazard_category",
+    "severity_score", "probability_score", "risk_score",
+]
+
+
+# Risk computations
+
+@benchmark("calculate_risk_score")
+def bench_risk_score():
+    pairs = [(severity, probability) for severity in range(1, 6) for probability in range(1, 6)]
+
+    def run():
+        for severity, probability in pairs:
+            calculate_risk_score(severity, probability)
+    return run, len(pairs)
+
+
+@benchmark("calculate_analysis_statistics[30]")
+def bench_statistics_typical():
+    factors = [make_factor(i) for i in range(30)]
+    return lambda: calculate_analysis_statistics(factors), 1
+
+
+@benchmark("calculate_analysis_statistics[400]")
+def bench_statistics_large():
+    factors = [make_factor(i) for i in range(400)]
+    return lambda: calculate_analysis_statistics(factors), 1
+
+
+# Changelog
+
+@benchmark("create_field_diff")
+def bench_field_diff():
+    old, new = make_factor(0), make_factor(0)
+    new.severity_score, new.risk_score, new.hazard_category = 5, 5, HazardCategory.SOFTWARE
+    return lambda: create_field_diff(old, new, TRACKED_FIELDS), 1
+
+
+@benchmark("log_action payload encoding")
+def bench_log_action_payload():
+    # Insert parameters as log_action builds them, JSON columns encoded by the engine's serializer
+    user = User(id=1, email="bench@example.com")
+    payload_columns = ("old_values", "new_values", "extra_data")
+    encoders = {
+        column: ChangeLog.__table__.c[column].type.bind_processor(engine.dialect) for column in payload_columns
+    }
+    old_values = {"severity_score": 3, "risk_score": 6, "hazard_category": "energy_functional"}
+    new_values = {"severity_score": 5, "risk_score": 10, "hazard_category": "software"}
+
+    def run():
+        values = _changelog_values(
+            user, None, action_type=ActionType.RISK_UPDATED,
+            action_description="Обновлен риск 'Перегрев корпуса' в проекте 'Инфузионный насос'",
+            target_type="risk", target_id=42, target_name="Перегрев корпуса", project_id=7,
+            old_values=old_values, new_values=new_values,
+        )
+        for column, encode in encoders.items():
+            if encode is not None and values[column] is not None:
+                values[column] = encode(values[column])
+        return values
+    return run, 1
+
+
+@benchmark("ChangeLog.action_display_name")
+def bench_action_display_name():
+    entries = [ChangeLog(action_type=action) for action in ActionType]
+
+    def run():
+        for entry in entries:
+            entry.action_display_name
+    return run, len(entries)
+
+
+# Schema validation
+
+@benchmark("schema RiskFactorCreate (request body)")
+def bench_factor_create():
+    return lambda: RiskFactorCreate.model_validate(FACTOR_BODY), 1
+
+
+@benchmark("schema RiskFactorUpdate (request body)")
+def bench_factor_update():
+    body = {"severity_score": 5, "probability_score": 3, "control_measures": "Ограничение мощности"}
+    return lambda: RiskFactorUpdate.model_validate(body), 1
+
+
+@benchmark("schema ProjectCreate (request body)")
+def bench_project_create():
+    body = {
+        "name": "Инфузионный насос", "description": "Файл менеджмента риска", "device_name": "Infusion pump",
+        "device_model": "IP-200", "device_purpose": "Дозированное введение лекарств",
+        "device_classification": "Class IIb", "intended_use": "Стационар",
+    }
+    return lambda: ProjectCreate.model_validate(body), 1
+
+
+@benchmark("schema RiskFactorResponse (from ORM)")
+def bench_factor_response():
+    factor = make_factor(3)
+    return lambda: RiskFactorResponse.model_validate(factor), 1
+
+
+@benchmark("schema ProjectListResponse (from row)")
+def bench_project_list_item():
+    row = {
+        "id": 1, "name": "Инфузионный насос", "status": ProjectStatus.IN_PROGRESS, "progress_percentage": 40.0,
+        "device_name": "Infusion pump", "owner_id": 3, "created_at": datetime(2025, 1, 1), "member_count": 4,
+        "user_role": "admin",
+    }
+    return lambda: ProjectListResponse.model_validate(row), 1
+
+
+@benchmark("schema ChangeLogResponse (from row)")
+def bench_changelog_response():
+    row = {
+        "id": 1, "action_type": ActionType.RISK_UPDATED, "action_description": "Обновлен риск 'Перегрев'",
+        "action_display_name": "Обновлен риск", "user_id": 1, "user_name": "Анна Иванова", "user_role": "user",
+        "target_type": "risk", "target_id": 42, "target_name": "Перегрев", "project_id": 7,
+        "project_name": "Инфузионный насос", "old_values": {"severity_score": 3, "risk_score": 6},
+        "new_values": {"severity_score": 5, "risk_score": 10}, "extra_data": None,
+        "created_at": datetime(2025, 1, 1),
+    }
+    return lambda: ChangeLogResponse.model_validate(row), 1
+
+
+# Local tokens
+
+TOKEN_USER = {"email": "bench@example.com", "object_id": "bench-object-id"}
+
+
+@benchmark("create_local_token")
+def bench_create_token():
+    return lambda: create_local_token(TOKEN_USER), 1
+
+
+@benchmark("verify_local_token")
+def bench_verify_token():
+    token = create_local_token(TOKEN_USER)
+    return lambda: verify_local_token(token), 1
+
+
+# Runner
+
+def measure(run: Callable[[], object], operations: int, rounds: int, min_time: float) -> dict:
+    """Seconds per operation over `rounds` rounds of calls lasting at least `min_time` each"""
+    calls = 1
+    while True:
+        elapsed = _time_calls(run, calls)
+        if elapsed >= min_time:
+            break
+        calls = max(calls * 2, int(calls * min_time / max(elapsed, 1e-9) * 1.2))
+    samples = [elapsed / (calls * operations)] + [
+        _time_calls(run, calls) / (calls * operations) for _ in range(rounds - 1)
+    ]
+    return {
+        "median_ns": statistics.median(samples) * 1e9,
+        "min_ns": min(samples) * 1e9,
+        "stdev_ns": (statistics.stdev(samples) if len(samples) > 1 else 0.0) * 1e9,
+        "rounds": rounds,
+        "calls": calls,
+        "operations": operations,
+    }
+
+
+def _time_calls(run: Callable[[], object], calls: int) -> float:
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        start = time.perf_counter()
+        for _ in range(calls):
+            run()
+        return time.perf_counter() - start
+    finally:
+        if gc_enabled:
+            gc.enable()
+
+
+def machine_key() -> str:
+    """Runs are only compared with runs of the same machine and Python version"""
+    return f"{platform.node()}/{platform.machine()}/{platform.python_implementation()}-{platform.python_version()}"
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(__file__)
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def load_history(path: str) -> List[dict]:
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def baselines(history: List[dict], machine: str, runs: int) -> Dict[str, float]:
+    """Median of the last `runs` medians per benchmark on this machine"""
+    medians: Dict[str, List[float]] = {}
+    for run in reversed(history):
+        if run.get("machine") != machine:
+            continue
+        for name, result in run["results"].items():
+            values = medians.setdefault(name, [])
+            if len(values) < runs:
+                values.append(result["median_ns"])
+    return {name: statistics.median(values) for name, values in medians.items()}
+
+
+def format_time(ns: float) -> str:
+    if ns >= 1e6:
+        return f"{ns / 1e6:.2f} ms"
+    if ns >= 1e3:
+        return f"{ns / 1e3:.2f} µs"
+    return f"{ns:.0f} ns"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Microbenchmarks of per-request computations")
+    parser.add_argument("--filter", help="only benchmarks whose name contains this text")
+    parser.add_argument("--list", action="store_true", help="list benchmark names and exit")
+    parser.add_argument("--rounds", type=int, default=7)
+    parser.add_argument("--min-time", type=float, default=0.05, help="minimum seconds per round")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="allowed slowdown of the median against the baseline (0.2 = 20%%)")
+    parser.add_argument("--baseline-runs", type=int, default=5, help="recent runs the baseline is the median of")
+    parser.add_argument("--history", default=DEFAULT_HISTORY, help="JSON Lines history file")
+    parser.add_argument("--no-save", action="store_true", help="do not append this run to the history")
+    args = parser.parse_args()
+    if args.rounds < 1:
+        parser.error("--rounds must be positive")
+
+    names = [name for name in BENCHMARKS if not args.filter or args.filter.lower() in name.lower()]
+    if args.list:
+        print("\n".join(names))
+        return
+    if not names:
+        parser.error(f"no benchmark matches {args.filter!r}")
+
+    machine = machine_key()
+    baseline = baselines(load_history(args.history), machine, args.baseline_runs)
+    results = {}
+    regressions = []
+    print(f"{'benchmark':42} {'median':>10} {'min':>10} {'±':>5} {'baseline':>10} {'change':>8}")
+    for name in names:
+        run, operations = BENCHMARKS[name]()
+        result = results[name] = measure(run, operations, args.rounds, args.min_time)
+        spread = result["stdev_ns"] / result["median_ns"] if result["median_ns"] else 0.0
+        line = f"{name:42} {format_time(result['median_ns']):>10} {format_time(result['min_ns']):>10} {spread:5.0%}"
+        if name in baseline:
+            change = result["median_ns"] / baseline[name] - 1
+            line += f" {format_time(baseline[name]):>10} {change:+8.1%}"
+            if change > args.threshold:
+                regressions.append(name)
+                line += "  REGRESSION"
+        print(line)
+
+    if not args.no_save:
+        os.makedirs(os.path.dirname(os.path.abspath(args.history)), exist_ok=True)
+        with open(args.history, "a", encoding="utf-8") as f:
+            f.write(json.dumps({
+                "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                "commit": git_commit(),
+                "machine": machine,
+                "results": results,
+            }) + "\n")
+        print(f"\nRun appended to {args.history}")
+
+    if regressions:
+        sys.exit(f"{len(regressions)} benchmark(s) slower than the baseline by more than {args.threshold:.0%}: "
+                 + ", ".join(regressions))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""
+Serialization benchmark for list endpoints
+
+Compares the default path (Pydantic model per row, FastAPI encoding with the
+stdlib json module) with the fast path (plain row dicts encoded with orjson).
+
+Usage:
+    python -m benchmarks.serialization [--rows 10000] [--repeat 5]
+"""
+import argparse
+import json
+from datetime import datetime
+
+from fastapi.encoders import jsonable_encoder
+
+from app.core.serialization import dumps, orjson
+from app.models.changelog import ActionType, ACTION_DISPLAY_NAMES
+from app.models.project import ProjectStatus
+from app.models.risk_analysis import LifecycleStage, HazardCategory
+from app.schemas.changelog import ChangeLogResponse
+from app.schemas.project import ProjectListResponse
+from app.schemas.risk_analysis import RiskFactorResponse
+from benchmarks import best_of
+
+
+def make_project_rows(count: int) -> list:
+    """Rows shaped like the fast project list query"""
+    now = datetime.now()
+    statuses = list(ProjectStatus)
+    return [
+        {
+            "id": i,
+            "name": f"Project {i}",
+            "status": statuses[i % len(statuses)],
+            "progress_percentage": float(i % 100),
+            "device_name": f"Device {i}",
+            "owner_id": i % 50 + 1,
+            "created_at": now,
+            "member_count": i % 7,
+            "user_role": "admin",
+        }
+        for i in range(count)
+    ]
+
+
+def make_factor_rows(count: int) -> list:
+    """Rows shaped like RISK_FACTOR_COLUMNS"""
+    now = datetime.now()
+    stages = list(LifecycleStage)
+    categories = list(HazardCategory)
+    return [
+        {
+            "id": i,
+            "analysis_id": i // 100 + 1,
+            "lifecycle_stage": stages[i % len(stages)],
+            "hazard_name": f"Hazard {i}",
+            "hazardous_situation": "Patient contact with exposed conductor",
+            "sequence_of_events": "Insulation wears out, housing becomes live",
+            "harm": "Electric shock",
+            "hazard_category": categories[i % len(categories)],
+            "severity_score": i % 5 + 1,
+            "probability_score": (i // 5) % 5 + 1,
+            "risk_score": (i % 5 + 1) * ((i // 5) % 5 + 1),
+            "control_measures": "Double insulation",
+            "residual_risk_score": None,
+            "created_at": now,
+            "updated_at": None,
+        }
+        for i in range(count)
+    ]
+
+
+def make_changelog_rows(count: int) -> list:
+    """Rows shaped like the fast changelog query"""
+    now = datetime.now()
+    actions = list(ActionType)
+    rows = []
+    for i in range(count):
+        action = actions[i % len(actions)]
+        rows.append({
+            "id": i,
+            "action_type": action,
+            "action_description": f"Обновлен риск 'Hazard {i}'",
+            "action_display_name": ACTION_DISPLAY_NAMES[action],
+            "user_id": i % 50 + 1,
+            "user_name": "Ivan Petrov",
+            "user_role": "USER",
+            "target_type": "risk",
+            "target_id": i,
+            "target_name": f"Hazard {i}",
+            "project_id": i % 20 + 1,
+            "project_name": "Project",
+            "old_values": {"severity_score": 3},
+            "new_values": {"severity_score": 4},
+            "extra_data": None,
+            "created_at": now,
+        })
+    return rows
+
+
+def default_path(schema, rows: list) -> bytes:
+    """Validate every row into a model, then encode like FastAPI's JSONResponse"""
+    models = [schema(**row) for row in rows]
+    return json.dumps(
+        jsonable_encoder(models), ensure_ascii=False, separators=(",", ":")
+    ).encode("utf-8")
+
+
+def fast_path(rows: list) -> bytes:
+    """Encode trusted rows directly"""
+    return dumps(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="List endpoint serialization benchmark")
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    cases = [
+        ("projects", ProjectListResponse, make_project_rows(args.rows)),
+        ("factors", RiskFactorResponse, make_factor_rows(args.rows)),
+        ("changelog", ChangeLogResponse, make_changelog_rows(args.rows)),
+    ]
+
+    print(f"Encoder: {'orjson' if orjson is not None else 'json (orjson not installed)'}")
+    print(f"{'entity':<12}{'rows':>8}{'default ms':>14}{'fast ms':>12}{'speedup':>10}")
+    for name, schema, rows in cases:
+        default_ms = best_of(lambda: default_path(schema, rows), args.repeat)
+        fast_ms = best_of(lambda: fast_path(rows), args.repeat)
+        print(f"{name:<12}{len(rows):>8}{default_ms:>14.1f}{fast_ms:>12.1f}{default_ms / fast_ms:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Hazard similarity lookup benchmark
+
+Builds a throwaway SQLite database with synthetic risk factors and their LSH
+buckets, then times top-k similar factor queries for typed hazard texts.
+
+Usage:
+    python -m benchmarks.similarity [--factors 200000] [--queries 50]
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.models import User, Project, RiskAnalysis, RiskFactor
+from app.models.hazard_similarity import HazardLSHBucket, bucket_rows
+from app.core.similarity import find_similar_factors
+
+HAZARD_WORDS = [
+    "поражение", "электрическим", "током", "перегрев", "корпуса", "утечка", "жидкости",
+    "ошибка", "программного", "обеспечения", "механическая", "травма", "излучение",
+    "контаминация", "инфекция", "отказ", "питания", "неверная", "дозировка", "аллергическая",
+    "electric", "shock", "battery", "failure", "overheating", "sensor", "drift", "alarm",
+]
+HARM_WORDS = [
+    "ожог", "кожи", "смерть", "пациента", "задержка", "лечения", "травма", "оператора",
+    "burn", "injury", "infection", "death", "misdiagnosis", "pain",
+]
+
+
+def random_text(rng: random.Random, words, length: int) -> str:
+    return " ".join(rng.choice(words) for _ in range(length))
+
+
+def build_database(url: str, count: int, seed: int = 42):
+    engine = create_engine(url)
+    Base.metadata.create_all(bind=engine)
+    rng = random.Random(seed)
+    with engine.begin() as conn:
+        conn.execute(insert(User.__table__), [{
+            "id": 1, "email": "bench@example.com", "azure_object_id": "bench",
+            "first_name": "Bench", "last_name": "User", "role": "USER", "is_active": True
+        }])
+        conn.execute(insert(Project.__table__), [{
+            "id": 1, "name": "Bench", "device_name": "Device", "owner_id": 1, "status": "DRAFT", "revision": 0
+        }])
+        conn.execute(insert(RiskAnalysis.__table__), [{
+            "id": 1, "project_id": 1, "analyst_id": 1, "revision": 0
+        }])
+        batch = []
+        buckets = []
+        for factor_id in range(1, count + 1):
+            hazard_name = random_text(rng, HAZARD_WORDS, rng.randint(2, 5))
+            harm = random_text(rng, HARM_WORDS, rng.randint(1, 3))
+            batch.append({
+                "id": factor_id, "analysis_id": 1, "lifecycle_stage": "OPERATION",
+                "hazard_name": hazard_name, "hazardous_situation": "-", "sequence_of_events": "-",
+                "harm": harm, "hazard_category": "ELECTRICAL", "severity_score": 3,
+                "probability_score": 3, "risk_score": 9
+            })
+            buckets.extend(bucket_rows(factor_id, hazard_name, harm))
+            if len(batch) == 10_000:
+                conn.execute(insert(RiskFactor.__table__), batch)
+                conn.execute(insert(HazardLSHBucket.__table__), buckets)
+                batch, buckets = [], []
+        if batch:
+            conn.execute(insert(RiskFactor.__table__), batch)
+            conn.execute(insert(HazardLSHBucket.__table__), buckets)
+    return engine
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Hazard similarity lookup benchmark")
+    parser.add_argument("--factors", type=int, default=200_000)
+    parser.add_argument("--queries", type=int, default=50)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        start = time.perf_counter()
+        engine = build_database(f"sqlite:///{os.path.join(directory, 'bench.db')}", args.factors)
+        build_s = time.perf_counter() - start
+
+        db = sessionmaker(bind=engine)()
+        rng = random.Random(7)
+        timings = []
+        found = 0
+        for _ in range(args.queries):
+            hazard_name = random_text(rng, HAZARD_WORDS, 3)
+            harm = random_text(rng, HARM_WORDS, 2)
+            start = time.perf_counter()
+            found += len(find_similar_factors(db, hazard_name, harm, k=10))
+            timings.append((time.perf_counter() - start) * 1000)
+        db.close()
+        engine.dispose()
+
+    timings.sort()
+    print(f"factors:   {args.factors:,}")
+    print(f"build:     {build_s:8.1f} s")
+    print(f"median:    {timings[len(timings) // 2]:8.1f} ms")
+    print(f"p95:       {timings[int(len(timings) * 0.95) - 1]:8.1f} ms")
+    print(f"results:   {found / args.queries:8.1f} per query")
+
+
+if __name__ == "__main__":
+    main()
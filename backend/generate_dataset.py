@@ -0,0 +1,641 @@
+"""
+Synthetic dataset generator for load and scale testing
+
+Builds a SQLite database with the application's schema and realistic volumes:
+users, projects whose owners, member counts and changelog activity follow
+power laws, risk analyses with factors across every lifecycle stage and
+hazard category, and a long chronological changelog history.
+
+Rows are generated in vectorized chunks from a seeded numpy generator (the
+same seed and sizes always give the same database) and written with
+executemany on a raw connection with journaling off and the bulk tables'
+indexes dropped; the indexes, the full-text index and the hazard similarity
+buckets are built once at the end. The "large" preset (about 10M rows) takes
+a few minutes.
+
+Snapshots use the SQLite backup API: --snapshot writes a copy of the finished
+database, --restore copies a snapshot back over --output, which is much
+faster than regenerating before every load test run.
+
+Usage:
+    python generate_dataset.py --output load.db [--preset small|medium|large] [--seed 42]
+        [--users N] [--projects N] [--changelog N] [--in-memory] [--snapshot PATH] [--force]
+        [--skip-search-index] [--skip-similarity-index]
+    python generate_dataset.py --restore PATH --output load.db [--force]
+"""
+
+import argparse
+import os
+import sqlite3
+import time
+from datetime import datetime, timedelta
+from functools import lru_cache
+
+import numpy as np
+from sqlalchemy import create_engine
+from sqlalchemy.pool import StaticPool
+
+from app.database import Base, json_serializer
+from app.models import (
+    ActionType, ChangeLog, ContactType, HazardCategory, HazardLSHBucket, LifecycleStage, Project, ProjectMember,
+    ProjectRole, ProjectStatus, RiskAnalysis, RiskFactor, User, UserRole
+)
+from app.core.changelog_fields import ensure_changelog_field_indexes
+from app.core.minhash import text_band_keys
+from app.core.search import ensure_search_indexes
+
+PRESETS = {
+    "small": {"users": 200, "projects": 300, "changelog": 50_000},
+    "medium": {"users": 2_000, "projects": 5_000, "changelog": 1_000_000},
+    "large": {"users": 20_000, "projects": 30_000, "changelog": 8_000_000},
+}
+
+CHUNK_SIZE = 100_000
+
+# Azure identities of generated user n (ids start at 1), used by benchmarks.load_test to log in
+EMAIL_TEMPLATE = "user{}@synthetic.example"
+OBJECT_ID_TEMPLATE = "synthetic-{:08d}"
+
+# Tables written in bulk: their indexes are dropped during the load and rebuilt after it
+BULK_TABLES = [
+    User.__table__, Project.__table__, ProjectMember.__table__, RiskAnalysis.__table__,
+    RiskFactor.__table__, ChangeLog.__table__, HazardLSHBucket.__table__,
+]
+
+FIRST_NAMES = ["Анна", "Иван", "Мария", "Алексей", "Ольга", "Дмитрий", "Елена", "Сергей",
+               "Anna", "John", "Maria", "Peter", "Laura", "David", "Sofia", "Thomas"]
+LAST_NAMES = ["Иванова", "Петров", "Смирнова", "Кузнецов", "Попова", "Соколов",
+              "Miller", "Schmidt", "Rossi", "Novak", "Berg", "Martin"]
+DEPARTMENTS = ["Quality", "R&D", "Regulatory Affairs", "Clinical", "Production", "Software"]
+POSITIONS = ["Engineer", "Risk Manager", "Physician", "Quality Specialist", "Product Owner", "Auditor"]
+
+DEVICES = [
+    ("Infusion pump", "Class IIb"), ("Patient monitor", "Class IIa"), ("Surgical laser", "Class IIb"),
+    ("Blood glucose meter", "Class IIa"), ("Ultrasound scanner", "Class IIa"), ("Ventilator", "Class IIb"),
+    ("Insulin pen", "Class IIb"), ("ECG recorder", "Class IIa"), ("Dental drill", "Class IIa"),
+    ("Hearing aid", "Class IIa"), ("Wound dressing", "Class I"), ("Defibrillator", "Class III"),
+]
+
+# (hazard, hazardous situation, harm) per category
+HAZARDS = {
+    HazardCategory.ENERGY_FUNCTIONAL: [
+        ("Electric shock", "Patient touches exposed conductor", "Burn injury"),
+        ("Overheating", "Prolonged operation at maximum power", "Thermal injury"),
+        ("Excessive output energy", "Calibration drift of the power stage", "Tissue damage"),
+        ("Loss of power", "Battery depleted during therapy", "Interrupted treatment"),
+        ("Mechanical failure", "Mounting bracket breaks under load", "Laceration"),
+        ("Electromagnetic interference", "Operation next to a mobile transmitter", "Incorrect therapy"),
+    ],
+    HazardCategory.BIOLOGICAL_CHEMICAL: [
+        ("Biocompatibility", "Skin contact with housing material", "Allergic reaction"),
+        ("Microbial contamination", "Insufficient reprocessing between patients", "Infection"),
+        ("Toxic residue", "Cleaning agent left on the applied part", "Chemical burn"),
+        ("Leachables", "Drug contact with tubing plasticizer", "Toxic exposure"),
+        ("Cross-contamination", "Reuse of a single-use component", "Infection"),
+    ],
+    HazardCategory.OPERATIONAL_INFORMATIONAL: [
+        ("Use error", "Wrong dose unit selected on the keypad", "Overdose"),
+        ("Unclear labelling", "Expiry date not legible", "Use of expired device"),
+        ("Alarm not noticed", "Alarm volume set too low in a noisy ward", "Delayed intervention"),
+        ("Inadequate instructions", "Setup step missing from the manual", "Incorrect therapy"),
+        ("Wrong patient", "Results assigned to the wrong record", "Misdiagnosis"),
+    ],
+    HazardCategory.SOFTWARE: [
+        ("Software crash", "Unhandled input during measurement", "Delayed diagnosis"),
+        ("Data loss", "Power failure while saving results", "Misdiagnosis"),
+        ("Calculation error", "Rounding of the dose calculation", "Underdose"),
+        ("Cybersecurity breach", "Unauthorized access over the network", "Privacy violation"),
+        ("Display freeze", "Stale values shown after a communication error", "Incorrect decision"),
+    ],
+}
+COMPONENTS = ["power supply", "main board", "sensor", "display", "battery", "housing", "tubing", "pump motor",
+              "firmware", "user interface", "connector", "cable", "applied part", "alarm system", "network module"]
+SEQUENCES = {
+    LifecycleStage.OPERATION: "Component fails during normal clinical use",
+    LifecycleStage.MAINTENANCE: "Service technician reassembles the device incorrectly",
+    LifecycleStage.STORAGE: "Device stored outside the specified temperature range",
+    LifecycleStage.TRANSPORT: "Package dropped during shipping",
+    LifecycleStage.DISPOSAL: "Device discarded without decontamination",
+}
+CONTROL_MEASURES = [
+    "Design change and verification testing", "Protective earth and double insulation",
+    "Alarm with escalation", "Labelling and user training", "Software input validation",
+    "Biocompatibility testing per ISO 10993", "Periodic maintenance and inspection",
+]
+
+# Relative frequency of changelog actions; every ActionType needs a weight
+ACTION_WEIGHTS = {
+    ActionType.RISK_UPDATED: 40, ActionType.RISK_CREATED: 20, ActionType.PROJECT_UPDATED: 9,
+    ActionType.USER_LOGIN: 10, ActionType.USER_LOGOUT: 2, ActionType.RISK_DELETED: 3,
+    ActionType.RISK_STATUS_CHANGED: 1, ActionType.PROJECT_STATUS_CHANGED: 2, ActionType.PROJECT_CREATED: 1,
+    ActionType.PROJECT_DELETED: 0.1, ActionType.PROJECT_MEMBER_ADDED: 3, ActionType.PROJECT_MEMBER_REMOVED: 1,
+    ActionType.PROJECT_MEMBER_ROLE_CHANGED: 1, ActionType.VERSION_CREATED: 2, ActionType.VERSION_UPDATED: 0.5,
+    ActionType.USER_ADDED: 0.5, ActionType.USER_REMOVED: 0.2, ActionType.USER_ROLE_CHANGED: 0.2,
+    ActionType.USER_PROFILE_UPDATED: 1, ActionType.SYSTEM_BACKUP: 0.1,
+}
+assert set(ACTION_WEIGHTS) == set(ActionType), "every action type needs a weight"
+
+RISK_ACTIONS = {ActionType.RISK_CREATED, ActionType.RISK_UPDATED, ActionType.RISK_DELETED, ActionType.RISK_STATUS_CHANGED}
+USER_AGENTS = [
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0 Safari/537.36",
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 14_4) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.4 Safari/605.1.15",
+    "Mozilla/5.0 (X11; Linux x86_64; rv:125.0) Gecko/20100101 Firefox/125.0",
+]
+
+STAGES = list(LifecycleStage)
+CATEGORIES = list(HazardCategory)
+STAGE_VALUES = [stage.value for stage in STAGES]
+CATEGORY_VALUES = [category.value for category in CATEGORIES]
+STATUSES = list(ProjectStatus)
+ACTIONS = list(ACTION_WEIGHTS)
+
+
+def timestamps(seconds: np.ndarray, origin: datetime) -> list:
+    """DateTime column texts ("YYYY-MM-DD HH:MM:SS", as SQLite stores them) of offsets from `origin`"""
+    moments = np.datetime64(origin, "s") + seconds.astype("timedelta64[s]")
+    return np.char.replace(moments.astype(str), "T", " ").tolist()
+
+
+def power_law_weights(count: int, exponent: float, rng: np.random.Generator) -> np.ndarray:
+    """Zipf-like weights over `count` items in random order (a few items get most of the weight)"""
+    weights = 1.0 / np.arange(1, count + 1) ** exponent
+    rng.shuffle(weights)
+    return weights / weights.sum()
+
+
+def insert(connection: sqlite3.Connection, table, columns, rows):
+    connection.executemany(
+        f"INSERT INTO {table.name} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})", rows
+    )
+
+
+class Progress:
+    def __init__(self, label: str):
+        self.label = label
+        self.started = time.perf_counter()
+
+    def done(self, rows: int):
+        elapsed = time.perf_counter() - self.started
+        print(f"  {self.label}: {rows:,} rows in {elapsed:.1f}s ({rows / max(elapsed, 1e-9):,.0f} rows/s)")
+
+
+class DatasetGenerator:
+    """
+    Generates the dataset into an open SQLite connection
+
+    Args:
+        connection: Target connection (file or :memory:), with the schema created
+        users, projects, changelog: Row counts
+        seed: Random seed; equal seeds and sizes give equal databases
+        end_date: Newest timestamp of the history
+        days: Length of the history
+    """
+
+    def __init__(self, connection: sqlite3.Connection, users: int, projects: int, changelog: int,
+                 seed: int = 42, end_date: datetime = datetime(2025, 6, 30), days: int = 730):
+        self.connection = connection
+        self.user_count = users
+        self.project_count = projects
+        self.changelog_count = changelog
+        self.rng = np.random.default_rng(seed)
+        self.origin = end_date - timedelta(days=days)
+        self.span = days * 86400.0
+        self.rows = 0
+
+    def run(self, similarity_index: bool = True):
+        self.generate_users()
+        self.generate_projects()
+        self.generate_members()
+        self.generate_analyses()
+        self.generate_factors(similarity_index)
+        self.generate_changelog()
+        self.connection.commit()
+        return self.rows
+
+    # Users and projects
+
+    def generate_users(self):
+        progress = Progress("users")
+        rng, n = self.rng, self.user_count
+        # Users join during the first half of the history
+        self.user_created = np.sort(rng.uniform(0, self.span * 0.5, n))
+        first = rng.integers(0, len(FIRST_NAMES), n)
+        last = rng.integers(0, len(LAST_NAMES), n)
+        department = rng.integers(0, len(DEPARTMENTS), n)
+        position = rng.integers(0, len(POSITIONS), n)
+        active = rng.random(n) < 0.97
+        login = rng.uniform(self.span * 0.5, self.span, n)
+        last_login = timestamps(login, self.origin)
+        created = timestamps(self.user_created, self.origin)
+        self.user_names = [f"{FIRST_NAMES[first[i]]} {LAST_NAMES[last[i]]}" for i in range(n)]
+        self.user_emails = [EMAIL_TEMPLATE.format(i + 1) for i in range(n)]
+
+        columns = ["id", "email", "azure_object_id", "first_name", "last_name", "role", "is_active", "is_verified",
+                   "language", "department", "position", "timezone", "email_notifications",
+                   "browser_notifications", "mobile_notifications", "last_login", "created_at"]
+        insert(self.connection, User.__table__, columns, [
+            (
+                i + 1, self.user_emails[i], OBJECT_ID_TEMPLATE.format(i + 1), FIRST_NAMES[first[i]], LAST_NAMES[last[i]],
+                (UserRole.SYS_ADMIN if i % 500 == 0 else UserRole.USER).name, bool(active[i]), True,
+                "ru" if first[i] < 8 else "en", DEPARTMENTS[department[i]], POSITIONS[position[i]], "UTC",
+                True, True, False, last_login[i], created[i],
+            )
+            for i in range(n)
+        ])
+        self.rows += n
+        progress.done(n)
+
+    def generate_projects(self):
+        progress = Progress("projects")
+        rng, n = self.rng, self.project_count
+        # A few users own many projects
+        self.owners = rng.choice(self.user_count, size=n, p=power_law_weights(self.user_count, 0.7, rng))
+        # Projects start during the first 80% of the history, after their owner joined
+        start = np.maximum(rng.uniform(0, self.span * 0.8, n), self.user_created[self.owners])
+        order = np.argsort(start, kind="stable")
+        self.owners, self.project_created = self.owners[order], start[order]
+        self.project_created[0] = 0.0  # the history starts with the first project
+        device = rng.integers(0, len(DEVICES), n)
+        status = rng.integers(0, len(STATUSES), n)
+        progress_pct = rng.integers(0, 101, n)
+        created = timestamps(self.project_created, self.origin)
+        self.project_names = [f"{DEVICES[device[i]][0]} {i + 1}" for i in range(n)]
+
+        columns = ["id", "name", "description", "status", "progress_percentage", "device_name", "device_model",
+                   "device_purpose", "device_classification", "intended_use", "contact_type", "duration",
+                   "invasiveness", "energy_source", "owner_id", "revision", "created_at"]
+        insert(self.connection, Project.__table__, columns, [
+            (
+                i + 1, self.project_names[i], f"Risk management file for {DEVICES[device[i]][0].lower()}",
+                STATUSES[status[i]].name, float(progress_pct[i]), DEVICES[device[i]][0], f"SX-{i + 1:05d}",
+                "Diagnosis and therapy in hospital settings", DEVICES[device[i]][1],
+                "Professional use by trained clinical staff", "no_contact", "temporary", "non_invasive",
+                "electrical", int(self.owners[i]) + 1, 0, created[i],
+            )
+            for i in range(n)
+        ])
+        self.rows += n
+        progress.done(n)
+
+    def generate_members(self):
+        """Power-law roster sizes: most projects have one or two members, a few have dozens"""
+        progress = Progress("project members")
+        rng, n = self.rng, self.project_count
+        cap = max(0, min(200, self.user_count - 1))
+        sizes = np.minimum(rng.zipf(1.8, n), cap)
+        roles = [ProjectRole.DOCTOR.name] * 12 + [ProjectRole.MANAGER.name] * 5 + [ProjectRole.ADMIN.name] * 3
+        # Participants (owner first, then members) per project, flattened for changelog user sampling
+        participants = []
+        self.participant_offsets = np.zeros(n + 1, dtype=np.int64)
+        rows = []
+        member_id = 0
+        created = timestamps(self.project_created, self.origin)
+        for project in range(n):
+            owner = int(self.owners[project])
+            members = [owner]
+            if sizes[project]:
+                candidates = np.unique(rng.integers(0, self.user_count, int(sizes[project]) * 2 + 2))
+                members += [int(user) for user in candidates if user != owner][: sizes[project]]
+            participants.extend(members)
+            self.participant_offsets[project + 1] = len(participants)
+            role_picks = rng.integers(0, len(roles), len(members))
+            for position, user in enumerate(members[1:], start=1):
+                member_id += 1
+                rows.append((member_id, project + 1, user + 1, roles[role_picks[position]], created[project]))
+            if len(rows) >= CHUNK_SIZE:
+                insert(self.connection, ProjectMember.__table__, ["id", "project_id", "user_id", "role", "joined_at"], rows)
+                rows = []
+        insert(self.connection, ProjectMember.__table__, ["id", "project_id", "user_id", "role", "joined_at"], rows)
+        self.participants = np.array(participants, dtype=np.int64)
+        self.rows += member_id
+        progress.done(member_id)
+
+    # Risk analyses and factors
+
+    def generate_analyses(self):
+        progress = Progress("risk analyses")
+        rng, n = self.rng, self.project_count
+        per_project = rng.choice([1, 2, 3], size=n, p=[0.7, 0.2, 0.1])
+        self.analysis_project = np.repeat(np.arange(n), per_project)
+        count = len(self.analysis_project)
+        created = self.project_created[self.analysis_project] + rng.uniform(0, 30 * 86400, count)
+        self.analysis_created = created
+        created = timestamps(created, self.origin)
+        contact = rng.integers(0, len(ContactType), count)
+        contact_types = list(ContactType)
+        insert(self.connection, RiskAnalysis.__table__,
+               ["id", "project_id", "has_body_contact", "contact_type", "analysis_date", "analyst_id", "revision",
+                "created_at"], [
+                   (
+                       a + 1, int(self.analysis_project[a]) + 1, bool(contact[a]), contact_types[contact[a]].name,
+                       created[a], int(self.owners[self.analysis_project[a]]) + 1, 0, created[a],
+                   )
+                   for a in range(count)
+               ])
+        self.rows += count
+        progress.done(count)
+
+    def generate_factors(self, similarity_index: bool):
+        """Log-normal factor counts per analysis (median ~30), every stage and category represented"""
+        progress = Progress("risk factors" + (" and similarity buckets" if similarity_index else ""))
+        rng = self.rng
+        analyses = len(self.analysis_project)
+        counts = np.clip(np.round(rng.lognormal(np.log(30), 0.6, analyses)), 3, 400).astype(np.int64)
+        total = int(counts.sum())
+        self.factor_analysis = np.repeat(np.arange(analyses), counts)
+        # Factor id range of each project's analyses (factor ids follow analysis ids)
+        factor_end = np.cumsum(counts)
+        self.project_factor_start = np.zeros(self.project_count, dtype=np.int64)
+        self.project_factor_count = np.zeros(self.project_count, dtype=np.int64)
+        np.add.at(self.project_factor_count, self.analysis_project, counts)
+        first_analysis = np.searchsorted(self.analysis_project, np.arange(self.project_count))
+        self.project_factor_start = factor_end[first_analysis] - counts[first_analysis]
+
+        self.factor_category = rng.integers(0, len(CATEGORIES), total)
+        self.factor_stage = rng.integers(0, len(STAGES), total)
+        self.factor_hazard = rng.integers(0, 1 << 30, total)  # index into the category's hazards
+        self.factor_component = rng.integers(0, len(COMPONENTS), total)
+        self.factor_severity = rng.choice([1, 2, 3, 4, 5], total, p=[0.15, 0.25, 0.3, 0.2, 0.1])
+        self.factor_probability = rng.choice([1, 2, 3, 4, 5], total, p=[0.3, 0.3, 0.2, 0.15, 0.05])
+        risk = self.factor_severity * self.factor_probability
+        residual = np.where(rng.random(total) < 0.6, np.maximum(1, risk - rng.integers(0, 10, total)), 0)
+        measures = rng.integers(0, len(CONTROL_MEASURES), total)
+        created = timestamps(self.analysis_created[self.factor_analysis] + rng.uniform(0, 90 * 86400, total), self.origin)
+        stage_names = [stage.name for stage in STAGES]
+        category_names = [category.name for category in CATEGORIES]
+        stage_ids, category_ids = self.factor_stage.tolist(), self.factor_category.tolist()
+        analysis_ids, severity, probability = self.factor_analysis.tolist(), self.factor_severity.tolist(), self.factor_probability.tolist()
+        risk, residual, measures = risk.tolist(), residual.tolist(), measures.tolist()
+
+        columns = ["id", "analysis_id", "lifecycle_stage", "hazard_name", "hazardous_situation",
+                   "sequence_of_events", "harm", "hazard_category", "severity_score", "probability_score",
+                   "risk_score", "control_measures", "residual_risk_score", "created_at"]
+        buckets = 0
+        for start in range(0, total, CHUNK_SIZE):
+            rows, bucket_rows = [], []
+            for f in range(start, min(start + CHUNK_SIZE, total)):
+                hazard, situation, harm = self.hazard(f)
+                rows.append((
+                    f + 1, analysis_ids[f] + 1, stage_names[stage_ids[f]], hazard, situation,
+                    SEQUENCES[STAGES[stage_ids[f]]], harm, category_names[category_ids[f]], severity[f],
+                    probability[f], risk[f], CONTROL_MEASURES[measures[f]], residual[f] or None, created[f],
+                ))
+                if similarity_index:
+                    bucket_rows.extend(
+                        (key, band, f + 1) for band, key in enumerate(band_keys(hazard, harm))
+                    )
+            insert(self.connection, RiskFactor.__table__, columns, rows)
+            if bucket_rows:
+                insert(self.connection, HazardLSHBucket.__table__, ["bucket", "band", "risk_factor_id"], bucket_rows)
+                buckets += len(bucket_rows)
+        # Plain lists: the changelog indexes them once per entry
+        for name in ("factor_category", "factor_stage", "factor_hazard", "factor_component",
+                     "factor_severity", "factor_probability"):
+            setattr(self, name, getattr(self, name).tolist())
+        self.rows += total + buckets
+        progress.done(total + buckets)
+
+    def hazard(self, factor: int):
+        """(hazard name, hazardous situation, harm) of a generated factor"""
+        catalog = HAZARDS[CATEGORIES[self.factor_category[factor]]]
+        hazard, situation, harm = catalog[self.factor_hazard[factor] % len(catalog)]
+        return f"{hazard}: {COMPONENTS[self.factor_component[factor]]}", situation, harm
+
+    # Changelog
+
+    def generate_changelog(self):
+        """Chronological history; busy projects (power law) get most of the entries"""
+        progress = Progress("changelog")
+        rng, n = self.rng, self.changelog_count
+        activity = np.cumsum(power_law_weights(self.project_count, 1.0, rng))
+        weights = np.array([ACTION_WEIGHTS[action] for action in ACTIONS], dtype=np.float64)
+        action_p = weights / weights.sum()
+        columns = ["id", "action_type", "action_description", "user_id", "target_type", "target_id",
+                   "target_name", "project_id", "old_values", "new_values", "extra_data", "ip_address",
+                   "user_agent", "created_at"]
+        chunks = max(1, -(-n // CHUNK_SIZE))
+        next_id = 1
+        for chunk in range(chunks):
+            size = min(CHUNK_SIZE, n - chunk * CHUNK_SIZE)
+            # Equal-count chunks of a uniform history cover equal time windows
+            window = self.span / chunks
+            times = np.sort(rng.uniform(chunk * window, (chunk + 1) * window, size))
+            # Only projects created before the entry are eligible, weighted by activity
+            eligible = np.maximum(np.searchsorted(self.project_created, times, side="right"), 1)
+            projects = np.searchsorted(activity, rng.random(size) * activity[eligible - 1], side="right")
+            projects = np.minimum(projects, eligible - 1)
+            offsets = self.participant_offsets[projects]
+            spans = self.participant_offsets[projects + 1] - offsets
+            users = self.participants[offsets + (rng.random(size) * spans).astype(np.int64)]
+            factors = self.project_factor_start[projects] + (
+                rng.random(size) * self.project_factor_count[projects]
+            ).astype(np.int64)
+            actions = rng.choice(len(ACTIONS), size, p=action_p)
+            deltas = rng.integers(1, 5, size)
+            agents = rng.integers(0, len(USER_AGENTS), size)
+
+            rows = list(map(
+                self.changelog_row, range(next_id, next_id + size), [ACTIONS[a] for a in actions.tolist()],
+                projects.tolist(), users.tolist(), factors.tolist(), deltas.tolist(),
+                [USER_AGENTS[a] for a in agents.tolist()], timestamps(times, self.origin),
+            ))
+            insert(self.connection, ChangeLog.__table__, columns, rows)
+            next_id += size
+        self.rows += n
+        progress.done(n)
+
+    def changelog_row(self, entry_id, action, project, user, factor, delta, user_agent, created_at):
+        project_name = self.project_names[project]
+        old_values = new_values = extra = None
+        if action in RISK_ACTIONS:
+            hazard, situation, harm = self.hazard(factor)
+            target = ("risk", factor + 1, hazard)
+            severity, probability = self.factor_severity[factor], self.factor_probability[factor]
+            values = {
+                "hazard_name": hazard, "hazardous_situation": situation, "harm": harm,
+                "lifecycle_stage": STAGE_VALUES[self.factor_stage[factor]],
+                "hazard_category": CATEGORY_VALUES[self.factor_category[factor]],
+                "severity_score": severity, "probability_score": probability, "risk_score": severity * probability,
+            }
+            if action == ActionType.RISK_CREATED:
+                new_values = values
+                description = f"Создан риск '{hazard}' в проекте '{project_name}'"
+            elif action == ActionType.RISK_DELETED:
+                old_values = values
+                description = f"Удален риск '{hazard}' в проекте '{project_name}'"
+            else:
+                old_severity = severity - 1 if severity > 1 else severity + delta
+                old_values = {"severity_score": old_severity, "risk_score": old_severity * probability}
+                new_values = {"severity_score": severity, "risk_score": severity * probability}
+                description = f"Обновлен риск '{hazard}' в проекте '{project_name}'"
+        elif action in (ActionType.USER_LOGIN, ActionType.USER_LOGOUT):
+            target = ("user", user + 1, self.user_names[user])
+            verb = "выполнил вход в систему" if action == ActionType.USER_LOGIN else "вышел из системы"
+            description = f"Пользователь {self.user_names[user]} ({self.user_emails[user]}) {verb}"
+            extra = {"user_email": self.user_emails[user], "user_role": UserRole.USER.value, "login_time": created_at}
+            return (
+                entry_id, action.name, description, user + 1, *target, None, None, None,
+                json_serializer(extra), "10.0.0.1", user_agent, created_at,
+            )
+        elif action in (ActionType.PROJECT_MEMBER_ADDED, ActionType.PROJECT_MEMBER_REMOVED,
+                        ActionType.PROJECT_MEMBER_ROLE_CHANGED):
+            target = ("user", user + 1, self.user_names[user])
+            role = ProjectRole.DOCTOR.value
+            if action == ActionType.PROJECT_MEMBER_ROLE_CHANGED:
+                old_values, new_values = {"role": ProjectRole.DOCTOR.value}, {"role": ProjectRole.MANAGER.value}
+            elif action == ActionType.PROJECT_MEMBER_ADDED:
+                new_values = {"user_id": user + 1, "role": role}
+            else:
+                old_values = {"user_id": user + 1, "role": role}
+            description = f"{ACTION_VERBS[action]} {self.user_names[user]} в проекте '{project_name}'"
+        elif action == ActionType.PROJECT_STATUS_CHANGED:
+            target = ("project", project + 1, project_name)
+            old_status, new_status = STATUSES[delta - 1].value, STATUSES[delta].value
+            old_values, new_values = {"status": old_status}, {"status": new_status}
+            description = f"Изменен статус проекта '{project_name}'"
+        elif action in (ActionType.VERSION_CREATED, ActionType.VERSION_UPDATED):
+            version = f"{delta}.{entry_id % 10}"
+            target = ("version", entry_id, version)
+            new_values = {"version": version}
+            description = f"{ACTION_VERBS[action]} {version} проекта '{project_name}'"
+        else:
+            target = ("project", project + 1, project_name)
+            if action == ActionType.PROJECT_UPDATED:
+                old_values = {"description": "Предыдущая редакция", "progress_percentage": float(delta * 10)}
+                new_values = {"description": "Обновленная редакция", "progress_percentage": float(delta * 20)}
+            description = f"{ACTION_VERBS[action]} '{project_name}'"
+        return (
+            entry_id, action.name, description, user + 1, *target, project + 1,
+            json_serializer(old_values) if old_values is not None else None,
+            json_serializer(new_values) if new_values is not None else None,
+            json_serializer(extra) if extra is not None else None,
+            "10.0.0.1", user_agent, created_at,
+        )
+
+
+ACTION_VERBS = {
+    ActionType.PROJECT_CREATED: "Создан проект",
+    ActionType.PROJECT_UPDATED: "Обновлен проект",
+    ActionType.PROJECT_DELETED: "Удален проект",
+    ActionType.PROJECT_MEMBER_ADDED: "Добавлен участник",
+    ActionType.PROJECT_MEMBER_REMOVED: "Удален участник",
+    ActionType.PROJECT_MEMBER_ROLE_CHANGED: "Изменена роль участника",
+    ActionType.VERSION_CREATED: "Создана версия",
+    ActionType.VERSION_UPDATED: "Обновлена версия",
+    ActionType.USER_ADDED: "Добавлен пользователь в проект",
+    ActionType.USER_REMOVED: "Удален пользователь из проекта",
+    ActionType.USER_ROLE_CHANGED: "Изменена роль пользователя в проекте",
+    ActionType.USER_PROFILE_UPDATED: "Обновлен профиль пользователя в проекте",
+    ActionType.SYSTEM_BACKUP: "Резервное копирование проекта",
+}
+
+
+@lru_cache(maxsize=None)
+def band_keys(hazard_name: str, harm: str):
+    """LSH band keys (generated texts repeat, so each pair is hashed once)"""
+    return text_band_keys(hazard_name, harm)
+
+
+def sqlite_engine(connection: sqlite3.Connection):
+    """SQLAlchemy engine over an existing connection, for the schema and index DDL"""
+    return create_engine("sqlite://", creator=lambda: connection, poolclass=StaticPool)
+
+
+def backup(source: sqlite3.Connection, path: str):
+    """Copy a database to a file with the SQLite backup API"""
+    target = sqlite3.connect(path)
+    try:
+        source.backup(target)
+    finally:
+        target.close()
+
+
+def build(args) -> sqlite3.Connection:
+    connection = sqlite3.connect(":memory:" if args.in_memory else args.output)
+    connection.execute("PRAGMA journal_mode=OFF")
+    connection.execute("PRAGMA synchronous=OFF")
+    connection.execute("PRAGMA cache_size=-262144")  # 256 MB
+    connection.execute("PRAGMA temp_store=MEMORY")
+    engine = sqlite_engine(connection)
+
+    print("Creating schema...")
+    Base.metadata.create_all(bind=engine)
+    for table in BULK_TABLES:
+        for index in table.indexes:
+            index.drop(bind=engine)
+
+    started = time.perf_counter()
+    generator = DatasetGenerator(
+        connection, args.users, args.projects, args.changelog, seed=args.seed, days=args.days
+    )
+    rows = generator.run(similarity_index=not args.skip_similarity_index)
+
+    progress = Progress("indexes")
+    for table in BULK_TABLES:
+        for index in table.indexes:
+            index.create(bind=engine)
+    ensure_changelog_field_indexes(engine)
+    progress.done(rows)
+    if not args.skip_search_index:
+        progress = Progress("full-text index")
+        ensure_search_indexes(engine)
+        progress.done(rows)
+    connection.commit()
+    print(f"Generated {rows:,} rows in {time.perf_counter() - started:.1f}s")
+    return connection
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic dataset for load and scale testing")
+    parser.add_argument("--output", required=True, help="SQLite database file to create")
+    parser.add_argument("--preset", choices=sorted(PRESETS), default="medium", help="dataset size")
+    parser.add_argument("--users", type=int, help="number of users (overrides the preset)")
+    parser.add_argument("--projects", type=int, help="number of projects (overrides the preset)")
+    parser.add_argument("--changelog", type=int, help="number of changelog entries (overrides the preset)")
+    parser.add_argument("--seed", type=int, default=42, help="random seed")
+    parser.add_argument("--days", type=int, default=730, help="length of the generated history in days")
+    parser.add_argument("--in-memory", action="store_true",
+                        help="build in memory and write the file with the backup API (needs RAM for the whole database)")
+    parser.add_argument("--snapshot", help="also write a snapshot copy of the finished database to this file")
+    parser.add_argument("--restore", help="restore this snapshot to --output instead of generating")
+    parser.add_argument("--skip-search-index", action="store_true",
+                        help="do not build the full-text index (the application builds it on first start)")
+    parser.add_argument("--skip-similarity-index", action="store_true", help="do not build the hazard similarity buckets")
+    parser.add_argument("--force", action="store_true", help="overwrite --output if it exists")
+    args = parser.parse_args()
+    for name, value in PRESETS[args.preset].items():
+        if getattr(args, name) is None:
+            setattr(args, name, value)
+
+    if os.path.exists(args.output):
+        if not args.force:
+            parser.error(f"{args.output} exists (use --force to overwrite)")
+        os.remove(args.output)
+
+    if args.restore:
+        started = time.perf_counter()
+        source = sqlite3.connect(f"file:{args.restore}?mode=ro", uri=True)
+        try:
+            backup(source, args.output)
+        finally:
+            source.close()
+        print(f"✅ Restored {args.restore} to {args.output} in {time.perf_counter() - started:.1f}s")
+        return
+
+    print(f"Generating {args.preset} dataset (seed {args.seed}): {args.users:,} users, "
+          f"{args.projects:,} projects, {args.changelog:,} changelog entries -> {args.output}")
+    connection = build(args)
+    try:
+        connection.execute("PRAGMA journal_mode=DELETE")
+        if args.in_memory:
+            backup(connection, args.output)
+        if args.snapshot:
+            backup(connection, args.snapshot)
+            print(f"Snapshot written to {args.snapshot}")
+    finally:
+        connection.close()
+    print(f"✅ Dataset written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+Database migration script adding revision counters and lookup indexes
+This script:
+1. Adds revision column to projects and risk_analyses
+2. Creates indexes on the foreign keys used by risk and membership queries
+"""
+
+from sqlalchemy import inspect, text
+
+from app.database import engine
+
+REVISION_TABLES = ["projects", "risk_analyses"]
+
+INDEXES = {
+    "ix_risk_factors_analysis_id": ("risk_factors", "analysis_id"),
+    "ix_risk_analyses_project_id": ("risk_analyses", "project_id"),
+    "ix_project_members_project_id": ("project_members", "project_id"),
+    "ix_project_members_user_id": ("project_members", "user_id"),
+}
+
+
+def migrate_database():
+    try:
+        inspector = inspect(engine)
+        tables = inspector.get_table_names()
+        
+        print("Starting database migration for revision counters...")
+        
+        with engine.begin() as conn:
+            for table in REVISION_TABLES:
+                if table not in tables:
+                    print(f"Table {table} not found, skipping (it will be created with the column)")
+                    continue
+                columns = [column["name"] for column in inspector.get_columns(table)]
+                if "revision" in columns:
+                    print(f"{table}.revision already exists")
+                    continue
+                print(f"Adding {table}.revision...")
+                conn.execute(text(f"ALTER TABLE {table} ADD COLUMN revision INTEGER NOT NULL DEFAULT 0"))
+            
+            for index_name, (table, column) in INDEXES.items():
+                if table not in tables:
+                    continue
+                existing = [index["name"] for index in inspector.get_indexes(table)]
+                if index_name in existing:
+                    continue
+                print(f"Creating index {index_name}...")
+                conn.execute(text(f"CREATE INDEX {index_name} ON {table} ({column})"))
+        
+        print("✅ Database migration completed successfully!")
+        return True
+        
+    except Exception as e:
+        print(f"❌ Migration failed: {e}")
+        return False
+
+
+if __name__ == "__main__":
+    success = migrate_database()
+    if success:
+        print("\n🎉 Migration completed! You can now restart the backend server.")
+    else:
+        print("\n💥 Migration failed! Please check the errors above.")
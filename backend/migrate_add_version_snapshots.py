@@ -0,0 +1,55 @@
+"""
+Database migration script adding snapshot columns to project versions
+This script:
+1. Adds snapshot_hash, project_revision, factor_count and created_by to project_versions
+The snapshot_blobs table is created by the backend on startup.
+Versions created before this migration have no snapshot.
+"""
+
+from sqlalchemy import inspect, text
+
+from app.database import engine
+
+TABLE = "project_versions"
+
+COLUMNS = {
+    "snapshot_hash": "VARCHAR(64)",
+    "project_revision": "INTEGER",
+    "factor_count": "INTEGER",
+    "created_by": "INTEGER REFERENCES users(id)",
+}
+
+
+def migrate_database():
+    try:
+        inspector = inspect(engine)
+        
+        print("Starting database migration for project version snapshots...")
+        
+        if TABLE not in inspector.get_table_names():
+            print(f"Table {TABLE} not found, skipping (it will be created with the columns)")
+            return True
+        
+        existing = [column["name"] for column in inspector.get_columns(TABLE)]
+        with engine.begin() as conn:
+            for column, column_type in COLUMNS.items():
+                if column in existing:
+                    print(f"{TABLE}.{column} already exists")
+                    continue
+                print(f"Adding {TABLE}.{column}...")
+                conn.execute(text(f"ALTER TABLE {TABLE} ADD COLUMN {column} {column_type}"))
+        
+        print("✅ Database migration completed successfully!")
+        return True
+        
+    except Exception as e:
+        print(f"❌ Migration failed: {e}")
+        return False
+
+
+if __name__ == "__main__":
+    success = migrate_database()
+    if success:
+        print("\n🎉 Migration completed! You can now restart the backend server.")
+    else:
+        print("\n💥 Migration failed! Please check the errors above.")
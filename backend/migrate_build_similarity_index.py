@@ -0,0 +1,40 @@
+"""
+Database migration script building the hazard similarity index
+This script:
+1. Creates the hazard_lsh_buckets table if missing
+2. Adds LSH buckets for risk factors created before the index existed
+New and edited factors are indexed automatically afterwards.
+"""
+
+from app.database import engine, SessionLocal
+from app.models.hazard_similarity import HazardLSHBucket
+from app.core.similarity import backfill_similarity_index
+
+
+def migrate_database():
+    try:
+        print("Starting database migration for the hazard similarity index...")
+
+        HazardLSHBucket.__table__.create(bind=engine, checkfirst=True)
+
+        db = SessionLocal()
+        try:
+            added = backfill_similarity_index(db)
+        finally:
+            db.close()
+        print(f"Indexed {added} risk factors")
+
+        print("✅ Database migration completed successfully!")
+        return True
+
+    except Exception as e:
+        print(f"❌ Migration failed: {e}")
+        return False
+
+
+if __name__ == "__main__":
+    success = migrate_database()
+    if success:
+        print("\n🎉 Migration completed! You can now restart the backend server.")
+    else:
+        print("\n💥 Migration failed! Please check the errors above.")
@@ -0,0 +1,55 @@
+"""
+Database migration script adding changelog search indexes
+This script:
+1. Creates composite (filter column, id) indexes used by changelog search
+2. Creates the created_at index used by date range filters
+The full-text index itself is created by the backend on startup.
+"""
+
+from sqlalchemy import inspect, text
+
+from app.database import engine
+
+TABLE = "changelogs"
+
+INDEXES = {
+    "ix_changelogs_project_id_id": "project_id, id",
+    "ix_changelogs_user_id_id": "user_id, id",
+    "ix_changelogs_action_type_id": "action_type, id",
+    "ix_changelogs_created_at": "created_at",
+}
+
+
+def migrate_database():
+    try:
+        inspector = inspect(engine)
+
+        print("Starting database migration for changelog search indexes...")
+
+        if TABLE not in inspector.get_table_names():
+            print(f"Table {TABLE} not found, skipping (indexes are created with the table)")
+            return True
+
+        existing = [index["name"] for index in inspector.get_indexes(TABLE)]
+        with engine.begin() as conn:
+            for index_name, columns in INDEXES.items():
+                if index_name in existing:
+                    print(f"{index_name} already exists")
+                    continue
+                print(f"Creating index {index_name}...")
+                conn.execute(text(f"CREATE INDEX {index_name} ON {TABLE} ({columns})"))
+
+        print("✅ Database migration completed successfully!")
+        return True
+
+    except Exception as e:
+        print(f"❌ Migration failed: {e}")
+        return False
+
+
+if __name__ == "__main__":
+    success = migrate_database()
+    if success:
+        print("\n🎉 Migration completed! You can now restart the backend server.")
+    else:
+        print("\n💥 Migration failed! Please check the errors above.")
@@ -0,0 +1,114 @@
+"""
+Database migration script moving changelog payloads to native JSON columns
+This script:
+1. Re-encodes old_values / new_values / extra_data as compact JSON objects
+   (Cyrillic kept unescaped, so it is full-text searchable); unreadable values
+   are kept as {"text": ...}
+2. PostgreSQL: converts the three columns from TEXT to JSONB and drops the
+   changelog full-text index, which the backend recreates on startup
+3. Creates the "changes touching field" indexes
+SQLite stores JSON as text, so no column type change is needed there.
+"""
+
+import json
+
+from sqlalchemy import inspect, text
+
+from app.database import engine, json_serializer
+from app.core.changelog_fields import ensure_changelog_field_indexes
+
+TABLE = "changelogs"
+COLUMNS = ["old_values", "new_values", "extra_data"]
+BATCH_SIZE = 1000
+
+
+def normalize_payload(value):
+    """JSON text of a stored payload as a JSON object (None for empty values)"""
+    if value is None or not value.strip():
+        return None
+    try:
+        payload = json.loads(value)
+    except ValueError:
+        return json_serializer({"text": value})
+    # Double-encoded payloads: a JSON string holding the JSON object
+    if isinstance(payload, str):
+        try:
+            payload = json.loads(payload)
+        except ValueError:
+            pass
+    if payload is None:
+        return None
+    if not isinstance(payload, dict):
+        payload = {"value": payload}
+    return json_serializer(payload)
+
+
+def backfill_payloads():
+    columns_sql = ", ".join(COLUMNS)
+    updated = 0
+    last_id = 0
+    while True:
+        with engine.begin() as conn:
+            rows = conn.execute(text(
+                f"SELECT id, {columns_sql} FROM {TABLE} WHERE id > :last_id ORDER BY id LIMIT :limit"
+            ), {"last_id": last_id, "limit": BATCH_SIZE}).all()
+            if not rows:
+                return updated
+            for row in rows:
+                changes = {}
+                for column, value in zip(COLUMNS, row[1:]):
+                    # Already JSONB (migration re-run) comes back decoded
+                    if not isinstance(value, str):
+                        continue
+                    normalized = normalize_payload(value)
+                    if normalized != value:
+                        changes[column] = normalized
+                if changes:
+                    assignments = ", ".join(f"{column} = :{column}" for column in changes)
+                    conn.execute(text(f"UPDATE {TABLE} SET {assignments} WHERE id = :id"), {"id": row[0], **changes})
+                    updated += 1
+            last_id = rows[-1][0]
+
+
+def migrate_database():
+    try:
+        inspector = inspect(engine)
+
+        print("Starting database migration for changelog JSON payloads...")
+
+        if TABLE not in inspector.get_table_names():
+            print(f"Table {TABLE} not found, skipping (it is created with JSON columns)")
+            return True
+
+        print("Re-encoding changelog payloads...")
+        print(f"Updated {backfill_payloads()} changelog entries")
+
+        if engine.dialect.name == "postgresql":
+            column_types = {column["name"]: str(column["type"]).upper() for column in inspector.get_columns(TABLE)}
+            with engine.begin() as conn:
+                for column in COLUMNS:
+                    if column_types.get(column) == "JSONB":
+                        print(f"{column} is already JSONB")
+                        continue
+                    print(f"Converting {column} to JSONB...")
+                    conn.execute(text(f"ALTER TABLE {TABLE} ALTER COLUMN {column} TYPE JSONB USING {column}::jsonb"))
+                # The search index expression now casts the JSONB columns to text
+                conn.execute(text("DROP INDEX IF EXISTS ix_changelogs_search"))
+
+        print("Creating changed-field indexes...")
+        ensure_changelog_field_indexes(engine)
+
+        print("✅ Database migration completed successfully!")
+        return True
+
+    except Exception as e:
+        print(f"❌ Migration failed: {e}")
+        return False
+
+
+if __name__ == "__main__":
+    success = migrate_database()
+    if success:
+        print("\n🎉 Migration completed! You can now restart the backend server.")
+    else:
+        print("\n💥 Migration failed! Please check the errors above.")
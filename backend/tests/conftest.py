@@ -0,0 +1,365 @@
+"""
+Shared test fixtures
+
+The application is imported against a throwaway SQLite database seeded with a
+mid-size dataset: a few dozen users and projects, multi-member rosters,
+risk analyses with realistic factor lists, changelog history, saved versions
+and a generated report. Rate limiting is disabled so that repeated calls are
+never rejected.
+"""
+import difflib
+import json
+import os
+import random
+import shutil
+import tempfile
+
+import pytest
+
+TEST_DATA_DIR = tempfile.mkdtemp(prefix="medical_risk_tests_")
+
+# Settings are read at import time, so they are set before the app is imported
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(TEST_DATA_DIR, 'test.db')}"
+os.environ["RATE_LIMIT_ENABLED"] = "False"
+os.environ["QUERY_DEBUG"] = "False"
+os.environ["CHANGELOG_ARCHIVE_DIR"] = os.path.join(TEST_DATA_DIR, "changelog_archive")
+
+from fastapi.testclient import TestClient  # noqa: E402
+from jose import jwt  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from app.main import app  # noqa: E402
+from app.database import Base, SessionLocal, create_database_engine  # noqa: E402
+from app.core.search import ensure_search_indexes  # noqa: E402
+from app.core.azure_auth_mock import create_local_token  # noqa: E402
+from app.core.reports import shutdown_report_executor  # noqa: E402
+from app.models import (  # noqa: E402
+    User, UserRole, Project, ProjectMember, ProjectRole, ProjectStatus,
+    RiskAnalysis, RiskFactor, LifecycleStage, HazardCategory,
+    ChangeLog, ActionType, ReportJob, ReportStatus
+)
+
+# Dataset size
+USER_COUNT = 40
+PROJECT_COUNT = 25
+FACTORS_PER_ANALYSIS = 30
+CHANGES_PER_PROJECT = 12
+
+HAZARDS = [
+    ("Electric shock", "Contact with exposed conductor", "Burn injury"),
+    ("Overheating", "Prolonged operation at maximum power", "Thermal injury"),
+    ("Software crash", "Unhandled input during measurement", "Delayed diagnosis"),
+    ("Biocompatibility", "Skin contact with housing material", "Allergic reaction"),
+    ("Data loss", "Power failure while saving results", "Misdiagnosis"),
+    ("Mechanical failure", "Broken mounting bracket", "Laceration"),
+]
+
+
+class Dataset:
+    """Ids of seeded records the tests refer to"""
+
+    def __init__(self):
+        self.admin_id = None  # sys admin
+        self.owner_id = None  # owns every other project
+        self.member_id = None  # doctor in the owner's projects
+        self.project_id = None  # owner's project with two analyses and versions
+        self.analysis_ids = []  # of project_id, oldest first
+        self.factor_id = None
+        self.changelog_id = None
+        self.report_job_id = None
+        self.version_id = None
+        self.spare_user_id = None  # in no project, for account changes
+        self.headers = {}  # "admin" / "owner" / "member" -> Authorization header
+
+
+def auth_header(user: User) -> dict:
+    token = create_local_token({"email": user.email, "object_id": user.azure_object_id})
+    return {"Authorization": f"Bearer {token}"}
+
+
+def make_factor(analysis_id: int, rnd: random.Random, index: int) -> RiskFactor:
+    hazard, situation, harm = HAZARDS[index % len(HAZARDS)]
+    severity, probability = rnd.randint(1, 5), rnd.randint(1, 5)
+    return RiskFactor(
+        analysis_id=analysis_id,
+        lifecycle_stage=rnd.choice(list(LifecycleStage)),
+        hazard_name=f"{hazard} {index}",
+        hazardous_situation=situation,
+        sequence_of_events="Component failure during normal use",
+        harm=harm,
+        hazard_category=rnd.choice(list(HazardCategory)),
+        severity_score=severity,
+        probability_score=probability,
+        risk_score=severity * probability,
+        control_measures="Insulation, thermal cut-off and user training",
+    )
+
+
+def seed_dataset(db, rnd: random.Random) -> Dataset:
+    data = Dataset()
+    users = [
+        User(
+            email=f"user{index}@example.com",
+            azure_object_id=f"oid-{index}",
+            first_name=f"First{index}",
+            last_name=f"Last{index}",
+            role=UserRole.SYS_ADMIN if index == 0 else UserRole.USER,
+            department="Quality" if index % 2 else "R&D",
+        )
+        for index in range(USER_COUNT)
+    ]
+    db.add_all(users)
+    db.commit()
+    admin, owner, member = users[0], users[1], users[2]
+    data.admin_id, data.owner_id, data.member_id = admin.id, owner.id, member.id
+    data.spare_user_id = users[-1].id
+
+    for index in range(PROJECT_COUNT):
+        project_owner = owner if index % 3 else rnd.choice(users[3:-1])
+        project = Project(
+            name=f"Project {index}",
+            description="Infusion pump risk management file",
+            device_name=f"Device {index}",
+            device_model=f"M-{index}",
+            status=rnd.choice(list(ProjectStatus)),
+            owner_id=project_owner.id,
+        )
+        db.add(project)
+        db.commit()
+
+        # Roster sizes vary a lot, like in real portfolios
+        roster = {member.id} if project_owner.id == owner.id else set()
+        roster.update(user.id for user in rnd.sample(users[3:-1], rnd.choice([1, 2, 3, 5, 8])))
+        roster.discard(project_owner.id)
+        db.add_all([
+            ProjectMember(project_id=project.id, user_id=user_id, role=rnd.choice(list(ProjectRole)))
+            for user_id in sorted(roster)
+        ])
+        if member.id in roster:
+            db.query(ProjectMember).filter(
+                ProjectMember.project_id == project.id, ProjectMember.user_id == member.id
+            ).update({"role": ProjectRole.DOCTOR})
+
+        analyses = 2 if data.project_id is None and project_owner.id == owner.id else 1
+        for _ in range(analyses):
+            analysis = RiskAnalysis(project_id=project.id, analyst_id=project_owner.id)
+            db.add(analysis)
+            db.commit()
+            db.add_all([make_factor(analysis.id, rnd, factor) for factor in range(FACTORS_PER_ANALYSIS)])
+            if analyses == 2:
+                data.analysis_ids.append(analysis.id)
+        if analyses == 2:
+            data.project_id = project.id
+
+        db.add_all([
+            ChangeLog(
+                action_type=rnd.choice([ActionType.PROJECT_UPDATED, ActionType.RISK_UPDATED, ActionType.RISK_CREATED]),
+                action_description=f"Change {change} of {project.name}",
+                user_id=project_owner.id,
+                project_id=project.id,
+                target_type="project",
+                target_id=project.id,
+                target_name=project.name,
+                old_values={"description": "Before", "status": "draft"},
+                new_values={"description": "After", "status": "in_progress"},
+            )
+            for change in range(CHANGES_PER_PROJECT)
+        ])
+        db.commit()
+
+    data.factor_id = db.query(RiskFactor.id).filter(
+        RiskFactor.analysis_id == data.analysis_ids[-1]
+    ).order_by(RiskFactor.id).limit(1).scalar()
+    data.changelog_id = db.query(ChangeLog.id).filter(
+        ChangeLog.project_id == data.project_id
+    ).order_by(ChangeLog.id).limit(1).scalar()
+
+    html = b"<html><body>Risk management report</body></html>"
+    job = ReportJob(
+        project_id=data.project_id,
+        project_revision=db.get(Project, data.project_id).revision,
+        report_format="html",
+        status=ReportStatus.COMPLETED,
+        requested_by=owner.id,
+        content=html,
+        content_size=len(html),
+    )
+    db.add(job)
+    db.commit()
+    data.report_job_id = job.id
+
+    data.headers = {"admin": auth_header(admin), "owner": auth_header(owner), "member": auth_header(member)}
+    return data
+
+
+@pytest.fixture(scope="session")
+def client():
+    with TestClient(app) as test_client:
+        yield test_client
+    shutdown_report_executor()
+    shutil.rmtree(TEST_DATA_DIR, ignore_errors=True)
+
+
+@pytest.fixture(scope="session")
+def dataset(client) -> Dataset:
+    db = SessionLocal()
+    try:
+        data = seed_dataset(db, random.Random(2024))
+    finally:
+        db.close()
+
+    # Saved versions go through the API, which builds their snapshots
+    for version in ("1.0", "1.1"):
+        response = client.post(
+            f"/api/projects/{data.project_id}/versions",
+            json={"version": version, "description": f"Release {version}"},
+            headers=data.headers["owner"],
+        )
+        assert response.status_code == 200, response.text
+        data.version_id = response.json()["id"]
+    return data
+
+
+def azure_token(email: str, object_id: str) -> str:
+    """Unsigned Azure-style ID token, accepted by the mock Azure verification"""
+    return jwt.encode(
+        {"email": email, "oid": object_id, "given_name": "Azure", "family_name": "User"},
+        "not-verified",
+        algorithm="HS256",
+    )
+
+
+@pytest.fixture
+def temp_db(request, tmp_path):
+    """
+    Session on an empty SQLite database with the application's schema
+
+    Parametrize indirectly with options to prepare more of it:
+    {"search_indexes": True} also creates the full-text indexes.
+    """
+    options = getattr(request, "param", {})
+    engine = create_database_engine(f"sqlite:///{tmp_path / 'temp.db'}")
+    Base.metadata.create_all(bind=engine)
+    if options.get("search_indexes"):
+        ensure_search_indexes(engine)
+    session = sessionmaker(autoflush=False, bind=engine)()
+    yield session
+    session.close()
+    engine.dispose()
+
+
+# Query and latency budgets (tests/test_query_budgets.py)
+
+BUDGETS_PATH = os.path.join(os.path.dirname(__file__), "query_budgets.json")
+# A latency budget is exceeded above baseline * tolerance + slack: timings vary
+# between machines and runs, statement counts do not
+LATENCY_SLACK_MS = 25.0
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("query budgets")
+    group.addoption(
+        "--update-query-budgets", action="store_true", default=False,
+        help="Record the measured statement counts and latencies as the new baseline"
+    )
+    group.addoption(
+        "--check-latency", action="store_true", default=False,
+        help="Also fail on latencies over budget (statement counts are always checked)"
+    )
+    group.addoption(
+        "--latency-tolerance", type=float, default=3.0,
+        help="Allowed latency as a multiple of the baseline (default: 3.0)"
+    )
+
+
+class QueryBudgets:
+    """Baseline budgets per endpoint and the measurements of this run"""
+
+    def __init__(self, path: str, update: bool, latency_tolerance: float, check_latency: bool = False):
+        self.path = path
+        self.update = update
+        self.latency_tolerance = latency_tolerance
+        self.check_latency = check_latency
+        self.baseline = {}
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                self.baseline = json.load(f)
+        self.measured = {}
+
+    def latency_limit(self, budget: dict) -> float:
+        return budget["latency_ms"] * self.latency_tolerance + LATENCY_SLACK_MS
+
+    def violations(self, key: str) -> list:
+        """Exceeded budgets of an endpoint (a missing budget counts as exceeded)"""
+        budget, measured = self.baseline.get(key), self.measured[key]
+        if budget is None:
+            return ["no budget recorded (run pytest with --update-query-budgets)"]
+        problems = []
+        if measured["queries"] > budget["queries"]:
+            problems.append(f"{measured['queries']} SQL statements, budget {budget['queries']}")
+        if self.check_latency and measured["latency_ms"] > self.latency_limit(budget):
+            problems.append(
+                f"{measured['latency_ms']:.1f} ms, budget {budget['latency_ms']:.1f} ms "
+                f"(limit {self.latency_limit(budget):.1f} ms)"
+            )
+        return problems
+
+    def proposed(self) -> dict:
+        """Baseline with this run's measurements: all of them when updating, otherwise only the exceeded budgets"""
+        budgets = dict(self.baseline)
+        for key, measured in self.measured.items():
+            if self.update or self.violations(key):
+                budgets[key] = measured
+        return dict(sorted(budgets.items()))
+
+    @staticmethod
+    def dumps(budgets: dict) -> str:
+        return json.dumps(budgets, indent=2, ensure_ascii=False) + "\n"
+
+    def diff(self, keys=None) -> str:
+        """Unified diff from the baseline to the proposed budgets (optionally of some endpoints only)"""
+        old, new = self.baseline, self.proposed()
+        if keys is not None:
+            old = {key: old[key] for key in keys if key in old}
+            new = {key: new[key] for key in keys if key in new}
+        return "".join(difflib.unified_diff(
+            self.dumps(old).splitlines(keepends=True),
+            self.dumps(new).splitlines(keepends=True),
+            fromfile="query_budgets.json (baseline)",
+            tofile="query_budgets.json (measured)",
+        ))
+
+    def save(self):
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.write(self.dumps(self.proposed()))
+
+
+QUERY_BUDGETS_KEY = pytest.StashKey[QueryBudgets]()
+
+
+@pytest.fixture(scope="session")
+def query_budgets(request) -> QueryBudgets:
+    budgets = QueryBudgets(
+        BUDGETS_PATH,
+        update=request.config.getoption("--update-query-budgets"),
+        latency_tolerance=request.config.getoption("--latency-tolerance"),
+        check_latency=request.config.getoption("--check-latency"),
+    )
+    request.config.stash[QUERY_BUDGETS_KEY] = budgets
+    yield budgets
+    if budgets.update and budgets.measured:
+        budgets.save()
+
+
+def pytest_terminal_summary(terminalreporter, exitstatus, config):
+    budgets = config.stash.get(QUERY_BUDGETS_KEY, None)
+    if budgets is None or not budgets.measured:
+        return
+    diff = budgets.diff()
+    if budgets.update:
+        terminalreporter.section("query budgets updated")
+        terminalreporter.write_line(f"{len(budgets.measured)} endpoint budgets written to {budgets.path}")
+    elif diff:
+        terminalreporter.section("query budgets exceeded")
+    if diff:
+        terminalreporter.write(diff)
@@ -0,0 +1,52 @@
+"""
+Loaded factor arrays line up with the factors they were read from
+"""
+import random
+
+import numpy as np
+
+from app.core.analytics import CATEGORIES, STAGES, load_factor_arrays
+from app.models import Project, RiskAnalysis, RiskFactor, User
+
+from conftest import make_factor
+
+
+def test_loaded_columns_belong_to_the_same_factor(temp_db):
+    user = User(email="user@example.com", first_name="U", last_name="U")
+    temp_db.add(user)
+    temp_db.flush()
+    rnd = random.Random(7)
+    analysis_ids = []
+    for index in range(3):
+        project = Project(name=f"Project {index}", device_name="Pump", owner_id=user.id)
+        temp_db.add(project)
+        temp_db.flush()
+        analysis = RiskAnalysis(project_id=project.id, analyst_id=user.id)
+        temp_db.add(analysis)
+        temp_db.flush()
+        factors = [make_factor(analysis.id, rnd, factor) for factor in range(40)]
+        for factor in factors[::3]:
+            factor.residual_risk_score = rnd.randint(1, factor.risk_score)
+        temp_db.add_all(factors)
+        analysis_ids.append(analysis.id)
+    temp_db.commit()
+
+    arrays = load_factor_arrays(temp_db, analysis_ids[:2])
+    factors = temp_db.query(RiskFactor, RiskAnalysis.project_id).join(RiskAnalysis).filter(
+        RiskFactor.analysis_id.in_(analysis_ids[:2])
+    ).all()
+    assert sorted(arrays.ids.tolist()) == sorted(factor.id for factor, _ in factors)
+    rows = {int(factor_id): index for index, factor_id in enumerate(arrays.ids)}
+    for factor, project_id in factors:
+        row = rows[factor.id]
+        assert arrays.project_ids[row] == project_id
+        assert (arrays.severity[row], arrays.probability[row], arrays.risk[row]) == (
+            factor.severity_score, factor.probability_score, factor.risk_score
+        )
+        if factor.residual_risk_score is None:
+            assert np.isnan(arrays.residual[row])
+        else:
+            assert arrays.residual[row] == factor.residual_risk_score
+        assert CATEGORIES[arrays.category[row]] == factor.hazard_category
+        assert STAGES[arrays.stage[row]] == factor.lifecycle_stage
+    assert len(load_factor_arrays(temp_db, [])) == 0
@@ -0,0 +1,121 @@
+"""
+Batch transactions: rollback of atomic and non-atomic batches, and no cache
+entries computed from rows a rollback discards
+"""
+import pytest
+
+from app.database import SessionLocal
+from app.models import ChangeLog, Project, RiskAnalysis, RiskFactor
+from app.models.hazard_similarity import HazardLSHBucket
+
+FACTOR = {
+    "lifecycle_stage": "operation",
+    "hazard_name": "Electric shock from damaged cable",
+    "hazardous_situation": "Operator touches exposed conductor",
+    "sequence_of_events": "Cable insulation wears through",
+    "harm": "Burn injury",
+    "hazard_category": "energy_functional",
+    "probability_score": 1,
+}
+
+
+@pytest.fixture
+def analysis(dataset):
+    """Empty analysis of a new project of the owner, removed again so the query budgets see the seeded dataset"""
+    db = SessionLocal()
+    try:
+        project = Project(name="Batch project", device_name="Batch device", owner_id=dataset.owner_id)
+        db.add(project)
+        db.commit()
+        analysis = RiskAnalysis(project_id=project.id, analyst_id=dataset.owner_id)
+        db.add(analysis)
+        db.commit()
+        project_id, analysis_id = project.id, analysis.id
+        yield {"project_id": project_id, "analysis_id": analysis_id}
+
+        factor_ids = db.query(RiskFactor.id).filter(RiskFactor.analysis_id == analysis_id)
+        db.query(HazardLSHBucket).filter(HazardLSHBucket.risk_factor_id.in_(factor_ids)).delete(synchronize_session=False)
+        db.query(RiskFactor).filter(RiskFactor.analysis_id == analysis_id).delete(synchronize_session=False)
+        db.query(ChangeLog).filter(ChangeLog.project_id == project_id).delete(synchronize_session=False)
+        db.query(RiskAnalysis).filter(RiskAnalysis.id == analysis_id).delete(synchronize_session=False)
+        db.query(Project).filter(Project.id == project_id).delete(synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+
+
+def factor_severities(analysis_id: int) -> list:
+    db = SessionLocal()
+    try:
+        return sorted(
+            severity for (severity,) in db.query(RiskFactor.severity_score).filter(RiskFactor.analysis_id == analysis_id)
+        )
+    finally:
+        db.close()
+
+
+def add_factor_operation(analysis: dict, severity: int) -> dict:
+    return {
+        "method": "POST", "path": f"/api/risk-analyses/{analysis['analysis_id']}/factors",
+        "body": {**FACTOR, "severity_score": severity},
+    }
+
+
+def run_batch(client, dataset, operations, atomic=True) -> dict:
+    response = client.post(
+        "/api/batch", json={"operations": operations, "atomic": atomic}, headers=dataset.headers["owner"]
+    )
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_atomic_batch_rolls_back_committed_operations(client, dataset, analysis):
+    # Handlers commit after each operation; on SQLite this only holds if the
+    # batch opened the transaction itself (pysqlite defers BEGIN)
+    result = run_batch(client, dataset, [
+        add_factor_operation(analysis, 5),
+        {"method": "GET", "path": "/api/projects/999999"},
+        add_factor_operation(analysis, 4),
+    ])
+    assert result["committed"] is False
+    assert [item["status"] for item in result["results"]] == [200, 404, 424]
+    assert factor_severities(analysis["analysis_id"]) == []
+
+
+def test_non_atomic_batch_rolls_back_only_the_failed_operation(client, dataset, analysis):
+    result = run_batch(client, dataset, [
+        add_factor_operation(analysis, 5),
+        {"method": "DELETE", "path": "/api/risk-analyses/factors/999999"},
+        add_factor_operation(analysis, 4),
+    ], atomic=False)
+    assert result["committed"] is True
+    assert [item["status"] for item in result["results"]] == [200, 404, 200]
+    assert factor_severities(analysis["analysis_id"]) == [4, 5]
+
+
+def test_rolled_back_batch_leaves_no_cached_matrix(client, dataset, analysis):
+    matrix_url = f"/api/risk-analyses/project/{analysis['project_id']}/matrix"
+    result = run_batch(client, dataset, [
+        add_factor_operation(analysis, 5),
+        {"method": "GET", "path": matrix_url},
+        {"method": "GET", "path": "/api/projects/999999"},
+    ])
+    assert result["committed"] is False
+    assert result["results"][1]["body"]["matrix"][4][0] == 1
+
+    # The rollback hands the batch's analysis revision out again
+    response = client.post(
+        f"/api/risk-analyses/{analysis['analysis_id']}/factors",
+        json={**FACTOR, "severity_score": 2}, headers=dataset.headers["owner"],
+    )
+    assert response.status_code == 200, response.text
+    matrix = client.get(matrix_url, headers=dataset.headers["owner"]).json()["matrix"]
+    assert (matrix[1][0], matrix[4][0]) == (1, 0)
+
+
+def test_report_jobs_are_not_available_in_batches(client, dataset, analysis):
+    result = run_batch(client, dataset, [
+        {"method": "POST", "path": f"/api/reports/project/{analysis['project_id']}"},
+    ])
+    assert result["results"][0]["status"] == 400
+    assert result["committed"] is False
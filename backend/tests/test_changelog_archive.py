@@ -0,0 +1,144 @@
+"""
+Changelog archival: entries moved to archive files are found by id and by
+the changelog search, and a failed batch leaves no files behind
+"""
+import os
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.core import changelog_archive
+from app.core.changelog_archive import ArchiveFilter, archive_changelog, find_archived_entry, search_archived_entries
+from app.core.config import settings
+from app.database import SessionLocal
+from app.models import ActionType, ChangeLog, Project, User
+from app.models.changelog_archive import ChangeLogArchiveSegment
+
+NOW = datetime.utcnow().replace(microsecond=0)
+CUTOFF = NOW - timedelta(days=365)
+
+
+def add_entries(db, project: Project, ages_in_days: list) -> list:
+    """Changelog entries of the project created the given number of days ago, oldest first"""
+    entries = [
+        ChangeLog(
+            action_type=ActionType.RISK_UPDATED,
+            action_description=f"Severity of overheating changed ({age} days ago)",
+            user_id=project.owner_id,
+            project_id=project.id,
+            target_type="risk_factor",
+            target_id=index,
+            target_name="Overheating",
+            old_values={"severity_score": 3},
+            new_values={"severity_score": 4},
+            created_at=NOW - timedelta(days=age),
+        )
+        for index, age in enumerate(ages_in_days)
+    ]
+    db.add_all(entries)
+    db.commit()
+    return [entry.id for entry in entries]
+
+
+def archive_files(archive_dir: str) -> list:
+    return sorted(
+        os.path.relpath(os.path.join(root, name), archive_dir)
+        for root, _, names in os.walk(archive_dir) for name in names
+    )
+
+
+@pytest.fixture
+def archive_dir(tmp_path) -> str:
+    return str(tmp_path / "archive")
+
+
+@pytest.fixture
+def project(temp_db) -> Project:
+    user = User(email="archivist@example.com", first_name="A", last_name="A")
+    temp_db.add(user)
+    temp_db.flush()
+    project = Project(name="Archived pump", device_name="Infusion pump", owner_id=user.id)
+    temp_db.add(project)
+    temp_db.commit()
+    return project
+
+
+def test_archived_entries_round_trip(temp_db, project, archive_dir):
+    old_ids = add_entries(temp_db, project, [800, 700, 600, 500])
+    [recent_id] = add_entries(temp_db, project, [10])
+
+    assert archive_changelog(temp_db, CUTOFF, archive_dir=archive_dir, batch_size=3) == 4
+    assert [entry_id for (entry_id,) in temp_db.query(ChangeLog.id)] == [recent_id]
+    segments = temp_db.query(ChangeLogArchiveSegment).order_by(ChangeLogArchiveSegment.min_id).all()
+    assert sum(segment.entry_count for segment in segments) == 4
+    assert len(archive_files(archive_dir)) == 2 * len(segments)
+
+    entry = find_archived_entry(temp_db, old_ids[1], archive_dir=archive_dir)
+    assert entry["id"] == old_ids[1]
+    assert entry["action_type"] == ActionType.RISK_UPDATED
+    assert entry["created_at"] == NOW - timedelta(days=700)
+    assert (entry["old_values"], entry["new_values"]) == ({"severity_score": 3}, {"severity_score": 4})
+    assert find_archived_entry(temp_db, recent_id, archive_dir=archive_dir) is None
+
+    found = search_archived_entries(
+        temp_db, ArchiveFilter("overheating", [project.id]), before_id=old_ids[3], limit=2, archive_dir=archive_dir
+    )
+    assert [entry["id"] for entry in found] == [old_ids[2], old_ids[1]]
+    # A second run finds nothing left to archive
+    assert archive_changelog(temp_db, CUTOFF, archive_dir=archive_dir) == 0
+
+
+def test_failed_commit_removes_segment_files(temp_db, project, archive_dir, monkeypatch):
+    old_ids = add_entries(temp_db, project, [800, 700])
+
+    def fail_commit():
+        raise RuntimeError("database is locked")
+
+    monkeypatch.setattr(temp_db, "commit", fail_commit)
+    with pytest.raises(RuntimeError):
+        archive_changelog(temp_db, CUTOFF, archive_dir=archive_dir)
+    monkeypatch.undo()
+
+    assert archive_files(archive_dir) == []
+    assert sorted(entry_id for (entry_id,) in temp_db.query(ChangeLog.id)) == old_ids
+    assert temp_db.query(ChangeLogArchiveSegment).count() == 0
+
+
+@pytest.fixture
+def archived_project(dataset):
+    """Owner's project with archived and live changelog entries, removed again with its archive files"""
+    db = SessionLocal()
+    try:
+        project = Project(name="Archive project", device_name="Archive device", owner_id=dataset.owner_id)
+        db.add(project)
+        db.commit()
+        old_ids = add_entries(db, project, [900, 800, 700])
+        live_ids = add_entries(db, project, [5, 1])
+        assert archive_changelog(db, CUTOFF) == 3
+        yield {"project_id": project.id, "old_ids": old_ids, "live_ids": live_ids}
+
+        segments = db.query(ChangeLogArchiveSegment).all()
+        changelog_archive._remove_segment_files(settings.changelog_archive_dir, [segment.path for segment in segments])
+        db.query(ChangeLogArchiveSegment).delete(synchronize_session=False)
+        db.query(ChangeLog).filter(ChangeLog.project_id == project.id).delete(synchronize_session=False)
+        db.query(Project).filter(Project.id == project.id).delete(synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+
+
+def test_changelog_search_merges_archived_entries(client, dataset, archived_project):
+    params = {"project_id": archived_project["project_id"], "q": "overheating", "limit": 3}
+    page = client.get("/api/changelog/search", params=params, headers=dataset.headers["owner"]).json()
+    live_ids, old_ids = archived_project["live_ids"], archived_project["old_ids"]
+    assert [item["id"] for item in page["changelogs"]] == [live_ids[1], live_ids[0], old_ids[2]]
+    assert page["changelogs"][2]["user_name"] == "First1 Last1"
+
+    response = client.get(
+        "/api/changelog/search", params={**params, "cursor": page["next_cursor"]}, headers=dataset.headers["owner"]
+    )
+    assert [item["id"] for item in response.json()["changelogs"]] == [old_ids[1], old_ids[0]]
+
+    detail = client.get(f"/api/changelog/{old_ids[0]}", headers=dataset.headers["owner"])
+    assert detail.status_code == 200, detail.text
+    assert detail.json()["new_values"] == {"severity_score": 4}
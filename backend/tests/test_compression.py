@@ -0,0 +1,60 @@
+"""
+Which compressed bodies are cached, and the byte bound of the cache
+"""
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import HTMLResponse, JSONResponse
+from fastapi.testclient import TestClient
+
+from app.core.compression import CompressedBodyCache, CompressionMiddleware
+
+BODY = "risk factor " * 200
+
+
+@pytest.fixture
+def compressed():
+    app = FastAPI()
+
+    @app.get("/api/factors")
+    def factors():
+        return JSONResponse([BODY])
+
+    @app.get("/api/tagged/{name}")
+    def tagged(name: str):
+        return JSONResponse([name, BODY], headers={"ETag": '"v1"'})
+
+    @app.get("/admin")
+    def admin():
+        return HTMLResponse(BODY)
+
+    middleware = CompressionMiddleware(app, cached_prefixes=("/admin",))
+    with TestClient(middleware) as client:
+        yield client, middleware.cache
+
+
+def test_only_etag_and_cached_routes_are_cached(compressed):
+    client, cache = compressed
+    for path in ("/api/factors", "/api/factors", "/admin", "/admin"):
+        response = client.get(path, headers={"Accept-Encoding": "gzip"})
+        assert response.headers["Content-Encoding"] == "gzip"
+    assert [key[0] for key in cache._entries] == ["/admin"]
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_same_etag_on_different_paths_is_not_shared(compressed):
+    client, cache = compressed
+    first = client.get("/api/tagged/first", headers={"Accept-Encoding": "gzip"})
+    second = client.get("/api/tagged/second", headers={"Accept-Encoding": "gzip"})
+    assert (first.json()[0], second.json()[0]) == ("first", "second")
+    assert len(cache._entries) == 2
+
+
+def test_cache_is_bounded_by_bytes():
+    cache = CompressedBodyCache(max_bytes=10)
+    cache.put(("/a", "1", "gzip", 6), b"12345")
+    cache.put(("/b", "1", "gzip", 6), b"123456")
+    assert cache.get(("/a", "1", "gzip", 6)) is None
+    assert cache.size == 6
+    cache.put(("/c", "1", "gzip", 6), b"x" * 11)
+    assert cache.get(("/c", "1", "gzip", 6)) is None
+    assert cache.get(("/b", "1", "gzip", 6)) == b"123456"
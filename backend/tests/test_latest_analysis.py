@@ -0,0 +1,37 @@
+"""
+One definition of a project's latest analysis for pages and portfolio queries
+"""
+from datetime import datetime
+
+import pytest
+
+from app.models import Project, RiskAnalysis, User, UserRole
+from app.models.risk_analysis import LATEST_ANALYSIS_ORDER
+from app.routers.risk_analyses import get_latest_analysis_ids
+
+
+def test_portfolio_and_project_pages_pick_the_same_analysis(temp_db):
+    admin = User(email="admin@example.com", first_name="A", last_name="A", role=UserRole.SYS_ADMIN)
+    temp_db.add(admin)
+    temp_db.flush()
+    backdated, tied = (Project(name=name, device_name="Pump", owner_id=admin.id) for name in ("Backdated", "Tied"))
+    temp_db.add_all([backdated, tied])
+    temp_db.flush()
+    # A later id created earlier (e.g. an imported analysis), and two analyses created at the same time
+    temp_db.add_all([
+        RiskAnalysis(project_id=backdated.id, analyst_id=admin.id, created_at=datetime(2025, 3, 1)),
+        RiskAnalysis(project_id=backdated.id, analyst_id=admin.id, created_at=datetime(2025, 1, 1)),
+        RiskAnalysis(project_id=tied.id, analyst_id=admin.id, created_at=datetime(2025, 2, 1)),
+        RiskAnalysis(project_id=tied.id, analyst_id=admin.id, created_at=datetime(2025, 2, 1)),
+    ])
+    temp_db.commit()
+
+    per_project = {
+        project.id: temp_db.query(RiskAnalysis.id).filter(
+            RiskAnalysis.project_id == project.id
+        ).order_by(*LATEST_ANALYSIS_ORDER).first()[0]
+        for project in (backdated, tied)
+    }
+    assert per_project == {backdated.id: 1, tied.id: 4}
+    assert sorted(get_latest_analysis_ids(temp_db, admin)) == sorted(per_project.values())
+    assert get_latest_analysis_ids(temp_db, admin, [backdated.id]) == [1]
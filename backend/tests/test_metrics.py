@@ -0,0 +1,26 @@
+"""
+Engine instrumentation keeps recording after the pool is replaced
+"""
+from sqlalchemy import text
+
+from app.core import metrics
+from app.database import create_database_engine
+
+
+def checkout_count() -> int:
+    series = metrics.DB_POOL_CHECKOUT_WAIT._series.get(())
+    return series[2] if series else 0
+
+
+def test_pool_checkout_wait_survives_dispose(tmp_path):
+    engine = create_database_engine(f"sqlite:///{tmp_path / 'metrics.db'}")
+    metrics.instrument_engine(engine)
+    try:
+        for _ in range(2):
+            before = checkout_count()
+            with engine.connect() as connection:
+                connection.execute(text("SELECT 1"))
+            assert checkout_count() == before + 1
+            engine.dispose()  # recreates the pool
+    finally:
+        engine.dispose()
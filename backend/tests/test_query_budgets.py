@@ -0,0 +1,365 @@
+"""
+SQL statement and latency budgets per endpoint
+
+Every route of the API (app/routers/*.py, admin_auth.py and the app's own
+endpoints) is called through the test client against the seeded dataset.
+Each call is repeated RUNS times; the largest statement count (cold caches
+included) and the median latency are compared with the checked-in baseline in
+tests/query_budgets.json. More statements than the baseline fail the test with
+a diff of the baseline; the same diff for the whole run is printed at the end.
+Latencies depend on the machine, so they are only checked with --check-latency:
+then a latency above baseline * --latency-tolerance plus a fixed slack fails too.
+
+Record a new baseline after an intended change with:
+
+    python -m pytest tests/test_query_budgets.py --update-query-budgets
+"""
+import itertools
+import random
+import statistics
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+
+import pytest
+from sqlalchemy import event
+
+from app.main import app
+from app.admin_auth import ADMIN_USERNAME, ADMIN_PASSWORD, create_admin_session
+from app.database import SessionLocal, engine
+from app.models import (
+    User, Project, ProjectMember, ProjectRole, RiskAnalysis, ActionType
+)
+from app.routers import reports as reports_router
+
+from conftest import Dataset, azure_token, make_factor
+
+RUNS = 3
+
+_sequence = itertools.count(1)
+_random = random.Random(7)
+
+
+@dataclass
+class Case:
+    """
+    One endpoint call
+
+    request(data) returns the URL and client.request() keyword arguments; it is
+    called before every run, outside the measurement, so that it can create the
+    records a destructive call consumes.
+    """
+    method: str
+    route: str  # path template as in the OpenAPI schema
+    request: Callable[[Dataset], dict]
+    status: int = 200
+    user: Optional[str] = "owner"  # dataset.headers key, None for anonymous calls
+
+    @property
+    def key(self) -> str:
+        return f"{self.method} {self.route}"
+
+
+def scratch_project(data: Dataset, members: int = 3, factors: int = 10) -> dict:
+    """Project of the owner with members and a risk analysis, for calls that modify or delete it"""
+    db = SessionLocal()
+    try:
+        project = Project(name=f"Scratch {next(_sequence)}", device_name="Scratch device", owner_id=data.owner_id)
+        db.add(project)
+        db.commit()
+        user_ids = [
+            user_id for (user_id,) in db.query(User.id).filter(
+                User.id.notin_([data.admin_id, data.owner_id])
+            ).order_by(User.id).limit(members + 1)
+        ]
+        db.add_all([
+            ProjectMember(project_id=project.id, user_id=user_id, role=ProjectRole.DOCTOR)
+            for user_id in user_ids[:members]
+        ])
+        analysis = RiskAnalysis(project_id=project.id, analyst_id=data.owner_id)
+        db.add(analysis)
+        db.commit()
+        factor_rows = [make_factor(analysis.id, _random, index) for index in range(factors)]
+        db.add_all(factor_rows)
+        db.commit()
+        return {
+            "project_id": project.id,
+            "analysis_id": analysis.id,
+            "member_ids": user_ids[:members],
+            "outsider_id": user_ids[members],
+            "factor_ids": [factor.id for factor in factor_rows],
+        }
+    finally:
+        db.close()
+
+
+def empty_project(data: Dataset) -> int:
+    db = SessionLocal()
+    try:
+        project = Project(name=f"Empty {next(_sequence)}", device_name="Scratch device", owner_id=data.owner_id)
+        db.add(project)
+        db.commit()
+        return project.id
+    finally:
+        db.close()
+
+
+def admin_cookie() -> dict:
+    return {"Cookie": f"admin_session={create_admin_session(ADMIN_USERNAME)}"}
+
+
+def add_member_request(scratch: dict) -> dict:
+    return {
+        "url": f"/api/projects/{scratch['project_id']}/members",
+        "json": {"user_id": scratch["outsider_id"], "role": "doctor"},
+    }
+
+
+def roster_request(scratch: dict) -> dict:
+    """Roster replacement removing one member and adding one"""
+    user_ids = scratch["member_ids"][1:] + [scratch["outsider_id"]]
+    return {
+        "url": f"/api/projects/{scratch['project_id']}/members",
+        "json": {"members": [{"user_id": user_id} for user_id in user_ids]},
+    }
+
+
+def remove_member_request(scratch: dict) -> dict:
+    return {"url": f"/api/projects/{scratch['project_id']}/members/{scratch['member_ids'][0]}"}
+
+
+def factor_body(**overrides) -> dict:
+    body = {
+        "lifecycle_stage": "operation",
+        "hazard_name": "Electric shock from damaged cable",
+        "hazardous_situation": "Operator touches exposed conductor",
+        "sequence_of_events": "Cable insulation wears through",
+        "harm": "Burn injury",
+        "hazard_category": "energy_functional",
+        "severity_score": 4,
+        "probability_score": 2,
+        "control_measures": "Strain relief, periodic inspection",
+    }
+    body.update(overrides)
+    return body
+
+
+# Read-only calls first, then calls that change the dataset
+CASES: List[Case] = [
+    # Application
+    Case("GET", "/", lambda d: {"url": "/"}, user=None),
+    Case("GET", "/health", lambda d: {"url": "/health"}, user=None),
+
+    # Authentication
+    Case("POST", "/api/auth/azure-login", lambda d: {
+        "url": "/api/auth/azure-login", "json": {"azure_token": azure_token("user5@example.com", "oid-5")}
+    }, user=None),
+    Case("GET", "/api/auth/me", lambda d: {"url": "/api/auth/me"}),
+    Case("POST", "/api/auth/logout", lambda d: {"url": "/api/auth/logout"}),
+
+    # Users
+    Case("GET", "/api/users/", lambda d: {"url": "/api/users/", "params": {"limit": 100}}, user="admin"),
+    Case("GET", "/api/users/with-projects", lambda d: {"url": "/api/users/with-projects"}, user="admin"),
+    Case("GET", "/api/users/me/statistics", lambda d: {"url": "/api/users/me/statistics"}),
+    Case("GET", "/api/users/me", lambda d: {"url": "/api/users/me"}),
+    Case("GET", "/api/users/{user_id}", lambda d: {"url": f"/api/users/{d.member_id}"}, user="admin"),
+    Case("GET", "/api/users/{user_id}/projects", lambda d: {"url": f"/api/users/{d.owner_id}/projects"}),
+
+    # Projects
+    Case("GET", "/api/projects/", lambda d: {"url": "/api/projects/", "params": {"limit": 100}}),
+    Case("GET", "/api/projects/{project_id}", lambda d: {"url": f"/api/projects/{d.project_id}"}),
+    Case("GET", "/api/projects/{project_id}/view", lambda d: {"url": f"/api/projects/{d.project_id}/view"}),
+    Case("GET", "/api/projects/{project_id}/members", lambda d: {"url": f"/api/projects/{d.project_id}/members"}),
+    Case("GET", "/api/projects/{project_id}/versions", lambda d: {"url": f"/api/projects/{d.project_id}/versions"}),
+    Case("GET", "/api/projects/{project_id}/versions/{version_id}", lambda d: {
+        "url": f"/api/projects/{d.project_id}/versions/{d.version_id}"
+    }),
+
+    # Risk analyses
+    Case("GET", "/api/risk-analyses/project/{project_id}", lambda d: {
+        "url": f"/api/risk-analyses/project/{d.project_id}"
+    }),
+    Case("GET", "/api/risk-analyses/project/{project_id}/factors", lambda d: {
+        "url": f"/api/risk-analyses/project/{d.project_id}/factors"
+    }),
+    Case("GET", "/api/risk-analyses/project/{project_id}/export", lambda d: {
+        "url": f"/api/risk-analyses/project/{d.project_id}/export"
+    }),
+    Case("GET", "/api/risk-analyses/export", lambda d: {"url": "/api/risk-analyses/export"}),
+    Case("GET", "/api/risk-analyses/project/{project_id}/matrix", lambda d: {
+        "url": f"/api/risk-analyses/project/{d.project_id}/matrix"
+    }),
+    Case("GET", "/api/risk-analyses/matrix", lambda d: {"url": "/api/risk-analyses/matrix"}),
+    Case("GET", "/api/risk-analyses/search", lambda d: {
+        "url": "/api/risk-analyses/search", "params": {"q": "electric shock"}
+    }),
+    Case("GET", "/api/risk-analyses/similar", lambda d: {
+        "url": "/api/risk-analyses/similar", "params": {"hazard_name": "Electric shock", "harm": "Burn injury"}
+    }),
+    Case("GET", "/api/risk-analyses/{analysis_id}/diff/{other_analysis_id}", lambda d: {
+        "url": f"/api/risk-analyses/{d.analysis_ids[0]}/diff/{d.analysis_ids[1]}"
+    }),
+    Case("GET", "/api/risk-analyses/summary", lambda d: {"url": "/api/risk-analyses/summary"}),
+
+    # Analytics
+    Case("GET", "/api/analytics/summary", lambda d: {"url": "/api/analytics/summary"}),
+    Case("GET", "/api/analytics/outliers", lambda d: {"url": "/api/analytics/outliers"}),
+
+    # Reports
+    Case("GET", "/api/reports/{job_id}", lambda d: {"url": f"/api/reports/{d.report_job_id}"}),
+    Case("GET", "/api/reports/{job_id}/download", lambda d: {"url": f"/api/reports/{d.report_job_id}/download"}),
+
+    # Changelog
+    Case("GET", "/api/changelog/projects", lambda d: {"url": "/api/changelog/projects"}),
+    Case("GET", "/api/changelog/project/{project_id}", lambda d: {
+        "url": f"/api/changelog/project/{d.project_id}"
+    }),
+    Case("GET", "/api/changelog/search", lambda d: {"url": "/api/changelog/search", "params": {"q": "change"}}),
+    Case("GET", "/api/changelog/{changelog_id}", lambda d: {"url": f"/api/changelog/{d.changelog_id}"}),
+
+    # Admin panel
+    Case("GET", "/admin", lambda d: {"url": "/admin", "headers": admin_cookie()}, user=None),
+    Case("POST", "/admin/login", lambda d: {
+        "url": "/admin/login", "data": {"username": ADMIN_USERNAME, "password": ADMIN_PASSWORD},
+        "follow_redirects": False
+    }, status=303, user=None),
+
+    # Changes
+    Case("PUT", "/api/users/me", lambda d: {"url": "/api/users/me", "json": {"department": "Quality"}}),
+    Case("PUT", "/api/users/{user_id}", lambda d: {
+        "url": f"/api/users/{d.member_id}", "json": {"position": f"Engineer {next(_sequence)}"}
+    }, user="admin"),
+    Case("POST", "/api/projects/", lambda d: {
+        "url": "/api/projects/", "json": {"name": f"New project {next(_sequence)}", "device_name": "Pump"}
+    }),
+    Case("PUT", "/api/projects/{project_id}", lambda d: {
+        "url": f"/api/projects/{d.project_id}", "json": {"description": f"Revision {next(_sequence)}"}
+    }),
+    Case("POST", "/api/projects/{project_id}/members", lambda d: add_member_request(scratch_project(d))),
+    Case("PUT", "/api/projects/{project_id}/members", lambda d: roster_request(scratch_project(d))),
+    Case("DELETE", "/api/projects/{project_id}/members/{user_id}", lambda d: remove_member_request(scratch_project(d))),
+    Case("POST", "/api/projects/{project_id}/versions", lambda d: {
+        "url": f"/api/projects/{d.project_id}/versions", "json": {"version": f"2.{next(_sequence)}"}
+    }),
+    Case("POST", "/api/risk-analyses/project/{project_id}", lambda d: {
+        "url": f"/api/risk-analyses/project/{scratch_project(d)['project_id']}",
+        "json": {"has_body_contact": True, "contact_type": "surface", "risk_factors": [factor_body()] * 5}
+    }),
+    Case("PUT", "/api/risk-analyses/{analysis_id}", lambda d: {
+        "url": f"/api/risk-analyses/{d.analysis_ids[-1]}", "json": {"has_body_contact": next(_sequence) % 2 == 0}
+    }),
+    Case("POST", "/api/risk-analyses/{analysis_id}/factors", lambda d: {
+        "url": f"/api/risk-analyses/{d.analysis_ids[-1]}/factors", "json": factor_body()
+    }),
+    Case("PUT", "/api/risk-analyses/factors/{factor_id}", lambda d: {
+        "url": f"/api/risk-analyses/factors/{d.factor_id}",
+        "json": {"control_measures": f"Inspection every {next(_sequence)} months", "severity_score": 3}
+    }),
+    Case("DELETE", "/api/risk-analyses/factors/{factor_id}", lambda d: {
+        "url": f"/api/risk-analyses/factors/{scratch_project(d)['factor_ids'][0]}"
+    }),
+    Case("POST", "/api/reports/project/{project_id}", lambda d: {
+        "url": f"/api/reports/project/{scratch_project(d)['project_id']}"
+    }, status=202),
+    Case("POST", "/api/changelog/", lambda d: {
+        "url": "/api/changelog/", "json": {
+            "action_type": ActionType.PROJECT_UPDATED.value,
+            "action_description": "Reviewed risk file",
+            "project_id": d.project_id,
+            "target_type": "project",
+            "target_id": d.project_id,
+        }
+    }),
+    Case("POST", "/api/batch", lambda d: {
+        "url": "/api/batch", "json": {"operations": [
+            {"method": "GET", "path": f"/api/projects/{d.project_id}/view", "query": {"include": "analysis"}},
+            {"method": "PUT", "path": f"/api/risk-analyses/factors/{d.factor_id}",
+             "body": {"control_measures": f"Batch review {next(_sequence)}"}},
+            {"method": "POST", "path": f"/api/risk-analyses/{d.analysis_ids[-1]}/factors", "body": factor_body()},
+        ]}
+    }),
+    # Only projects without members or analyses can be deleted (no ORM cascades)
+    Case("DELETE", "/api/projects/{project_id}", lambda d: {"url": f"/api/projects/{empty_project(d)}"}),
+    Case("POST", "/admin/users/{user_id}/toggle", lambda d: {
+        "url": f"/admin/users/{d.spare_user_id}/toggle", "headers": admin_cookie()
+    }, user=None),
+    Case("POST", "/admin/users/{user_id}/role", lambda d: {
+        "url": f"/admin/users/{d.member_id}/role", "json": {"role": "USER"}, "headers": admin_cookie()
+    }, user=None),
+    Case("GET", "/admin/logout", lambda d: {
+        "url": "/admin/logout", "headers": admin_cookie(), "follow_redirects": False
+    }, status=303, user=None),
+]
+
+
+class StatementCounter:
+    """Counts SQL statements sent to the engine while active"""
+
+    def __init__(self):
+        self.active = False
+        self.count = 0
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        if self.active:
+            self.count += 1
+
+
+@pytest.fixture(scope="module")
+def statement_counter():
+    counter = StatementCounter()
+    event.listen(engine, "before_cursor_execute", counter)
+    yield counter
+    event.remove(engine, "before_cursor_execute", counter)
+
+
+@pytest.fixture(scope="module", autouse=True)
+def no_report_workers():
+    """Queued report jobs are not rendered: worker processes would write to the database under measurement"""
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setattr(reports_router, "submit_report_job", lambda job_id: True)
+        yield
+
+
+def measure(client, counter: StatementCounter, case: Case, data: Dataset) -> Dict[str, float]:
+    """Largest statement count and median latency over RUNS calls"""
+    counts, timings = [], []
+    for _ in range(RUNS):
+        kwargs = case.request(data)
+        url = kwargs.pop("url")
+        headers = dict(data.headers[case.user]) if case.user else {}
+        headers.update(kwargs.pop("headers", {}))
+
+        counter.count = 0
+        counter.active = True
+        started = time.perf_counter()
+        try:
+            response = client.request(case.method, url, headers=headers, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - started
+            counter.active = False
+
+        assert response.status_code == case.status, f"{case.key}: {response.status_code} {response.text[:500]}"
+        counts.append(counter.count)
+        timings.append(elapsed * 1000)
+    return {"queries": max(counts), "latency_ms": round(statistics.median(timings), 1)}
+
+
+@pytest.mark.parametrize("case", CASES, ids=[case.key for case in CASES])
+def test_endpoint_budget(case: Case, client, dataset, statement_counter, query_budgets):
+    query_budgets.measured[case.key] = measure(client, statement_counter, case, dataset)
+    if query_budgets.update:
+        return
+    problems = query_budgets.violations(case.key)
+    if problems:
+        pytest.fail(f"{case.key}: {'; '.join(problems)}\n{query_budgets.diff([case.key])}", pytrace=False)
+
+
+def test_every_route_has_a_case():
+    """New endpoints need a case (and a budget)"""
+    routes = {
+        f"{method.upper()} {path}"
+        for path, operations in app.openapi()["paths"].items()
+        for method in operations
+    }
+    missing = routes - {case.key for case in CASES}
+    assert not missing, f"Endpoints without a query budget case: {sorted(missing)}"
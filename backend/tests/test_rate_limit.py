@@ -0,0 +1,95 @@
+"""
+Token bucket arithmetic and the responses of the rate limit middleware
+"""
+import sqlite3
+import time
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.core.rate_limit import (
+    MemoryTokenBuckets, RateLimiter, RateLimitMiddleware, RouteClassLimit, SQLiteTokenBuckets
+)
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def buckets(request, tmp_path):
+    if request.param == "memory":
+        return MemoryTokenBuckets()
+    return SQLiteTokenBuckets(str(tmp_path / "buckets.db"))
+
+
+def test_bucket_spends_burst_then_refills_at_rate(buckets):
+    waits = [buckets.acquire("caller", rate=2, burst=3, now=100.0) for _ in range(4)]
+    assert waits == [0, 0, 0, pytest.approx(0.5)]
+    # Half a token refilled: still empty, half the wait left
+    assert buckets.acquire("caller", rate=2, burst=3, now=100.25) == pytest.approx(0.25)
+    assert buckets.acquire("caller", rate=2, burst=3, now=100.5) == 0
+    # Refill is capped at the burst
+    assert [buckets.acquire("caller", rate=2, burst=3, now=200.0) for _ in range(4)][-1] == pytest.approx(0.5)
+    assert buckets.acquire("other", rate=2, burst=3, now=100.5) == 0
+
+
+@pytest.mark.parametrize("rate, burst", [(0, 10), (-1, 10), (1, 0)])
+def test_limits_without_refill_are_rejected(rate, burst):
+    with pytest.raises(ValueError):
+        RouteClassLimit(rate, burst)
+
+
+def test_locked_sqlite_buckets_fail_open_quickly(tmp_path):
+    path = str(tmp_path / "buckets.db")
+    limiter = RateLimiter(SQLiteTokenBuckets(path), {"default": RouteClassLimit(1, 1)})
+    writer = sqlite3.connect(path, isolation_level=None)
+    writer.execute("BEGIN IMMEDIATE")
+    try:
+        started = time.perf_counter()
+        assert limiter.check_rate("caller", "default") == 0
+        assert time.perf_counter() - started < 1
+        assert limiter.backend_errors == 1
+    finally:
+        writer.execute("ROLLBACK")
+        writer.close()
+
+
+@pytest.fixture
+def limited_client():
+    app = FastAPI()
+
+    @app.get("/api/items")
+    def items():
+        return []
+
+    @app.get("/api/reports")
+    def reports():
+        return []
+
+    limiter = RateLimiter(
+        MemoryTokenBuckets(),
+        {"default": RouteClassLimit(0.25, 1), "expensive": RouteClassLimit(10, 10, max_in_flight=1)},
+        {"/api/reports": "expensive"},
+    )
+    app.add_middleware(RateLimitMiddleware, limiter=limiter, shed_retry_after=2)
+    with TestClient(app) as client:
+        yield client, limiter
+
+
+def test_empty_bucket_answers_429_with_retry_after(limited_client):
+    client, limiter = limited_client
+    assert client.get("/api/items").status_code == 200
+    response = client.get("/api/items")
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "4"
+    assert limiter.snapshot()["default"]["rate_limited"] == 1
+
+
+def test_requests_over_in_flight_limit_answer_503_with_retry_after(limited_client):
+    client, limiter = limited_client
+    assert limiter.enter("expensive")  # a request still in flight
+    try:
+        response = client.get("/api/reports")
+    finally:
+        limiter.leave("expensive")
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "2"
+    assert client.get("/api/reports").status_code == 200
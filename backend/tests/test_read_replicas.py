@@ -0,0 +1,150 @@
+"""
+Read replica routing with two SQLite files
+
+The replica file is created from the primary and then left behind, standing in
+for replication lag: a row only on the primary shows which database a read
+went to.
+"""
+import pytest
+from fastapi.testclient import TestClient
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+from sqlalchemy import func, select, text
+from sqlalchemy.orm import sessionmaker
+
+from app.core.azure_auth_mock import create_local_token
+from app.core.read_replicas import ReadReplicaMiddleware, RecentWriters
+from app.database import Base, RequestRouting, RoutingSession, create_database_engine, current_routing
+from app.models import User
+
+
+@pytest.fixture
+def databases(tmp_path):
+    primary = create_database_engine(f"sqlite:///{tmp_path / 'primary.db'}")
+    replica = create_database_engine(f"sqlite:///{tmp_path / 'replica.db'}")
+    for database in (primary, replica):
+        Base.metadata.create_all(bind=database)
+    with primary.begin() as conn:
+        conn.execute(User.__table__.insert(), [{"email": "primary@example.com", "first_name": "P", "last_name": "P"}])
+    yield primary, replica
+    primary.dispose()
+    replica.dispose()
+
+
+@pytest.fixture
+def make_session(databases):
+    primary, replica = databases
+    return sessionmaker(class_=RoutingSession, autoflush=False, bind=primary, replicas=[replica])
+
+
+def user_count(db) -> int:
+    return db.scalar(select(func.count()).select_from(User))
+
+
+def routed(use_replica: bool):
+    routing = RequestRouting(use_replica)
+    return routing, current_routing.set(routing)
+
+
+def test_reads_go_to_replica_when_routed(make_session):
+    db = make_session()
+    try:
+        assert user_count(db) == 1  # outside a routed request: primary
+        routing, token = routed(True)
+        try:
+            db.close()
+            assert user_count(db) == 0
+            assert db.execute(text("SELECT count(*) FROM users")).scalar() == 0
+            assert db.query(User).count() == 0
+            assert not routing.wrote
+        finally:
+            current_routing.reset(token)
+    finally:
+        db.close()
+
+
+def test_writes_and_later_reads_go_to_primary(make_session, databases):
+    primary, replica = databases
+    routing, token = routed(True)
+    db = make_session()
+    try:
+        assert user_count(db) == 0
+        db.add(User(email="new@example.com", first_name="N", last_name="N"))
+        db.commit()
+        assert routing.wrote
+        # The session reads its own write from the primary from now on
+        assert user_count(db) == 2
+        assert db.query(User).filter(User.email == "new@example.com").one().id
+    finally:
+        db.close()
+        current_routing.reset(token)
+    with replica.connect() as conn:
+        assert conn.execute(text("SELECT count(*) FROM users")).scalar() == 0
+
+
+def test_primary_when_request_is_not_routed_to_replica(make_session):
+    routing, token = routed(False)
+    db = make_session()
+    try:
+        assert user_count(db) == 1
+        assert not routing.wrote
+    finally:
+        db.close()
+        current_routing.reset(token)
+
+
+def test_recent_writers_expire():
+    writers = RecentWriters(window=5)
+    writers.mark("user:a", now=100)
+    assert writers.is_recent("user:a", now=104.9)
+    assert not writers.is_recent("user:a", now=105)
+    assert not writers.is_recent("user:b", now=101)
+    writers.mark("user:b", now=200)  # prunes the expired mark
+    assert "user:a" not in writers._expiry
+
+
+def test_middleware_read_your_writes(make_session):
+    def count_users(request):
+        db = make_session()
+        try:
+            return JSONResponse({"users": user_count(db)})
+        finally:
+            db.close()
+
+    def add_user(request):
+        db = make_session()
+        try:
+            db.add(User(email=f"user{user_count(db)}@example.com", first_name="U", last_name="U"))
+            db.commit()
+            return JSONResponse({"users": user_count(db)})
+        finally:
+            db.close()
+
+    app = Starlette(routes=[Route("/users", count_users), Route("/users", add_user, methods=["POST"])])
+    app.add_middleware(ReadReplicaMiddleware, window=60)
+    client = TestClient(app)
+
+    def headers(email):
+        return {"Authorization": f"Bearer {create_local_token({'email': email, 'object_id': email})}"}
+
+    writer, reader = headers("writer@example.com"), headers("reader@example.com")
+    assert client.get("/users", headers=writer).json() == {"users": 0}
+    assert client.post("/users", headers=writer).json() == {"users": 2}
+    # The writer reads the primary during the window, other users keep reading the replica
+    assert client.get("/users", headers=writer).json() == {"users": 2}
+    assert client.get("/users", headers=reader).json() == {"users": 0}
+
+
+def test_bind_without_statement_keeps_reads_on_replica(make_session, databases):
+    primary, replica = databases
+    routing, token = routed(True)
+    db = make_session()
+    try:
+        # e.g. db.get_bind().dialect.name to build a dialect-specific filter
+        assert db.get_bind() is primary
+        assert user_count(db) == 0
+        assert not routing.wrote
+    finally:
+        db.close()
+        current_routing.reset(token)
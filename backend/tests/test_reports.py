@@ -0,0 +1,81 @@
+"""
+Report jobs that cannot finish are failed instead of being reused as in-flight
+"""
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import timedelta
+
+import pytest
+
+from app.core import reports
+from app.core.reports import PROCESS_STARTED_AT, find_reusable_job
+from app.database import SessionLocal
+from app.models import Project, ReportJob, ReportStatus
+
+
+@pytest.fixture
+def db():
+    session = SessionLocal()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def project(dataset, db):
+    """A seeded project without report jobs; the jobs a test adds are removed again"""
+    project = db.query(Project).filter(
+        Project.owner_id == dataset.owner_id, Project.id != dataset.project_id
+    ).order_by(Project.id).first()
+    yield project
+    db.rollback()
+    db.query(ReportJob).filter(ReportJob.project_id == project.id).delete(synchronize_session=False)
+    db.commit()
+
+
+def add_job(db, project: Project, **values) -> ReportJob:
+    job = ReportJob(
+        project_id=project.id, project_revision=project.revision, report_format="html",
+        requested_by=project.owner_id, **values
+    )
+    db.add(job)
+    db.commit()
+    return job
+
+
+def job_status(db, job_id: int) -> ReportStatus:
+    db.expire_all()
+    return db.get(ReportJob, job_id).status
+
+
+def test_job_that_cannot_be_queued_is_failed(client, dataset, db, project, monkeypatch):
+    executor = ProcessPoolExecutor(max_workers=1)
+    executor.shutdown()
+    monkeypatch.setattr(reports, "_executor", executor)
+
+    response = client.post(f"/api/reports/project/{project.id}", headers=dataset.headers["owner"])
+    assert response.status_code == 503
+    assert reports._executor is None
+    [job] = db.query(ReportJob).filter(ReportJob.project_id == project.id).all()
+    assert job.status == ReportStatus.FAILED
+    assert find_reusable_job(db, project, "html") is None
+
+
+def test_job_of_crashed_worker_is_failed_and_pool_replaced(dataset, db, project, monkeypatch):
+    job = add_job(db, project, status=ReportStatus.RUNNING)
+    executor = ProcessPoolExecutor(max_workers=1)
+    monkeypatch.setattr(reports, "_executor", executor)
+    future = Future()
+    future.set_exception(BrokenProcessPool("A child process terminated abruptly"))
+
+    reports._job_done(job.id, executor, future)
+    assert job_status(db, job.id) == ReportStatus.FAILED
+    assert reports._executor is None
+
+
+def test_pending_job_from_before_process_start_is_not_reused(dataset, db, project):
+    orphan = add_job(db, project, created_at=PROCESS_STARTED_AT - timedelta(minutes=1))
+    assert orphan.status == ReportStatus.PENDING
+    assert find_reusable_job(db, project, "html") is None
+
+    job = add_job(db, project)
+    assert find_reusable_job(db, project, "html").id == job.id
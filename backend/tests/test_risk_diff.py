@@ -0,0 +1,90 @@
+"""
+Risk analysis diffs: matching by hazard key and classification of the changes
+"""
+from app.core.risk_diff import diff_factors
+
+
+def factor(factor_id: int, hazard_name: str, severity: int, probability: int, **values) -> dict:
+    return {
+        "id": factor_id,
+        "lifecycle_stage": "operation",
+        "hazard_name": hazard_name,
+        "hazardous_situation": "Prolonged operation",
+        "sequence_of_events": "Component failure",
+        "harm": "Burn injury",
+        "hazard_category": "energy_functional",
+        "severity_score": severity,
+        "probability_score": probability,
+        "risk_score": severity * probability,
+        "control_measures": None,
+        "residual_risk_score": None,
+        **values,
+    }
+
+
+def test_factors_are_matched_by_normalized_hazard_key():
+    old = [
+        factor(1, "Electric shock", 3, 2),
+        factor(2, "Overheating", 4, 4),
+        factor(3, "Data loss", 2, 2),
+        factor(4, "Software crash", 5, 1),
+    ]
+    new = [
+        factor(11, "  electric SHOCK!", 3, 2),  # same hazard, only the spelling differs
+        factor(12, "Overheating", 2, 4, control_measures="Thermal cut-off", residual_risk_score=4),
+        factor(13, "Software crash", 5, 1, lifecycle_stage="maintenance"),  # other stage: other hazard
+        factor(14, "Biocompatibility", 4, 4),
+    ]
+    result = diff_factors(iter(old), iter(new))
+
+    assert [f["id"] for f in result["added"]] == [13, 14]
+    assert [f["id"] for f in result["removed"]] == [3, 4]
+    renamed, rescored = result["modified"]
+    # The spelling of a matched hazard name is still reported as a change
+    assert (renamed["old_id"], renamed["new_id"]) == (1, 11)
+    assert (set(renamed["changes"]), renamed["score_delta"]) == ({"hazard_name"}, {})
+    assert (rescored["old_id"], rescored["new_id"]) == (2, 12)
+    assert set(rescored["changes"]) == {"severity_score", "risk_score", "control_measures", "residual_risk_score"}
+    assert rescored["changes"]["severity_score"] == {"old": 4, "new": 2}
+    # Residual risk was not set before, so it has no delta
+    assert rescored["score_delta"] == {"severity_score": -2, "risk_score": -8}
+
+    assert result["summary"] == {
+        "added_count": 2,
+        "removed_count": 2,
+        "modified_count": 2,
+        "unchanged_count": 0,
+        "total_risk_score_delta": (6 + 8 + 5 + 16) - (6 + 16 + 4 + 5),
+        "high_risk_count_delta": 0,
+    }
+
+
+def test_unchanged_factors_are_only_counted():
+    old = [factor(1, "Electric shock", 3, 2), factor(2, "Overheating", 4, 4)]
+    new = [factor(11, "Electric shock", 3, 2), factor(12, "Overheating", 4, 4)]
+    result = diff_factors(iter(old), iter(new))
+    assert (result["added"], result["removed"], result["modified"]) == ([], [], [])
+    assert result["summary"]["unchanged_count"] == 2
+    assert result["summary"]["total_risk_score_delta"] == 0
+
+
+def test_repeated_hazard_keys_are_matched_in_id_order():
+    old = [
+        factor(1, "Overheating", 2, 2),
+        factor(2, "Overheating", 3, 3),
+        factor(3, "Overheating", 5, 4),
+    ]
+    new = [
+        factor(11, "Overheating", 2, 2),
+        factor(12, "Overheating", 4, 4),
+    ]
+    result = diff_factors(iter(old), iter(new))
+
+    assert result["summary"]["unchanged_count"] == 1
+    [modified] = result["modified"]
+    assert (modified["old_id"], modified["new_id"]) == (2, 12)
+    assert modified["score_delta"] == {"severity_score": 1, "probability_score": 1, "risk_score": 7}
+    # The surplus old factor is removed, taking its high risk with it
+    assert [f["id"] for f in result["removed"]] == [3]
+    assert result["summary"]["total_risk_score_delta"] == (4 + 16) - (4 + 9 + 20)
+    assert result["summary"]["high_risk_count_delta"] == 1 - 1
@@ -0,0 +1,44 @@
+"""
+Search highlights are HTML-escaped before matches are marked
+"""
+import pytest
+
+from app.core import search
+from app.core.search import changelog_highlights, search_risk_factors
+from app.models import HazardCategory, LifecycleStage, Project, RiskAnalysis, RiskFactor, User
+
+PAYLOAD = '<img src=x onerror="alert(1)"> Overheating'
+
+
+@pytest.mark.parametrize("temp_db", [{"search_indexes": True}], indirect=True)
+@pytest.mark.parametrize("backend", ["fts5", "like"])
+def test_risk_factor_highlights_escape_stored_markup(temp_db, backend, monkeypatch):
+    monkeypatch.setattr(search, "_search_backend", backend)
+    user = User(email="user@example.com", first_name="U", last_name="U")
+    temp_db.add(user)
+    temp_db.flush()
+    project = Project(name="Pump", device_name="Infusion pump", owner_id=user.id)
+    temp_db.add(project)
+    temp_db.flush()
+    analysis = RiskAnalysis(project_id=project.id, analyst_id=user.id)
+    temp_db.add(analysis)
+    temp_db.flush()
+    temp_db.add(RiskFactor(
+        analysis_id=analysis.id, lifecycle_stage=LifecycleStage.OPERATION, hazard_name=PAYLOAD,
+        hazardous_situation="Prolonged operation", sequence_of_events="Fan failure", harm="Burn <b>injury</b>",
+        hazard_category=HazardCategory.ENERGY_FUNCTIONAL, severity_score=3, probability_score=2, risk_score=6,
+    ))
+    temp_db.commit()
+
+    [result] = search_risk_factors(temp_db, "overheating injury", [analysis.id])
+    assert result["highlights"]["hazard_name"] == (
+        '&lt;img src=x onerror=&quot;alert(1)&quot;&gt; <mark>Overheating</mark>'
+    )
+    assert result["highlights"]["harm"] == "Burn &lt;b&gt;<mark>injury</mark>&lt;/b&gt;"
+
+
+def test_changelog_highlights_escape_stored_markup():
+    highlights = changelog_highlights({"action_description": PAYLOAD, "target_name": "<script>"}, "overheating")
+    assert highlights == {
+        "action_description": '&lt;img src=x onerror=&quot;alert(1)&quot;&gt; <mark>Overheating</mark>'
+    }
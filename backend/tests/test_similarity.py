@@ -0,0 +1,48 @@
+"""
+Near-duplicate hazard lookup restricted to accessible projects
+"""
+import pytest
+
+from app.core.similarity import MAX_CANDIDATES, find_similar_factors
+from app.models import HazardCategory, LifecycleStage, Project, RiskAnalysis, RiskFactor, User
+
+HAZARD = "Overheating of the pump motor housing"
+HARM = "Thermal injury"
+
+
+def add_project(db, owner: User, name: str, hazards) -> Project:
+    project = Project(name=name, device_name="Infusion pump", owner_id=owner.id)
+    db.add(project)
+    db.flush()
+    analysis = RiskAnalysis(project_id=project.id, analyst_id=owner.id)
+    db.add(analysis)
+    db.flush()
+    db.add_all([
+        RiskFactor(
+            analysis_id=analysis.id, lifecycle_stage=LifecycleStage.OPERATION, hazard_name=hazard_name,
+            hazardous_situation="Prolonged operation at maximum power",
+            sequence_of_events="Fan failure", harm=HARM, hazard_category=HazardCategory.ENERGY_FUNCTIONAL,
+            severity_score=3, probability_score=2, risk_score=6,
+        )
+        for hazard_name in hazards
+    ])
+    db.commit()
+    return project
+
+
+def test_inaccessible_near_duplicates_do_not_crowd_out_accessible_ones(temp_db):
+    user = User(email="user@example.com", first_name="U", last_name="U")
+    other = User(email="other@example.com", first_name="O", last_name="O")
+    temp_db.add_all([user, other])
+    temp_db.commit()
+    # The accessible factor is created first and shares fewer bands than the
+    # inaccessible ones, so it would lose every tie of the candidate cut
+    accessible = add_project(temp_db, user, "Accessible", ["Overheating of the pump motor casing"])
+    add_project(temp_db, other, "Inaccessible", [HAZARD] * (MAX_CANDIDATES + 50))
+
+    unfiltered = find_similar_factors(temp_db, HAZARD, HARM, k=5)
+    assert [item["project_id"] for item in unfiltered] != [accessible.id]
+
+    results = find_similar_factors(temp_db, HAZARD, HARM, project_filter=Project.owner_id == user.id, k=5)
+    assert [item["project_id"] for item in results] == [accessible.id]
+    assert results[0]["hazard_name"] == "Overheating of the pump motor casing"
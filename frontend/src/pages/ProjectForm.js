@@ -224,59 +224,24 @@ const ProjectForm = () => {
       if (response.ok) {
         const projectData = await response.json();
         
-        if (isEditMode) {
-          // For edit mode, first get current members and remove those not selected
-          const currentMembersResponse = await fetch(`http://localhost:8000/api/projects/${id}/members`, {
+        // Sync the team in one request: the server adds, removes and keeps members as needed
+        try {
+          const membersResponse = await fetch(`http://localhost:8000/api/projects/${projectData.id}/members`, {
+            method: 'PUT',
             headers: {
-              'Authorization': `Bearer ${token}`
-            }
+              'Authorization': `Bearer ${token}`,
+              'Content-Type': 'application/json'
+            },
+            body: JSON.stringify({
+              members: formData.teamMembers.map(userId => ({ user_id: Number(userId) }))
+            })
           });
           
-          if (currentMembersResponse.ok) {
-            const currentMembers = await currentMembersResponse.json();
-            const currentMemberIds = currentMembers
-              .filter(member => member.role !== 'owner')
-              .map(member => member.user_id.toString());
-            
-            // Remove members that are no longer selected
-            for (const memberId of currentMemberIds) {
-              if (!formData.teamMembers.includes(memberId)) {
-                try {
-                  await fetch(`http://localhost:8000/api/projects/${id}/members/${memberId}`, {
-                    method: 'DELETE',
-                    headers: {
-                      'Authorization': `Bearer ${token}`
-                    }
-                  });
-                } catch (error) {
-                  console.error(`Error removing user ${memberId} from project:`, error);
-                }
-              }
-            }
-          }
-        }
-        
-        // Add new team members
-        for (const userId of formData.teamMembers) {
-          try {
-            const memberResponse = await fetch(`http://localhost:8000/api/projects/${projectData.id}/members`, {
-              method: 'POST',
-              headers: {
-                'Authorization': `Bearer ${token}`,
-                'Content-Type': 'application/json'
-              },
-              body: JSON.stringify({
-                user_id: userId,
-                role: 'member'
-              })
-            });
-            
-            if (!memberResponse.ok) {
-              console.warn(`Failed to add user ${userId} to project`);
-            }
-          } catch (error) {
-            console.error(`Error adding user ${userId} to project:`, error);
+          if (!membersResponse.ok) {
+            console.warn('Failed to update project members');
           }
+        } catch (error) {
+          console.error('Error updating project members:', error);
         }
         
         navigate(`/project/${projectData.id}`);
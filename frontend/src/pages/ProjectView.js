@@ -20,14 +20,17 @@ const ProjectView = () => {
       
       try {
         const token = localStorage.getItem('token');
-        const response = await fetch(`http://localhost:8000/api/projects/${id}`, {
+        // Project, team and risk statistics in one request
+        const response = await fetch(`http://localhost:8000/api/projects/${id}/view?include=members,analysis`, {
           headers: {
             'Authorization': `Bearer ${token}`
           }
         });
 
         if (response.ok) {
-          const projectData = await response.json();
+          const viewData = await response.json();
+          const projectData = viewData.project;
+          const analysis = viewData.analysis;
           
           // Transform API data to frontend format
           const transformedProject = {
@@ -51,17 +54,23 @@ const ProjectView = () => {
               operatingEnvironment: projectData.operating_environment || 'N/A'
             },
             
-            // Team Members - will be loaded separately
-            team: [],
+            // Team Members
+            team: (viewData.members || []).map(member => ({
+              id: member.user_id,
+              name: `${member.user_first_name} ${member.user_last_name}`,
+              role: member.role, // Keep original role (admin, manager, doctor)
+              email: member.user_email,
+              avatar: '/api/placeholder/40/40'
+            })),
             
-            // Project Statistics - will be loaded separately
+            // Project Statistics of the latest risk analysis
             statistics: {
-              totalRisks: 0,
-              highRisks: 0,
-              mediumRisks: 0,
-              lowRisks: 0,
-              mitigatedRisks: 0,
-              pendingActions: 0
+              totalRisks: analysis ? analysis.total_risk_factors : 0,
+              highRisks: analysis ? analysis.high_risk_count : 0,
+              mediumRisks: analysis ? analysis.medium_risk_count : 0,
+              lowRisks: analysis ? analysis.low_risk_count : 0,
+              mitigatedRisks: 0, // TODO: implement mitigation tracking
+              pendingActions: 0 // TODO: implement action tracking
             },
             
             // Recent Activity - placeholder for now
@@ -69,56 +78,6 @@ const ProjectView = () => {
           };
           
           setProject(transformedProject);
-          
-          // Load project members
-          const membersResponse = await fetch(`http://localhost:8000/api/projects/${id}/members`, {
-            headers: {
-              'Authorization': `Bearer ${token}`
-            }
-          });
-          
-          if (membersResponse.ok) {
-            const membersData = await membersResponse.json();
-            const teamMembers = membersData.map(member => ({
-              id: member.user_id,
-              name: `${member.user_first_name} ${member.user_last_name}`,
-              role: member.role, // Keep original role (admin, manager, doctor)
-              email: member.user_email,
-              avatar: '/api/placeholder/40/40'
-            }));
-            
-            setProject(prev => ({
-              ...prev,
-              team: teamMembers
-            }));
-          }
-          
-          // Load risk statistics
-          const risksResponse = await fetch(`http://localhost:8000/api/risk-analyses/project/${id}/factors`, {
-            headers: {
-              'Authorization': `Bearer ${token}`
-            }
-          });
-          
-          if (risksResponse.ok) {
-            const risksData = await risksResponse.json();
-            const totalRisks = risksData.length;
-            const highRisks = risksData.filter(risk => risk.risk_score >= 15).length;
-            const mediumRisks = risksData.filter(risk => risk.risk_score >= 10 && risk.risk_score < 15).length;
-            const lowRisks = risksData.filter(risk => risk.risk_score < 10).length;
-            
-            setProject(prev => ({
-              ...prev,
-              statistics: {
-                totalRisks: totalRisks,
-                highRisks: highRisks,
-                mediumRisks: mediumRisks,
-                lowRisks: lowRisks,
-                mitigatedRisks: 0, // TODO: implement mitigation tracking
-                pendingActions: 0 // TODO: implement action tracking
-              }
-            }));
-          }
         } else if (response.status === 403) {
           setProject(null);
           alert('You do not have access to this project');
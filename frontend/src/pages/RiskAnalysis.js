@@ -98,31 +98,23 @@ const RiskAnalysis = () => {
     try {
       const token = localStorage.getItem('token');
       
-      // Load project data
-      const projectResponse = await fetch(`http://localhost:8000/api/projects/${id}`, {
+      // Load project data and risk factors in one request
+      const viewResponse = await fetch(`http://localhost:8000/api/projects/${id}/view?include=factors`, {
         headers: {
           'Authorization': `Bearer ${token}`
         }
       });
       
-      if (projectResponse.ok) {
-        const projectData = await projectResponse.json();
+      if (viewResponse.ok) {
+        const viewData = await viewResponse.json();
+        const projectData = viewData.project;
         setProject({
           id: projectData.id,
           name: projectData.name,
           deviceName: projectData.device_name
         });
-      }
-      
-      // Load risk factors
-      const risksResponse = await fetch(`http://localhost:8000/api/risk-analyses/project/${id}/factors`, {
-        headers: {
-          'Authorization': `Bearer ${token}`
-        }
-      });
-      
-      if (risksResponse.ok) {
-        const risksData = await risksResponse.json();
+        
+        const risksData = viewData.risk_factors || [];
         const transformedRisks = risksData.map(risk => ({
           id: risk.id,
           lifecycleStage: risk.lifecycle_stage,